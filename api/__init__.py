@@ -16,6 +16,18 @@ from flask_cors import CORS
 from .config import ApplicationConfig, ProductionConfig
 from .extensions import bcrypt, jwt
 from .database.models import db
+from .database.pool import init_pool_metrics, make_engine_options
+from .storage.blob_store import init_blob_store
+from .storage.images import init_image_processor
+from .storage.commands import blobs_cli
+from .functions.openai_clients import init_openai_clients
+from .functions.generation_cache import init_generation_cache
+from .functions.jwt_functions import init_parent_cache
+from .functions.passwords import init_password_hasher
+from .functions.compression import init_compression, static_cli
+from .functions.portraits import portraits_cli
+from .jobs.commands import jobs_cli
+from .database.commands import db_cli
 
 
 def create_app(config=ApplicationConfig) -> Flask:
@@ -37,18 +49,52 @@ def create_app(config=ApplicationConfig) -> Flask:
     # Load the configuration for the Flask app
     app.config.from_object(config)
 
+    # Size the connection pool of the database (unless the configuration
+    # sets the engine options itself)
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS", make_engine_options(app.config)
+    )
+
     # Initialize the Flask extensions
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
 
+    # Record (and periodically log) the metrics of the database pool
+    init_pool_metrics(app)
+
+    # Initialize the blob store holding the images
+    init_blob_store(app)
+
+    # Initialize the pool transcoding the generated images
+    init_image_processor(app)
+
+    # Initialize the pooled OpenAI clients (closed with the app)
+    init_openai_clients(app)
+
+    # Initialize the cache of the OpenAI generations
+    init_generation_cache(app)
+
+    # Initialize the pool hashing the passwords
+    init_password_hasher(app)
+
+    # Initialize the cache of the authenticated parents
+    init_parent_cache(app)
+
+    # Compress the responses and serve the precompressed static files
+    init_compression(app)
+
+    # Register the blob store, generation jobs, static files, portrait
+    # library and database migration CLI commands
+    app.cli.add_command(blobs_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(static_cli)
+    app.cli.add_command(portraits_cli)
+    app.cli.add_command(db_cli)
+
     # Enable CORS for the entire app (see the comment at line 7)
     CORS(app)
 
-    # Create tables in the database
-    with app.app_context():
-        db.create_all()
-
     from .api import api_blueprint
 
     # Register the 'api' blueprint with the Flask app
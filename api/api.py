@@ -5,6 +5,8 @@ This module contains the API routes for the Dreamify application.
 from flask import Blueprint
 from flask_restx import Api
 
+from .functions.representations import output_json
+
 # Create a blueprint for the API
 api_blueprint = Blueprint("api", __name__, url_prefix="/api")
 
@@ -16,11 +18,16 @@ api = Api(
     description="A Flask RESTX powered API for Dreamify",
 )
 
+# Encode the JSON responses with orjson (when installed)
+api.representations["application/json"] = output_json
+
 from .namespaces.auth import auth
 from .namespaces.children import children
 from .namespaces.stories import stories
+from .namespaces.media import media
 
 # Add the namespaces to the API
 api.add_namespace(auth)
 api.add_namespace(children)
 api.add_namespace(stories)
+api.add_namespace(media)
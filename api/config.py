@@ -3,6 +3,7 @@ This module contains the configuration for the Flask app.
 """
 
 import os
+import tempfile
 from uuid import uuid4
 from datetime import timedelta
 
@@ -26,6 +27,129 @@ class ApplicationConfig:
         "DEFAULT_DATABASE_URI", "sqlite:///db.sqlite"
     )
 
+    # Set the connection pool of the database engine (per process, so the
+    # database must accept replicas x workers x (size + overflow) connections):
+    # the kept and extra connections, the wait for a free connection and the
+    # lifetime of the connections (in seconds), whether the connections are
+    # checked before use, and the statement timeout (in milliseconds, 0 to
+    # disable). SQLite keeps the pool of its dialect.
+    DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 5))
+    DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 5))
+    DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", 10))
+    DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", 1800))
+    DATABASE_POOL_PRE_PING = (
+        os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+    )
+    DATABASE_STATEMENT_TIMEOUT = int(
+        os.getenv("DATABASE_STATEMENT_TIMEOUT", 30000)
+    )
+
+    # Set the interval (in seconds) between the logged metrics of the database
+    # pool (checkout wait time, saturation and churn), 0 to disable
+    DATABASE_POOL_METRICS_INTERVAL = float(
+        os.getenv("DATABASE_POOL_METRICS_INTERVAL", 60)
+    )
+
+    # Set the blob store used for the images ("local" or "s3")
+    BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+
+    # Set the directory of the local blob store (relative to the instance folder)
+    BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "blob_store")
+
+    # Set the S3 compatible object storage settings (only used by the "s3" backend)
+    BLOB_STORE_S3_ENDPOINT = os.getenv("BLOB_STORE_S3_ENDPOINT")
+    BLOB_STORE_S3_BUCKET = os.getenv("BLOB_STORE_S3_BUCKET")
+    BLOB_STORE_S3_ACCESS_KEY = os.getenv("BLOB_STORE_S3_ACCESS_KEY")
+    BLOB_STORE_S3_SECRET_KEY = os.getenv("BLOB_STORE_S3_SECRET_KEY")
+    BLOB_STORE_S3_REGION = os.getenv("BLOB_STORE_S3_REGION", "us-east-1")
+    BLOB_STORE_S3_PREFIX = os.getenv("BLOB_STORE_S3_PREFIX", "")
+
+    # Set the public base URL of the blobs (e.g. a CDN), served by the API if unset
+    BLOB_STORE_PUBLIC_URL = os.getenv("BLOB_STORE_PUBLIC_URL")
+
+    # Set the OpenAI API key and base URL (the OpenAI API if unset)
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+    # Set the connection pool, timeouts (in seconds) and retries of the OpenAI clients
+    OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 10)
+    )
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 30))
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 180))
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 10))
+    OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+
+    # Set the number of stories generated concurrently by a worker and its polling interval (in seconds)
+    GENERATION_WORKER_CONCURRENCY = int(
+        os.getenv("GENERATION_WORKER_CONCURRENCY", 4)
+    )
+    GENERATION_WORKER_POLL_INTERVAL = float(
+        os.getenv("GENERATION_WORKER_POLL_INTERVAL", 1)
+    )
+
+    # Set the attempts per job, the delay before the first retry (doubled after every failure)
+    # and the lease of a claimed job after which it is retried (in seconds)
+    GENERATION_JOB_MAX_ATTEMPTS = int(
+        os.getenv("GENERATION_JOB_MAX_ATTEMPTS", 3)
+    )
+    GENERATION_JOB_RETRY_DELAY = float(
+        os.getenv("GENERATION_JOB_RETRY_DELAY", 30)
+    )
+    GENERATION_JOB_LEASE = float(os.getenv("GENERATION_JOB_LEASE", 600))
+
+    # Set whether the OpenAI generations are cached, the lifetime (in seconds),
+    # the maximum number of the cached generations (least recently used evicted)
+    # and the time (in seconds) a used generation is kept from eviction (the
+    # lease of a generation job, so that its images are stored before)
+    GENERATION_CACHE_ENABLED = (
+        os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+    )
+    GENERATION_CACHE_TTL = float(
+        os.getenv("GENERATION_CACHE_TTL", 30 * 24 * 60 * 60)
+    )
+    GENERATION_CACHE_MAX_ENTRIES = int(
+        os.getenv("GENERATION_CACHE_MAX_ENTRIES", 10000)
+    )
+    GENERATION_CACHE_EVICTION_GRACE = float(
+        os.getenv("GENERATION_CACHE_EVICTION_GRACE", 600)
+    )
+
+    # Set the cost of the password hashes (rehashed on login when changed)
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+
+    # Set the default and maximum number of entries per page of the listings
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", 20))
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
+
+    # Set the maximum number of children added by a batch import
+    CHILDREN_BATCH_MAX_SIZE = int(os.getenv("CHILDREN_BATCH_MAX_SIZE", 500))
+
+    # Set the lifetime (in seconds) and the maximum number of the cached parent lookups
+    PARENT_CACHE_TTL = float(os.getenv("PARENT_CACHE_TTL", 60))
+    PARENT_CACHE_SIZE = int(os.getenv("PARENT_CACHE_SIZE", 1024))
+
+    # Set the number of processes transcoding the generated images, the format
+    # (WEBP or AVIF) and quality (0-100) of the transcoded images and the sizes
+    # (in pixels) of their thumbnails
+    IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+    IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+    IMAGE_THUMBNAIL_SIZES = [
+        int(size)
+        for size in os.getenv("IMAGE_THUMBNAIL_SIZES", "128,256,512").split(
+            ","
+        )
+    ]
+
+    # Set whether the responses are compressed, the minimum size (in bytes) of
+    # the compressed responses and the gzip (0-9) and Brotli (0-11) levels
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 4))
+
 
 class ProductionConfig(ApplicationConfig):
     """
@@ -70,5 +194,20 @@ class TestingConfig(ApplicationConfig):
         "TEST_DATABASE_URI", "sqlite:///:memory:"
     )
 
+    # Use a fresh local blob store in the temporary directory for the tests
+    BLOB_STORE_BACKEND = "local"
+    BLOB_STORE_PATH = os.path.join(
+        tempfile.gettempdir(), f"dreamify_test_blobs_{uuid4().hex}"
+    )
+
+    # Use the minimum cost of the password hashes in testing
+    BCRYPT_LOG_ROUNDS = 4
+
+    # Retry the failed generation jobs right away in testing
+    GENERATION_JOB_RETRY_DELAY = 0
+
+    # Do not cache the generations in testing (the tests count the API calls)
+    GENERATION_CACHE_ENABLED = False
+
     # Disable CSRF protection in testing
     WTF_CSRF_ENABLED = False
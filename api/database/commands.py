@@ -0,0 +1,87 @@
+"""
+This module contains the CLI commands to migrate the database schema.
+"""
+
+import click
+from alembic import command
+from flask.cli import AppGroup
+
+from .migrations import (
+    connect_for_migrations,
+    get_alembic_config,
+    upgrade_database,
+)
+from .models import db
+
+# Create a "flask db ..." command group
+db_cli = AppGroup("db", help="Migrate the database schema.")
+
+
+@db_cli.command("upgrade")
+@click.argument("revision", default="head")
+@click.option(
+    "--sql", is_flag=True, help="Print the SQL instead of running it."
+)
+def upgrade(revision: str, sql: bool) -> None:
+    """
+    Upgrade the database schema to a revision (the latest by default).
+    """
+    if sql:
+        command.upgrade(
+            get_alembic_config(url=db.engine.url.render_as_string(False)),
+            revision,
+            sql=True,
+        )
+        return
+
+    with connect_for_migrations(db.engine) as connection:
+        upgrade_database(connection, revision)
+
+
+@db_cli.command("downgrade")
+@click.argument("revision")
+@click.option(
+    "--sql", is_flag=True, help="Print the SQL instead of running it."
+)
+def downgrade(revision: str, sql: bool) -> None:
+    """
+    Downgrade the database schema to a revision.
+    """
+    if sql:
+        command.downgrade(
+            get_alembic_config(url=db.engine.url.render_as_string(False)),
+            revision,
+            sql=True,
+        )
+        return
+
+    with connect_for_migrations(db.engine) as connection:
+        command.downgrade(get_alembic_config(connection), revision)
+
+
+@db_cli.command("current")
+def current() -> None:
+    """
+    Show the revision of the database schema.
+    """
+    with connect_for_migrations(db.engine) as connection:
+        command.current(get_alembic_config(connection))
+
+
+@db_cli.command("revision")
+@click.option("-m", "--message", required=True, help="The revision message.")
+@click.option(
+    "--autogenerate",
+    is_flag=True,
+    help="Generate the operations from the differences with the models.",
+)
+def revision(message: str, autogenerate: bool) -> None:
+    """
+    Create a revision of the database schema.
+    """
+    with connect_for_migrations(db.engine) as connection:
+        command.revision(
+            get_alembic_config(connection),
+            message=message,
+            autogenerate=autogenerate,
+        )
@@ -0,0 +1,53 @@
+"""
+This module contains the IDs of the entries: time-ordered UUIDs (version 7)
+stored in native UUID columns (32 hexadecimal characters on the databases
+without a UUID type, e.g. SQLite) and handled by the app as 32 character
+hex strings.
+"""
+
+import os
+import time
+import uuid
+from typing import Any
+from sqlalchemy import Uuid
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator
+
+
+class UUIDHex(TypeDecorator):
+    """
+    A UUID column (UUID on PostgreSQL, CHAR(32) otherwise) whose values are
+    32 character hex strings.
+    """
+
+    impl = Uuid
+    cache_ok = True
+
+    def __init__(self) -> None:
+        super().__init__(as_uuid=False)
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> Any:
+        # The UUIDs are read back with hyphens
+        return value.replace("-", "") if value is not None else None
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a UUID version 7 (RFC 9562): the Unix time in milliseconds (48
+    bits) followed by random bits, so that the new entries are added at the
+    end of the primary key and foreign key indexes instead of at random
+    places.
+
+    Returns:
+        uuid.UUID: The UUID.
+    """
+    timestamp = time.time_ns() // 1_000_000
+    value = (timestamp & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(
+        os.urandom(10), "big"
+    )
+
+    # Set the version (7) and the variant (0b10) bits
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+
+    return uuid.UUID(int=value)
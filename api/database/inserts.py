@@ -2,18 +2,36 @@
 This module contains functions for inserting data into the database.
 """
 
+from typing import Any
 from flask import current_app
+from sqlalchemy import DateTime, Text, exists, insert, literal, select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
 from email_validator import validate_email, EmailNotValidError
 
-from ..extensions import bcrypt
+from ..functions.passwords import get_password_hasher
 from ..functions.input_validation import (
+    is_valid_id,
     validate_non_empty_string,
     validate_type,
     validate_list_of_non_empty_strings,
+    validate_list_of_non_empty_bytes,
     validate_allowed_value,
 )
+from ..jobs.queue import add_portrait_jobs
+from ..storage.images import (
+    ProcessedImage,
+    StoredImage,
+    store_processed_image,
+    validate_image,
+)
+from .ids import UUIDHex
 from .models import db, Parent, Child, Story, Chapter
+from .schemas import CHILD_SCHEMA, STORY_SCHEMA
+from .utilities import generate_id, utc_now
+
+# Image statuses of an inserted child
+INSERTED_IMAGE_STATUSES = ("pending", "ready")
 
 
 def insert_parent(
@@ -50,9 +68,7 @@ def insert_parent(
             raise ValueError(f"User with email '{email}' already exists.")
 
         # Hash the parent's password
-        hashed_password = bcrypt.generate_password_hash(password).decode(
-            "utf-8"
-        )
+        hashed_password = get_password_hasher().hash(password)
 
         # Create a parent
         parent = Parent(
@@ -82,7 +98,7 @@ def insert_parent(
 def insert_child(
     parent_id: str,
     name: str,
-    image: str,
+    image: bytes | StoredImage,
     age_range: str,
     sex: str,
     eye_color: str,
@@ -92,14 +108,18 @@ def insert_child(
     fav_animals: str | None = None,
     fav_activities: str | None = None,
     fav_shows: str | None = None,
+    thumbnails: dict[int, bytes] | None = None,
+    image_status: str = "ready",
 ) -> Child:
     """
-    Insert a child into the database.
+    Insert a child into the database, with the job generating its portrait
+    when its image is a placeholder (in the same transaction).
 
     Args:
         parent_id (str): The ID of the parent.
         name (str): The name of the child.
-        image (str): The image of the child in base64 string format.
+        image (bytes | StoredImage): The raw bytes of the child's image, or
+            the keys of an image already stored (e.g. a library portrait).
         age_range (str): The age range of the child.
         sex (str): The sex of the child.
         eye_color (str): The eye color of the child.
@@ -109,6 +129,12 @@ def insert_child(
         fav_animals (str | None): The child's favorite animals. Optional.
         fav_activities (str | None): The child's favorite activities. Optional.
         fav_shows (str | None): The child's favorite shows. Optional.
+        thumbnails (dict[int, bytes] | None): The raw bytes of the
+            thumbnails of the image (by size in pixels), ignored for a
+            stored image. Optional.
+        image_status (str): The status of the image ("pending" when the
+            image is a placeholder until the portrait is generated by a
+            queued job). Defaults to "ready".
 
     Raises:
         ValueError: If the parent does not exist.
@@ -116,55 +142,53 @@ def insert_child(
     Returns:
         Child: The inserted child.
     """
-    # Validation constants
-    valid_age_ranges = ["0-3", "4-6", "7-9", "10-13"]
-    valid_sexes = ["Male", "Female"]
-    valid_eye_colors = ["Blue", "Brown", "Green", "Hazel", "Amber", "Gray"]
-    valid_hair_types = ["Straight", "Wavy", "Curly", "Kinky", "Bald"]
-    valid_hair_colors = [
-        "Blonde",
-        "Brown",
-        "Black",
-        "Red",
-        "Auburn",
-        "Gray",
-        "White",
-        "Bald",
-    ]
-
     try:
         # Validate required fields
         validate_non_empty_string(parent_id, "parent_id")
-        validate_non_empty_string(name, "name")
-        validate_non_empty_string(image, "image")
-        validate_non_empty_string(age_range, "age_range")
-        validate_non_empty_string(sex, "sex")
-        validate_non_empty_string(eye_color, "eye_color")
-        validate_non_empty_string(hair_type, "hair_type")
-        validate_non_empty_string(hair_color, "hair_color")
-        validate_non_empty_string(ethnicity, "ethnicity")
-
-        # Validate optional fields with allowance for None
-        validate_type(fav_animals, [str], "fav_animals", allow_none=True)
-        validate_type(fav_activities, [str], "fav_activities", allow_none=True)
-        validate_type(fav_shows, [str], "fav_shows", allow_none=True)
-
-        # Validate allowed values
-        validate_allowed_value(age_range, valid_age_ranges, "age_range")
-        validate_allowed_value(sex, valid_sexes, "sex")
-        validate_allowed_value(eye_color, valid_eye_colors, "eye_color")
-        validate_allowed_value(hair_type, valid_hair_types, "hair_type")
-        validate_allowed_value(hair_color, valid_hair_colors, "hair_color")
-
-        # Check if the parent exists
-        if Parent.query.filter_by(user_id=parent_id).first() is None:
+        validate_image(image, "image")
+        validate_allowed_value(
+            image_status, INSERTED_IMAGE_STATUSES, "image_status"
+        )
+
+        # Validate the attributes of the child (all the errors at once)
+        CHILD_SCHEMA.validate(
+            {
+                "name": name,
+                "age_range": age_range,
+                "sex": sex,
+                "eye_color": eye_color,
+                "hair_type": hair_type,
+                "hair_color": hair_color,
+                "ethnicity": ethnicity,
+                "fav_animals": fav_animals,
+                "fav_activities": fav_activities,
+                "fav_shows": fav_shows,
+            }
+        )
+
+        # Check if the parent exists (without loading the row, a malformed
+        # ID cannot exist)
+        if (
+            not is_valid_id(parent_id)
+            or not db.session.query(
+                exists().where(Parent.user_id == parent_id)
+            ).scalar()
+        ):
             raise ValueError(f"Parent with ID '{parent_id}' does not exist.")
 
+        # Store the image and its thumbnails in the blob store (unless they
+        # are stored already), the row only keeps their keys
+        image_key, thumbnail_keys = store_processed_image(
+            image
+            if isinstance(image, StoredImage)
+            else ProcessedImage(image, thumbnails or {})
+        )
+
         # Create and insert the child
         child = Child(
             parent_id=parent_id,
             name=name,
-            image=image,
+            image=image_key,
             age_range=age_range,
             sex=sex,
             eye_color=eye_color,
@@ -174,8 +198,17 @@ def insert_child(
             fav_animals=fav_animals,
             fav_activities=fav_activities,
             fav_shows=fav_shows,
+            thumbnails=thumbnail_keys or None,
+            image_status=image_status,
         )
         db.session.add(child)
+
+        # Queue the generation of the portrait (the child is inserted first,
+        # the job references it)
+        if image_status == "pending":
+            db.session.flush()
+            add_portrait_jobs(parent_id, [child.child_id])
+
         db.session.commit()
 
         return child
@@ -189,6 +222,153 @@ def insert_child(
         raise e
 
 
+def validate_children(children: list[dict[str, Any]]) -> dict[int, str]:
+    """
+    Validate the attributes of many children (e.g. a batch import).
+
+    Args:
+        children (list[dict[str, Any]]): The attributes of the children.
+
+    Returns:
+        dict[int, str]: The errors of each invalid child (by index), empty
+            when all the children are valid.
+    """
+    errors = {}
+    for i, child in enumerate(children):
+        child_errors = CHILD_SCHEMA.get_errors(child)
+        if child_errors:
+            errors[i] = " ".join(child_errors.values())
+    return errors
+
+
+def insert_children(
+    parent_id: str, children: list[dict[str, Any]]
+) -> list[Child]:
+    """
+    Insert many children of a parent into the database in one transaction,
+    with the jobs generating the portraits of the children whose image is a
+    placeholder.
+
+    Args:
+        parent_id (str): The ID of the parent.
+        children (list[dict[str, Any]]): The attributes of the children (as
+            taken by insert_child), with the raw bytes of their "image" (or
+            the keys of an image already stored), of its "thumbnails"
+            (optional) and their "image_status" (optional, defaults to
+            "ready").
+
+    Raises:
+        ValueError: If a child is invalid or the parent does not exist.
+        SQLAlchemyError: If an error occurs with the database.
+
+    Returns:
+        list[Child]: The inserted children (in the same order).
+    """
+    try:
+        # Validate the parent ID
+        validate_non_empty_string(parent_id, "parent_id")
+
+        # Validate the attributes of all the children
+        errors = validate_children(children)
+        if errors:
+            i = min(errors)
+            raise ValueError(f"Invalid child at index {i}: {errors[i]}")
+
+        # Validate the images and their statuses
+        for i, child in enumerate(children):
+            validate_image(child.get("image"), f"children[{i}].image")
+            validate_allowed_value(
+                child.get("image_status", "ready"),
+                INSERTED_IMAGE_STATUSES,
+                f"children[{i}].image_status",
+            )
+
+        # Check if the parent exists (without loading the row, a malformed
+        # ID cannot exist)
+        if (
+            not is_valid_id(parent_id)
+            or not db.session.query(
+                exists().where(Parent.user_id == parent_id)
+            ).scalar()
+        ):
+            raise ValueError(f"Parent with ID '{parent_id}' does not exist.")
+
+        # Store the images and their thumbnails in the blob store, once per
+        # distinct image (e.g. the placeholder shared by the children), the
+        # images already stored keep their keys
+        stored_images = {}
+        for child in children:
+            image = child["image"]
+            if not isinstance(image, StoredImage) and (
+                image not in stored_images
+            ):
+                stored_images[image] = store_processed_image(
+                    ProcessedImage(image, child.get("thumbnails") or {})
+                )
+
+        # Create the children, with their IDs generated on the client
+        created_at = utc_now()
+        new_children = []
+        for child in children:
+            image = child["image"]
+            image_key, thumbnail_keys = (
+                image
+                if isinstance(image, StoredImage)
+                else stored_images[image]
+            )
+            new_child = Child(
+                parent_id=parent_id,
+                image=image_key,
+                thumbnails=thumbnail_keys or None,
+                image_status=child.get("image_status", "ready"),
+                **{field: child.get(field) for field in CHILD_SCHEMA.names},
+            )
+            new_child.child_id = generate_id()
+            new_child.created_at = created_at
+            new_children.append(new_child)
+
+        # Insert all the children in a single statement (an executemany,
+        # batched into multi-row INSERTs on PostgreSQL)
+        if new_children:
+            columns = [column.key for column in Child.__table__.columns]
+            db.session.execute(
+                # Keep the NULLs so that the rows are not split into
+                # batches by their non-NULL columns
+                insert(Child).execution_options(render_nulls=True),
+                [
+                    {column: getattr(child, column) for column in columns}
+                    for child in new_children
+                ],
+            )
+
+        # Queue the generation of the missing portraits (in one statement)
+        add_portrait_jobs(
+            parent_id,
+            [
+                child.child_id
+                for child in new_children
+                if child.image_status == "pending"
+            ],
+        )
+        db.session.commit()
+
+        # Attach the inserted children to the session (without inserting
+        # them or reloading them)
+        for new_child in new_children:
+            make_transient_to_detached(new_child)
+            db.session.add(new_child)
+
+        return new_children
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to add children: {e}")
+        raise e
+    except Exception as e:
+        current_app.logger.error(f"Failed to add children: {e}")
+        raise e
+
+
 def insert_story(
     child_id: str,
     title: str,
@@ -197,7 +377,8 @@ def insert_story(
     story_genre: str,
     chapter_titles: list[str],
     chapter_contents: list[str],
-    images: list[str],
+    images: list[bytes],
+    thumbnails: list[dict[int, bytes]] | None = None,
 ) -> Story:
     """
     Insert a story and its chapters into the database.
@@ -210,7 +391,9 @@ def insert_story(
         story_genre (str): The genre of the story.
         chapter_titles (list[str]): The list of story chapter titles.
         chapter_contents (list[str]): The list of story chapter contents.
-        images (list[str]): The list of images.
+        images (list[bytes]): The list of raw chapter image bytes.
+        thumbnails (list[dict[int, bytes]] | None): The list of raw bytes of
+            the thumbnails of the chapter images (by size in pixels). Optional.
 
     Raises:
         ValueError: If the child with the given ID does not exist.
@@ -218,26 +401,17 @@ def insert_story(
     Returns:
         Story: The inserted story.
     """
-    valid_image_styles = [
-        "Cartoon",
-        "Realistic",
-        "Fantasy",
-        "Watercolor",
-        "Anime",
-    ]
-    valid_story_genres = ["Fantasy", "Adventure", "Educational"]
-
     try:
-        # Validate inputs
+        # Validate inputs (all the errors of the story at once)
         validate_non_empty_string(child_id, "child_id")
-        validate_non_empty_string(title, "title")
-        validate_non_empty_string(topic, "topic")
-        validate_non_empty_string(image_style, "image_style")
-        validate_non_empty_string(story_genre, "story_genre")
-
-        # Validate allowed values
-        validate_allowed_value(image_style, valid_image_styles, "image_style")
-        validate_allowed_value(story_genre, valid_story_genres, "story_genre")
+        STORY_SCHEMA.validate(
+            {
+                "title": title,
+                "topic": topic,
+                "image_style": image_style,
+                "story_genre": story_genre,
+            }
+        )
 
         # Validate types
         validate_type(chapter_titles, [list], "chapter_titles")
@@ -252,25 +426,86 @@ def insert_story(
                 f"{len(chapter_titles)}, {len(chapter_contents)}, and {len(images)}."
             )
 
-        # Check for valid chapter titles, contents, and images
-        validate_list_of_non_empty_strings(chapter_titles, "chapter_titles")
-        validate_list_of_non_empty_strings(
-            chapter_contents, "chapter_contents"
-        )
-        validate_list_of_non_empty_strings(images, "images")
+        # Check that every image has its thumbnails (if any)
+        if thumbnails is not None and len(thumbnails) != len(images):
+            raise ValueError(
+                "Lists of images and thumbnails must have the same length "
+                f"but have lengths of {len(images)} and {len(thumbnails)}."
+            )
 
         # Check for valid chapter titles, contents, and images
         validate_list_of_non_empty_strings(chapter_titles, "chapter_titles")
         validate_list_of_non_empty_strings(
             chapter_contents, "chapter_contents"
         )
-        validate_list_of_non_empty_strings(images, "images")
+        validate_list_of_non_empty_bytes(images, "images")
+
+        # Generate the IDs on the client, so that nothing is read back
+        story_id = generate_id()
+        created_at = utc_now()
 
-        # Verify that the child exists
-        if not Child.query.filter_by(child_id=child_id).first():
+        # A malformed ID cannot exist (nor be bound to the UUID column)
+        if not is_valid_id(child_id):
             raise ValueError(f"Child with ID '{child_id}' does not exist")
 
-        # Create and insert the story
+        # Insert the story only if the child exists (checked by the INSERT
+        # itself instead of a separate SELECT)
+        inserted = db.session.execute(
+            insert(Story).from_select(
+                [
+                    "story_id",
+                    "child_id",
+                    "title",
+                    "topic",
+                    "image_style",
+                    "story_genre",
+                    "created_at",
+                ],
+                select(
+                    literal(story_id, UUIDHex),
+                    Child.child_id,
+                    literal(title, Text),
+                    literal(topic, Text),
+                    literal(image_style, Text),
+                    literal(story_genre, Text),
+                    literal(created_at, DateTime),
+                ).where(Child.child_id == child_id),
+            )
+        )
+        if inserted.rowcount == 0:
+            raise ValueError(f"Child with ID '{child_id}' does not exist")
+
+        # Store the images and their thumbnails in the blob store, the rows
+        # only keep their keys
+        stored_images = [
+            store_processed_image(ProcessedImage(image, image_thumbnails))
+            for image, image_thumbnails in zip(
+                images, thumbnails or [{}] * len(images)
+            )
+        ]
+
+        # Insert all the chapters in a single statement (an executemany,
+        # batched into multi-row INSERTs on PostgreSQL)
+        chapters = [
+            {
+                "chapter_id": generate_id(),
+                "story_id": story_id,
+                "title": chapter_title,
+                "content": content,
+                "image": image_key,
+                "order": i,
+                "thumbnails": thumbnail_keys or None,
+            }
+            for i, (chapter_title, content, (image_key, thumbnail_keys)) in (
+                enumerate(
+                    zip(chapter_titles, chapter_contents, stored_images), 1
+                )
+            )
+        ]
+        if chapters:
+            db.session.execute(insert(Chapter), chapters)
+
+        # Attach the inserted story to the session (without inserting it)
         story = Story(
             child_id=child_id,
             title=title,
@@ -278,24 +513,11 @@ def insert_story(
             image_style=image_style,
             story_genre=story_genre,
         )
+        story.story_id = story_id
+        story.created_at = created_at
+        make_transient_to_detached(story)
         db.session.add(story)
 
-        # Flush to get the story_id for chapter insertion
-        db.session.flush()
-
-        # Add chapters to the database
-        for i, (title, content, image) in enumerate(
-            zip(chapter_titles, chapter_contents, images), 1
-        ):
-            chapter = Chapter(
-                story_id=story.story_id,
-                title=title,
-                content=content,
-                image=image,
-                order=i,
-            )
-            db.session.add(chapter)
-
         db.session.commit()
         return story
     except SQLAlchemyError as e:
@@ -303,5 +525,6 @@ def insert_story(
         current_app.logger.error(f"Failed to add story: {e}")
         raise e
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Failed to add story: {e}")
         raise e
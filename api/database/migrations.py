@@ -0,0 +1,189 @@
+"""
+This module contains the migrations of the database schema (with Alembic,
+the revisions are in the migrations folder of the API) and the operations
+building the indexes of PostgreSQL without blocking the writes.
+"""
+
+import os
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+from alembic import command, op
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+from .models import db
+
+# Path to the migrations (the Alembic script directory)
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+
+# Revision of the schema created by db.create_all before the migrations
+BASELINE_REVISION = "0001"
+
+
+def get_alembic_config(
+    connection: Connection | None = None, url: str | None = None
+) -> Config:
+    """
+    Get the Alembic configuration of the migrations.
+
+    Args:
+        connection (Connection, optional): The connection running the
+            migrations.
+        url (str, optional): The URL of the database (to generate the SQL of
+            the migrations instead of running them).
+
+    Returns:
+        Config: The configuration (read by migrations/env.py).
+    """
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_PATH)
+    if url is not None:
+        # Escape the "%" of the URL (interpolated by the configuration)
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    config.attributes["connection"] = connection
+    config.attributes["target_metadata"] = db.metadata
+    return config
+
+
+@contextmanager
+def connect_for_migrations(engine: Engine) -> Iterator[Connection]:
+    """
+    Connect to the database to migrate its schema, without the statement
+    timeout of the app on PostgreSQL (DATABASE_STATEMENT_TIMEOUT, set on
+    every connection of the engine): the migrations rewrite whole tables
+    and build indexes, which take longer than any request.
+
+    Args:
+        engine (Engine): The engine of the app.
+
+    Yields:
+        Connection: The connection (outside of a transaction).
+    """
+    with engine.connect() as connection:
+        if connection.dialect.name != "postgresql":
+            yield connection
+            return
+
+        connection.exec_driver_sql("SET statement_timeout = 0")
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            # Restore the timeout of the connection before it is returned
+            # to the pool
+            connection.rollback()
+            connection.exec_driver_sql("RESET statement_timeout")
+            connection.commit()
+
+
+def is_unversioned(connection: Connection) -> bool:
+    """
+    Check whether the schema was created by db.create_all (before the
+    migrations): the tables exist but not their revision.
+
+    Args:
+        connection (Connection): The connection.
+
+    Returns:
+        bool: True if the schema is not versioned yet, False otherwise.
+    """
+    if not inspect(connection).has_table("parents"):
+        return False
+    return (
+        MigrationContext.configure(connection).get_current_revision() is None
+    )
+
+
+def upgrade_database(connection: Connection, revision: str = "head") -> None:
+    """
+    Upgrade the schema of the database to a revision.
+
+    A schema created by db.create_all before the migrations is stamped with
+    the baseline revision first (which it matches), then upgraded like the
+    others.
+
+    Args:
+        connection (Connection): The connection (outside of a transaction).
+        revision (str, optional): The target revision, the latest by default.
+    """
+    config = get_alembic_config(connection)
+
+    # Adopt a schema created before the migrations
+    adopt = is_unversioned(connection)
+    connection.commit()
+    if adopt:
+        command.stamp(config, BASELINE_REVISION)
+
+    # Run the migrations (each one in its own transaction)
+    command.upgrade(config, revision)
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    **kwargs: Any,
+) -> None:
+    """
+    Create an index in a migration without blocking the writes to its table:
+    CREATE INDEX CONCURRENTLY on PostgreSQL (run outside of the transaction
+    of the migration, which is committed first), a plain CREATE INDEX on the
+    other databases.
+
+    An interrupted concurrent build leaves an invalid index behind, so the
+    index is dropped first (if it exists) for the migration to be retried.
+
+    Args:
+        index_name (str): The name of the index.
+        table_name (str): The name of its table.
+        columns (Sequence[str]): The indexed columns.
+        **kwargs (Any): The other arguments of op.create_index (e.g. unique).
+    """
+    context = op.get_context()
+    if context.dialect.name != "postgresql":
+        op.create_index(index_name, table_name, columns, **kwargs)
+        return
+
+    with context.autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name=table_name,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            index_name,
+            table_name,
+            columns,
+            postgresql_concurrently=True,
+            **kwargs,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """
+    Drop an index in a migration without blocking the writes to its table:
+    DROP INDEX CONCURRENTLY on PostgreSQL (run outside of the transaction of
+    the migration), a plain DROP INDEX on the other databases.
+
+    Args:
+        index_name (str): The name of the index.
+        table_name (str): The name of its table.
+    """
+    context = op.get_context()
+    if context.dialect.name != "postgresql":
+        op.drop_index(index_name, table_name=table_name)
+        return
+
+    with context.autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name=table_name,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -2,10 +2,19 @@
 This module contains the database models.
 """
 
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import CheckConstraint
+from sqlalchemy.orm import deferred
 
-from .utilities import generate_id
+from .ids import UUIDHex
+from .schemas import (
+    CHILD_IMAGE_STATUSES,
+    CHILD_SCHEMA,
+    STORY_SCHEMA,
+    check_constraint,
+)
+from .utilities import generate_id, utc_now
 
 # Create a SQLAlchemy instance
 db = SQLAlchemy()
@@ -32,7 +41,7 @@ class Parent(db.Model):
     # Define the table name
     __tablename__ = "parents"
 
-    user_id = db.Column(db.Text, primary_key=True, default=generate_id)
+    user_id = db.Column(UUIDHex, primary_key=True, default=generate_id)
     first_name = db.Column(db.Text, nullable=False)
     last_name = db.Column(db.Text, nullable=False)
     password = db.Column(db.Text, nullable=False)
@@ -71,6 +80,8 @@ class Child(db.Model):
         fav_animals: str | None = None,
         fav_activities: str | None = None,
         fav_shows: str | None = None,
+        thumbnails: dict[str, str] | None = None,
+        image_status: str = "ready",
     ) -> None:
         super().__init__()
         self.parent_id = parent_id
@@ -85,41 +96,49 @@ class Child(db.Model):
         self.fav_animals = fav_animals
         self.fav_activities = fav_activities
         self.fav_shows = fav_shows
+        self.thumbnails = thumbnails
+        self.image_status = image_status
 
     # Define the table name
     __tablename__ = "children"
 
-    child_id = db.Column(db.Text, primary_key=True, default=generate_id)
-    parent_id = db.Column(db.Text, db.ForeignKey("parents.user_id"))
+    child_id = db.Column(UUIDHex, primary_key=True, default=generate_id)
+    parent_id = db.Column(UUIDHex, db.ForeignKey("parents.user_id"))
     name = db.Column(db.Text, nullable=False)
-    image = db.Column(db.Text, nullable=False)
+    # Blob store key of the image (the bytes live in the blob store),
+    # deferred so that it is only loaded when needed (see query_shapes.py)
+    image = deferred(db.Column(db.Text, nullable=False))
+    # Blob store keys of the thumbnails of the image (by size in pixels)
+    thumbnails = db.Column(db.JSON, nullable=True)
+    # Status of the portrait (a placeholder is the image while it is pending,
+    # the portrait is generated by the job worker)
+    image_status = db.Column(
+        db.Text,
+        check_constraint("image_status", CHILD_IMAGE_STATUSES),
+        nullable=False,
+        default="ready",
+    )
     age_range = db.Column(
         db.Text,
-        CheckConstraint("age_range IN ('0-3', '4-6', '7-9', '10-13')"),
+        CHILD_SCHEMA.check_constraint("age_range"),
         nullable=False,
     )
     sex = db.Column(
-        db.Text, CheckConstraint("sex IN ('Male', 'Female')"), nullable=False
+        db.Text, CHILD_SCHEMA.check_constraint("sex"), nullable=False
     )
     eye_color = db.Column(
         db.Text,
-        CheckConstraint(
-            "eye_color IN ('Blue', 'Brown', 'Green', 'Hazel', 'Amber', 'Gray')"
-        ),
+        CHILD_SCHEMA.check_constraint("eye_color"),
         nullable=False,
     )
     hair_type = db.Column(
         db.Text,
-        CheckConstraint(
-            "hair_type IN ('Straight', 'Wavy', 'Curly', 'Kinky', 'Bald')"
-        ),
+        CHILD_SCHEMA.check_constraint("hair_type"),
         nullable=False,
     )
     hair_color = db.Column(
         db.Text,
-        CheckConstraint(
-            "hair_color IN ('Blonde', 'Brown', 'Black', 'Red', 'Auburn', 'Gray', 'White', 'Bald')"
-        ),
+        CHILD_SCHEMA.check_constraint("hair_color"),
         nullable=False,
     )
     ethnicity = db.Column(
@@ -129,6 +148,7 @@ class Child(db.Model):
     fav_animals = db.Column(db.Text, nullable=True)
     fav_activities = db.Column(db.Text, nullable=True)
     fav_shows = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now)
 
     # Relationship to Story
     stories = db.relationship("Story", backref="child", lazy=True)
@@ -139,6 +159,13 @@ class Child(db.Model):
         db.Index("idx_children_child_id", "child_id"),
         # Composite index to optimize get_child_from_parent and child_belongs_to_parent
         db.Index("idx_children_parent_id_child_id", "parent_id", "child_id"),
+        # Composite index to optimize the (keyset) pages of get_children
+        db.Index(
+            "idx_children_parent_id_created_at",
+            "parent_id",
+            "created_at",
+            "child_id",
+        ),
     )
 
 
@@ -165,33 +192,38 @@ class Story(db.Model):
     # Define the table name
     __tablename__ = "stories"
 
-    story_id = db.Column(db.Text, primary_key=True, default=generate_id)
-    child_id = db.Column(db.Text, db.ForeignKey("children.child_id"))
+    story_id = db.Column(UUIDHex, primary_key=True, default=generate_id)
+    child_id = db.Column(UUIDHex, db.ForeignKey("children.child_id"))
     title = db.Column(db.Text, nullable=False)
     topic = db.Column(db.Text, nullable=False)
     image_style = db.Column(
         db.Text,
-        CheckConstraint(
-            "image_style IN ('Cartoon', 'Realistic', 'Fantasy', 'Watercolor', 'Anime')"
-        ),
+        STORY_SCHEMA.check_constraint("image_style"),
         nullable=False,
     )
     story_genre = db.Column(
         db.Text,
-        CheckConstraint(
-            "story_genre IN ('Fantasy', 'Adventure', 'Educational')"
-        ),
+        STORY_SCHEMA.check_constraint("story_genre"),
         nullable=False,
     )
-    created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now)
 
-    # Relationship to Chapter
-    chapters = db.relationship("Chapter", backref="story", lazy=True)
+    # Relationship to Chapter (in the order of the story)
+    chapters = db.relationship(
+        "Chapter", backref="story", lazy=True, order_by="Chapter.order"
+    )
 
     # Indices
     __table_args__ = (
         # Index to optimize get_story
         db.Index("idx_stories_story_id", "story_id"),
+        # Composite index to optimize the (keyset) pages of get_child_stories
+        db.Index(
+            "idx_stories_child_id_created_at",
+            "child_id",
+            "created_at",
+            "story_id",
+        ),
     )
 
 
@@ -201,20 +233,227 @@ class Chapter(db.Model):
     """
 
     def __init__(
-        self, story_id: str, title: str, content: str, image: str, order: int
+        self,
+        story_id: str,
+        title: str,
+        content: str,
+        image: str,
+        order: int,
+        thumbnails: dict[str, str] | None = None,
     ) -> None:
         self.story_id = story_id
         self.title = title
         self.content = content
         self.image = image
         self.order = order
+        self.thumbnails = thumbnails
 
     # Define the table name
     __tablename__ = "chapters"
 
-    chapter_id = db.Column(db.Text, primary_key=True, default=generate_id)
-    story_id = db.Column(db.Text, db.ForeignKey("stories.story_id"))
+    chapter_id = db.Column(UUIDHex, primary_key=True, default=generate_id)
+    story_id = db.Column(UUIDHex, db.ForeignKey("stories.story_id"))
     title = db.Column(db.Text, nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    image = db.Column(db.Text, nullable=False)
+    # Deferred heavy columns, only loaded when needed (see query_shapes.py)
+    content = deferred(db.Column(db.Text, nullable=False))
+    # Blob store key of the image (the bytes live in the blob store)
+    image = deferred(db.Column(db.Text, nullable=False))
+    # Blob store keys of the thumbnails of the image (by size in pixels)
+    thumbnails = db.Column(db.JSON, nullable=True)
     order = db.Column(db.Integer, nullable=False)
+
+    # Indices
+    __table_args__ = (
+        # Composite index to optimize the loading of the chapters of stories
+        db.Index("idx_chapters_story_id_order", "story_id", "order"),
+    )
+
+
+class GenerationJob(db.Model):
+    """
+    Represents a queued story or child portrait generation (processed by the
+    job worker).
+    """
+
+    def __init__(
+        self,
+        parent_id: str,
+        child_id: str,
+        max_attempts: int,
+        available_at: datetime,
+        kind: str = "story",
+        topic: str | None = None,
+        image_style: str | None = None,
+        story_genre: str | None = None,
+    ) -> None:
+        super().__init__()
+        self.parent_id = parent_id
+        self.child_id = child_id
+        self.kind = kind
+        self.topic = topic
+        self.image_style = image_style
+        self.story_genre = story_genre
+        self.max_attempts = max_attempts
+        self.available_at = available_at
+
+    # Define the table name
+    __tablename__ = "generation_jobs"
+
+    job_id = db.Column(UUIDHex, primary_key=True, default=generate_id)
+    parent_id = db.Column(
+        UUIDHex, db.ForeignKey("parents.user_id"), nullable=False
+    )
+    child_id = db.Column(
+        UUIDHex, db.ForeignKey("children.child_id"), nullable=False
+    )
+    kind = db.Column(
+        db.Text,
+        CheckConstraint("kind IN ('story', 'portrait')"),
+        nullable=False,
+        default="story",
+    )
+    # Parameters of the story (only for the story generations)
+    topic = db.Column(db.Text, nullable=True)
+    image_style = db.Column(db.Text, nullable=True)
+    story_genre = db.Column(db.Text, nullable=True)
+    status = db.Column(
+        db.Text,
+        CheckConstraint(
+            "status IN ('queued', 'running', 'succeeded', 'failed')"
+        ),
+        nullable=False,
+        default="queued",
+    )
+    # Number of times the job has been claimed by a worker
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    # Time from which the job can be claimed (delayed when retried)
+    available_at = db.Column(db.DateTime, nullable=False)
+    # End of the lease of the claiming worker (the job is claimed again
+    # after it, e.g. when the worker crashed)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    story_id = db.Column(
+        UUIDHex, db.ForeignKey("stories.story_id"), nullable=True
+    )
+    created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=db.func.now(),
+        onupdate=db.func.now(),
+    )
+
+    # Indices
+    __table_args__ = (
+        # Composite index to optimize claim_generation_jobs
+        db.Index(
+            "idx_generation_jobs_status_available_at",
+            "status",
+            "available_at",
+        ),
+    )
+
+
+class GenerationCacheEntry(db.Model):
+    """
+    Represents a cached OpenAI generation (keyed by its model, parameters
+    and prompt).
+    """
+
+    def __init__(
+        self,
+        cache_key: str,
+        kind: str,
+        model: str,
+        value: str,
+        expires_at: datetime,
+    ) -> None:
+        super().__init__()
+        self.cache_key = cache_key
+        self.kind = kind
+        self.model = model
+        self.value = value
+        self.expires_at = expires_at
+
+    # Define the table name
+    __tablename__ = "generation_cache"
+
+    # SHA-256 digest of the model, the parameters and the prompt
+    cache_key = db.Column(db.Text, primary_key=True)
+    kind = db.Column(
+        db.Text, CheckConstraint("kind IN ('text', 'image')"), nullable=False
+    )
+    model = db.Column(db.Text, nullable=False)
+    # Generated text, or blob store key of the generated image
+    value = db.Column(db.Text, nullable=False)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now)
+    last_used_at = db.Column(db.DateTime, nullable=False, default=utc_now)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    # Indices
+    __table_args__ = (
+        # Index to optimize the eviction of the least recently used entries
+        db.Index("idx_generation_cache_last_used_at", "last_used_at"),
+        # Index to optimize the eviction of the expired entries
+        db.Index("idx_generation_cache_expires_at", "expires_at"),
+    )
+
+
+class Portrait(db.Model):
+    """
+    Represents a pre-generated child portrait of the portrait library.
+    """
+
+    def __init__(
+        self,
+        age_range: str,
+        sex: str,
+        eye_color: str,
+        hair_type: str,
+        hair_color: str,
+        ethnicity: str,
+        image: str,
+        thumbnails: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__()
+        self.age_range = age_range
+        self.sex = sex
+        self.eye_color = eye_color
+        self.hair_type = hair_type
+        self.hair_color = hair_color
+        self.ethnicity = ethnicity
+        self.image = image
+        self.thumbnails = thumbnails
+
+    # Define the table name
+    __tablename__ = "portraits"
+
+    portrait_id = db.Column(UUIDHex, primary_key=True, default=generate_id)
+    age_range = db.Column(db.Text, nullable=False)
+    sex = db.Column(db.Text, nullable=False)
+    eye_color = db.Column(db.Text, nullable=False)
+    hair_type = db.Column(db.Text, nullable=False)
+    hair_color = db.Column(db.Text, nullable=False)
+    # Normalized ethnicity (free text, see functions/portraits.py)
+    ethnicity = db.Column(db.Text, nullable=False)
+    # Blob store keys of the image and its thumbnails (by size in pixels)
+    image = db.Column(db.Text, nullable=False)
+    thumbnails = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now)
+
+    # Indices
+    __table_args__ = (
+        # Unique index to optimize the lookup of the portraits by attributes
+        db.Index(
+            "idx_portraits_attributes",
+            "age_range",
+            "sex",
+            "eye_color",
+            "hair_type",
+            "hair_color",
+            "ethnicity",
+            unique=True,
+        ),
+    )
@@ -0,0 +1,201 @@
+"""
+This module contains functions for paginating and projecting the listings.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, load_only
+from sqlalchemy.inspection import inspect
+
+
+class Page(NamedTuple):
+    """
+    Represents a page of entries and the cursor of the next page.
+    """
+
+    items: list[Any]
+    next_cursor: str | None
+
+
+def encode_cursor(created_at: datetime, entry_id: str) -> str:
+    """
+    Encode the position of an entry as an opaque cursor.
+
+    Args:
+        created_at (datetime): The creation time of the entry.
+        entry_id (str): The ID of the entry.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = json.dumps([created_at.isoformat(), entry_id])
+    return urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Decode a cursor into the position of an entry.
+
+    Args:
+        cursor (str): The cursor.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+
+    Returns:
+        tuple[datetime, str]: The creation time and the ID of the entry.
+    """
+    try:
+        created_at, entry_id = json.loads(urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), str(entry_id)
+    except (BinasciiError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def parse_fields(value: str | None, model) -> list[str] | None:
+    """
+    Parse a comma-separated list of fields of a model (e.g. "name,image").
+
+    Args:
+        value (str | None): The fields, None or empty to select all fields.
+        model: The model of the entries.
+
+    Raises:
+        ValueError: If a field is not a column of the model.
+
+    Returns:
+        list[str] | None: The fields, None to select all fields.
+    """
+    if not value:
+        return None
+
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    columns = {attr.key for attr in inspect(model).column_attrs}
+
+    # Reject the unknown fields
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        raise ValueError(
+            f"Invalid fields: {', '.join(unknown)}. "
+            f"Allowed fields: {', '.join(sorted(columns))}."
+        )
+
+    return fields
+
+
+def parse_page_arguments(
+    args: Mapping[str, str], model, *, default_limit: int, max_limit: int
+) -> tuple[int, str | None, list[str] | None]:
+    """
+    Parse the "limit", "cursor" and "fields" query parameters of a listing.
+
+    Args:
+        args (Mapping[str, str]): The query parameters.
+        model: The model of the entries.
+        default_limit (int): The page size when no limit is given.
+        max_limit (int): The maximum page size (larger limits are capped).
+
+    Raises:
+        ValueError: If a parameter is invalid.
+
+    Returns:
+        tuple[int, str | None, list[str] | None]: The limit, the cursor
+            and the fields.
+    """
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError as e:
+        raise ValueError("limit must be a positive integer.") from e
+
+    if limit < 1:
+        raise ValueError("limit must be a positive integer.")
+
+    return (
+        min(limit, max_limit),
+        args.get("cursor") or None,
+        parse_fields(args.get("fields"), model),
+    )
+
+
+def paginate(
+    query: Query,
+    created_at_column,
+    id_column,
+    *,
+    limit: int,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+) -> Page:
+    """
+    Get a page of entries, newest first, after the given cursor.
+
+    The entries are ordered by (created_at, id), so that the pages are
+    read with an index range scan, however many entries come before.
+
+    Args:
+        query (Query): The query of the entries.
+        created_at_column: The creation time column.
+        id_column: The ID (primary key) column.
+        limit (int): The maximum number of entries of the page.
+        cursor (str | None, optional): The cursor of the page.
+        fields (list[str] | None, optional): The columns to load (the
+            cursor columns are always loaded), None to load all of them.
+
+    Raises:
+        ValueError: If the limit or the cursor is invalid.
+
+    Returns:
+        Page: The entries and the cursor of the next page (None if last).
+    """
+    if limit < 1:
+        raise ValueError("limit must be a positive integer.")
+
+    # Only load the selected columns
+    if fields is not None:
+        model = id_column.class_
+        query = query.options(
+            load_only(
+                *{
+                    getattr(model, field)
+                    for field in [
+                        *fields,
+                        created_at_column.key,
+                        id_column.key,
+                    ]
+                }
+            )
+        )
+
+    # Start after the last entry of the previous page
+    if cursor is not None:
+        created_at, entry_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                created_at_column < created_at,
+                and_(created_at_column == created_at, id_column < entry_id),
+            )
+        )
+
+    # Get one more entry to know if there is a next page
+    items = (
+        query.order_by(created_at_column.desc(), id_column.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    if len(items) <= limit:
+        return Page(items, None)
+
+    items = items[:limit]
+    last = items[-1]
+    return Page(
+        items,
+        encode_cursor(
+            getattr(last, created_at_column.key), getattr(last, id_column.key)
+        ),
+    )
@@ -0,0 +1,261 @@
+"""
+This module contains the connection pool settings of the SQLAlchemy engine
+and the metrics of its pool (checkout wait time, saturation and churn),
+logged periodically by every process to size the pool from data.
+"""
+
+import time
+import threading
+from typing import Any
+from flask import Flask, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+from .models import db
+
+
+class TimedQueuePool(QueuePool):
+    """
+    A queue pool recording the time spent waiting for a connection (and the
+    checkouts that timed out) in its metrics.
+    """
+
+    metrics: "PoolMetrics | None" = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start, True)
+            raise
+
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - start, False)
+        return connection
+
+    def recreate(self) -> "TimedQueuePool":
+        # Keep the metrics when the pool is recreated (e.g. engine.dispose())
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def make_engine_options(config: dict) -> dict[str, Any]:
+    """
+    Make the SQLAlchemy engine options from the DATABASE_POOL_* settings.
+
+    SQLite (development and tests) keeps the pool of its dialect, only the
+    other databases (PostgreSQL in production) get the sized pool.
+
+    Args:
+        config (dict): The configuration of the app.
+
+    Returns:
+        dict[str, Any]: The engine options (SQLALCHEMY_ENGINE_OPTIONS).
+    """
+    options = {"pool_pre_ping": config["DATABASE_POOL_PRE_PING"]}
+
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config["DATABASE_POOL_SIZE"],
+        max_overflow=config["DATABASE_MAX_OVERFLOW"],
+        pool_timeout=config["DATABASE_POOL_TIMEOUT"],
+        pool_recycle=config["DATABASE_POOL_RECYCLE"],
+    )
+
+    # Cancel the statements running longer than the timeout (in milliseconds)
+    statement_timeout = config["DATABASE_STATEMENT_TIMEOUT"]
+    if statement_timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout}"
+        }
+
+    return options
+
+
+class PoolMetrics:
+    """
+    Counts the checkouts, the time spent waiting for them and the opened and
+    closed connections of a pool since the last report.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Start a new reporting window (the checked out connections are kept).
+        """
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.checkouts = 0
+            self.timeouts = 0
+            self.waits = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.connects = 0
+            self.closes = 0
+            self.invalidations = 0
+            self.peak_checked_out = self.checked_out
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Record the events of the pool of the given engine.
+
+        Args:
+            engine (Engine): The SQLAlchemy engine.
+        """
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = self
+
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "close", self._on_close)
+        event.listen(engine, "close_detached", self._on_close)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        """
+        Record the time spent waiting for a connection.
+
+        Args:
+            seconds (float): The time spent waiting (in seconds).
+            timed_out (bool): Whether no connection was free in time.
+        """
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool: Pool) -> dict[str, int | float | None]:
+        """
+        Get the metrics of the current window.
+
+        Args:
+            pool (Pool): The pool of the engine (for its size).
+
+        Returns:
+            dict[str, int | float | None]: The metrics (the capacity and the
+                saturation are None for the pools without a fixed size).
+        """
+        capacity = None
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            return {
+                "window_s": round(elapsed, 3),
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "capacity": capacity,
+                # Share of the connections used at the busiest moment
+                "saturation": (
+                    round(self.peak_checked_out / capacity, 3)
+                    if capacity
+                    else None
+                ),
+                "wait_avg_ms": (
+                    round(self.wait_total / self.waits * 1000, 3)
+                    if self.waits
+                    else 0.0
+                ),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "timeouts": self.timeouts,
+                # Churn of the connections (e.g. recycled or invalidated)
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+            }
+
+    def _on_checkout(self, dbapi_connection, record, proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(
+                self.peak_checked_out, self.checked_out
+            )
+
+    def _on_checkin(self, dbapi_connection, record) -> None:
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_connect(self, dbapi_connection, record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_close(self, dbapi_connection, *args) -> None:
+        with self._lock:
+            self.closes += 1
+
+    def _on_invalidate(self, dbapi_connection, record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+def report_pool_metrics(exception: BaseException | None = None) -> None:
+    """
+    Log the pool metrics of the current app when the reporting interval has
+    elapsed, then start a new window (called when an app context ends).
+    """
+    app = current_app
+    interval = app.config["DATABASE_POOL_METRICS_INTERVAL"]
+    metrics = app.extensions.get("pool_metrics")
+    if metrics is None or not interval:
+        return
+
+    if time.monotonic() - metrics.started_at < interval:
+        return
+
+    snapshot = metrics.snapshot(db.engine.pool)
+    metrics.reset()
+
+    app.logger.info(
+        "Database pool: "
+        + " ".join(f"{name}={value}" for name, value in snapshot.items())
+    )
+
+
+def init_pool_metrics(app: Flask) -> PoolMetrics:
+    """
+    Record the pool metrics of the engine of the given app and log them
+    every DATABASE_POOL_METRICS_INTERVAL seconds.
+
+    Args:
+        app (Flask): The Flask app (with the database extension initialized).
+
+    Returns:
+        PoolMetrics: The pool metrics.
+    """
+    metrics = PoolMetrics()
+    with app.app_context():
+        metrics.attach(db.engine)
+    app.extensions["pool_metrics"] = metrics
+
+    app.teardown_appcontext(report_pool_metrics)
+
+    return metrics
+
+
+def get_pool_metrics() -> PoolMetrics:
+    """
+    Get the pool metrics of the current app.
+
+    Returns:
+        PoolMetrics: The pool metrics.
+    """
+    return current_app.extensions["pool_metrics"]
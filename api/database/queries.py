@@ -2,17 +2,21 @@
 This module contains functions for querying the database.
 """
 
-import re
 from flask import current_app
+from sqlalchemy import exists
+from sqlalchemy.orm.interfaces import LoaderOption
 from email_validator import validate_email, EmailNotValidError
 
-from ..extensions import bcrypt
 from ..functions.input_validation import (
     validate_non_empty_string,
     validate_id_format,
     validate_type,
+    is_valid_id,
 )
-from .models import Parent, Child, Story
+from ..functions.passwords import get_password_hasher
+from .models import db, Parent, Child, Story, Chapter
+from .pagination import Page, paginate
+from .updates import rehash_parent_password
 
 
 def get_parent(identifier: str) -> Parent | None:
@@ -29,11 +33,8 @@ def get_parent(identifier: str) -> Parent | None:
         # Validate the identifier is a non-empty string
         validate_non_empty_string(identifier, "identifier")
 
-        # Regex pattern to check if the identifier is an ID
-        uuid_pattern = r"^[0-9a-f]{32}$"
-
         # If identifier matches ID format, query by ID
-        if re.match(uuid_pattern, identifier):
+        if is_valid_id(identifier):
             parent = Parent.query.filter_by(user_id=identifier).first()
 
         # If identifier does not match ID format, assume it's an email
@@ -52,13 +53,126 @@ def get_parent(identifier: str) -> Parent | None:
         raise e
 
 
-def get_child_from_parent(parent_id: str, child_id: str) -> Child | None:
+def parent_exists(parent_id: str) -> bool:
+    """
+    Check if a parent exists (without loading the row).
+
+    Args:
+        parent_id (str): The ID of the parent.
+
+    Returns:
+        bool: True if the parent exists, False otherwise.
+    """
+    try:
+        # Validate the parent ID
+        validate_id_format(parent_id, "parent_id")
+
+        # Check the existence with the primary key index only
+        return db.session.query(
+            exists().where(Parent.user_id == parent_id)
+        ).scalar()
+    except Exception as e:
+        current_app.logger.error(f"Error checking if user exists: {e}")
+        raise e
+
+
+def get_children(
+    parent_id: str,
+    *,
+    limit: int,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    options: tuple[LoaderOption, ...] = (),
+) -> Page:
+    """
+    Get a page of the children of a parent from the database, newest first.
+
+    Args:
+        parent_id (str): The ID of the parent.
+        limit (int): The maximum number of children of the page.
+        cursor (str | None, optional): The cursor of the page.
+        fields (list[str] | None, optional): The columns to load.
+        options (tuple[LoaderOption, ...], optional): The loader options,
+            e.g. to load the (deferred) images (see query_shapes.py).
+
+    Raises:
+        ValueError: If the limit or the cursor is invalid.
+
+    Returns:
+        Page: The children and the cursor of the next page.
+    """
+    try:
+        # Validate the parent ID
+        validate_id_format(parent_id, "parent_id")
+
+        # Get the page of children
+        return paginate(
+            Child.query.options(*options).filter_by(parent_id=parent_id),
+            Child.created_at,
+            Child.child_id,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error fetching children: {e}")
+        raise e
+
+
+def get_child_stories(
+    child_id: str,
+    *,
+    limit: int,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    options: tuple[LoaderOption, ...] = (),
+) -> Page:
+    """
+    Get a page of the stories of a child from the database, newest first.
+
+    Args:
+        child_id (str): The ID of the child.
+        limit (int): The maximum number of stories of the page.
+        cursor (str | None, optional): The cursor of the page.
+        fields (list[str] | None, optional): The columns to load.
+        options (tuple[LoaderOption, ...], optional): The loader options of
+            the related entries (see query_shapes.py).
+
+    Raises:
+        ValueError: If the limit or the cursor is invalid.
+
+    Returns:
+        Page: The stories and the cursor of the next page.
+    """
+    try:
+        # Validate the child ID
+        validate_id_format(child_id, "child_id")
+
+        # Get the page of stories
+        return paginate(
+            Story.query.options(*options).filter_by(child_id=child_id),
+            Story.created_at,
+            Story.story_id,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error fetching stories: {e}")
+        raise e
+
+
+def get_child_from_parent(
+    parent_id: str, child_id: str, *, options: tuple[LoaderOption, ...] = ()
+) -> Child | None:
     """
     Get a child from the database for a given parent.
 
     Args:
         parent_id (str): The ID of the parent.
         child_id (str): The ID of the child.
+        options (tuple[LoaderOption, ...], optional): The loader options,
+            e.g. to load the (deferred) image (see query_shapes.py).
 
     Returns:
         Child | None: The child if found, None otherwise.
@@ -75,9 +189,11 @@ def get_child_from_parent(parent_id: str, child_id: str) -> Child | None:
         validate_id_format(child_id, "child_id")
 
         # Get the child
-        child = Child.query.filter_by(
-            parent_id=parent_id, child_id=child_id
-        ).first()
+        child = (
+            Child.query.options(*options)
+            .filter_by(parent_id=parent_id, child_id=child_id)
+            .first()
+        )
 
         # Return the child
         return child
@@ -104,13 +220,12 @@ def child_belongs_to_parent(parent_id: str, child_id: str) -> bool:
         # Validate the child ID
         validate_id_format(child_id, "child_id")
 
-        # Get the child
-        child = Child.query.filter_by(
-            parent_id=parent_id, child_id=child_id
-        ).first()
-
-        # Return True if the child exists, False otherwise
-        return child is not None
+        # Check the existence without loading the row
+        return db.session.query(
+            exists().where(
+                Child.parent_id == parent_id, Child.child_id == child_id
+            )
+        ).scalar()
     except Exception as e:
         current_app.logger.error(
             f"Failed to check if child belongs to parent: {e}"
@@ -118,17 +233,22 @@ def child_belongs_to_parent(parent_id: str, child_id: str) -> bool:
         raise e
 
 
-def check_password(email: str, password: str) -> bool:
+def authenticate_parent(
+    email: str, password: str
+) -> tuple[Parent | None, bool]:
     """
-    Check if the password is correct for the given user.
+    Get a parent by email and check its password with a single query.
+
+    The password is hashed again (and updated) when it was hashed with
+    another cost than the configured BCRYPT_LOG_ROUNDS.
 
     Args:
-        email (str): The email of the user.
+        email (str): The email of the parent.
         password (str): The password to check.
 
     Returns:
-        bool: True if the password is correct,
-            False if the password is incorrect or the user does not exist.
+        tuple[Parent | None, bool]: The parent (None if it does not exist)
+            and True if the password is correct, False otherwise.
     """
     try:
         # Validate the email type and format
@@ -141,27 +261,56 @@ def check_password(email: str, password: str) -> bool:
         validate_non_empty_string(password, "password")
 
         # Get the parent
-        user = Parent.query.filter_by(email=email).first()
+        parent = Parent.query.filter_by(email=email).first()
 
-        # Return False if the user does not exist
-        if not user:
-            return False
+        # Return no parent if it does not exist
+        if not parent:
+            return None, False
 
-        # Check the password
-        return bcrypt.check_password_hash(user.password, password)
+        # Check the password against its hash (with the app's hasher)
+        hasher = get_password_hasher()
+        if not hasher.check(parent.password, password):
+            return parent, False
+
+        # Upgrade the hash to the configured cost
+        if hasher.needs_rehash(parent.password):
+            rehash_parent_password(parent, password)
+
+        return parent, True
     except EmailNotValidError as e:
         raise ValueError(f"Invalid email: {e}")
     except Exception as e:
-        current_app.logger.error(f"Error checking password: {e}")
+        current_app.logger.error(f"Error authenticating user: {e}")
         raise e
 
 
-def get_story(story_id: str) -> Story | None:
+def check_password(email: str, password: str) -> bool:
+    """
+    Check if the password is correct for the given user.
+
+    Args:
+        email (str): The email of the user.
+        password (str): The password to check.
+
+    Returns:
+        bool: True if the password is correct,
+            False if the password is incorrect or the user does not exist.
+    """
+    # Check the password
+    _, authenticated = authenticate_parent(email, password)
+    return authenticated
+
+
+def get_story(
+    story_id: str, *, options: tuple[LoaderOption, ...] = ()
+) -> Story | None:
     """
     Get a story from the database.
 
     Args:
         story_id (str): The ID of the story.
+        options (tuple[LoaderOption, ...], optional): The loader options of
+            the related entries (see query_shapes.py).
 
     Returns:
         Story | None: The story if found, None otherwise.
@@ -171,10 +320,44 @@ def get_story(story_id: str) -> Story | None:
         validate_id_format(story_id, "story_id")
 
         # Get the story
-        story = Story.query.filter_by(story_id=story_id).first()
+        story = (
+            Story.query.options(*options).filter_by(story_id=story_id).first()
+        )
 
         # Return the story
         return story
     except Exception as e:
         current_app.logger.error(f"Error fetching story: {e}")
         raise e
+
+
+def get_chapter(
+    chapter_id: str, *, options: tuple[LoaderOption, ...] = ()
+) -> Chapter | None:
+    """
+    Get a chapter from the database.
+
+    Args:
+        chapter_id (str): The ID of the chapter.
+        options (tuple[LoaderOption, ...], optional): The loader options,
+            e.g. to load the (deferred) image (see query_shapes.py).
+
+    Returns:
+        Chapter | None: The chapter if found, None otherwise.
+    """
+    try:
+        # Validate the chapter ID
+        validate_id_format(chapter_id, "chapter_id")
+
+        # Get the chapter
+        chapter = (
+            Chapter.query.options(*options)
+            .filter_by(chapter_id=chapter_id)
+            .first()
+        )
+
+        # Return the chapter
+        return chapter
+    except Exception as e:
+        current_app.logger.error(f"Error fetching chapter: {e}")
+        raise e
@@ -0,0 +1,92 @@
+"""
+This module contains the loader strategies (query shapes) of the endpoints,
+which load the related entries they need in a bounded number of queries.
+"""
+
+from sqlalchemy.orm import load_only, selectinload, undefer
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from .models import Child, Story, Chapter
+
+
+def child_with_image() -> tuple[LoaderOption, ...]:
+    """
+    Get the shape of a child loaded with its (deferred) image key.
+
+    Returns:
+        tuple[LoaderOption, ...]: The loader options.
+    """
+    return (undefer(Child.image),)
+
+
+def child_image_status() -> tuple[LoaderOption, ...]:
+    """
+    Get the shape of a child loaded with its image key, thumbnails and image
+    status only (polled while its portrait is generated).
+
+    Returns:
+        tuple[LoaderOption, ...]: The loader options.
+    """
+    return (
+        load_only(
+            Child.child_id,
+            Child.image,
+            Child.thumbnails,
+            Child.image_status,
+        ),
+    )
+
+
+def chapter_with_image() -> tuple[LoaderOption, ...]:
+    """
+    Get the shape of a chapter loaded with its (deferred) image key, but
+    without its content.
+
+    Returns:
+        tuple[LoaderOption, ...]: The loader options.
+    """
+    return (undefer(Chapter.image),)
+
+
+def story_with_chapters(*, images: bool = True) -> tuple[LoaderOption, ...]:
+    """
+    Get the shape of a story loaded with its chapters and their (deferred)
+    content (one more query for all the chapters, in their order).
+
+    Args:
+        images (bool, optional): Whether to load the image keys of the
+            chapters (deferred otherwise).
+
+    Returns:
+        tuple[LoaderOption, ...]: The loader options.
+    """
+    chapters = selectinload(Story.chapters)
+
+    return (
+        chapters.undefer(Chapter.content),
+        (
+            chapters.undefer(Chapter.image)
+            if images
+            else chapters.defer(Chapter.image, raiseload=True)
+        ),
+    )
+
+
+def stories_with_covers() -> tuple[LoaderOption, ...]:
+    """
+    Get the shape of a page of stories loaded with their first chapter only
+    (one more query for the whole page), whose image (and its thumbnails) is
+    the cover of the story. The content of the chapters is not loaded.
+
+    Returns:
+        tuple[LoaderOption, ...]: The loader options.
+    """
+    return (
+        selectinload(Story.chapters.and_(Chapter.order == 1)).load_only(
+            Chapter.chapter_id,
+            Chapter.story_id,
+            Chapter.image,
+            Chapter.thumbnails,
+            Chapter.order,
+        ),
+    )
@@ -0,0 +1,294 @@
+"""
+This module contains the schema registry of the text fields of the children
+and stories (whether they are required and their allowed values), from which
+the RESTX models, the database CHECK constraints and the runtime validators
+are generated.
+"""
+
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any, NamedTuple
+from flask_restx import fields
+from sqlalchemy import CheckConstraint
+
+from ..functions.input_validation import (
+    validate_allowed_value,
+    validate_non_empty_string,
+    validate_type,
+)
+
+# Validator of a field, returning its error (None when the value is valid)
+FieldValidator = Callable[[Any], str | None]
+
+
+class NullableString(fields.String):
+    """
+    Custom field for a nullable string.
+    """
+
+    __schema_type__ = ["string", "null"]
+    __schema_example__ = "nullable string"
+
+
+class FieldSpec(NamedTuple):
+    """
+    A text field of a schema.
+    """
+
+    name: str
+    description: str
+    # Whether the field must be a non-empty string (otherwise a string or
+    # None)
+    required: bool = True
+    # The allowed values (in their display order), any value if empty
+    values: tuple[str, ...] = ()
+
+
+class SchemaValidationError(ValueError, TypeError):
+    """
+    Raised when a payload does not match its schema, with the errors of all
+    its invalid fields (also a TypeError, like the type errors of the input
+    validation functions).
+    """
+
+    def __init__(self, errors: dict[str, str]) -> None:
+        super().__init__(" ".join(errors.values()))
+        self.errors = errors
+
+
+def _get_error(validate: Callable[..., None], *args: Any) -> str:
+    """
+    Get the message of the error raised by an input validation function.
+    """
+    try:
+        validate(*args)
+    except (TypeError, ValueError) as e:
+        return str(e)
+    raise AssertionError(f"{validate.__name__}{args} did not fail")
+
+
+def compile_validator(field: FieldSpec) -> FieldValidator:
+    """
+    Compile the validator of a field: a type check and a lookup in the
+    frozen set of its allowed values (the error messages, the same as those
+    of the input validation functions, are only built for invalid values).
+
+    Args:
+        field (FieldSpec): The field.
+
+    Returns:
+        FieldValidator: The validator of the field.
+    """
+    name, values = field.name, field.values
+    allowed = frozenset(values)
+
+    def check_value(value: str) -> str | None:
+        if allowed and value not in allowed:
+            return _get_error(validate_allowed_value, value, values, name)
+        return None
+
+    if field.required:
+
+        def validate(value: Any) -> str | None:
+            if isinstance(value, str) and value.strip():
+                return check_value(value)
+            return _get_error(validate_non_empty_string, value, name)
+
+    else:
+
+        def validate(value: Any) -> str | None:
+            if value is None:
+                return None
+            if isinstance(value, str):
+                return check_value(value)
+            return _get_error(validate_type, value, [str], name, True)
+
+    return validate
+
+
+def check_constraint(name: str, values: Iterable[str]) -> CheckConstraint:
+    """
+    Make the CHECK constraint of a column restricted to the given values.
+
+    Args:
+        name (str): The name of the column.
+        values (Iterable[str]): The allowed values.
+
+    Returns:
+        CheckConstraint: The constraint ("<name> IN ('a', 'b', ...)").
+    """
+    quoted = ", ".join(
+        "'" + value.replace("'", "''") + "'" for value in values
+    )
+    return CheckConstraint(f"{name} IN ({quoted})")
+
+
+class Schema:
+    """
+    The fields of a payload, with their validators compiled once.
+    """
+
+    def __init__(self, name: str, field_specs: Iterable[FieldSpec]) -> None:
+        self.name = name
+        self.fields = {field.name: field for field in field_specs}
+        self.names = tuple(self.fields)
+        self.allowed_values = {
+            field.name: frozenset(field.values)
+            for field in self.fields.values()
+            if field.values
+        }
+        self._validators = tuple(
+            (field.name, compile_validator(field))
+            for field in self.fields.values()
+        )
+
+    def __getitem__(self, name: str) -> FieldSpec:
+        return self.fields[name]
+
+    def get_errors(self, payload: Mapping[str, Any]) -> dict[str, str]:
+        """
+        Validate a payload in a single pass over the fields, collecting the
+        errors of all the invalid fields (the missing fields are None).
+
+        Args:
+            payload (Mapping[str, Any]): The payload.
+
+        Returns:
+            dict[str, str]: The error of each invalid field (by name), empty
+                when the payload is valid.
+        """
+        errors = {}
+        for name, validate in self._validators:
+            error = validate(payload.get(name))
+            if error is not None:
+                errors[name] = error
+        return errors
+
+    def validate(self, payload: Mapping[str, Any]) -> None:
+        """
+        Validate a payload.
+
+        Args:
+            payload (Mapping[str, Any]): The payload.
+
+        Raises:
+            SchemaValidationError: With the errors of all the invalid fields.
+        """
+        errors = self.get_errors(payload)
+        if errors:
+            raise SchemaValidationError(errors)
+
+    def check_constraint(self, name: str) -> CheckConstraint:
+        """
+        Make the CHECK constraint of a field with allowed values.
+
+        Args:
+            name (str): The name of the field.
+
+        Returns:
+            CheckConstraint: The constraint of its column.
+        """
+        return check_constraint(name, self.fields[name].values)
+
+    def restx_fields(
+        self, names: Iterable[str] | None = None
+    ) -> dict[str, fields.Raw]:
+        """
+        Make the RESTX fields of the schema (e.g. of a namespace model).
+
+        Args:
+            names (Iterable[str] | None, optional): The fields to include,
+                all of them by default.
+
+        Returns:
+            dict[str, fields.Raw]: The RESTX fields (by name).
+        """
+        restx_fields = {}
+        for name in self.names if names is None else names:
+            field = self.fields[name]
+            if not field.required:
+                restx_fields[name] = NullableString(
+                    required=False, description=field.description
+                )
+            elif field.values:
+                restx_fields[name] = fields.String(
+                    required=True,
+                    description=field.description,
+                    enum=list(field.values),
+                )
+            else:
+                restx_fields[name] = fields.String(
+                    required=True, description=field.description
+                )
+        return restx_fields
+
+
+# Fields of a child
+CHILD_SCHEMA = Schema(
+    "Child",
+    [
+        FieldSpec("name", "Name of the child"),
+        FieldSpec(
+            "age_range",
+            "Age range of the child",
+            values=("0-3", "4-6", "7-9", "10-13"),
+        ),
+        FieldSpec("sex", "Sex of the child", values=("Male", "Female")),
+        FieldSpec(
+            "eye_color",
+            "Eye color of the child",
+            values=("Blue", "Brown", "Green", "Hazel", "Amber", "Gray"),
+        ),
+        FieldSpec(
+            "hair_type",
+            "Hair type of the child",
+            values=("Straight", "Wavy", "Curly", "Kinky", "Bald"),
+        ),
+        FieldSpec(
+            "hair_color",
+            "Hair color of the child",
+            values=(
+                "Blonde",
+                "Brown",
+                "Black",
+                "Red",
+                "Auburn",
+                "Gray",
+                "White",
+                "Bald",
+            ),
+        ),
+        FieldSpec("ethnicity", "Ethnicity of the child"),
+        FieldSpec(
+            "fav_animals", "Favorite animals of the child", required=False
+        ),
+        FieldSpec(
+            "fav_activities",
+            "Favorite activities of the child",
+            required=False,
+        ),
+        FieldSpec("fav_shows", "Favorite shows of the child", required=False),
+    ],
+)
+
+# Statuses of the image of a child (a placeholder while it is pending, the
+# portrait is generated by the job worker)
+CHILD_IMAGE_STATUSES = ("pending", "ready", "failed")
+
+# Fields of a story
+STORY_SCHEMA = Schema(
+    "Story",
+    [
+        FieldSpec("title", "Title of the story"),
+        FieldSpec("topic", "Topic of the story"),
+        FieldSpec(
+            "image_style",
+            "Style of the image",
+            values=("Cartoon", "Realistic", "Fantasy", "Watercolor", "Anime"),
+        ),
+        FieldSpec(
+            "story_genre",
+            "Genre of the story",
+            values=("Fantasy", "Adventure", "Educational"),
+        ),
+    ],
+)
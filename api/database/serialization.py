@@ -0,0 +1,180 @@
+"""
+This module contains the compiled serializers turning the database entries
+(and projected rows) into dictionaries.
+"""
+
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any
+from sqlalchemy import Row
+from sqlalchemy.inspection import inspect
+
+# Converter of a value to a string (None is kept)
+Converter = Callable[[Any], Any]
+
+
+def _to_str(value: Any) -> Any:
+    """
+    Transform a value to a string, except None and integer values.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    return str(value)
+
+
+def _get_converter(column) -> Converter | None:
+    """
+    Get the converter of the values of a column to strings (None if they
+    are already strings, integers or JSON documents).
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return _to_str
+
+    return None if issubclass(python_type, (str, int, dict, list)) else _to_str
+
+
+class ModelSerializer:
+    """
+    Serializes the entries of a model, with the selected columns and their
+    converters resolved once (instead of inspecting every entry).
+    """
+
+    def __init__(
+        self,
+        model,
+        *,
+        include: frozenset[str] | None = None,
+        exclude: frozenset[str] = frozenset(),
+        transform_to_str: bool = True,
+    ) -> None:
+        # Select the columns of the model (in their declaration order)
+        columns = [
+            attr
+            for attr in inspect(model, raiseerr=True).column_attrs
+            if (include is None or attr.key in include)
+            and attr.key not in exclude
+        ]
+
+        self.model = model
+        self.keys = tuple(attr.key for attr in columns)
+
+        # Resolve the converters of the columns which need one
+        self.converters = (
+            {
+                attr.key: converter
+                for attr in columns
+                if (converter := _get_converter(attr.columns[0])) is not None
+            }
+            if transform_to_str
+            else {}
+        )
+
+        # Get all the values of an entry with a single call
+        getter = attrgetter(*self.keys) if self.keys else lambda _: ()
+        self._getter = (
+            (lambda entry: (getter(entry),)) if len(self.keys) == 1 else getter
+        )
+
+    def serialize(self, entry) -> dict[str, Any]:
+        """
+        Serialize an entry of the model.
+
+        Args:
+            entry: The entry (only the selected columns are accessed, so the
+                other ones are not loaded if deferred).
+
+        Returns:
+            dict[str, Any]: The attributes of the entry.
+        """
+        try:
+            # Read the loaded values directly (bypassing the descriptors)
+            values = entry.__dict__
+            attributes = {key: values[key] for key in self.keys}
+        except KeyError:
+            # Load the expired or deferred values through the descriptors
+            attributes = dict(zip(self.keys, self._getter(entry)))
+
+        for key, converter in self.converters.items():
+            attributes[key] = converter(attributes[key])
+
+        return attributes
+
+    def serialize_many(self, entries: Iterable) -> list[dict[str, Any]]:
+        """
+        Serialize entries of the model.
+
+        Args:
+            entries (Iterable): The entries.
+
+        Returns:
+            list[dict[str, Any]]: The attributes of the entries.
+        """
+        return [self.serialize(entry) for entry in entries]
+
+    def serialize_row(self, row: Row) -> dict[str, Any]:
+        """
+        Serialize a row of a column-projected query (e.g.
+        `select(Child.child_id, Child.name)`), without building entries.
+
+        Args:
+            row (Row): The row, whose fields are columns of the model.
+
+        Returns:
+            dict[str, Any]: The attributes of the row.
+        """
+        attributes = row._asdict()
+
+        for key, converter in self.converters.items():
+            if key in attributes:
+                attributes[key] = converter(attributes[key])
+
+        return attributes
+
+
+@lru_cache(maxsize=None)
+def _get_serializer(
+    model,
+    include: frozenset[str] | None,
+    exclude: frozenset[str],
+    transform_to_str: bool,
+) -> ModelSerializer:
+    return ModelSerializer(
+        model,
+        include=include,
+        exclude=exclude,
+        transform_to_str=transform_to_str,
+    )
+
+
+def get_serializer(
+    model,
+    *,
+    include: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+    transform_to_str: bool = True,
+) -> ModelSerializer:
+    """
+    Get the (cached) serializer of a model for the given columns.
+
+    Args:
+        model: The model.
+        include (Iterable[str], optional): The only columns to include.
+        exclude (Iterable[str], optional): The columns to exclude.
+        transform_to_str (bool, optional): Whether to transform
+            the values to strings (except None and integers).
+
+    Raises:
+        sqlalchemy.exc.NoInspectionAvailable: If the model is not mapped.
+
+    Returns:
+        ModelSerializer: The serializer.
+    """
+    return _get_serializer(
+        model,
+        frozenset(include) if include is not None else None,
+        frozenset(exclude or ()),
+        transform_to_str,
+    )
@@ -6,11 +6,46 @@ from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
 
 from ..functions.input_validation import (
-    validate_non_empty_string,
-    validate_type,
+    is_valid_id,
     validate_allowed_value,
 )
-from .models import db, Child
+from ..functions.passwords import get_password_hasher
+from ..storage.images import (
+    ProcessedImage,
+    StoredImage,
+    store_processed_image,
+    validate_image,
+)
+from .models import db, Parent, Child
+from .query_shapes import child_with_image
+from .schemas import CHILD_IMAGE_STATUSES, CHILD_SCHEMA
+
+
+def rehash_parent_password(parent: Parent, password: str) -> Parent:
+    """
+    Hash the password of a parent again with the configured cost.
+
+    Failing to update the hash is logged but not raised, since the
+    password was already checked and the old hash remains valid.
+
+    Args:
+        parent (Parent): The parent.
+        password (str): The (checked) password of the parent.
+
+    Returns:
+        Parent: The updated parent.
+    """
+    try:
+        # Hash the password with the configured cost
+        parent.password = get_password_hasher().hash(password)
+
+        # Commit the changes
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to rehash password: {e}")
+
+    return parent
 
 
 def update_child(
@@ -45,49 +80,36 @@ def update_child(
     Returns:
         Child: The updated child.
     """
-    # Validation constants
-    valid_age_ranges = ["0-3", "4-6", "7-9", "10-13"]
-    valid_sexes = ["Male", "Female"]
-    valid_eye_colors = ["Blue", "Brown", "Green", "Hazel", "Amber", "Gray"]
-    valid_hair_types = ["Straight", "Wavy", "Curly", "Kinky", "Bald"]
-    valid_hair_colors = [
-        "Blonde",
-        "Brown",
-        "Black",
-        "Red",
-        "Auburn",
-        "Gray",
-        "White",
-        "Bald",
-    ]
     try:
-        # Check if the child exists
-        child = Child.query.filter_by(child_id=child_id).first()
+        # Check if the child exists (with its image, returned with the
+        # updated child, a malformed ID cannot exist)
+        child = None
+        if is_valid_id(child_id):
+            child = (
+                Child.query.options(*child_with_image())
+                .filter_by(child_id=child_id)
+                .first()
+            )
 
         # Return an error if the child does not exist
         if child is None:
             raise ValueError(f"Child with ID '{child_id}' does not exist.")
 
-        # Validate required fields
-        validate_non_empty_string(name, "name")
-        validate_non_empty_string(age_range, "age_range")
-        validate_non_empty_string(sex, "sex")
-        validate_non_empty_string(eye_color, "eye_color")
-        validate_non_empty_string(hair_type, "hair_type")
-        validate_non_empty_string(hair_color, "hair_color")
-        validate_non_empty_string(ethnicity, "ethnicity")
-
-        # Validate optional fields with allowance for None
-        validate_type(fav_animals, [str], "fav_animals", allow_none=True)
-        validate_type(fav_activities, [str], "fav_activities", allow_none=True)
-        validate_type(fav_shows, [str], "fav_shows", allow_none=True)
-
-        # Validate allowed values
-        validate_allowed_value(age_range, valid_age_ranges, "age_range")
-        validate_allowed_value(sex, valid_sexes, "sex")
-        validate_allowed_value(eye_color, valid_eye_colors, "eye_color")
-        validate_allowed_value(hair_type, valid_hair_types, "hair_type")
-        validate_allowed_value(hair_color, valid_hair_colors, "hair_color")
+        # Validate the attributes of the child (all the errors at once)
+        CHILD_SCHEMA.validate(
+            {
+                "name": name,
+                "age_range": age_range,
+                "sex": sex,
+                "eye_color": eye_color,
+                "hair_type": hair_type,
+                "hair_color": hair_color,
+                "ethnicity": ethnicity,
+                "fav_animals": fav_animals,
+                "fav_activities": fav_activities,
+                "fav_shows": fav_shows,
+            }
+        )
 
         # Update the child attributes
         child.name = name
@@ -113,3 +135,69 @@ def update_child(
     except Exception as e:
         current_app.logger.error(f"Failed to update child: {e}")
         raise e
+
+
+def update_child_image(
+    child_id: str,
+    image_status: str,
+    image: bytes | StoredImage | None = None,
+    thumbnails: dict[int, bytes] | None = None,
+) -> Child:
+    """
+    Update the image of a child (once its portrait is generated).
+
+    Args:
+        child_id (str): The ID of the child.
+        image_status (str): The new status of the image ("ready" or "failed").
+        image (bytes | StoredImage, optional): The raw bytes of the new
+            image, or the keys of an image already stored (the image is kept
+            when not given, e.g. the placeholder of a failed portrait).
+        thumbnails (dict[int, bytes], optional): The raw bytes of the
+            thumbnails of the new image (by size in pixels), ignored for a
+            stored image.
+
+    Returns:
+        Child: The updated child.
+    """
+    try:
+        # Validate the status
+        validate_allowed_value(
+            image_status, CHILD_IMAGE_STATUSES, "image_status"
+        )
+
+        # Check if the child exists (a malformed ID cannot exist)
+        child = (
+            db.session.get(Child, child_id) if is_valid_id(child_id) else None
+        )
+
+        # Return an error if the child does not exist
+        if child is None:
+            raise ValueError(f"Child with ID '{child_id}' does not exist.")
+
+        if image is not None:
+            validate_image(image, "image")
+
+            # Store the image and its thumbnails in the blob store (unless
+            # they are stored already), the row only keeps their keys
+            image_key, thumbnail_keys = store_processed_image(
+                image
+                if isinstance(image, StoredImage)
+                else ProcessedImage(image, thumbnails or {})
+            )
+            child.image = image_key
+            child.thumbnails = thumbnail_keys or None
+
+        child.image_status = image_status
+
+        # Commit the changes
+        db.session.commit()
+
+        # Return the updated child
+        return child
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to update child image: {e}")
+        raise e
+    except Exception as e:
+        current_app.logger.error(f"Failed to update child image: {e}")
+        raise e
@@ -2,29 +2,42 @@
 This module contains utility functions for the database.
 """
 
+from datetime import datetime, timezone
 from flask import current_app
-from uuid import uuid4
-from sqlalchemy.inspection import inspect
 from typing import Any
 
+from .ids import uuid7
+from .serialization import get_serializer
+
 
 def generate_id() -> str:
     """
-    Generate a unique ID.
+    Generate a unique (time-ordered) ID.
 
     Returns:
-        str: The generated ID.
+        str: The generated ID (a UUID version 7 as 32 hex characters).
     """
     try:
-        return uuid4().hex
+        return uuid7().hex
     except Exception as e:
         current_app.logger.error(f"Failed to generate ID: {e}")
         raise e
 
 
+def utc_now() -> datetime:
+    """
+    Get the current UTC time (naive, like the database timestamps).
+
+    Returns:
+        datetime: The current time.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 def get_entry_attributes(
     entry,
     *,
+    include: list[str] | None = None,
     exclude: list[str] | None = None,
     transform_to_str: bool = True,
 ) -> dict[str, Any]:
@@ -33,6 +46,7 @@ def get_entry_attributes(
 
     Args:
         entry: The database entry, expected to be an instance of a model.
+        include (list[str], optional): The only attributes to include.
         exclude (list[str], optional): The attributes to exclude.
         transform_to_str (bool, optional): Whether to transform
             all the attributes to strings.
@@ -45,26 +59,15 @@ def get_entry_attributes(
         dict: The attributes of the entry.
     """
     try:
-        # Get the attributes of the entry
-        attributes = {
-            attr.key: getattr(entry, attr.key)
-            for attr in inspect(entry, raiseerr=True).mapper.column_attrs
-        }
-
-        # Remove the excluded attributes
-        if exclude is not None:
-            for key in exclude:
-                attributes.pop(key, None)
-
-        # Transform the attributes to strings if the flag is set
-        if transform_to_str:
-            for key, value in attributes.items():
-                # Exclude None and integer values
-                if value is not None and not isinstance(value, int):
-                    attributes[key] = str(value)
-
-        # Return the attributes
-        return attributes
+        # Serialize the entry with the compiled serializer of its model (only
+        # the included attributes are accessed, so the other ones are not
+        # loaded if deferred)
+        return get_serializer(
+            type(entry),
+            include=include,
+            exclude=exclude,
+            transform_to_str=transform_to_str,
+        ).serialize(entry)
     except Exception as e:
         current_app.logger.error(f"Failed to get entry attributes: {e}")
         raise e
@@ -44,6 +44,21 @@ DATABASE_HOST=db
 DATABASE_PORT=None
 DATABASE_NAME=dreamify_db
 
+# Connection pool of every API and worker process: keep the total
+# (replicas x gunicorn workers x (size + overflow), plus the job worker)
+# below the max_connections of PostgreSQL (100 by default)
+DATABASE_POOL_SIZE=5
+DATABASE_MAX_OVERFLOW=5
+DATABASE_POOL_TIMEOUT=10
+DATABASE_POOL_RECYCLE=1800
+DATABASE_POOL_PRE_PING=true
+
+# Statement timeout in milliseconds (0 to disable)
+DATABASE_STATEMENT_TIMEOUT=30000
+
+# Seconds between the logged pool metrics (0 to disable)
+DATABASE_POOL_METRICS_INTERVAL=60
+
 # --- Frontend settings ---
 
 # Set the app mode ("development", "production" or "testing")
@@ -69,6 +84,57 @@ FLASK_JWT_SECRET_KEY={uuid4().hex}
 
 # Number of days before a JWT token expires
 JWT_DAYS_EXPIRATION=3
+
+# Cost of the password hashes (rehashed on login when changed)
+BCRYPT_LOG_ROUNDS=12
+
+# Default and maximum number of entries per page of the children and stories listings
+PAGE_SIZE=20
+MAX_PAGE_SIZE=100
+
+# Maximum number of children added by a batch import (POST /api/children/batch)
+CHILDREN_BATCH_MAX_SIZE=500
+
+# Lifetime (in seconds) and maximum number of the cached parent lookups
+PARENT_CACHE_TTL=60
+PARENT_CACHE_SIZE=1024
+
+# --- OpenAI client settings (shared keep-alive connection pools) ---
+
+# Maximum number of (keep-alive) connections to the OpenAI API per worker
+OPENAI_MAX_CONNECTIONS=20
+OPENAI_MAX_KEEPALIVE_CONNECTIONS=10
+
+# Request and connection timeouts (in seconds) and number of retries
+OPENAI_TIMEOUT=180
+OPENAI_CONNECT_TIMEOUT=10
+OPENAI_MAX_RETRIES=2
+
+# --- Story generation job settings (run the worker with "flask jobs work") ---
+
+# Number of stories generated concurrently by a worker and polling interval (in seconds)
+GENERATION_WORKER_CONCURRENCY=4
+GENERATION_WORKER_POLL_INTERVAL=1
+
+# Attempts per story, delay before the first retry and lease of a running job (in seconds)
+GENERATION_JOB_MAX_ATTEMPTS=3
+GENERATION_JOB_RETRY_DELAY=30
+GENERATION_JOB_LEASE=600
+
+# --- Blob store settings (where the generated images are stored) ---
+
+# Blob store backend ("local" or "s3")
+BLOB_STORE_BACKEND=local
+
+# Directory of the local blob store (relative to the Flask instance folder)
+BLOB_STORE_PATH=blob_store
+
+# S3 compatible object storage settings (only used by the "s3" backend)
+BLOB_STORE_S3_ENDPOINT=
+BLOB_STORE_S3_BUCKET=
+BLOB_STORE_S3_ACCESS_KEY=
+BLOB_STORE_S3_SECRET_KEY=
+BLOB_STORE_S3_REGION=us-east-1
 """
     try:
         # Get the file path to the project root directory
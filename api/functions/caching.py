@@ -0,0 +1,96 @@
+"""
+This module contains an in-process cache with a time-to-live and LRU eviction.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+# Marker of a missing cache entry (None can be cached)
+MISSING = object()
+
+
+class TTLCache:
+    """
+    A thread-safe mapping whose entries expire after a time-to-live and
+    which evicts the least recently used entries beyond its maximum size.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer.")
+        if ttl <= 0:
+            raise ValueError("ttl must be a positive number of seconds.")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Get the value of a key.
+
+        Args:
+            key (Hashable): The key.
+            default (Any, optional): The value returned for a missing or
+                expired key (MISSING by default).
+
+        Returns:
+            Any: The cached value, or the default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+
+            # Drop the expired entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            # Mark the entry as the most recently used
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Set the value of a key (for the time-to-live of the cache).
+
+        Args:
+            key (Hashable): The key.
+            value (Any): The value.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a key (if cached).
+
+        Args:
+            key (Hashable): The key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all the keys.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
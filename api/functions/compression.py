@@ -0,0 +1,274 @@
+"""
+This module contains the compression of the responses and the serving of
+the precompressed static files (the React build).
+"""
+
+import os
+import re
+import gzip
+import click
+import mimetypes
+from flask import Flask, Response, current_app, request, send_from_directory
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing (images, fonts and archives are already
+# compressed, so compressing them again only costs CPU time)
+COMPRESSIBLE_MIMETYPES = frozenset(
+    (
+        "application/javascript",
+        "application/json",
+        "application/manifest+json",
+        "application/xml",
+        "image/svg+xml",
+        "text/css",
+        "text/html",
+        "text/javascript",
+        "text/plain",
+        "text/xml",
+    )
+)
+
+# Extensions of the precompressed siblings of the static files
+ENCODING_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+# Regex pattern of a file name holding a content hash, e.g. the React
+# build's "main.1a2b3c4d.js" or "453.d3b0a9e1.chunk.css"
+HASHED_FILENAME_PATTERN = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?\w+$")
+
+# Hashed files never change (a new build gets new names), so they can be
+# cached by the browsers and proxies for a year without revalidation
+HASHED_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def get_accepted_encodings() -> list[str]:
+    """
+    Get the encodings supported by both the server and the client of the
+    current request, from the most to the least preferred.
+
+    Returns:
+        list[str]: The accepted encodings (e.g. ["br", "gzip"]).
+    """
+    accepted = request.accept_encodings
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    # Rank by the client's quality, Brotli first on a tie (smaller output)
+    ranked = sorted(
+        (encoding for encoding in supported if accepted[encoding] > 0),
+        key=lambda encoding: accepted[encoding],
+        reverse=True,
+    )
+    return ranked
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """
+    Compress the given bytes.
+
+    Args:
+        data (bytes): The bytes to compress.
+        encoding (str): The content encoding ("br" or "gzip").
+        level (int): The compression level (0-9 for gzip, 0-11 for Brotli).
+
+    Raises:
+        ValueError: If the encoding is not supported.
+
+    Returns:
+        bytes: The compressed bytes.
+    """
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=level)
+
+    raise ValueError(f"Unsupported content encoding: '{encoding}'.")
+
+
+def is_hashed_filename(filename: str) -> bool:
+    """
+    Check if a static file name holds a content hash.
+
+    Args:
+        filename (str): The path of the file (relative to the static folder).
+
+    Returns:
+        bool: True if the file name holds a content hash, False otherwise.
+    """
+    return HASHED_FILENAME_PATTERN.search(filename) is not None
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response with the encoding preferred by the client, if it
+    is large enough and of a compressible content type.
+
+    Args:
+        response (Response): The response to compress.
+
+    Returns:
+        Response: The (possibly compressed) response.
+    """
+    config = current_app.config
+    if not config["COMPRESS_ENABLED"]:
+        return response
+
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    # The representation depends on the Accept-Encoding header
+    response.vary.add("Accept-Encoding")
+
+    # Leave the files, streams (e.g. the server-sent events), partial and
+    # empty responses, and the already encoded responses untouched
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    encodings = get_accepted_encodings()
+    if not encodings:
+        return response
+
+    encoding = encodings[0]
+    level = (
+        config["COMPRESS_BROTLI_QUALITY"]
+        if encoding == "br"
+        else config["COMPRESS_GZIP_LEVEL"]
+    )
+    response.set_data(compress(data, encoding, level))
+    response.headers["Content-Encoding"] = encoding
+
+    # The compressed bytes differ, so a strong ETag would be wrong
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def send_static_file(filename: str) -> Response:
+    """
+    Serve a file of the static folder, using its precompressed (".br" or
+    ".gz") sibling when there is one the client accepts.
+
+    Args:
+        filename (str): The path of the file (relative to the static folder).
+
+    Returns:
+        Response: The response of the file (or its sibling).
+    """
+    app = current_app
+    static_folder = app.static_folder
+    response = None
+
+    for encoding in get_accepted_encodings():
+        sibling = filename + ENCODING_EXTENSIONS[encoding]
+        path = safe_join(static_folder, sibling)
+        if path is None or not os.path.isfile(path):
+            continue
+
+        # Keep the content type of the original file
+        mimetype, _ = mimetypes.guess_type(filename)
+        response = send_from_directory(
+            static_folder,
+            sibling,
+            mimetype=mimetype or "application/octet-stream",
+        )
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        break
+
+    if response is None:
+        response = app.send_static_file(filename)
+        if response.mimetype in COMPRESSIBLE_MIMETYPES:
+            response.vary.add("Accept-Encoding")
+
+    # Cache the hashed files for a year, revalidate the others (index.html)
+    if is_hashed_filename(filename):
+        response.cache_control.public = True
+        response.cache_control.max_age = HASHED_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Compress the responses of the given app and serve its static files
+    precompressed.
+
+    Args:
+        app (Flask): The Flask app.
+    """
+    app.after_request(compress_response)
+
+    # Replace the view of the static files (the React build)
+    if app.has_static_folder:
+        app.view_functions["static"] = send_static_file
+
+
+# Create a "flask static ..." command group
+static_cli = AppGroup("static", help="Manage the static files.")
+
+
+@static_cli.command("compress")
+@click.option(
+    "--min-size",
+    default=None,
+    type=int,
+    help="Minimum size (in bytes) of the compressed files.",
+)
+def compress_static_files(min_size: int | None) -> None:
+    """
+    Write the precompressed siblings of the static files (e.g. after a build).
+    """
+    app = current_app
+    if not app.has_static_folder:
+        raise click.ClickException("The app has no static folder.")
+
+    if min_size is None:
+        min_size = app.config["COMPRESS_MIN_SIZE"]
+
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+    compressed = 0
+
+    for root, _, files in os.walk(app.static_folder):
+        for name in files:
+            mimetype, _ = mimetypes.guess_type(name)
+            if mimetype not in COMPRESSIBLE_MIMETYPES:
+                continue
+
+            path = os.path.join(root, name)
+            with open(path, "rb") as file:
+                data = file.read()
+            if len(data) < min_size:
+                continue
+
+            for encoding in encodings:
+                # Precompress with the highest level (done only once)
+                level = 11 if encoding == "br" else 9
+                output = compress(data, encoding, level)
+
+                # Only keep the siblings that are actually smaller
+                if len(output) < len(data):
+                    with open(path + ENCODING_EXTENSIONS[encoding], "wb") as f:
+                        f.write(output)
+
+            compressed += 1
+
+    click.echo(f"Compressed {compressed} static files.")
@@ -0,0 +1,344 @@
+"""
+This module contains the app-scoped cache of the OpenAI generations, which
+serves the repeated prompts without calling the OpenAI API again.
+"""
+
+import json
+import hashlib
+from datetime import timedelta
+from flask import Flask, current_app
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from ..database.models import (
+    db,
+    Child,
+    Chapter,
+    GenerationCacheEntry,
+    Portrait,
+)
+from ..database.utilities import utc_now
+from ..storage.blob_store import get_blob_store
+
+
+def make_cache_key(kind: str, model: str, params: dict, prompt: str) -> str:
+    """
+    Compute the key of a generation.
+
+    Args:
+        kind (str): The kind of generation ("text" or "image").
+        model (str): The model used for the generation.
+        params (dict): The other parameters of the generation.
+        prompt (str): The prompt.
+
+    Returns:
+        str: The hex encoded SHA-256 digest of the generation.
+    """
+    document = json.dumps(
+        {"kind": kind, "model": model, "params": params, "prompt": prompt},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Caches the generated texts (in the database) and images (in the blob
+    store, referenced from the database) for a time-to-live, evicting the
+    least recently used entries beyond its maximum number of entries (but
+    not the entries used within the eviction grace period).
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        ttl: float,
+        max_entries: int,
+        eviction_grace: float = 0,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.eviction_grace = eviction_grace
+
+    def get_text(self, key: str) -> str | None:
+        """
+        Get a cached text.
+
+        Args:
+            key (str): The key of the generation (see make_cache_key).
+
+        Returns:
+            str | None: The generated text, or None if it is not cached.
+        """
+        return self._get(key)
+
+    def set_text(self, key: str, model: str, text: str) -> None:
+        """
+        Cache a generated text.
+
+        Args:
+            key (str): The key of the generation (see make_cache_key).
+            model (str): The model used for the generation.
+            text (str): The generated text.
+        """
+        self._set(key, "text", model, text)
+
+    def get_image(self, key: str) -> bytes | None:
+        """
+        Get a cached image.
+
+        Args:
+            key (str): The key of the generation (see make_cache_key).
+
+        Returns:
+            bytes | None: The bytes of the generated image, or None if it is
+                not cached.
+        """
+        blob_key = self._get(key)
+        if blob_key is None:
+            return None
+
+        try:
+            return get_blob_store().get(blob_key)
+        except KeyError:
+            # The image was deleted from the blob store, generate it again
+            self.invalidate(key)
+            return None
+
+    def set_image(self, key: str, model: str, image: bytes) -> None:
+        """
+        Cache a generated image.
+
+        Args:
+            key (str): The key of the generation (see make_cache_key).
+            model (str): The model used for the generation.
+            image (bytes): The bytes of the generated image.
+        """
+        if self.enabled:
+            self._set(key, "image", model, get_blob_store().put(image))
+
+    def invalidate(self, key: str) -> None:
+        """
+        Remove a generation from the cache.
+
+        Args:
+            key (str): The key of the generation.
+        """
+        try:
+            db.session.execute(
+                delete(GenerationCacheEntry).where(
+                    GenerationCacheEntry.cache_key == key
+                )
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to invalidate generation: {e}")
+
+    def evict(self) -> int:
+        """
+        Remove the expired entries and the least recently used entries
+        beyond the maximum number of entries, with the images no longer
+        referenced by a child, a chapter or a portrait.
+
+        The entries used within the eviction grace period are kept: a
+        generation which just got an image from the cache only references it
+        once it stores its child or story, so deleting the image meanwhile
+        would lose it (a generation outlasting the grace period still can).
+
+        Returns:
+            int: The number of removed entries.
+        """
+        try:
+            now = utc_now()
+            recently_used = now - timedelta(seconds=self.eviction_grace)
+
+            # Keep the most recently used entries which did not expire (and
+            # the entries used within the grace period)
+            kept = (
+                select(GenerationCacheEntry.cache_key)
+                .where(GenerationCacheEntry.expires_at > now)
+                .order_by(GenerationCacheEntry.last_used_at.desc())
+                .limit(self.max_entries)
+            )
+            evicted = db.session.execute(
+                select(
+                    GenerationCacheEntry.cache_key,
+                    GenerationCacheEntry.kind,
+                    GenerationCacheEntry.value,
+                ).where(
+                    GenerationCacheEntry.cache_key.not_in(kept),
+                    GenerationCacheEntry.last_used_at <= recently_used,
+                )
+            ).all()
+
+            if not evicted:
+                return 0
+
+            db.session.execute(
+                delete(GenerationCacheEntry)
+                .where(
+                    GenerationCacheEntry.cache_key.in_(
+                        [key for key, _, _ in evicted]
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+            # Delete the images which are not used elsewhere
+            blob_keys = {
+                value for _, kind, value in evicted if kind == "image"
+            }
+            if blob_keys:
+                used = (
+                    set(
+                        db.session.scalars(
+                            select(Child.image).where(
+                                Child.image.in_(blob_keys)
+                            )
+                        )
+                    )
+                    | set(
+                        db.session.scalars(
+                            select(Chapter.image).where(
+                                Chapter.image.in_(blob_keys)
+                            )
+                        )
+                    )
+                    | set(
+                        db.session.scalars(
+                            select(Portrait.image).where(
+                                Portrait.image.in_(blob_keys)
+                            )
+                        )
+                    )
+                    | set(
+                        db.session.scalars(
+                            select(GenerationCacheEntry.value).where(
+                                GenerationCacheEntry.value.in_(blob_keys)
+                            )
+                        )
+                    )
+                )
+                blob_store = get_blob_store()
+                for blob_key in blob_keys - used:
+                    blob_store.delete(blob_key)
+
+            return len(evicted)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to evict generations: {e}")
+            return 0
+
+    def _get(self, key: str) -> str | None:
+        """
+        Get the value of an entry which did not expire (marking it as used).
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            now = utc_now()
+            value = db.session.scalars(
+                update(GenerationCacheEntry)
+                .where(
+                    GenerationCacheEntry.cache_key == key,
+                    GenerationCacheEntry.expires_at > now,
+                )
+                .values(
+                    hits=GenerationCacheEntry.hits + 1,
+                    last_used_at=now,
+                )
+                .returning(GenerationCacheEntry.value)
+                .execution_options(synchronize_session=False)
+            ).first()
+            db.session.commit()
+
+            return value
+        except SQLAlchemyError as e:
+            # A cache failure must not fail the generation
+            db.session.rollback()
+            current_app.logger.error(f"Failed to get cached generation: {e}")
+            return None
+
+    def _set(self, key: str, kind: str, model: str, value: str) -> None:
+        """
+        Add (or replace) an entry, evicting the entries beyond the maximum.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            expires_at = utc_now() + timedelta(seconds=self.ttl)
+
+            # Replace an expired entry with the same key
+            db.session.execute(
+                delete(GenerationCacheEntry).where(
+                    GenerationCacheEntry.cache_key == key
+                )
+            )
+            db.session.add(
+                GenerationCacheEntry(
+                    cache_key=key,
+                    kind=kind,
+                    model=model,
+                    value=value,
+                    expires_at=expires_at,
+                )
+            )
+            db.session.commit()
+        except IntegrityError:
+            # The same generation was cached concurrently
+            db.session.rollback()
+            return
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to cache generation: {e}")
+            return
+
+        # Bound the size of the cache
+        if self._count() > self.max_entries:
+            self.evict()
+
+    def _count(self) -> int:
+        """
+        Count the entries of the cache.
+        """
+        return db.session.scalar(
+            select(func.count()).select_from(GenerationCacheEntry)
+        )
+
+
+def init_generation_cache(app: Flask) -> GenerationCache:
+    """
+    Create the generation cache of the given app and register it.
+
+    Args:
+        app (Flask): The Flask app.
+
+    Returns:
+        GenerationCache: The created generation cache.
+    """
+    cache = GenerationCache(
+        enabled=app.config["GENERATION_CACHE_ENABLED"],
+        ttl=app.config["GENERATION_CACHE_TTL"],
+        max_entries=app.config["GENERATION_CACHE_MAX_ENTRIES"],
+        eviction_grace=app.config["GENERATION_CACHE_EVICTION_GRACE"],
+    )
+    app.extensions["generation_cache"] = cache
+
+    return cache
+
+
+def get_generation_cache() -> GenerationCache:
+    """
+    Get the generation cache of the current app.
+
+    Returns:
+        GenerationCache: The generation cache.
+    """
+    return current_app.extensions["generation_cache"]
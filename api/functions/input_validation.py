@@ -2,9 +2,13 @@
 This module contains functions for validating input data.
 """
 
+import re
 from collections.abc import Iterable
 from typing import Any, Type
 
+# Format of the IDs (UUIDs as 32 lowercase hex characters)
+ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
 
 def validate_type(
     value: Any,
@@ -59,6 +63,25 @@ def validate_non_empty_string(value: str, field_name: str) -> None:
         raise ValueError(f"{field_name} must be a non-empty string.")
 
 
+def validate_non_empty_bytes(value: bytes, field_name: str) -> None:
+    """
+    Ensure a bytes value is not empty.
+
+    Args:
+        value (bytes): The bytes value to check.
+        field_name (str): The name of the field (for error messaging).
+
+    Raises:
+        ValueError: If the value is empty.
+
+    Returns:
+        None
+    """
+    validate_type(value, [bytes], field_name)
+    if not value:
+        raise ValueError(f"{field_name} must be a non-empty bytes object.")
+
+
 def validate_list_of_non_empty_strings(
     value_list: list[str],
     field_name: str,
@@ -80,6 +103,27 @@ def validate_list_of_non_empty_strings(
         validate_non_empty_string(value, f"{field_name}[{i}]")
 
 
+def validate_list_of_non_empty_bytes(
+    value_list: list[bytes],
+    field_name: str,
+) -> None:
+    """
+    Validate that each item in a list is a non-empty bytes object.
+
+    Args:
+        value_list (list[bytes]): The list to validate.
+        field_name (str): The name of the field, for error messages.
+
+    Raises:
+        ValueError: If the list is None, or if any item in the list is not a non-empty bytes object.
+    """
+    if value_list is None:
+        raise ValueError(f"{field_name} must not be None.")
+
+    for i, value in enumerate(value_list):
+        validate_non_empty_bytes(value, f"{field_name}[{i}]")
+
+
 def validate_allowed_value(
     value: Any, allowed_values: Iterable[Any], field_name: str
 ) -> None:
@@ -101,6 +145,20 @@ def validate_allowed_value(
         )
 
 
+def is_valid_id(value: Any) -> bool:
+    """
+    Check whether a value is a valid UUID hex string (e.g. before binding it
+    to a UUID column, which rejects the malformed IDs).
+
+    Args:
+        value (Any): The value to check.
+
+    Returns:
+        bool: True if the value is a valid UUID hex string, False otherwise.
+    """
+    return isinstance(value, str) and ID_PATTERN.fullmatch(value) is not None
+
+
 def validate_id_format(value: str, field_name: str) -> None:
     """
     Validate that a string is a valid UUID hex string.
@@ -113,7 +171,7 @@ def validate_id_format(value: str, field_name: str) -> None:
         ValueError: If the value is not a valid UUID hex string.
     """
     validate_non_empty_string(value, field_name)
-    if len(value) != 32 or not all(c in "0123456789abcdef" for c in value):
+    if not ID_PATTERN.fullmatch(value):
         raise ValueError(
             f"{field_name} must be a valid UUID hex string but found '{value}'."
         )
@@ -2,28 +2,128 @@
 This module contains helper functions for the Flask backend.
 """
 
-from flask import current_app
-from flask_jwt_extended import get_jwt_identity
+from typing import NamedTuple
+from flask import Flask, current_app
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
 
 from ..database.models import Parent
-from ..database.queries import get_parent
+from ..database.queries import get_parent, parent_exists
+from .caching import TTLCache, MISSING
 
+# Claims of the access tokens holding the identity of the parent
+IDENTITY_CLAIMS = ("first_name", "last_name", "email")
 
-def get_current_parent() -> Parent | None:
+
+class ParentIdentity(NamedTuple):
+    """
+    Represents the identity of the logged in parent.
+    """
+
+    user_id: str
+    first_name: str
+    last_name: str
+    email: str
+
+    @classmethod
+    def from_parent(cls, parent: Parent) -> "ParentIdentity":
+        return cls(
+            user_id=parent.user_id,
+            first_name=parent.first_name,
+            last_name=parent.last_name,
+            email=parent.email,
+        )
+
+
+def init_parent_cache(app: Flask) -> TTLCache:
+    """
+    Create the cache of the parent lookups of the given app and register it.
+
+    Args:
+        app (Flask): The Flask app.
+
+    Returns:
+        TTLCache: The created cache.
+    """
+    cache = TTLCache(
+        maxsize=app.config["PARENT_CACHE_SIZE"],
+        ttl=app.config["PARENT_CACHE_TTL"],
+    )
+    app.extensions["parent_cache"] = cache
+
+    return cache
+
+
+def create_parent_access_token(parent: Parent) -> str:
+    """
+    Create an access token for the given parent, holding its identity claims.
+
+    Args:
+        parent (Parent): The parent.
+
+    Returns:
+        str: The access token.
+    """
+    return create_access_token(
+        identity=parent.user_id,
+        additional_claims={
+            claim: getattr(parent, claim) for claim in IDENTITY_CLAIMS
+        },
+    )
+
+
+def invalidate_parent(user_id: str) -> None:
+    """
+    Remove a parent from the lookup cache (e.g. after changing or deleting it,
+    so that the next request checks the database again).
+
+    Args:
+        user_id (str): The ID of the parent.
     """
-    Get the current parent from the database if the parent is logged in.
+    current_app.extensions["parent_cache"].invalidate(user_id)
+
+
+def get_current_parent() -> ParentIdentity | None:
+    """
+    Get the identity of the current parent if the parent is logged in.
+
+    The identity comes from the claims of the access token, and the existence
+    of the parent is only checked in the database when it is not cached.
 
     Returns:
-        Parent: The current parent.
+        ParentIdentity | None: The current parent, None if it does not exist.
     """
     try:
         # Get the current parent's ID
         current_parent_id = get_jwt_identity()
 
-        # Get the current parent from the database
-        parent = get_parent(current_parent_id)
+        # Get the parent from the cache of the recent lookups
+        cache = current_app.extensions["parent_cache"]
+        parent = cache.get(current_parent_id)
+
+        if parent is not MISSING:
+            return parent
+
+        claims = get_jwt()
+
+        if all(claim in claims for claim in IDENTITY_CLAIMS):
+            # Only check that the parent still exists
+            parent = (
+                ParentIdentity(
+                    user_id=current_parent_id,
+                    **{claim: claims[claim] for claim in IDENTITY_CLAIMS},
+                )
+                if parent_exists(current_parent_id)
+                else None
+            )
+        else:
+            # Get the identity from the database (tokens without claims)
+            parent = get_parent(current_parent_id)
+            parent = ParentIdentity.from_parent(parent) if parent else None
+
+        # Only cache the existing parents
+        if parent is not None:
+            cache.set(current_parent_id, parent)
 
-        # Return the current parent
         return parent
     except Exception as e:
         current_app.logger.error(f"Error fetching current user: {e}")
@@ -0,0 +1,320 @@
+"""
+This module contains the app-scoped registry of the pooled OpenAI clients.
+"""
+
+import asyncio
+import threading
+import weakref
+import httpx
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from typing import TypeVar
+from flask import Flask, current_app
+from openai import OpenAI, AsyncOpenAI
+
+T = TypeVar("T")
+
+# Marker of the end of a stream forwarded between the event loops
+_STREAM_END = object()
+
+
+class OpenAIClientRegistry:
+    """
+    Holds the OpenAI clients (and their keep-alive connection pools)
+    shared by all the requests of an app.
+
+    The clients are created lazily, so that the app starts without an
+    OpenAI API key when the generation is disabled. The asynchronous
+    client lives on a dedicated event loop thread because Flask runs each
+    async view on a new event loop, which would otherwise discard the
+    connection pool after every request.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 180.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 2,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+
+        self._lock = threading.RLock()
+        self._http_client: httpx.Client | None = None
+        self._async_http_client: httpx.AsyncClient | None = None
+        self._client: OpenAI | None = None
+        self._async_client: AsyncOpenAI | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    def get_http_client(self) -> httpx.Client:
+        """
+        Get the pooled synchronous HTTP client (thread-safe).
+
+        Returns:
+            httpx.Client: The HTTP client (also used by the OpenAI client).
+        """
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(
+                    limits=self.limits, timeout=self.timeout
+                )
+            return self._http_client
+
+    def get_client(self) -> OpenAI:
+        """
+        Get the pooled synchronous OpenAI client (thread-safe).
+
+        Returns:
+            OpenAI: The synchronous client.
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=self.max_retries,
+                    http_client=self.get_http_client(),
+                )
+            return self._client
+
+    def download(self, url: str) -> bytes:
+        """
+        Download a file (e.g. a generated image) with the pooled HTTP client.
+
+        Args:
+            url (str): The URL of the file.
+
+        Returns:
+            bytes: The content of the file.
+        """
+        response = self.get_http_client().get(url)
+        response.raise_for_status()
+        return response.content
+
+    async def run_async(
+        self, call: Callable[[AsyncOpenAI], Awaitable[T]]
+    ) -> T:
+        """
+        Run a call with the pooled asynchronous OpenAI client.
+
+        Args:
+            call (Callable[[AsyncOpenAI], Awaitable[T]]): A function receiving
+                the client and returning the awaitable to run, e.g.
+                `lambda client: client.images.generate(...)`.
+
+        Returns:
+            T: The result of the call.
+        """
+        return await self._run_on_loop(lambda: call(self._get_async_client()))
+
+    async def stream_async(
+        self, call: Callable[[AsyncOpenAI], Awaitable[AsyncIterable[T]]]
+    ) -> AsyncIterator[T]:
+        """
+        Run a streaming call with the pooled asynchronous OpenAI client and
+        iterate over its items on the caller's event loop.
+
+        Args:
+            call (Callable[[AsyncOpenAI], Awaitable[AsyncIterable[T]]]): A
+                function receiving the client and returning the awaitable
+                stream, e.g. `lambda client: client.chat.completions.create(
+                ..., stream=True)`.
+
+        Yields:
+            T: The items of the stream (e.g. the completion chunks).
+        """
+        caller_loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def forward(item: object, error: BaseException | None = None):
+            # Hand the item over to the caller's loop (if still running)
+            try:
+                caller_loop.call_soon_threadsafe(
+                    queue.put_nowait, (item, error)
+                )
+            except RuntimeError:
+                pass
+
+        async def pump() -> None:
+            try:
+                stream = await call(self._get_async_client())
+                try:
+                    async for item in stream:
+                        forward(item)
+                finally:
+                    await stream.close()
+            except BaseException as e:
+                forward(_STREAM_END, e)
+                raise
+            forward(_STREAM_END)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._get_loop())
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is _STREAM_END:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            # Stop the stream when the caller stops iterating early
+            future.cancel()
+
+    async def download_async(self, url: str) -> bytes:
+        """
+        Asynchronously download a file with the pooled HTTP client.
+
+        Args:
+            url (str): The URL of the file.
+
+        Returns:
+            bytes: The content of the file.
+        """
+
+        async def download() -> bytes:
+            response = await self._get_async_http_client().get(url)
+            response.raise_for_status()
+            return response.content
+
+        return await self._run_on_loop(download)
+
+    def close(self) -> None:
+        """
+        Close the clients, their connection pools and the event loop thread.
+        """
+        with self._lock:
+            # Closing the OpenAI clients also closes their HTTP clients
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            elif self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+
+            if self._loop is not None:
+                # Closing the OpenAI client also closes its HTTP client
+                if self._async_client is not None:
+                    closing = self._async_client.close()
+                elif self._async_http_client is not None:
+                    closing = self._async_http_client.aclose()
+                else:
+                    closing = None
+
+                if closing is not None:
+                    asyncio.run_coroutine_threadsafe(
+                        closing, self._loop
+                    ).result(timeout=10)
+                self._async_client = None
+                self._async_http_client = None
+
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=10)
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+    async def _run_on_loop(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run the awaitable created by the factory on the registry's event loop.
+        """
+        loop = self._get_loop()
+
+        async def run() -> T:
+            return await factory()
+
+        # Cancelling the caller also cancels the call on the registry's loop
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(run(), loop)
+        )
+
+    def _get_async_http_client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled asynchronous HTTP client (registry's event loop only).
+        """
+        if self._async_http_client is None:
+            self._async_http_client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout
+            )
+        return self._async_http_client
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """
+        Get the pooled asynchronous OpenAI client (registry's event loop only).
+        """
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=self.max_retries,
+                http_client=self._get_async_http_client(),
+            )
+        return self._async_client
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the registry's event loop, starting its thread if needed.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="openai-client-loop",
+                    daemon=True,
+                )
+                self._thread.start()
+            return self._loop
+
+
+def init_openai_clients(app: Flask) -> OpenAIClientRegistry:
+    """
+    Create the OpenAI client registry of the given app and register it.
+
+    Args:
+        app (Flask): The Flask app.
+
+    Returns:
+        OpenAIClientRegistry: The created registry.
+    """
+    registry = OpenAIClientRegistry(
+        api_key=app.config.get("OPENAI_API_KEY"),
+        base_url=app.config.get("OPENAI_BASE_URL"),
+        max_connections=app.config["OPENAI_MAX_CONNECTIONS"],
+        max_keepalive_connections=app.config[
+            "OPENAI_MAX_KEEPALIVE_CONNECTIONS"
+        ],
+        keepalive_expiry=app.config["OPENAI_KEEPALIVE_EXPIRY"],
+        timeout=app.config["OPENAI_TIMEOUT"],
+        connect_timeout=app.config["OPENAI_CONNECT_TIMEOUT"],
+        max_retries=app.config["OPENAI_MAX_RETRIES"],
+    )
+    app.extensions["openai_clients"] = registry
+
+    # Close the connection pools when the app is torn down (or at exit)
+    weakref.finalize(app, registry.close)
+
+    return registry
+
+
+def get_openai_clients() -> OpenAIClientRegistry:
+    """
+    Get the OpenAI client registry of the current app.
+
+    Returns:
+        OpenAIClientRegistry: The registry.
+    """
+    return current_app.extensions["openai_clients"]
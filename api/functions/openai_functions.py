@@ -2,12 +2,19 @@
 This module contains functions for calling the OpenAI API.
 """
 
-from openai import OpenAI, AsyncOpenAI
+from collections.abc import AsyncIterator
 from flask import current_app
 
+from .openai_clients import get_openai_clients
+from .generation_cache import get_generation_cache, make_cache_key
+
 
 def text_gen(
-    prompt: str, *, model: str = "gpt-4-turbo", max_tokens: int = 3000
+    prompt: str,
+    *,
+    model: str = "gpt-4-turbo",
+    max_tokens: int = 3000,
+    cache: bool = True,
 ) -> str:
     """
     Call the OpenAI API to generate a response based on the given prompt.
@@ -16,13 +23,19 @@ def text_gen(
         prompt (str): The input prompt.
         model (str): The model to use for generating the response. Default is "gpt-4-turbo".
         max_tokens (int): The maximum number of tokens to generate. Default is 3000.
+        cache (bool): Whether to use (and fill) the generation cache. Default is True.
 
     Returns:
         str: The generated response from the OpenAI API.
     """
     try:
-        # Create an OpenAI client
-        client = OpenAI()
+        # Return the cached response of the same prompt (if any)
+        key = make_cache_key("text", model, {"max_tokens": max_tokens}, prompt)
+        if cache and (output := get_generation_cache().get_text(key)):
+            return output
+
+        # Get the pooled OpenAI client
+        client = get_openai_clients().get_client()
 
         # Call the OpenAI API to generate a response
         response = client.chat.completions.create(
@@ -34,10 +47,69 @@ def text_gen(
         )
 
         # Select the first choice
-        output = response.choices[0].message.content
+        output = response.choices[0].message.content.strip()
+
+        # Cache the response
+        if cache:
+            get_generation_cache().set_text(key, model, output)
+
+        # Return the output (stripped of any leading/trailing whitespace)
+        return output
+    except Exception as e:
+        current_app.logger.error(f"Error generating text: {e}")
+        raise e
+
+
+async def text_gen_stream_async(
+    prompt: str,
+    *,
+    model: str = "gpt-4-turbo",
+    max_tokens: int = 3000,
+    cache: bool = True,
+) -> AsyncIterator[str]:
+    """
+    Asynchronously call the OpenAI API to generate a streamed response based
+    on the given prompt.
+
+    Args:
+        prompt (str): The input prompt.
+        model (str): The model to use for generating the response. Default is "gpt-4-turbo".
+        max_tokens (int): The maximum number of tokens to generate. Default is 3000.
+        cache (bool): Whether to use (and fill) the generation cache. Default is True.
 
-        # Strip any leading/trailing whitespace and return the output
-        return output.strip()
+    Yields:
+        str: The chunks of the generated response as they are produced
+        (the whole response at once when it is cached).
+    """
+    try:
+        # Return the cached response of the same prompt (if any)
+        key = make_cache_key("text", model, {"max_tokens": max_tokens}, prompt)
+        if cache and (output := get_generation_cache().get_text(key)):
+            yield output
+            return
+
+        # Stream the response with the pooled asynchronous OpenAI client
+        chunks = get_openai_clients().stream_async(
+            lambda client: client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "user", "content": prompt},
+                ],
+                max_tokens=max_tokens,
+                stream=True,
+            )
+        )
+
+        parts = []
+        async for chunk in chunks:
+            # Skip the chunks without content (e.g. the role or finish reason)
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+
+        # Cache the complete response
+        if cache:
+            get_generation_cache().set_text(key, model, "".join(parts))
     except Exception as e:
         current_app.logger.error(f"Error generating text: {e}")
         raise e
@@ -65,8 +137,8 @@ def image_gen(
         str: The URL of the generated image.
     """
     try:
-        # Create an OpenAI client
-        client = OpenAI()
+        # Get the pooled OpenAI client
+        client = get_openai_clients().get_client()
 
         # Limit the prompt to 1000 characters (API limit)
         prompt = prompt[:1000]
@@ -112,19 +184,19 @@ async def image_gen_async(
         str: The URL of the generated image.
     """
     try:
-        # Create an asynchronous OpenAI client
-        client = AsyncOpenAI()
-
         # Limit the prompt to 1000 characters (API limit)
         prompt = prompt[:1000]
 
         # Asynchronously call the OpenAI API to generate an image(s)
-        response = await client.images.generate(
-            model=model,
-            prompt=prompt,
-            size=size,
-            quality=quality,
-            n=n,
+        # with the pooled asynchronous OpenAI client
+        response = await get_openai_clients().run_async(
+            lambda client: client.images.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=n,
+            )
         )
 
         # Select the image URL
@@ -135,3 +207,88 @@ async def image_gen_async(
     except Exception as e:
         current_app.logger.error(f"Error generating image: {e}")
         raise e
+
+
+def generate_image(
+    prompt: str,
+    *,
+    model: str = "dall-e-3",
+    size: str = "1024x1024",
+    quality: str = "standard",
+    cache: bool = True,
+) -> bytes:
+    """
+    Generate an image based on the given prompt and download it, or get the
+    image generated for the same prompt from the generation cache.
+
+    Args:
+        prompt (str): The input prompt.
+        model (str): The model to use for generating the image. Default is "dall-e-3".
+        size (str): The size of the generated image. Default is "1024x1024".
+        quality (str): The quality of the generated image. Default is "standard".
+        cache (bool): Whether to use (and fill) the generation cache. Default is True.
+
+    Returns:
+        bytes: The generated image.
+    """
+    # Return the cached image of the same prompt (if any)
+    key = make_cache_key(
+        "image", model, {"size": size, "quality": quality}, prompt[:1000]
+    )
+    if cache and (image := get_generation_cache().get_image(key)):
+        return image
+
+    # Generate the image and download it (pooled connections)
+    image_url = image_gen(prompt, model=model, size=size, quality=quality)
+    current_app.logger.info(f"Generated image: {image_url}")
+    image = get_openai_clients().download(image_url)
+
+    # Cache the image (the generated URLs expire, so the bytes are kept)
+    if cache:
+        get_generation_cache().set_image(key, model, image)
+
+    return image
+
+
+async def generate_image_async(
+    prompt: str,
+    *,
+    model: str = "dall-e-3",
+    size: str = "1024x1024",
+    quality: str = "standard",
+    cache: bool = True,
+) -> bytes:
+    """
+    Asynchronously generate an image based on the given prompt and download
+    it, or get the image generated for the same prompt from the generation
+    cache.
+
+    Args:
+        prompt (str): The input prompt.
+        model (str): The model to use for generating the image. Default is "dall-e-3".
+        size (str): The size of the generated image. Default is "1024x1024".
+        quality (str): The quality of the generated image. Default is "standard".
+        cache (bool): Whether to use (and fill) the generation cache. Default is True.
+
+    Returns:
+        bytes: The generated image.
+    """
+    # Return the cached image of the same prompt (if any)
+    key = make_cache_key(
+        "image", model, {"size": size, "quality": quality}, prompt[:1000]
+    )
+    if cache and (image := get_generation_cache().get_image(key)):
+        return image
+
+    # Generate the image and download it asynchronously (pooled connections)
+    image_url = await image_gen_async(
+        prompt, model=model, size=size, quality=quality
+    )
+    current_app.logger.info(f"Generated image: {image_url}")
+    image = await get_openai_clients().download_async(image_url)
+
+    # Cache the image (the generated URLs expire, so the bytes are kept)
+    if cache:
+        get_generation_cache().set_image(key, model, image)
+
+    return image
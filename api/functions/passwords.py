@@ -0,0 +1,88 @@
+"""
+This module contains the app-scoped hasher hashing and checking the
+passwords.
+"""
+
+import re
+from flask import Flask, current_app
+
+from ..extensions import bcrypt
+
+# Cost (log rounds) stored in a bcrypt hash, e.g. "$2b$12$..."
+BCRYPT_COST_PATTERN = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+class PasswordHasher:
+    """
+    Hashes and checks the passwords with the configured cost (the hashes
+    created with another cost are detected to be upgraded on login).
+    """
+
+    def __init__(self, *, log_rounds: int = 12):
+        self.log_rounds = log_rounds
+
+    def hash(self, password: str) -> str:
+        """
+        Hash a password with the configured cost.
+
+        Args:
+            password (str): The password.
+
+        Returns:
+            str: The bcrypt hash of the password.
+        """
+        return bcrypt.generate_password_hash(password, self.log_rounds).decode(
+            "utf-8"
+        )
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """
+        Check a password against its hash.
+
+        Args:
+            password_hash (str): The bcrypt hash of the password.
+            password (str): The password to check.
+
+        Returns:
+            bool: True if the password is correct, False otherwise.
+        """
+        return bcrypt.check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Check if a hash was created with another cost than the configured one.
+
+        Args:
+            password_hash (str): The bcrypt hash of a password.
+
+        Returns:
+            bool: True if the password should be hashed again.
+        """
+        match = BCRYPT_COST_PATTERN.match(password_hash)
+        return match is None or int(match.group(1)) != self.log_rounds
+
+
+def init_password_hasher(app: Flask) -> PasswordHasher:
+    """
+    Create the password hasher of the given app and register it.
+
+    Args:
+        app (Flask): The Flask app.
+
+    Returns:
+        PasswordHasher: The created password hasher.
+    """
+    hasher = PasswordHasher(log_rounds=app.config["BCRYPT_LOG_ROUNDS"])
+    app.extensions["password_hasher"] = hasher
+
+    return hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Get the password hasher of the current app.
+
+    Returns:
+        PasswordHasher: The password hasher.
+    """
+    return current_app.extensions["password_hasher"]
@@ -0,0 +1,263 @@
+"""
+This module contains the library of pre-generated child portraits, which
+serves the portraits of the common child attributes instead of generating
+them while the child is being added.
+"""
+
+import click
+from collections import Counter
+from itertools import product
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .openai_functions import generate_image
+from .prompt_assembly import create_child_image_prompt
+from ..database.models import db, Child, Portrait
+from ..database.schemas import CHILD_SCHEMA
+from ..storage.blob_store import get_blob_store
+from ..storage.images import (
+    ProcessedImage,
+    StoredImage,
+    get_image_processor,
+    store_processed_image,
+)
+
+# Attributes of a child the portrait prompt depends on
+PORTRAIT_ATTRIBUTES = (
+    "age_range",
+    "sex",
+    "eye_color",
+    "hair_type",
+    "hair_color",
+    "ethnicity",
+)
+
+# Values of the attributes offered by the frontend (the API accepts any
+# ethnicity, the other attributes are checked by the schema registry)
+ATTRIBUTE_VALUES = {
+    **{
+        name: list(CHILD_SCHEMA[name].values)
+        for name in PORTRAIT_ATTRIBUTES
+        if CHILD_SCHEMA[name].values
+    },
+    "ethnicity": [
+        "Asian",
+        "Black",
+        "Pacific islander",
+        "White",
+        "Hispanic or Latino",
+    ],
+}
+
+
+def get_portrait_attributes(child_params: dict[str, str]) -> dict[str, str]:
+    """
+    Get the (normalized) attributes of a child which identify its portrait.
+
+    Args:
+        child_params (dict[str, str]): The parameters for the child.
+
+    Returns:
+        dict[str, str]: The portrait attributes, with the free text ethnicity
+            normalized (whitespace and case).
+    """
+    attributes = {name: child_params[name] for name in PORTRAIT_ATTRIBUTES}
+    attributes["ethnicity"] = " ".join(attributes["ethnicity"].split()).lower()
+    return attributes
+
+
+def get_portrait(child_params: dict[str, str]) -> StoredImage | None:
+    """
+    Get the portrait of the library matching the attributes of a child.
+
+    Args:
+        child_params (dict[str, str]): The parameters for the child.
+
+    Returns:
+        StoredImage | None: The blob store keys of the portrait and its
+            thumbnails (reused by the child as they are), or None if the
+            library has no portrait for these attributes.
+    """
+    try:
+        portrait = Portrait.query.filter_by(
+            **get_portrait_attributes(child_params)
+        ).first()
+
+        # A missing image only means that the portrait is generated
+        if portrait is None or not get_blob_store().exists(portrait.image):
+            return None
+
+        return StoredImage(portrait.image, portrait.thumbnails or {})
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Failed to get portrait: {e}")
+        return None
+
+
+def add_portrait(
+    child_params: dict[str, str], image: ProcessedImage
+) -> Portrait:
+    """
+    Add (or replace) the portrait of the given attributes to the library.
+
+    Args:
+        child_params (dict[str, str]): The parameters for the child (only the
+            portrait attributes are used).
+        image (ProcessedImage): The portrait and its thumbnails.
+
+    Raises:
+        SQLAlchemyError: If an error occurs with the database.
+
+    Returns:
+        Portrait: The added portrait.
+    """
+    try:
+        attributes = get_portrait_attributes(child_params)
+        image_key, thumbnail_keys = store_processed_image(image)
+
+        portrait = Portrait.query.filter_by(**attributes).first()
+        if portrait is None:
+            portrait = Portrait(**attributes, image=image_key)
+            db.session.add(portrait)
+
+        portrait.image = image_key
+        portrait.thumbnails = thumbnail_keys or None
+        db.session.commit()
+
+        return portrait
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to add portrait: {e}")
+        raise e
+
+
+def get_missing_attribute_combinations(
+    limit: int, *, include_all: bool = False
+) -> list[dict[str, str]]:
+    """
+    Get the most common attribute combinations of the children which have
+    no portrait in the library yet.
+
+    Args:
+        limit (int): The maximum number of combinations.
+        include_all (bool, optional): Whether to complete the combinations of
+            the children with all the combinations offered by the frontend.
+
+    Returns:
+        list[dict[str, str]]: The combinations, most common first.
+    """
+    columns = [getattr(Child, name) for name in PORTRAIT_ATTRIBUTES]
+
+    # Count the children of every combination (the ethnicities are grouped
+    # after their normalization)
+    counts = Counter()
+    for *values, count in db.session.execute(
+        select(*columns, func.count()).group_by(*columns)
+    ):
+        attributes = dict(zip(PORTRAIT_ATTRIBUTES, values))
+        counts[tuple(get_portrait_attributes(attributes).values())] += count
+
+    # Skip the combinations already in the library
+    existing = set(
+        db.session.execute(
+            select(*[getattr(Portrait, name) for name in PORTRAIT_ATTRIBUTES])
+        ).tuples()
+    )
+
+    combinations = [
+        combination
+        for combination, _ in counts.most_common()
+        if combination not in existing
+    ]
+
+    if include_all:
+        for values in product(
+            *(ATTRIBUTE_VALUES[name] for name in PORTRAIT_ATTRIBUTES)
+        ):
+            if len(combinations) >= limit:
+                break
+
+            attributes = dict(zip(PORTRAIT_ATTRIBUTES, values))
+            combination = tuple(get_portrait_attributes(attributes).values())
+            if combination not in existing and combination not in counts:
+                combinations.append(combination)
+
+    return [
+        dict(zip(PORTRAIT_ATTRIBUTES, combination))
+        for combination in combinations[:limit]
+    ]
+
+
+def generate_portrait(child_params: dict[str, str]) -> Portrait:
+    """
+    Generate the portrait of the given attributes and add it to the library.
+
+    Args:
+        child_params (dict[str, str]): The parameters for the child (only the
+            portrait attributes are used).
+
+    Returns:
+        Portrait: The added portrait.
+    """
+    # Generate the image like the portrait of a new child
+    prompt = create_child_image_prompt(
+        {name: child_params[name] for name in PORTRAIT_ATTRIBUTES}
+    )
+    image = get_image_processor().process(generate_image(prompt))
+
+    return add_portrait(child_params, image)
+
+
+# Create a "flask portraits ..." command group
+portraits_cli = AppGroup("portraits", help="Manage the portrait library.")
+
+
+@portraits_cli.command("generate")
+@click.option(
+    "--limit",
+    default=50,
+    show_default=True,
+    help="Maximum number of portraits to generate.",
+)
+@click.option(
+    "--all",
+    "include_all",
+    is_flag=True,
+    help="Also generate the combinations no child has yet.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Only list the combinations which would be generated.",
+)
+def generate_portraits(limit: int, include_all: bool, dry_run: bool) -> None:
+    """
+    Pre-generate the portraits of the most common child attributes.
+    """
+    combinations = get_missing_attribute_combinations(
+        limit, include_all=include_all
+    )
+
+    generated = 0
+    for attributes in combinations:
+        description = ", ".join(attributes.values())
+
+        if dry_run:
+            click.echo(description)
+            continue
+
+        try:
+            generate_portrait(attributes)
+        except IntegrityError:
+            # Added concurrently (e.g. by another batch)
+            continue
+        except Exception as e:
+            click.echo(f"Failed to generate portrait ({description}): {e}")
+            continue
+
+        generated += 1
+        click.echo(f"Generated portrait ({description}).")
+
+    if not dry_run:
+        click.echo(f"Generated {generated} portraits.")
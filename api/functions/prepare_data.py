@@ -3,24 +3,34 @@ This module contains functions for preparing data for the API response.
 """
 
 import os
-import requests
 import asyncio
 import aiofiles
-from aiohttp import ClientSession
+from collections.abc import AsyncIterator, Awaitable
 from flask import current_app
-from base64 import b64encode
 from sqlalchemy.exc import SQLAlchemyError
 
-from .openai_functions import text_gen, image_gen, image_gen_async
+from .openai_functions import text_gen_stream_async, generate_image_async
+from .portraits import get_portrait, get_portrait_attributes
 from .prompt_assembly import (
     create_story_prompt,
     create_chapter_image_prompt,
     create_child_image_prompt,
-    extract_story_components,
+    StoryStreamParser,
 )
 from ..database.models import Child
-from ..database.inserts import insert_story, insert_child
+from ..database.inserts import insert_story, insert_child, insert_children
+from ..database.updates import update_child_image
 from ..database.utilities import get_entry_attributes
+from ..storage.blob_store import (
+    get_blob_store,
+    with_image_url,
+)
+from ..storage.images import (
+    ProcessedImage,
+    StoredImage,
+    get_image_processor,
+    with_thumbnail_urls,
+)
 from ..dummy_data.dummy_story import dummy_story
 
 # Set the path to the dummy data directory based on the current environment
@@ -29,6 +39,16 @@ if os.path.exists(os.path.join(".", "dummy_data")):
 else:
     DUMMY_PATH = os.path.join(".", "api", "dummy_data")
 
+# Image of the children whose portrait is being generated (in the dummy
+# data directory)
+PLACEHOLDER_IMAGE = "child_placeholder.webp"
+
+# Number of characters per chunk when streaming the dummy story
+DUMMY_STORY_CHUNK_SIZE = 64
+
+# Marker of the end of a task generating story events
+_TASK_DONE = object()
+
 
 def get_generate_flag() -> bool:
     """
@@ -84,10 +104,18 @@ def get_child_parameters(child_id: str) -> dict[str, str]:
         if child is None:
             raise ValueError(f"Child with ID '{child_id}' does not exist")
 
-        # Get the filtered parameters for the child
+        # Get the filtered parameters for the child (the deferred image is
+        # not needed by the prompts, so it is not loaded)
         child_parameters = get_entry_attributes(
             child,
-            exclude=["child_id", "parent_id"],
+            exclude=[
+                "child_id",
+                "parent_id",
+                "image",
+                "thumbnails",
+                "image_status",
+                "created_at",
+            ],
         )
 
         return child_parameters
@@ -96,19 +124,37 @@ def get_child_parameters(child_id: str) -> dict[str, str]:
         raise e
 
 
-def generate_story(
+async def _stream_dummy_story_async() -> AsyncIterator[str]:
+    """
+    Stream the dummy story in chunks, like a streamed generation.
+
+    Yields:
+        str: The chunks of the dummy story.
+    """
+    for i in range(0, len(dummy_story), DUMMY_STORY_CHUNK_SIZE):
+        yield dummy_story[i : i + DUMMY_STORY_CHUNK_SIZE]
+
+        # Let the other tasks (e.g. the image generations) run in between
+        await asyncio.sleep(0)
+
+
+async def stream_story_async(
     child_params: dict[str, str], topic: str, story_genre: str
-) -> tuple[str, list[str], list[str]]:
+) -> AsyncIterator[dict[str, str | int]]:
     """
-    Generate chapters for a story based on the given child parameters and story topic.
+    Asynchronously generate a story based on the given child parameters and
+    story topic, yielding its title and chapters as soon as they are complete.
 
     Args:
         child_params (dict[str, str]): The parameters for the child.
         topic (str): The topic of the story.
         story_genre (str): The genre of the story.
 
-    Returns:
-        tuple[str, list[str], list[str]]: The generated story title, chapter_contents and chapter titles.
+    Raises:
+        ValueError: If the story components cannot be extracted.
+
+    Yields:
+        dict[str, str | int]: The "title" and "chapter" events of the story.
     """
     try:
         # Get the generate flag from the environment variable
@@ -119,27 +165,130 @@ def generate_story(
 
         # Check if the story should be generated
         if generate_flag:
-            # Generate the story based on the prompt
-            story = text_gen(prompt)
-            current_app.logger.info("Generated story.")
+            # Stream the story generated based on the prompt (not cached:
+            # asking again gives a new story, and a malformed story would be
+            # replayed on every retry)
+            chunks = text_gen_stream_async(prompt, cache=False)
         else:
             # Use a dummy story instead of generating one
-            story = dummy_story
+            chunks = _stream_dummy_story_async()
 
-        # Extract the story title, chapter titles and chapter contents
-        return extract_story_components(story)
+        # Extract the story title and chapters as the chunks come in
+        parser = StoryStreamParser()
+        async for chunk in chunks:
+            for event in parser.feed(chunk):
+                yield event
+
+        # Extract the last chapter once the story is complete
+        for event in parser.close():
+            yield event
+
+        if generate_flag:
+            current_app.logger.info("Generated story.")
     except Exception as e:
         current_app.logger.error(f"Failed to generate story: {e}")
         raise e
 
 
+async def generate_story_events_async(
+    child_params: dict[str, str],
+    topic: str,
+    story_genre: str,
+    image_style: str,
+) -> AsyncIterator[dict[str, str | int | bytes]]:
+    """
+    Asynchronously generate a story and the images of its chapters, each
+    image being generated as soon as its chapter is complete (i.e. while the
+    next chapters are still being generated).
+
+    Args:
+        child_params (dict[str, str]): The parameters for the child.
+        topic (str): The topic of the story.
+        story_genre (str): The genre of the story.
+        image_style (str): The style of the images.
+
+    Yields:
+        dict[str, str | int | bytes]: The "title", "chapter" and "image"
+        (transcoded image and thumbnails) events of the story, in the order
+        they are produced.
+    """
+    # Events of the story and of its images, in the order they are produced
+    events = asyncio.Queue()
+
+    # Tasks generating the story and the chapter images
+    tasks = []
+
+    async def produce(coroutine: Awaitable[None]) -> None:
+        # Forward the error of a task to the consumer, then mark it as done
+        try:
+            await coroutine
+        except Exception as e:
+            await events.put(e)
+        finally:
+            await events.put(_TASK_DONE)
+
+    def start(coroutine: Awaitable[None]) -> None:
+        tasks.append(asyncio.create_task(produce(coroutine)))
+
+    async def generate_image(chapter: str, chapter_number: int) -> None:
+        image = await _generate_chapter_image_async(
+            generate_flag, child_params, image_style, chapter, chapter_number
+        )
+
+        # Transcode the image and create its thumbnails (in another process)
+        processed = await get_image_processor().process_async(image)
+        await events.put(
+            {
+                "type": "image",
+                "number": chapter_number,
+                "image": processed.master,
+                "thumbnails": processed.thumbnails,
+            }
+        )
+
+    async def generate_text() -> None:
+        async for event in stream_story_async(
+            child_params, topic, story_genre
+        ):
+            await events.put(event)
+
+            # Start generating the image of the completed chapter
+            if event["type"] == "chapter":
+                start(generate_image(event["content"], event["number"]))
+
+    try:
+        # Get the generate flag from the environment variable
+        generate_flag = get_generate_flag()
+
+        start(generate_text())
+
+        # Forward the events until the story and all its images are done
+        remaining = 0
+        while remaining < len(tasks):
+            event = await events.get()
+
+            if event is _TASK_DONE:
+                remaining += 1
+            elif isinstance(event, Exception):
+                raise event
+            else:
+                yield event
+    except Exception as e:
+        current_app.logger.error(f"Failed to generate story: {e}")
+        raise e
+    finally:
+        # Do not keep generating a failed (or abandoned) story
+        for task in tasks:
+            task.cancel()
+
+
 async def _generate_chapter_image_async(
     generate: bool,
     child_params: dict[str, str],
     image_style: str,
     chapter: str,
     chapter_number: int,
-) -> str:
+) -> bytes:
     """
     Generate an image for a chapter of the story asynchronously.
 
@@ -151,7 +300,7 @@ async def _generate_chapter_image_async(
         chapter_number (int): The number of the chapter.
 
     Returns:
-        str: The generated image in base64 format.
+        bytes: The generated image.
     """
     try:
         # Create a prompt for generating the image
@@ -164,18 +313,9 @@ async def _generate_chapter_image_async(
 
         # Check if the image should be generated
         if generate:
-            # Generate the image based on the prompt
-            image_url = await image_gen_async(prompt)
-
-            # Log the generated image URL
-            current_app.logger.info(
-                f"Generated chapter {chapter_number} image: {image_url}"
-            )
-
-            # Get the image bytes from the URL asynchronously
-            async with ClientSession() as session:
-                async with session.get(image_url) as response:
-                    image = await response.read()
+            # Generate the image based on the prompt and download it
+            # asynchronously (or get it from the generation cache)
+            image = await generate_image_async(prompt)
         else:
             # Use a dummy image instead of generating one
             path = os.path.join(DUMMY_PATH, f"image_{chapter_number}.webp")
@@ -184,97 +324,99 @@ async def _generate_chapter_image_async(
             async with aiofiles.open(path, "rb") as file:
                 image = await file.read()
 
-        # Convert the image to a base64 string and return it
-        return b64encode(image).decode("utf-8")
+        return image
     except Exception as e:
         current_app.logger.error(f"Failed to generate chapter image: {e}")
         raise e
 
 
-async def generate_chapter_images_async(
-    chapters: list[str],
+async def generate_child_image_async(
     child_params: dict[str, str],
-    image_style: str,
-) -> list[str]:
+) -> ProcessedImage | StoredImage:
     """
-    Asynchronously generate images for each chapter of the story concurrently.
+    Asynchronously generate an image for the child based on the given
+    parameters, using the portrait library when it has a portrait for the
+    same attributes.
 
     Args:
-        chapters (list[str]): The generated story chapters.
         child_params (dict[str, str]): The parameters for the child.
-        image_style (str): The style of the images.
 
     Returns:
-        list[str]: The generated images in base64 format.
+        ProcessedImage | StoredImage: The generated image and its thumbnails,
+            or the keys of the stored portrait of the library.
     """
     try:
+        # Use the pre-generated portrait of the same attributes (if any),
+        # querying the database in a thread to keep the event loop free
+        portrait = await asyncio.to_thread(get_portrait, child_params)
+        if portrait is not None:
+            return portrait
+
         # Get the generate flag from the environment variable
         generate_flag = get_generate_flag()
 
-        # Create a list of tasks to generate images for each chapter
-        tasks = [
-            _generate_chapter_image_async(
-                generate_flag, child_params, image_style, chapter, i + 1
-            )
-            for i, chapter in enumerate(chapters)
-        ]
+        # Create a prompt for generating the image
+        prompt = create_child_image_prompt(child_params=child_params)
 
-        # Execute the tasks concurrently
-        images = await asyncio.gather(*tasks)
+        if generate_flag:
+            # Generate the image based on the prompt and download it (or get
+            # it from the generation cache, the portraits of children with
+            # the same attributes share the same prompt)
+            image = await generate_image_async(prompt)
+        else:
+            # Use a dummy image instead of generating one
+            path = os.path.join(DUMMY_PATH, "child_image.jpg")
+            async with aiofiles.open(path, "rb") as file:
+                image = await file.read()
 
-        return images
+        # Transcode the image and create its thumbnails (in another process)
+        return await get_image_processor().process_async(image)
     except Exception as e:
-        current_app.logger.error(f"Failed to generate chapter images: {e}")
+        current_app.logger.error(f"Failed to generate child image: {e}")
         raise e
 
 
-def generate_child_image(child_params: dict[str, str]) -> str:
+async def assemble_child_image_async(child_id: str) -> None:
     """
-    Generate an image for the child based on the given parameters.
+    Asynchronously generate the portrait of the given child and replace its
+    placeholder image with it.
 
     Args:
-        child_params (dict[str, str]): The parameters for the child.
-
-    Returns:
-        str: The generated image in base64 format.
+        child_id (str): The ID of the child.
     """
     try:
-        # Get the generate flag from the environment variable
-        generate_flag = get_generate_flag()
-
-        # Create a prompt for generating the image
-        prompt = create_child_image_prompt(child_params=child_params)
-
-        if generate_flag:
-            # Generate the image based on the prompt
-            image_url = image_gen(prompt)
-
-            # Get the image bytes from the URL
-            image = requests.get(image_url).content
-
-            # Log the generated image URL
-            current_app.logger.info(f"Generated child image:\n{image_url}\n")
+        # Get the child parameters (the blocking database calls run in a
+        # thread to keep the event loop free)
+        child_params = await asyncio.to_thread(get_child_parameters, child_id)
+
+        # Generate the image (and its thumbnails) for the child
+        image = await generate_child_image_async(child_params)
+
+        # Replace the placeholder (with the portrait of the library as it
+        # is stored)
+        if isinstance(image, StoredImage):
+            await asyncio.to_thread(
+                update_child_image, child_id, "ready", image
+            )
         else:
-            # Set a dummy image URL
-            image_url = "temp_image_url"
-
-            # Use a dummy image instead of generating one
-            path = os.path.join(DUMMY_PATH, "child_image.jpg")
-            with open(path, "rb") as file:
-                image = file.read()
-
-        # Convert the image to a base64 string and return it
-        return b64encode(image).decode("utf-8")
+            await asyncio.to_thread(
+                update_child_image,
+                child_id,
+                "ready",
+                image.master,
+                thumbnails=image.thumbnails,
+            )
     except Exception as e:
-        current_app.logger.error(f"Failed to generate child image: {e}")
+        current_app.logger.error(f"Failed to assemble child image: {e}")
         raise e
 
 
-async def assemble_story_payload_async(
+async def assemble_story_events_async(
     child_id: str, topic: str, image_style: str, story_genre: str
-) -> dict[str, str | list[str]]:
+) -> AsyncIterator[dict[str, str | int]]:
     """
-    Asynchronously assemble the payload for the given child ID, story topic, and image style.
+    Asynchronously generate and store a story for the given child ID, story
+    topic, and image style, yielding its parts as soon as they are ready.
 
     Args:
         child_id (str): The ID of the child.
@@ -285,25 +427,52 @@ async def assemble_story_payload_async(
     Raises:
         ValueError: If the child with the given ID does not exist.
 
-    Returns:
-        dict[str, list[str]]: The assembled payload containing chapters and images.
+    Yields:
+        dict[str, str | int]: The "title", "chapter" (title and content),
+        "image" (blob store key of the stored image) events and the final
+        "story" event (ID and creation date of the inserted story).
     """
     try:
-        # Get the child parameters
-        child_params = get_child_parameters(child_id)
-
-        # Generate the story
-        story_title, chapter_titles, chapter_contents = generate_story(
-            child_params, topic, story_genre
-        )
-
-        # Generate the images for the story chapters asynchronously
-        images = await generate_chapter_images_async(
-            chapter_contents, child_params, image_style
-        )
+        # Get the child parameters (the blocking database and blob store
+        # calls run in a thread to keep the event loop free)
+        child_params = await asyncio.to_thread(get_child_parameters, child_id)
+
+        story_title = None
+        chapter_titles = []
+        chapter_contents = []
+        images = {}
+        thumbnails = {}
+
+        blob_store = get_blob_store()
+
+        # Generate the story and the images of its chapters
+        async for event in generate_story_events_async(
+            child_params, topic, story_genre, image_style
+        ):
+            if event["type"] == "title":
+                story_title = event["title"]
+            elif event["type"] == "chapter":
+                chapter_titles.append(event["title"])
+                chapter_contents.append(event["content"])
+            elif event["type"] == "image":
+                images[event["number"]] = event["image"]
+                thumbnails[event["number"]] = event["thumbnails"]
+
+                # Store the image right away so that it can be shown (the
+                # insertion of the story stores it again at no cost)
+                event = {
+                    "type": "image",
+                    "number": event["number"],
+                    "image": await asyncio.to_thread(
+                        blob_store.put, event["image"]
+                    ),
+                }
+
+            yield event
 
         # Add the story to the database
-        inserted_story = insert_story(
+        inserted_story = await asyncio.to_thread(
+            insert_story,
             child_id,
             story_title,
             topic,
@@ -311,25 +480,20 @@ async def assemble_story_payload_async(
             story_genre,
             chapter_titles,
             chapter_contents,
-            images,
+            [images[number] for number in sorted(images)],
+            [thumbnails[number] for number in sorted(images)],
         )
 
-        # Get the story attributes and return them
+        # Get the story attributes
         story_attributes = get_entry_attributes(inserted_story)
 
-        # Assemble the payload for the story
-        payload = {
+        yield {
+            "type": "story",
             "story_id": story_attributes["story_id"],
-            "title": story_title,
-            "chapter_titles": chapter_titles,
-            "chapter_contents": chapter_contents,
-            "chapter_images": images,
             "created_at": story_attributes["created_at"],
         }
-
-        return payload
     except Exception as e:
-        current_app.logger.error(f"Failed to assemble story payload: {e}")
+        current_app.logger.error(f"Failed to assemble story events: {e}")
         raise e
 
 
@@ -347,7 +511,10 @@ def assemble_child_payload(
     fav_shows: str | None = None,
 ) -> dict[str, str]:
     """
-    Assemble the payload for the given child parameters.
+    Assemble the payload for the given child parameters. Unless the portrait
+    library has a portrait for the same attributes, the child is added with
+    a placeholder image ("pending" image_status) and its portrait is
+    generated by the job worker.
 
     Args:
         parent_id (str): The ID of the parent.
@@ -380,10 +547,19 @@ def assemble_child_payload(
             "fav_shows": fav_shows,
         }
 
-        # Generate the image for the child
-        image = generate_child_image(child_params=child_params)
+        # Use the pre-generated portrait of the same attributes (if any, as
+        # it is stored), otherwise a placeholder until the job worker
+        # generates one
+        portrait = get_portrait(child_params)
+        if portrait is None:
+            path = os.path.join(DUMMY_PATH, PLACEHOLDER_IMAGE)
+            with open(path, "rb") as file:
+                image = file.read()
+        else:
+            image = portrait
 
-        # Add the story to the database
+        # Add the child to the database (with the job generating its
+        # portrait, if any)
         inserted_child = insert_child(
             parent_id,
             name,
@@ -397,10 +573,72 @@ def assemble_child_payload(
             fav_animals,
             fav_activities,
             fav_shows,
+            image_status="ready" if portrait is not None else "pending",
         )
 
-        # Get the child attributes and return them
-        return get_entry_attributes(inserted_child)
+        # Get the child attributes (with the image and thumbnail URLs)
+        return with_thumbnail_urls(
+            with_image_url(get_entry_attributes(inserted_child))
+        )
     except Exception as e:
         current_app.logger.error(f"Failed to assemble child payload: {e}")
         raise e
+
+
+def assemble_children_payloads(
+    parent_id: str, children: list[dict[str, str | None]]
+) -> list[dict[str, str]]:
+    """
+    Assemble the payloads of many children of a parent, added in one
+    transaction. Like assemble_child_payload, the children whose attributes
+    have no portrait in the portrait library are added with a placeholder
+    image and their portraits are generated by the job worker.
+
+    Args:
+        parent_id (str): The ID of the parent.
+        children (list[dict[str, str | None]]): The attributes of the
+            children (as taken by assemble_child_payload).
+
+    Returns:
+        list[dict[str, str]]: The assembled payloads (in the same order).
+    """
+    try:
+        # Look up the portrait library once per combination of attributes
+        combinations = [
+            tuple(get_portrait_attributes(child_params).items())
+            for child_params in children
+        ]
+        portraits = {
+            combination: get_portrait(dict(combination))
+            for combination in set(combinations)
+        }
+
+        # Read the placeholder once (stored once for all the children)
+        path = os.path.join(DUMMY_PATH, PLACEHOLDER_IMAGE)
+        with open(path, "rb") as file:
+            placeholder = file.read()
+
+        # Add the children to the database (with the portraits of the
+        # library as they are stored, and the jobs generating the others)
+        rows = []
+        for child_params, combination in zip(children, combinations):
+            portrait = portraits[combination]
+            rows.append(
+                {
+                    **child_params,
+                    "image": placeholder if portrait is None else portrait,
+                    "image_status": (
+                        "ready" if portrait is not None else "pending"
+                    ),
+                }
+            )
+        inserted_children = insert_children(parent_id, rows)
+
+        # Get the children attributes (with the image and thumbnail URLs)
+        return [
+            with_thumbnail_urls(with_image_url(get_entry_attributes(child)))
+            for child in inserted_children
+        ]
+    except Exception as e:
+        current_app.logger.error(f"Failed to assemble children payloads: {e}")
+        raise e
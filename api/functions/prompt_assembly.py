@@ -6,12 +6,70 @@ import re
 from string import Template
 from flask import current_app
 
-from ..prompting.prompt_templates import (
-    story_prompt_template,
-    chapter_image_prompt_template,
-    child_image_prompt_template,
+from ..prompting.registry import PLACEHOLDER_PATTERN, get_prompt_template
+
+# Registered prompt templates (their placeholders are extracted at import)
+STORY_PROMPT = get_prompt_template("story")
+CHAPTER_IMAGE_PROMPT = get_prompt_template("chapter_image")
+CHILD_IMAGE_PROMPT = get_prompt_template("child_image")
+
+# Pattern to extract the story title
+STORY_TITLE_PATTERN = re.compile(
+    r"""
+    # Matches 'Title of the story:' possibly followed by whitespace characters and stars
+    Title\ of\ the\ story:\s*\**\s*
+
+    # Lazily captures the title of the story
+    (.*?)
+
+    # Positive lookahead for the start of the first chapter
+    # (with stars and optional whitespace characters)
+    (?=\s*\**\s*\n)
+    """,
+    re.IGNORECASE | re.VERBOSE,
 )
 
+# Pattern to extract chapter titles and descriptions
+STORY_CHAPTER_PATTERN = re.compile(
+    r"""
+    # Matches 'Chapter <number> title:' possibly followed by whitespace characters and stars
+    Chapter\ \d+\ title:\s*\**\s*
+
+    # Lazily captures the chapter title
+    (.+?)
+
+    # Optional stars and whitespace characters
+    \s*\**\s*
+
+    # Matches 'Chapter <number> description:' possibly followed by whitespace characters
+    Chapter\ \d+\ description:\s*\**\s*
+
+    # Lazily captures the chapter description
+    (.+?)
+
+    # Optional stars and whitespace characters
+    \s*\**\s*
+
+    # Lookahead for the start of the next chapter, the end of the story
+    # or the end of the document (with stars and optional whitespace characters)
+    (?=\s*Chapter\ \d+\ title:\s*\**\s*|\s*The end.|$)
+    """,
+    re.DOTALL | re.IGNORECASE | re.VERBOSE,
+)
+
+# Pattern matching the start of the next chapter, which ends the previous one
+# (the last chapter of a story only ends with the document)
+STORY_NEXT_CHAPTER_PATTERN = re.compile(
+    r"\s*Chapter\ \d+\ title:", re.IGNORECASE
+)
+
+
+class StoryFormatError(ValueError):
+    """
+    Raised when a generated story does not have the expected format (unlike
+    the other validation errors, generating the story again can fix it).
+    """
+
 
 def extract_story_components(
     story: str,
@@ -33,67 +91,23 @@ def extract_story_components(
         if not story:
             raise ValueError("The story is an empty string.")
 
-        # Title pattern
-        title_pattern = re.compile(
-            r"""
-            # Matches 'Title of the story:' possibly followed by whitespace characters and stars
-            Title\ of\ the\ story:\s*\**\s*
-
-            # Lazily captures the title of the story
-            (.*?)
-
-            # Positive lookahead for the start of the first chapter
-            # (with stars and optional whitespace characters)
-            (?=\s*\**\s*\n)
-            """,
-            re.IGNORECASE | re.VERBOSE,
-        )
-
         # Extract the story title
-        title_match = re.search(title_pattern, story)
+        title_match = STORY_TITLE_PATTERN.search(story)
 
         # Extract the title if it exists
         title = title_match.group(1).strip() if title_match.group(1) else None
 
         # Raise an error if the title could not be extracted
         if not title:
-            raise ValueError(
+            raise StoryFormatError(
                 "Invalid story format, could not extract story components."
             )
 
-        # Pattern to extract chapter titles and descriptions
-        chapter_pattern = re.compile(
-            r"""
-            # Matches 'Chapter <number> title:' possibly followed by whitespace characters and stars
-            Chapter\ \d+\ title:\s*\**\s*
-
-            # Lazily captures the chapter title
-            (.+?)
-
-            # Optional stars and whitespace characters
-            \s*\**\s*
-
-            # Matches 'Chapter <number> description:' possibly followed by whitespace characters
-            Chapter\ \d+\ description:\s*\**\s*
-
-            # Lazily captures the chapter description
-            (.+?)
-
-            # Optional stars and whitespace characters
-            \s*\**\s*
-
-            # Lookahead for the start of the next chapter, the end of the story
-            # or the end of the document (with stars and optional whitespace characters)
-            (?=\s*Chapter\ \d+\ title:\s*\**\s*|\s*The end.|$)
-            """,
-            re.DOTALL | re.IGNORECASE | re.VERBOSE,
-        )
-
         chapter_titles = []
         chapter_contents = []
 
         # Extract chapters details
-        for match in chapter_pattern.finditer(story):
+        for match in STORY_CHAPTER_PATTERN.finditer(story):
             # Extract chapter title and content
             chapter_title = match.group(1).strip()
             chapter_content = match.group(2).strip()
@@ -104,7 +118,7 @@ def extract_story_components(
 
         # Raise an error if the story components could not be extracted
         if not chapter_titles or not chapter_contents:
-            raise ValueError(
+            raise StoryFormatError(
                 "Invalid story format, could not extract story components."
             )
 
@@ -115,6 +129,103 @@ def extract_story_components(
         raise e
 
 
+class StoryStreamParser:
+    """
+    Incrementally extracts the components of a story streamed in chunks.
+
+    The title and each chapter are emitted as soon as they are complete
+    (i.e. once the text following them has been received) and are the same
+    as the ones extracted by `extract_story_components` from the whole story.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.title: str | None = None
+        self.chapter_titles: list[str] = []
+        self.chapter_contents: list[str] = []
+
+        # Position of the end of the last emitted chapter in the text
+        self._position = 0
+
+    def feed(self, chunk: str) -> list[dict[str, str | int]]:
+        """
+        Add a chunk of the story and get the newly completed components.
+
+        Args:
+            chunk (str): The next chunk of the story.
+
+        Returns:
+            list[dict[str, str | int]]: The "title" and "chapter" events of the
+            components completed by the chunk.
+        """
+        self.text += chunk
+        return self._parse(final=False)
+
+    def close(self) -> list[dict[str, str | int]]:
+        """
+        Mark the end of the story and get the remaining components.
+
+        Raises:
+            ValueError: If the story components cannot be extracted.
+
+        Returns:
+            list[dict[str, str | int]]: The remaining "title" and "chapter"
+            events (i.e. the last chapter).
+        """
+        try:
+            events = self._parse(final=True)
+
+            # Raise an error if the story components could not be extracted
+            if not self.title or not self.chapter_titles:
+                raise StoryFormatError(
+                    "Invalid story format, could not extract story components."
+                )
+
+            return events
+        except Exception as e:
+            current_app.logger.error(f"Error extracting story components: {e}")
+            raise e
+
+    def _parse(self, final: bool) -> list[dict[str, str | int]]:
+        """
+        Extract the components completed since the last call.
+        """
+        events = []
+
+        # Extract the story title once its line is complete
+        if self.title is None:
+            title_match = STORY_TITLE_PATTERN.search(self.text)
+
+            if title_match:
+                self.title = title_match.group(1).strip()
+
+                if self.title:
+                    events.append({"type": "title", "title": self.title})
+
+        # Extract the chapters following the last emitted one
+        for match in STORY_CHAPTER_PATTERN.finditer(self.text, self._position):
+            # Until the end of the story, a chapter is only complete once it
+            # is followed by the next chapter
+            if not final and not STORY_NEXT_CHAPTER_PATTERN.match(
+                self.text, match.end()
+            ):
+                break
+
+            self._position = match.end()
+            self.chapter_titles.append(match.group(1).strip())
+            self.chapter_contents.append(match.group(2).strip())
+            events.append(
+                {
+                    "type": "chapter",
+                    "number": len(self.chapter_titles),
+                    "title": self.chapter_titles[-1],
+                    "content": self.chapter_contents[-1],
+                }
+            )
+
+        return events
+
+
 def extract_placeholders_from_template(template: Template) -> list[str]:
     """
     Extract placeholders from a string Template.
@@ -126,25 +237,8 @@ def extract_placeholders_from_template(template: Template) -> list[str]:
         list[str]: A list of unique placeholder names found in the template.
     """
     try:
-        # Regular expression to find ${placeholder} or $placeholder in the template
-        placeholder_pattern = re.compile(
-            r"""
-            \$              # Start with a dollar sign
-            \{?             # Optionally followed by an opening brace
-            (\w+)           # Capture one or more word characters (the placeholder name)
-            \}?             # Optionally followed by a closing brace
-        """,
-            re.VERBOSE,
-        )
-
-        # Find all matches in the template's template string
-        required_placeholders = placeholder_pattern.findall(template.template)
-
-        # Filter out duplicates by converting the list to a set
-        required_placeholders = set(required_placeholders)
-
-        # Return the required placeholders as a list
-        return list(required_placeholders)
+        # Find all the unique placeholders in the template's template string
+        return list(set(PLACEHOLDER_PATTERN.findall(template.template)))
     except Exception as e:
         current_app.logger.error(
             f"Error extracting placeholders from template: {e}"
@@ -177,21 +271,8 @@ def create_story_prompt(
             "story_genre": story_genre,
         }
 
-        # Extract the required placeholders from the story prompt template
-        required_placeholders = extract_placeholders_from_template(
-            story_prompt_template
-        )
-
-        # Check for missing required placeholders
-        missing_placeholders = [
-            param for param in required_placeholders if param not in parameters
-        ]
-
-        # Raise an error if there are missing required placeholders
-        if missing_placeholders:
-            raise ValueError(
-                f"Missing required placeholders: {', '.join(missing_placeholders)}"
-            )
+        # Check for missing required placeholders (extracted at import)
+        STORY_PROMPT.validate(parameters)
 
         # Replace the Nones in the optional child_params with "unspecified"
         for key in ["fav_animals", "fav_activities", "fav_shows"]:
@@ -199,7 +280,7 @@ def create_story_prompt(
                 parameters[key] = "unspecified"
 
         # Substitute the parameters into the story prompt template and return it
-        return story_prompt_template.substitute(parameters)
+        return STORY_PROMPT.template.substitute(parameters)
     except Exception as e:
         current_app.logger.error(f"Error creating story prompt: {e}")
         raise e
@@ -221,6 +302,9 @@ def create_chapter_image_prompt(
         chapter_content (str): The content of the chapter.
         chapter_number (int): The number of the chapter.
 
+    Raises:
+        ValueError: If there are missing required placeholders.
+
     Returns:
         str: The image prompt.
     """
@@ -233,8 +317,8 @@ def create_chapter_image_prompt(
             "image_style": image_style,
         }
 
-        # Substitute the parameters into the chapter image prompt template and return it
-        return chapter_image_prompt_template.substitute(**parameters)
+        # Validate and substitute the parameters into the chapter image prompt template
+        return CHAPTER_IMAGE_PROMPT.render(parameters)
     except Exception as e:
         current_app.logger.error(f"Error creating chapter image prompt: {e}")
         raise e
@@ -247,12 +331,15 @@ def create_child_image_prompt(child_params: dict[str, str]) -> str:
     Args:
         child_params (dict[str, str]): The parameters for the child.
 
+    Raises:
+        ValueError: If there are missing required placeholders.
+
     Returns:
         str: The image prompt.
     """
     try:
-        # Substitute the parameters into the child image prompt template and return it
-        return child_image_prompt_template.substitute(**child_params)
+        # Validate and substitute the parameters into the child image prompt template
+        return CHILD_IMAGE_PROMPT.render(child_params)
     except Exception as e:
         current_app.logger.error(f"Error creating child image prompt: {e}")
         raise e
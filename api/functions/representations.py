@@ -0,0 +1,72 @@
+"""
+This module contains the JSON representation of the API responses, encoded
+with orjson when it is installed (and the standard library otherwise).
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+from flask import Response, current_app, make_response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """
+    Encode the values which JSON does not support natively.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def dumps(data: Any, *, indent: bool = False) -> bytes:
+    """
+    Encode data as JSON (ending with a new line).
+
+    Args:
+        data (Any): The data (datetimes are encoded in ISO 8601).
+        indent (bool, optional): Whether to indent the JSON.
+
+    Raises:
+        TypeError: If the data cannot be encoded.
+
+    Returns:
+        bytes: The JSON encoded data.
+    """
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+    return (
+        json.dumps(data, default=_default, indent=2 if indent else None) + "\n"
+    ).encode("utf-8")
+
+
+def output_json(
+    data: Any, code: int, headers: dict[str, str] | None = None
+) -> Response:
+    """
+    Make a response with a JSON encoded body (the representation of the
+    "application/json" responses of the API).
+
+    Args:
+        data (Any): The data returned by a resource.
+        code (int): The HTTP status code.
+        headers (dict[str, str], optional): The additional headers.
+
+    Returns:
+        Response: The response.
+    """
+    # Indent the JSON in debug mode, like Flask-RESTX does
+    response = make_response(dumps(data, indent=current_app.debug), code)
+    response.mimetype = "application/json"
+    response.headers.extend(headers or {})
+    return response
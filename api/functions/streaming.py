@@ -0,0 +1,49 @@
+"""
+This module contains helper functions for streaming responses.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+def iterate_async(iterator: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterate over an asynchronous iterator from synchronous code (e.g. the
+    body of a streamed response) on a dedicated event loop.
+
+    Args:
+        iterator (AsyncIterator[T]): The asynchronous iterator.
+
+    Yields:
+        T: The items of the iterator.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(iterator))
+            except StopAsyncIteration:
+                return
+    finally:
+        # Close the iterator, also when the client disconnects early
+        loop.run_until_complete(iterator.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def format_sse_event(event: str, data: dict[str, Any]) -> str:
+    """
+    Format a server-sent event.
+
+    Args:
+        event (str): The name of the event.
+        data (dict[str, Any]): The data of the event (sent as JSON).
+
+    Returns:
+        str: The formatted event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
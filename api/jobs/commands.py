@@ -0,0 +1,40 @@
+"""
+This module contains the CLI commands to manage the generation jobs.
+"""
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .worker import main
+
+# Create a "flask jobs ..." command group
+jobs_cli = AppGroup("jobs", help="Manage the generation jobs.")
+
+
+@jobs_cli.command("work")
+@click.option(
+    "--concurrency",
+    type=int,
+    default=None,
+    help="Maximum number of concurrent jobs (GENERATION_WORKER_CONCURRENCY).",
+)
+@click.option(
+    "--poll-interval",
+    type=float,
+    default=None,
+    help="Seconds between polls (GENERATION_WORKER_POLL_INTERVAL).",
+)
+@click.option(
+    "--burst", is_flag=True, help="Stop once no job is left to claim."
+)
+def work(concurrency: int | None, poll_interval: float | None, burst: bool):
+    """
+    Run a worker processing the queued generations (stories and portraits).
+    """
+    main(
+        current_app._get_current_object(),
+        concurrency=concurrency,
+        poll_interval=poll_interval,
+        burst=burst,
+    )
@@ -0,0 +1,338 @@
+"""
+This module contains the functions managing the generation job queue (the
+stories and the child portraits).
+"""
+
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, case, insert, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..database.models import db, Child, GenerationJob
+from ..database.utilities import generate_id, get_entry_attributes, utc_now
+from ..functions.input_validation import (
+    validate_id_format,
+    validate_non_empty_string,
+)
+
+
+def _claimable(now: datetime):
+    """
+    Get the condition of the jobs which can be claimed by a worker: the
+    queued jobs which are due and the running jobs whose lease has expired
+    (i.e. whose worker crashed) with attempts left.
+    """
+    return or_(
+        and_(
+            GenerationJob.status == "queued",
+            GenerationJob.available_at <= now,
+        ),
+        and_(
+            GenerationJob.status == "running",
+            GenerationJob.locked_until < now,
+            GenerationJob.attempts < GenerationJob.max_attempts,
+        ),
+    )
+
+
+def enqueue_story_job(
+    parent_id: str,
+    child_id: str,
+    topic: str,
+    image_style: str,
+    story_genre: str,
+) -> GenerationJob:
+    """
+    Queue the generation of a story.
+
+    Args:
+        parent_id (str): The ID of the parent.
+        child_id (str): The ID of the child.
+        topic (str): The topic of the story.
+        image_style (str): The style of the images.
+        story_genre (str): The genre of the story.
+
+    Raises:
+        ValueError: If the input is invalid.
+        SQLAlchemyError: If an error occurs with the database.
+
+    Returns:
+        GenerationJob: The queued job.
+    """
+    try:
+        # Validate the input
+        validate_id_format(parent_id, "parent_id")
+        validate_id_format(child_id, "child_id")
+        validate_non_empty_string(topic, "topic")
+        validate_non_empty_string(image_style, "image_style")
+        validate_non_empty_string(story_genre, "story_genre")
+
+        job = GenerationJob(
+            parent_id=parent_id,
+            child_id=child_id,
+            topic=topic,
+            image_style=image_style,
+            story_genre=story_genre,
+            max_attempts=current_app.config["GENERATION_JOB_MAX_ATTEMPTS"],
+            available_at=utc_now(),
+        )
+
+        db.session.add(job)
+        db.session.commit()
+
+        return job
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error queuing story generation: {e}")
+        raise e
+
+
+def add_portrait_jobs(parent_id: str, child_ids: list[str]) -> None:
+    """
+    Queue the generation of the portraits of children of a parent (in a
+    single statement), in the transaction of the session: the jobs are
+    committed with the children by the caller.
+
+    Args:
+        parent_id (str): The ID of the parent.
+        child_ids (list[str]): The IDs of the children.
+
+    Raises:
+        ValueError: If the input is invalid.
+    """
+    # Validate the input
+    validate_id_format(parent_id, "parent_id")
+    for child_id in child_ids:
+        validate_id_format(child_id, "child_id")
+
+    if not child_ids:
+        return
+
+    now = utc_now()
+    db.session.execute(
+        insert(GenerationJob),
+        [
+            {
+                "job_id": generate_id(),
+                "parent_id": parent_id,
+                "child_id": child_id,
+                "kind": "portrait",
+                "max_attempts": current_app.config[
+                    "GENERATION_JOB_MAX_ATTEMPTS"
+                ],
+                "available_at": now,
+            }
+            for child_id in child_ids
+        ],
+    )
+
+
+def get_generation_job(parent_id: str, job_id: str) -> GenerationJob | None:
+    """
+    Get a generation job of the given parent.
+
+    Args:
+        parent_id (str): The ID of the parent.
+        job_id (str): The ID of the job.
+
+    Raises:
+        ValueError: If the job ID is invalid.
+        SQLAlchemyError: If an error occurs with the database.
+
+    Returns:
+        GenerationJob | None: The job, or None if the parent has no such job.
+    """
+    try:
+        # Validate the job ID
+        validate_id_format(job_id, "job_id")
+
+        return GenerationJob.query.filter_by(
+            job_id=job_id, parent_id=parent_id
+        ).first()
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Error getting generation job: {e}")
+        raise e
+
+
+def get_job_attributes(job: GenerationJob) -> dict[str, str | int | None]:
+    """
+    Get the attributes of a job shown to its parent.
+
+    Args:
+        job (GenerationJob): The job.
+
+    Returns:
+        dict[str, str | int | None]: The attributes of the job.
+    """
+    return get_entry_attributes(
+        job, exclude=["parent_id", "available_at", "locked_until"]
+    )
+
+
+def claim_generation_jobs(limit: int) -> list[str]:
+    """
+    Claim up to the given number of jobs for a worker, oldest first.
+
+    On PostgreSQL the candidate rows are locked with FOR UPDATE SKIP LOCKED,
+    so concurrent workers skip each other's jobs instead of waiting. SQLite
+    ignores the locking clause, there the claiming UPDATE re-checks that the
+    jobs are still claimable (writes are serialized).
+
+    Args:
+        limit (int): The maximum number of jobs to claim.
+
+    Raises:
+        SQLAlchemyError: If an error occurs with the database.
+
+    Returns:
+        list[str]: The IDs of the claimed jobs.
+    """
+    try:
+        now = utc_now()
+        lease = timedelta(seconds=current_app.config["GENERATION_JOB_LEASE"])
+
+        # Fail the abandoned jobs without attempts left
+        abandoned = db.session.execute(
+            update(GenerationJob)
+            .where(
+                GenerationJob.status == "running",
+                GenerationJob.locked_until < now,
+                GenerationJob.attempts >= GenerationJob.max_attempts,
+            )
+            .values(
+                status="failed",
+                error=case(
+                    (
+                        GenerationJob.kind == "portrait",
+                        "The portrait generation timed out.",
+                    ),
+                    else_="The story generation timed out.",
+                ),
+                locked_until=None,
+                updated_at=now,
+            )
+            .returning(GenerationJob.kind, GenerationJob.child_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        # Mark the abandoned portraits as failed (the children keep their
+        # placeholders)
+        child_ids = [
+            child_id for kind, child_id in abandoned if kind == "portrait"
+        ]
+        if child_ids:
+            db.session.execute(
+                update(Child)
+                .where(Child.child_id.in_(child_ids))
+                .values(image_status="failed")
+                .execution_options(synchronize_session=False)
+            )
+
+        # Select the claimable jobs, skipping the ones locked by other workers
+        job_ids = db.session.scalars(
+            select(GenerationJob.job_id)
+            .where(_claimable(now))
+            .order_by(GenerationJob.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        if not job_ids:
+            db.session.commit()
+            return []
+
+        # Mark them as running (unless another worker claimed them meanwhile)
+        claimed_ids = db.session.scalars(
+            update(GenerationJob)
+            .where(GenerationJob.job_id.in_(job_ids), _claimable(now))
+            .values(
+                status="running",
+                attempts=GenerationJob.attempts + 1,
+                locked_until=now + lease,
+                updated_at=now,
+            )
+            .returning(GenerationJob.job_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+
+        return list(claimed_ids)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error claiming generation jobs: {e}")
+        raise e
+
+
+def complete_generation_job(job_id: str, story_id: str | None = None) -> None:
+    """
+    Mark a job as succeeded.
+
+    Args:
+        job_id (str): The ID of the job.
+        story_id (str, optional): The ID of the generated story (None for a
+            portrait).
+
+    Raises:
+        SQLAlchemyError: If an error occurs with the database.
+    """
+    try:
+        db.session.execute(
+            update(GenerationJob)
+            .where(GenerationJob.job_id == job_id)
+            .values(
+                status="succeeded",
+                story_id=story_id,
+                error=None,
+                locked_until=None,
+                updated_at=utc_now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error completing generation job: {e}")
+        raise e
+
+
+def fail_generation_job(job_id: str, error: str, retry: bool = True) -> str:
+    """
+    Record the failure of a job attempt, retrying it later with an
+    exponential backoff until it runs out of attempts.
+
+    Args:
+        job_id (str): The ID of the job.
+        error (str): The error message shown to the user.
+        retry (bool, optional): Whether the job can be retried (False when
+            another attempt would fail the same way, e.g. a deleted child).
+
+    Raises:
+        SQLAlchemyError: If an error occurs with the database.
+
+    Returns:
+        str: The new status of the job ("queued" or "failed").
+    """
+    try:
+        job = db.session.get(GenerationJob, job_id)
+        now = utc_now()
+
+        if retry and job.attempts < job.max_attempts:
+            # Wait twice as long after every failed attempt
+            delay = current_app.config["GENERATION_JOB_RETRY_DELAY"] * 2 ** (
+                job.attempts - 1
+            )
+            job.status = "queued"
+            job.available_at = now + timedelta(seconds=delay)
+        else:
+            job.status = "failed"
+
+        job.error = error
+        job.locked_until = None
+        job.updated_at = now
+        db.session.commit()
+
+        return job.status
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error failing generation job: {e}")
+        raise e
@@ -0,0 +1,204 @@
+"""
+This module contains the asyncio worker processing the generation jobs (the
+stories and the child portraits).
+
+Run it next to the API (e.g. `flask --app wsgi jobs work`, or
+`python -m api.jobs.worker` from the repository root).
+"""
+
+import asyncio
+import signal
+from flask import Flask, current_app
+
+from ..database.models import db, GenerationJob
+from ..database.updates import update_child_image
+from ..functions.prompt_assembly import StoryFormatError
+from ..functions.prepare_data import (
+    assemble_child_image_async,
+    assemble_story_events_async,
+)
+from .queue import (
+    claim_generation_jobs,
+    complete_generation_job,
+    fail_generation_job,
+)
+
+
+async def process_generation_job(app: Flask, job_id: str) -> None:
+    """
+    Generate the story (or the child portrait) of a claimed job and record
+    the outcome.
+
+    Args:
+        app (Flask): The Flask app.
+        job_id (str): The ID of the claimed job.
+    """
+    # Each job gets its own app context (and so its own database session),
+    # the blocking database calls run in a thread (which sees the context)
+    # to keep the event loop free for the other jobs
+    with app.app_context():
+        job = await asyncio.to_thread(db.session.get, GenerationJob, job_id)
+
+        try:
+            if job.kind == "portrait":
+                # Generate the portrait and replace the placeholder
+                await assemble_child_image_async(job.child_id)
+                await asyncio.to_thread(complete_generation_job, job_id)
+                return
+
+            # Generate and store the story (the final event holds its ID)
+            async for event in assemble_story_events_async(
+                child_id=job.child_id,
+                topic=job.topic,
+                image_style=job.image_style,
+                story_genre=job.story_genre,
+            ):
+                if event["type"] == "story":
+                    await asyncio.to_thread(
+                        complete_generation_job, job_id, event["story_id"]
+                    )
+        except Exception as e:
+            await asyncio.to_thread(db.session.rollback)
+            current_app.logger.error(f"Generation job '{job_id}' failed: {e}")
+
+            # Only show the validation errors to the user
+            error = (
+                str(e)
+                if isinstance(e, ValueError)
+                else "Internal Server Error"
+            )
+            # The validation errors fail the same way on every attempt
+            # (e.g. a deleted child), unlike a malformed generated story
+            retry = not isinstance(e, ValueError) or isinstance(
+                e, StoryFormatError
+            )
+            status = await asyncio.to_thread(
+                fail_generation_job, job_id, error, retry
+            )
+
+            # Keep the placeholder of a portrait without attempts left
+            if job.kind == "portrait" and status == "failed":
+                await asyncio.to_thread(
+                    update_child_image, job.child_id, "failed"
+                )
+
+
+def _claim_generation_jobs(app: Flask, limit: int) -> list[str]:
+    """
+    Claim at most `limit` generation jobs in their own app context.
+
+    Args:
+        app (Flask): The Flask app.
+        limit (int): The maximum number of jobs to claim.
+
+    Returns:
+        list[str]: The IDs of the claimed jobs.
+    """
+    with app.app_context():
+        return claim_generation_jobs(limit)
+
+
+async def run_worker(
+    app: Flask,
+    *,
+    concurrency: int | None = None,
+    poll_interval: float | None = None,
+    burst: bool = False,
+    stop: asyncio.Event | None = None,
+) -> int:
+    """
+    Claim and process the generation jobs, at most `concurrency` at a time.
+
+    Args:
+        app (Flask): The Flask app.
+        concurrency (int, optional): The maximum number of concurrent jobs
+            (GENERATION_WORKER_CONCURRENCY by default).
+        poll_interval (float, optional): The time to wait for new jobs in
+            seconds (GENERATION_WORKER_POLL_INTERVAL by default).
+        burst (bool, optional): Whether to stop once no job is claimable.
+        stop (asyncio.Event, optional): Stops the worker once set (the
+            running jobs are finished first).
+
+    Returns:
+        int: The number of processed jobs.
+    """
+    if concurrency is None:
+        concurrency = app.config["GENERATION_WORKER_CONCURRENCY"]
+    if poll_interval is None:
+        poll_interval = app.config["GENERATION_WORKER_POLL_INTERVAL"]
+    if stop is None:
+        stop = asyncio.Event()
+
+    running = set()
+    processed = 0
+
+    while not stop.is_set():
+        # Claim as many jobs as there are free slots
+        job_ids = []
+        if len(running) < concurrency:
+            job_ids = await asyncio.to_thread(
+                _claim_generation_jobs, app, concurrency - len(running)
+            )
+
+        for job_id in job_ids:
+            running.add(
+                asyncio.create_task(process_generation_job(app, job_id))
+            )
+
+        if burst and not job_ids and not running:
+            break
+
+        # Wait for a free slot, or also for new jobs while some slots are
+        # free (only a full worker waits for a running job to finish)
+        if running:
+            done, _ = await asyncio.wait(
+                running,
+                timeout=None if len(running) >= concurrency else poll_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            running -= done
+            processed += len(done)
+        elif not job_ids:
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # Finish the running jobs before stopping
+    if running:
+        await asyncio.wait(running)
+        processed += len(running)
+
+    return processed
+
+
+def main(app: Flask | None = None, **kwargs) -> None:
+    """
+    Run the worker until it receives SIGINT or SIGTERM.
+
+    Args:
+        app (Flask, optional): The Flask app (created if not given).
+        **kwargs: The options of `run_worker`.
+    """
+    if app is None:
+        # Imported here because the app factory registers the jobs commands
+        from .. import create_app
+
+        app = create_app()
+
+    async def work() -> None:
+        stop = asyncio.Event()
+
+        # Stop claiming jobs on shutdown and finish the running ones
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        processed = await run_worker(app, stop=stop, **kwargs)
+        app.logger.info(f"Worker stopped after {processed} jobs.")
+
+    asyncio.run(work())
+
+
+if __name__ == "__main__":
+    main()
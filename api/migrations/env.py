@@ -0,0 +1,66 @@
+"""
+This module contains the environment of the migrations, run by Alembic with
+the connection and the metadata given by the "flask db" commands (see
+database/migrations.py).
+"""
+
+from alembic import context
+
+from api.database.ids import UUIDHex
+
+config = context.config
+
+# Metadata of the models (compared with the database by --autogenerate)
+target_metadata = config.attributes["target_metadata"]
+
+
+def render_item(type_, obj, autogen_context):
+    """
+    Render the ID columns of the generated revisions with their type.
+    """
+    if type_ == "type" and isinstance(obj, UUIDHex):
+        autogen_context.imports.add("from api.database.ids import UUIDHex")
+        return "UUIDHex()"
+    return False
+
+
+def run_migrations_offline() -> None:
+    """
+    Print the SQL of the migrations instead of running them.
+    """
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """
+    Run the migrations, each one in its own transaction (so that an index
+    can be built concurrently outside of it, see create_index_concurrently).
+    """
+    connection = config.attributes["connection"]
+
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+        # SQLite cannot alter the columns, the tables are copied instead
+        render_as_batch=connection.dialect.name == "sqlite",
+        render_item=render_item,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,140 @@
+"""Create the baseline schema
+
+The schema of the models before the migrations (created by db.create_all
+until then, with text IDs), the baseline revision of the existing
+databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 14:40:48.114633
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "parents",
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("first_name", sa.Text(), nullable=False),
+        sa.Column("last_name", sa.Text(), nullable=False),
+        sa.Column("password", sa.Text(), nullable=False),
+        sa.Column("email", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+        sa.UniqueConstraint("email"),
+    )
+    op.create_index("idx_parents_user_id", "parents", ["user_id"])
+    op.create_index("idx_parents_email", "parents", ["email"])
+
+    op.create_table(
+        "children",
+        sa.Column("child_id", sa.Text(), nullable=False),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("image", sa.Text(), nullable=False),
+        sa.Column(
+            "age_range",
+            sa.Text(),
+            sa.CheckConstraint("age_range IN ('0-3', '4-6', '7-9', '10-13')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "sex",
+            sa.Text(),
+            sa.CheckConstraint("sex IN ('Male', 'Female')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "eye_color",
+            sa.Text(),
+            sa.CheckConstraint(
+                "eye_color IN ('Blue', 'Brown', 'Green', 'Hazel', 'Amber', "
+                "'Gray')"
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "hair_type",
+            sa.Text(),
+            sa.CheckConstraint(
+                "hair_type IN ('Straight', 'Wavy', 'Curly', 'Kinky', 'Bald')"
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "hair_color",
+            sa.Text(),
+            sa.CheckConstraint(
+                "hair_color IN ('Blonde', 'Brown', 'Black', 'Red', 'Auburn', "
+                "'Gray', 'White', 'Bald')"
+            ),
+            nullable=False,
+        ),
+        sa.Column("ethnicity", sa.Text(), nullable=False),
+        sa.Column("fav_animals", sa.Text(), nullable=True),
+        sa.Column("fav_activities", sa.Text(), nullable=True),
+        sa.Column("fav_shows", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(["parent_id"], ["parents.user_id"]),
+        sa.PrimaryKeyConstraint("child_id"),
+    )
+    op.create_index("idx_children_child_id", "children", ["child_id"])
+    op.create_index(
+        "idx_children_parent_id_child_id",
+        "children",
+        ["parent_id", "child_id"],
+    )
+
+    op.create_table(
+        "stories",
+        sa.Column("story_id", sa.Text(), nullable=False),
+        sa.Column("child_id", sa.Text(), nullable=True),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("topic", sa.Text(), nullable=False),
+        sa.Column(
+            "image_style",
+            sa.Text(),
+            sa.CheckConstraint(
+                "image_style IN ('Cartoon', 'Realistic', 'Fantasy', "
+                "'Watercolor', 'Anime')"
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "story_genre",
+            sa.Text(),
+            sa.CheckConstraint(
+                "story_genre IN ('Fantasy', 'Adventure', 'Educational')"
+            ),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["child_id"], ["children.child_id"]),
+        sa.PrimaryKeyConstraint("story_id"),
+    )
+    op.create_index("idx_stories_story_id", "stories", ["story_id"])
+
+    op.create_table(
+        "chapters",
+        sa.Column("chapter_id", sa.Text(), nullable=False),
+        sa.Column("story_id", sa.Text(), nullable=True),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("image", sa.Text(), nullable=False),
+        sa.Column("order", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["story_id"], ["stories.story_id"]),
+        sa.PrimaryKeyConstraint("chapter_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("chapters")
+    op.drop_table("stories")
+    op.drop_table("children")
+    op.drop_table("parents")
@@ -0,0 +1,246 @@
+"""Add the jobs, the caches, the portraits and the UUIDs
+
+The schema changes of the models since the baseline: the text IDs become
+UUIDs, the children get their thumbnails, the status of their image and
+their creation time, the chapters their thumbnails, and the generation
+jobs, the generation cache and the portrait library get their tables.
+
+The indexes of the existing tables are built concurrently by 0003.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:02:11.527940
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from api.database.ids import UUIDHex
+
+# Revision identifiers, used by Alembic
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# ID columns of the baseline tables (stored as text)
+ID_COLUMNS = {
+    "parents": ["user_id"],
+    "children": ["child_id", "parent_id"],
+    "stories": ["story_id", "child_id"],
+    "chapters": ["chapter_id", "story_id"],
+}
+
+# Foreign keys between the ID columns (named by PostgreSQL)
+FOREIGN_KEYS = [
+    ("children_parent_id_fkey", "children", "parents", "parent_id", "user_id"),
+    ("stories_child_id_fkey", "stories", "children", "child_id", "child_id"),
+    ("chapters_story_id_fkey", "chapters", "stories", "story_id", "story_id"),
+]
+
+# CHECK constraints of the baseline tables, unnamed so not reflected when a
+# table is copied by the batch operations of SQLite (which cannot alter
+# its columns)
+CHECK_CONSTRAINTS = {
+    "children": (
+        sa.CheckConstraint("age_range IN ('0-3', '4-6', '7-9', '10-13')"),
+        sa.CheckConstraint("sex IN ('Male', 'Female')"),
+        sa.CheckConstraint(
+            "eye_color IN ('Blue', 'Brown', 'Green', 'Hazel', 'Amber', "
+            "'Gray')"
+        ),
+        sa.CheckConstraint(
+            "hair_type IN ('Straight', 'Wavy', 'Curly', 'Kinky', 'Bald')"
+        ),
+        sa.CheckConstraint(
+            "hair_color IN ('Blonde', 'Brown', 'Black', 'Red', 'Auburn', "
+            "'Gray', 'White', 'Bald')"
+        ),
+    ),
+    "stories": (
+        sa.CheckConstraint(
+            "image_style IN ('Cartoon', 'Realistic', 'Fantasy', "
+            "'Watercolor', 'Anime')"
+        ),
+        sa.CheckConstraint(
+            "story_genre IN ('Fantasy', 'Adventure', 'Educational')"
+        ),
+    ),
+}
+
+
+def convert_ids(type_: sa.types.TypeEngine, using: str) -> None:
+    """
+    Convert the ID columns of the baseline tables to a type. On PostgreSQL,
+    the foreign keys are dropped and recreated around the conversion (both
+    sides must have the same type).
+
+    Args:
+        type_ (TypeEngine): The new type of the columns.
+        using (str): The PostgreSQL expression converting a column (with a
+            "{column}" placeholder).
+    """
+    postgresql = op.get_context().dialect.name == "postgresql"
+
+    if postgresql:
+        for name, table, _, _, _ in FOREIGN_KEYS:
+            op.drop_constraint(name, table, type_="foreignkey")
+
+    for table, columns in ID_COLUMNS.items():
+        with op.batch_alter_table(
+            table, table_args=CHECK_CONSTRAINTS.get(table, ())
+        ) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    type_=type_,
+                    postgresql_using=using.format(column=f'"{column}"'),
+                )
+
+    if postgresql:
+        for name, table, referred, column, referred_column in FOREIGN_KEYS:
+            op.create_foreign_key(
+                name, table, referred, [column], [referred_column]
+            )
+
+
+def upgrade() -> None:
+    # Convert the text IDs (32 hex characters) to UUIDs
+    convert_ids(UUIDHex(), "{column}::uuid")
+
+    # Add the thumbnails, the status of the image and the creation time of
+    # the children (the existing children have their image, and are
+    # considered created by the migration)
+    op.add_column("children", sa.Column("thumbnails", sa.JSON()))
+    op.add_column(
+        "children",
+        sa.Column(
+            "image_status", sa.Text(), nullable=False, server_default="ready"
+        ),
+    )
+    op.add_column("children", sa.Column("created_at", sa.DateTime()))
+    op.execute("UPDATE children SET created_at = CURRENT_TIMESTAMP")
+    with op.batch_alter_table(
+        "children", table_args=CHECK_CONSTRAINTS["children"]
+    ) as batch_op:
+        batch_op.alter_column("image_status", server_default=None)
+        batch_op.alter_column("created_at", nullable=False)
+        batch_op.create_check_constraint(
+            "children_image_status_check",
+            "image_status IN ('pending', 'ready', 'failed')",
+        )
+
+    # Add the thumbnails of the chapters
+    op.add_column("chapters", sa.Column("thumbnails", sa.JSON()))
+
+    op.create_table(
+        "generation_cache",
+        sa.Column("cache_key", sa.Text(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Text(),
+            sa.CheckConstraint("kind IN ('text', 'image')"),
+            nullable=False,
+        ),
+        sa.Column("model", sa.Text(), nullable=False),
+        sa.Column("value", sa.Text(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("cache_key"),
+    )
+    op.create_index(
+        "idx_generation_cache_last_used_at",
+        "generation_cache",
+        ["last_used_at"],
+    )
+    op.create_index(
+        "idx_generation_cache_expires_at", "generation_cache", ["expires_at"]
+    )
+
+    op.create_table(
+        "portraits",
+        sa.Column("portrait_id", UUIDHex(), nullable=False),
+        sa.Column("age_range", sa.Text(), nullable=False),
+        sa.Column("sex", sa.Text(), nullable=False),
+        sa.Column("eye_color", sa.Text(), nullable=False),
+        sa.Column("hair_type", sa.Text(), nullable=False),
+        sa.Column("hair_color", sa.Text(), nullable=False),
+        sa.Column("ethnicity", sa.Text(), nullable=False),
+        sa.Column("image", sa.Text(), nullable=False),
+        sa.Column("thumbnails", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("portrait_id"),
+    )
+    op.create_index(
+        "idx_portraits_attributes",
+        "portraits",
+        [
+            "age_range",
+            "sex",
+            "eye_color",
+            "hair_type",
+            "hair_color",
+            "ethnicity",
+        ],
+        unique=True,
+    )
+
+    op.create_table(
+        "generation_jobs",
+        sa.Column("job_id", UUIDHex(), nullable=False),
+        sa.Column("parent_id", UUIDHex(), nullable=False),
+        sa.Column("child_id", UUIDHex(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Text(),
+            sa.CheckConstraint("kind IN ('story', 'portrait')"),
+            nullable=False,
+        ),
+        sa.Column("topic", sa.Text(), nullable=True),
+        sa.Column("image_style", sa.Text(), nullable=True),
+        sa.Column("story_genre", sa.Text(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Text(),
+            sa.CheckConstraint(
+                "status IN ('queued', 'running', 'succeeded', 'failed')"
+            ),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("story_id", UUIDHex(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["parent_id"], ["parents.user_id"]),
+        sa.ForeignKeyConstraint(["child_id"], ["children.child_id"]),
+        sa.ForeignKeyConstraint(["story_id"], ["stories.story_id"]),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    op.create_index(
+        "idx_generation_jobs_status_available_at",
+        "generation_jobs",
+        ["status", "available_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("generation_jobs")
+    op.drop_table("portraits")
+    op.drop_table("generation_cache")
+
+    op.drop_column("chapters", "thumbnails")
+    with op.batch_alter_table(
+        "children", table_args=CHECK_CONSTRAINTS["children"]
+    ) as batch_op:
+        batch_op.drop_constraint("children_image_status_check", type_="check")
+        batch_op.drop_column("created_at")
+        batch_op.drop_column("image_status")
+        batch_op.drop_column("thumbnails")
+
+    # Convert the UUIDs back to text IDs (without their hyphens)
+    convert_ids(sa.Text(), "replace({column}::text, '-', '')")
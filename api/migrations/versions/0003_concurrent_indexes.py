@@ -0,0 +1,43 @@
+"""Index the children, stories and chapters concurrently
+
+The indexes of the keyset pagination of the children and the stories and
+of the chapters of a story, built without blocking the writes to their
+tables (which exist since the baseline).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:05:37.204118
+"""
+
+from api.database.migrations import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+# Revision identifiers, used by Alembic
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_concurrently(
+        "idx_children_parent_id_created_at",
+        "children",
+        ["parent_id", "created_at", "child_id"],
+    )
+    create_index_concurrently(
+        "idx_stories_child_id_created_at",
+        "stories",
+        ["child_id", "created_at", "story_id"],
+    )
+    create_index_concurrently(
+        "idx_chapters_story_id_order", "chapters", ["story_id", "order"]
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently("idx_chapters_story_id_order", "chapters")
+    drop_index_concurrently("idx_stories_child_id_created_at", "stories")
+    drop_index_concurrently("idx_children_parent_id_created_at", "children")
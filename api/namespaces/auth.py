@@ -5,15 +5,16 @@ This module contains the auth namespace and related operations.
 from flask import request, current_app
 from email_validator import validate_email, EmailNotValidError
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import (
-    create_access_token,
-    jwt_required,
-)
+from flask_jwt_extended import jwt_required
 
-from ..functions.jwt_functions import get_current_parent
+from ..functions.jwt_functions import (
+    get_current_parent,
+    create_parent_access_token,
+    invalidate_parent,
+)
 from ..functions.input_validation import validate_non_empty_string
 from ..database.inserts import insert_parent
-from ..database.queries import check_password, get_parent
+from ..database.queries import authenticate_parent
 from ..database.utilities import get_entry_attributes
 
 # Create an auth namespace
@@ -137,8 +138,10 @@ class Login(Resource):
             validate_email(data["email"])
             validate_non_empty_string(data["password"], "password")
 
-            # Get the parent
-            parent = get_parent(data["email"])
+            # Get the parent and check its password
+            parent, authenticated = authenticate_parent(
+                data["email"], data["password"]
+            )
 
             # Return an error if no parent is found
             if not parent:
@@ -146,12 +149,15 @@ class Login(Resource):
                     "Error": f"Parent with email '{data['email']}' not found"
                 }, 401
 
-            # Check the password
-            if not check_password(data["email"], data["password"]):
+            # Return an error if the password is incorrect
+            if not authenticated:
                 return {"Error": "Incorrect password"}, 401
 
-            # Create an access token
-            access_token = create_access_token(identity=parent.user_id)
+            # Create an access token holding the parent's identity claims
+            access_token = create_parent_access_token(parent)
+
+            # Drop the cached lookup so the new claims are used
+            invalidate_parent(parent.user_id)
 
             # Return the access token and a status code
             return {"access_token": access_token}, 200
@@ -187,13 +193,8 @@ class CurrentParent(Resource):
             if not parent:
                 return {"Error": "Unauthorized, please log in"}, 401
 
-            # Get the parent's filtered attributes
-            parent_attributes = get_entry_attributes(
-                parent, exclude=["password"]
-            )
-
-            # Return the parent data and a 200 status code
-            return parent_attributes, 200
+            # Return the parent's identity and a 200 status code
+            return parent._asdict(), 200
         except Exception as e:
             current_app.logger.error(f"Error: {e}")
             return {"Error": "Internal Server Error"}, 500
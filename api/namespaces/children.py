@@ -2,19 +2,38 @@
 This module contains the namespace and resources for managing children.
 """
 
-from flask import request, current_app
+import json
+from flask import (
+    Response,
+    request,
+    current_app,
+    stream_with_context,
+    url_for,
+)
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 
-from ..functions.prepare_data import assemble_child_payload
+from ..functions.prepare_data import (
+    assemble_child_payload,
+    assemble_children_payloads,
+)
+from ..functions.representations import dumps
 from ..functions.jwt_functions import get_current_parent
-from ..functions.input_validation import (
-    validate_non_empty_string,
-    validate_id_format,
+from ..functions.input_validation import validate_id_format
+from ..database.queries import (
+    get_children,
+    get_child_from_parent,
+    child_belongs_to_parent,
 )
-from ..database.queries import get_child_from_parent, child_belongs_to_parent
 from ..database.updates import update_child
+from ..database.inserts import validate_children
+from ..database.models import db, Child as ChildModel
+from ..database.pagination import parse_page_arguments
+from ..database.query_shapes import child_image_status, child_with_image
+from ..database.schemas import CHILD_SCHEMA
 from ..database.utilities import get_entry_attributes
+from ..storage.blob_store import with_image_url
+from ..storage.images import with_thumbnail_urls
 
 # Create a children namespace
 children = Namespace(
@@ -22,71 +41,8 @@ children = Namespace(
 )
 
 
-class NullableString(fields.String):
-    """
-    Custom field for a nullable string.
-    """
-
-    __schema_type__ = ["string", "null"]
-    __schema_example__ = "nullable string"
-
-
-add_child_model = children.model(
-    "AddChild",
-    {
-        "name": fields.String(required=True, description="Name of the child"),
-        "age_range": fields.String(
-            required=True,
-            description="Age range of the child",
-            enum=["0-3", "4-6", "7-9", "10-13"],
-        ),
-        "sex": fields.String(
-            required=True,
-            description="Sex of the child",
-            enum=["Male", "Female"],
-        ),
-        "eye_color": fields.String(
-            required=True,
-            description="Eye color of the child",
-            enum=["Blue", "Brown", "Green", "Hazel", "Amber", "Gray"],
-        ),
-        "hair_type": fields.String(
-            required=True,
-            description="Hair type of the child",
-            enum=["Straight", "Wavy", "Curly", "Kinky", "Bald"],
-        ),
-        "hair_color": fields.String(
-            required=True,
-            description="Hair color of the child",
-            enum=[
-                "Blonde",
-                "Brown",
-                "Black",
-                "Red",
-                "Auburn",
-                "Gray",
-                "White",
-                "Bald",
-            ],
-        ),
-        "ethnicity": fields.String(
-            required=True,
-            description="Ethnicity of the child",
-        ),
-        "fav_animals": NullableString(
-            required=False,
-            description="Favorite animals of the child",
-        ),
-        "fav_activities": NullableString(
-            required=False,
-            description="Favorite activities of the child",
-        ),
-        "fav_shows": NullableString(
-            required=False,
-            description="Favorite shows of the child",
-        ),
-    },
-)
+# Define the models of the children endpoint (from the schema registry)
+add_child_model = children.model("AddChild", CHILD_SCHEMA.restx_fields())
 
 modify_child_model = children.model(
     "ModifyChild",
@@ -94,56 +50,7 @@ modify_child_model = children.model(
         "child_id": fields.String(
             required=True, description="ID of the child to modify"
         ),
-        "name": fields.String(required=True, description="Name of the child"),
-        "age_range": fields.String(
-            required=True,
-            description="Age range of the child",
-            enum=["0-3", "4-6", "7-9", "10-13"],
-        ),
-        "sex": fields.String(
-            required=True,
-            description="Sex of the child",
-            enum=["Male", "Female"],
-        ),
-        "eye_color": fields.String(
-            required=True,
-            description="Eye color of the child",
-            enum=["Blue", "Brown", "Green", "Hazel", "Amber", "Gray"],
-        ),
-        "hair_type": fields.String(
-            required=True,
-            description="Hair type of the child",
-            enum=["Straight", "Wavy", "Curly", "Kinky", "Bald"],
-        ),
-        "hair_color": fields.String(
-            required=True,
-            description="Hair color of the child",
-            enum=[
-                "Blonde",
-                "Brown",
-                "Black",
-                "Red",
-                "Auburn",
-                "Gray",
-                "White",
-                "Bald",
-            ],
-        ),
-        "ethnicity": fields.String(
-            required=True, description="Ethnicity of the child"
-        ),
-        "fav_animals": NullableString(
-            required=False,
-            description="Favorite animals of the child",
-        ),
-        "fav_activities": NullableString(
-            required=False,
-            description="Favorite activities of the child",
-        ),
-        "fav_shows": NullableString(
-            required=False,
-            description="Favorite shows of the child",
-        ),
+        **CHILD_SCHEMA.restx_fields(),
     },
 )
 
@@ -184,14 +91,18 @@ class Child(Resource):
             validate_id_format(child_id, "child_id")
 
             # Get the child
-            child = get_child_from_parent(parent.user_id, child_id)
+            child = get_child_from_parent(
+                parent.user_id, child_id, options=child_with_image()
+            )
 
             # Return an error if the child does not exist
             if not child:
                 return {"Error": f"Child with ID '{child_id}' not found"}, 404
 
-            # Get the child's attributes
-            child_attributes = get_entry_attributes(child)
+            # Get the child's attributes (with the image and thumbnail URLs)
+            child_attributes = with_thumbnail_urls(
+                with_image_url(get_entry_attributes(child))
+            )
 
             # Return the child data and a 200 status code
             return child_attributes, 200
@@ -204,12 +115,14 @@ class Child(Resource):
     @jwt_required()
     @children.expect(add_child_model, validate=True)
     @children.response(200, "Success")
+    @children.response(202, "Portrait Queued")
     @children.response(400, "Validation Error")
     @children.response(401, "Unauthorized, please log in")
     @children.response(500, "Internal Server Error")
     def post(self):
         """
-        Add a child.
+        Add a child (with a placeholder image until its portrait is
+        generated by the job worker, poll the returned image status).
         """
         try:
             # Get the current parent
@@ -222,14 +135,8 @@ class Child(Resource):
             # Get the data from the request
             data = request.get_json()
 
-            # Validate the data
-            validate_non_empty_string(data["name"], "name")
-            validate_non_empty_string(data["age_range"], "age_range")
-            validate_non_empty_string(data["sex"], "sex")
-            validate_non_empty_string(data["eye_color"], "eye_color")
-            validate_non_empty_string(data["hair_type"], "hair_type")
-            validate_non_empty_string(data["hair_color"], "hair_color")
-            validate_non_empty_string(data["ethnicity"], "ethnicity")
+            # Validate the data (all the errors at once)
+            CHILD_SCHEMA.validate(data)
 
             # Assemble the child payload
             payload = assemble_child_payload(
@@ -246,7 +153,21 @@ class Child(Resource):
                 data.get("fav_shows"),
             )
 
-            # Return the child data and a 200 status code
+            # Return the child data with a 200 status code, or with a 202
+            # status code and where to poll its image status while the
+            # portrait is generated
+            if payload["image_status"] == "pending":
+                return (
+                    payload,
+                    202,
+                    {
+                        "Location": url_for(
+                            "api.children_child_image_status",
+                            child_id=payload["child_id"],
+                        )
+                    },
+                )
+
             return payload, 200
         except ValueError as e:
             return {"Error": str(e)}, 400
@@ -276,14 +197,8 @@ class Child(Resource):
             # Get the data from the request
             data = request.get_json()
 
-            # Validate the data
-            validate_non_empty_string(data["name"], "name")
-            validate_non_empty_string(data["age_range"], "age_range")
-            validate_non_empty_string(data["sex"], "sex")
-            validate_non_empty_string(data["eye_color"], "eye_color")
-            validate_non_empty_string(data["hair_type"], "hair_type")
-            validate_non_empty_string(data["hair_color"], "hair_color")
-            validate_non_empty_string(data["ethnicity"], "ethnicity")
+            # Validate the data (all the errors at once)
+            CHILD_SCHEMA.validate(data)
 
             # Validate the child_id format
             validate_id_format(data.get("child_id"), "child_id")
@@ -313,7 +228,10 @@ class Child(Resource):
             updated_child = update_child(child_id, **child_updates)
 
             # Get the updated child's attributes
-            child_attributes = get_entry_attributes(updated_child)
+            # (with the image and thumbnail URLs)
+            child_attributes = with_thumbnail_urls(
+                with_image_url(get_entry_attributes(updated_child))
+            )
 
             # Return the updated child data and a 200 status code
             return child_attributes, 200
@@ -325,6 +243,67 @@ class Child(Resource):
             return {"Error": "Internal Server Error"}, 500
 
 
+@children.route("/<string:child_id>/image", strict_slashes=False)
+class ChildImageStatus(Resource):
+    """
+    Represents the image of a child (polled while its portrait is generated).
+    """
+
+    @jwt_required()
+    @children.response(200, "Success")
+    @children.response(400, "Validation Error")
+    @children.response(401, "Unauthorized, please log in")
+    @children.response(404, "Child Not Found")
+    @children.response(500, "Internal Server Error")
+    def get(self, child_id: str):
+        """
+        Get the status of a child's image (with the image and thumbnail URLs).
+        """
+        try:
+            # Get the current parent
+            parent = get_current_parent()
+
+            # Return an error if the parent is not found, meaning the user is not logged in
+            if not parent:
+                return {"Error": "Unauthorized, please log in"}, 401
+
+            # Validate the child_id format
+            validate_id_format(child_id, "child_id")
+
+            # Get the child (only its image columns)
+            child = get_child_from_parent(
+                parent.user_id,
+                child_id,
+                options=child_image_status(),
+            )
+
+            # Return an error if the child does not exist
+            if not child:
+                return {"Error": f"Child with ID '{child_id}' not found"}, 404
+
+            # Get the image status (with the image and thumbnail URLs)
+            image_attributes = with_thumbnail_urls(
+                with_image_url(
+                    get_entry_attributes(
+                        child,
+                        include=[
+                            "child_id",
+                            "image",
+                            "thumbnails",
+                            "image_status",
+                        ],
+                    )
+                )
+            )
+
+            return image_attributes, 200
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(f"Error: {e}")
+            return {"Error": "Internal Server Error"}, 500
+
+
 @children.route("/all", strict_slashes=False)
 class AllChildren(Resource):
     """
@@ -333,11 +312,19 @@ class AllChildren(Resource):
 
     @jwt_required()
     @children.response(200, "Success")
+    @children.response(400, "Validation Error")
     @children.response(401, "Unauthorized, please log in")
     @children.response(500, "Internal Server Error")
+    @children.doc(
+        params={
+            "limit": "The maximum number of children, optional",
+            "cursor": "The cursor of the page (next_cursor), optional",
+            "fields": "The comma-separated fields to return, optional",
+        }
+    )
     def get(self):
         """
-        Get all children for a parent.
+        Get a page of the children of a parent, newest first.
         """
         try:
             # Get the current parent
@@ -347,15 +334,225 @@ class AllChildren(Resource):
             if not parent:
                 return {"Error": "Unauthorized, please log in"}, 401
 
+            # Get the page size, the cursor and the fields to return
+            limit, cursor, fields = parse_page_arguments(
+                request.args,
+                ChildModel,
+                default_limit=current_app.config["PAGE_SIZE"],
+                max_limit=current_app.config["MAX_PAGE_SIZE"],
+            )
+
+            # Get the page of children
+            # (with their deferred images unless other fields are selected)
+            page = get_children(
+                parent.user_id,
+                limit=limit,
+                cursor=cursor,
+                fields=fields,
+                options=child_with_image() if fields is None else (),
+            )
+
             # Define the payload
             payload = {
                 "children": [
-                    get_entry_attributes(child) for child in parent.children
-                ]
+                    with_thumbnail_urls(
+                        with_image_url(
+                            get_entry_attributes(child, include=fields)
+                        )
+                    )
+                    for child in page.items
+                ],
+                "next_cursor": page.next_cursor,
             }
 
             # Return the child data and a 200 status code
             return payload, 200
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(f"Error: {e}")
+            return {"Error": "Internal Server Error"}, 500
+
+
+def read_children_batch() -> list[dict[str, str | None]]:
+    """
+    Read the children of a batch import from the request body, either a JSON
+    array or NDJSON (one JSON object per line, e.g. an export).
+
+    Raises:
+        ValueError: If the body is not a list of JSON objects.
+
+    Returns:
+        list[dict[str, str | None]]: The attributes of the children (the
+            other fields, e.g. the child_id of an export, are left out).
+    """
+    if request.mimetype == "application/x-ndjson":
+        rows = []
+        lines = request.get_data(as_text=True).splitlines()
+        for number, line in enumerate(lines, 1):
+            # Skip the blank lines (e.g. the last one)
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(
+                    f"Invalid JSON on line {number}: {e.msg}"
+                ) from e
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array or NDJSON of children")
+
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Every child must be a JSON object")
+
+    return [
+        {field: row.get(field) for field in CHILD_SCHEMA.names} for row in rows
+    ]
+
+
+@children.route("/batch", strict_slashes=False)
+class ChildrenBatch(Resource):
+    """
+    Represents a batch of children (e.g. the import of a school's children).
+    """
+
+    @jwt_required()
+    @children.expect([add_child_model])
+    @children.response(200, "Success")
+    @children.response(202, "Portraits Queued")
+    @children.response(400, "Validation Error")
+    @children.response(401, "Unauthorized, please log in")
+    @children.response(500, "Internal Server Error")
+    def post(self):
+        """
+        Add many children at once from a JSON array or NDJSON (application/
+        x-ndjson), all validated before any is added (the children without a
+        portrait in the portrait library get a placeholder until the job
+        worker generates it).
+        """
+        try:
+            # Get the current parent
+            parent = get_current_parent()
+
+            # Return an error if the parent is not found, meaning the user is not logged in
+            if not parent:
+                return {"Error": "Unauthorized, please log in"}, 401
+
+            # Get the children from the request
+            batch = read_children_batch()
+
+            # Return an error if the batch is empty or too large
+            max_size = current_app.config["CHILDREN_BATCH_MAX_SIZE"]
+            if not batch:
+                return {"Error": "No children provided"}, 400
+            if len(batch) > max_size:
+                return {
+                    "Error": f"At most {max_size} children can be added at "
+                    f"once but found {len(batch)}"
+                }, 400
+
+            # Validate all the children, returning the error of every
+            # invalid one (numbered from 1)
+            errors = validate_children(batch)
+            if errors:
+                return {
+                    "Error": f"Found {len(errors)} invalid children",
+                    "Rows": [
+                        {"row": i + 1, "Error": error}
+                        for i, error in sorted(errors.items())
+                    ],
+                }, 400
+
+            # Add the children and queue their missing portraits
+            payloads = assemble_children_payloads(parent.user_id, batch)
+
+            # Return the children with a 202 status code while portraits
+            # are generated (poll their image status), otherwise a 200
+            status = 200
+            if any(
+                payload["image_status"] == "pending" for payload in payloads
+            ):
+                status = 202
+
+            return {"children": payloads}, status
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(e)
+            return {"Error": "Internal Server Error"}, 500
+
+
+@children.route("/export", strict_slashes=False)
+class ChildrenExport(Resource):
+    """
+    Represents the export of all the children of a parent.
+    """
+
+    @jwt_required()
+    @children.response(200, "Success (application/x-ndjson)")
+    @children.response(401, "Unauthorized, please log in")
+    @children.response(500, "Internal Server Error")
+    def get(self):
+        """
+        Export all the children of a parent as NDJSON (one child per line,
+        newest first), streamed page by page (the export can be imported
+        back with POST /children/batch).
+        """
+        try:
+            # Get the current parent
+            parent = get_current_parent()
+
+            # Return an error if the parent is not found, meaning the user is not logged in
+            if not parent:
+                return {"Error": "Unauthorized, please log in"}, 401
+
+            parent_id = parent.user_id
+            limit = current_app.config["MAX_PAGE_SIZE"]
+
+            def generate():
+                try:
+                    cursor = None
+                    while True:
+                        # Get the next page of children
+                        page = get_children(
+                            parent_id,
+                            limit=limit,
+                            cursor=cursor,
+                            options=child_with_image(),
+                        )
+                        lines = [
+                            dumps(
+                                with_thumbnail_urls(
+                                    with_image_url(get_entry_attributes(child))
+                                )
+                            )
+                            for child in page.items
+                        ]
+
+                        # End the transaction (returning the connection to
+                        # the pool) while the page is sent
+                        db.session.commit()
+                        yield from lines
+
+                        if page.next_cursor is None:
+                            return
+                        cursor = page.next_cursor
+                except Exception as e:
+                    # The status was already sent, the export is cut short
+                    current_app.logger.error(f"Failed to export children: {e}")
+                    raise
+
+            # Stream the children
+            return Response(
+                stream_with_context(generate()),
+                mimetype="application/x-ndjson",
+                headers={
+                    "Content-Disposition": "attachment; "
+                    'filename="children.ndjson"'
+                },
+            )
         except Exception as e:
             current_app.logger.error(f"Error: {e}")
             return {"Error": "Internal Server Error"}, 500
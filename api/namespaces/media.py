@@ -0,0 +1,46 @@
+"""
+This module contains the namespace and resources for serving stored media.
+"""
+
+from flask import current_app
+from flask_restx import Namespace, Resource
+
+from ..storage.blob_store import validate_blob_key
+from ..storage.responses import make_blob_response
+
+# Create a media namespace
+media = Namespace("media", path="/media", description="Media operations")
+
+
+@media.route("/<string:key>", strict_slashes=False)
+class Blob(Resource):
+    """
+    Represents a stored blob (e.g. a chapter or child image).
+    """
+
+    # Note: no JWT is required because <img> tags cannot send the
+    # Authorization header, the 256-bit content keys are unguessable
+    @media.response(200, "Success")
+    @media.response(206, "Partial Content")
+    @media.response(304, "Not Modified")
+    @media.response(400, "Validation Error")
+    @media.response(404, "Blob Not Found")
+    @media.response(416, "Range Not Satisfiable")
+    @media.response(500, "Internal Server Error")
+    def get(self, key: str):
+        """
+        Get the raw bytes of a stored blob.
+        """
+        try:
+            # Validate the key format
+            validate_blob_key(key)
+
+            # Stream the blob (handles ETag and Range requests)
+            return make_blob_response(key)
+        except KeyError:
+            return {"Error": f"Blob with key '{key}' not found."}, 404
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(f"Error: {e}")
+            return {"Error": "Internal Server Error"}, 500
@@ -2,18 +2,46 @@
 This module contains the namespace and resources for managing stories.
 """
 
-from flask import request, current_app
+from flask import (
+    Response,
+    request,
+    current_app,
+    stream_with_context,
+    url_for,
+)
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 
-from ..functions.prepare_data import assemble_story_payload_async
+from ..functions.prepare_data import assemble_story_events_async
+from ..functions.streaming import iterate_async, format_sse_event
 from ..functions.jwt_functions import get_current_parent
 from ..functions.input_validation import (
     validate_non_empty_string,
     validate_id_format,
 )
-from ..database.queries import get_story, get_child_from_parent
+from ..database.models import Story
+from ..database.pagination import parse_page_arguments
+from ..database.schemas import STORY_SCHEMA
+from ..database.queries import (
+    get_story,
+    get_chapter,
+    get_child_stories,
+    child_belongs_to_parent,
+)
+from ..database.query_shapes import (
+    chapter_with_image,
+    story_with_chapters,
+    stories_with_covers,
+)
 from ..database.utilities import get_entry_attributes
+from ..jobs.queue import (
+    enqueue_story_job,
+    get_generation_job,
+    get_job_attributes,
+)
+from ..storage.blob_store import with_image_url
+from ..storage.images import with_thumbnail_urls
+from ..storage.responses import make_blob_response
 
 # Create a chapters namespace
 stories = Namespace(
@@ -28,19 +56,7 @@ generate_story_model = stories.model(
         "child_id": fields.String(
             required=True, description="The ID of the kid"
         ),
-        "topic": fields.String(
-            required=True, description="Topic of the story"
-        ),
-        "image_style": fields.String(
-            required=True,
-            description="Style of the image",
-            enum=["Cartoon", "Realistic", "Fantasy", "Watercolor", "Anime"],
-        ),
-        "story_genre": fields.String(
-            required=True,
-            description="Genre of the story",
-            enum=["Fantasy", "Adventure", "Educational"],
-        ),
+        **STORY_SCHEMA.restx_fields(["topic", "image_style", "story_genre"]),
     },
 )
 
@@ -53,12 +69,15 @@ class GenerateStory(Resource):
 
     @jwt_required()
     @stories.expect(generate_story_model, validate=True)
-    @stories.response(200, "Success")
+    @stories.response(202, "Generation Queued")
     @stories.response(400, "Validation Error")
+    @stories.response(401, "Unauthorized, please log in")
+    @stories.response(404, "Child Not Found")
     @stories.response(500, "Internal Server Error")
-    async def post(self):
+    def post(self):
         """
-        Generate a story based on the provided data asynchronously.
+        Queue the generation of a story based on the provided data (the
+        story is generated by the job worker, poll the returned job).
         """
         try:
             # Get the parent
@@ -77,24 +96,151 @@ class GenerateStory(Resource):
             validate_non_empty_string(data["image_style"], "image_style")
             validate_non_empty_string(data["story_genre"], "story_genre")
 
-            # Get the child
-            child = get_child_from_parent(parent.user_id, data["child_id"])
-
-            if not child:
+            # Check that the child exists (without loading it)
+            if not child_belongs_to_parent(parent.user_id, data["child_id"]):
                 return {
                     "Error": f"Child with ID '{data['child_id']}' not found"
                 }, 404
 
-            # Assemble the payload asynchronously
-            payload = await assemble_story_payload_async(
+            # Queue the generation of the story
+            job = enqueue_story_job(
+                parent_id=parent.user_id,
                 child_id=data["child_id"],
                 topic=data["topic"],
                 image_style=data["image_style"],
                 story_genre=data["story_genre"],
             )
 
-            # Return the payload and a 200 status code
-            return payload, 200
+            # Return the job and where to poll it with a 202 status code
+            return (
+                get_job_attributes(job),
+                202,
+                {
+                    "Location": url_for(
+                        "api.stories_generation_job_status", job_id=job.job_id
+                    )
+                },
+            )
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(e)
+            return {"Error": "Internal Server Error"}, 500
+
+
+@stories.route("/jobs/<string:job_id>", strict_slashes=False)
+class GenerationJobStatus(Resource):
+    """
+    Represents a queued story generation.
+    """
+
+    @jwt_required()
+    @stories.response(200, "Success")
+    @stories.response(400, "Validation Error")
+    @stories.response(401, "Unauthorized, please log in")
+    @stories.response(404, "Job Not Found")
+    @stories.response(500, "Internal Server Error")
+    def get(self, job_id: str):
+        """
+        Get the status of a story generation (with the story ID once it succeeded).
+        """
+        try:
+            # Get the parent
+            parent = get_current_parent()
+
+            # Return an error if the parent is not found, meaning the user is not logged in
+            if not parent:
+                return {"Error": "Unauthorized, please log in"}, 401
+
+            # Get the job of the parent
+            job = get_generation_job(parent.user_id, job_id)
+
+            if not job:
+                return {"Error": f"Job with ID '{job_id}' not found."}, 404
+
+            return get_job_attributes(job), 200
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(e)
+            return {"Error": "Internal Server Error"}, 500
+
+
+@stories.route("/generate/stream", strict_slashes=False)
+class GenerateStoryStream(Resource):
+    """
+    This class represents a resource for generating stories progressively.
+    """
+
+    @jwt_required()
+    @stories.expect(generate_story_model, validate=True)
+    @stories.response(200, "Success (text/event-stream)")
+    @stories.response(400, "Validation Error")
+    @stories.response(401, "Unauthorized, please log in")
+    @stories.response(404, "Child Not Found")
+    @stories.response(500, "Internal Server Error")
+    def post(self):
+        """
+        Generate a story based on the provided data, streaming its title,
+        chapters, chapter images and ID as server-sent events.
+        """
+        try:
+            # Get the parent
+            parent = get_current_parent()
+
+            # Return an error if the parent is not found, meaning the user is not logged in
+            if not parent:
+                return {"Error": "Unauthorized, please log in"}, 401
+
+            # Get the data from the request
+            data = request.get_json()
+
+            # Validate the data
+            validate_id_format(data["child_id"], "child_id")
+            validate_non_empty_string(data["topic"], "topic")
+            validate_non_empty_string(data["image_style"], "image_style")
+            validate_non_empty_string(data["story_genre"], "story_genre")
+
+            # Check that the child exists (without loading it)
+            if not child_belongs_to_parent(parent.user_id, data["child_id"]):
+                return {
+                    "Error": f"Child with ID '{data['child_id']}' not found"
+                }, 404
+
+            def generate():
+                try:
+                    # Send each event as soon as it is produced
+                    for event in iterate_async(
+                        assemble_story_events_async(
+                            child_id=data["child_id"],
+                            topic=data["topic"],
+                            image_style=data["image_style"],
+                            story_genre=data["story_genre"],
+                        )
+                    ):
+                        # Send the URL of the stored images
+                        if event["type"] == "image":
+                            event = with_image_url(event)
+
+                        yield format_sse_event(event["type"], event)
+                except ValueError as e:
+                    yield format_sse_event("error", {"Error": str(e)})
+                except Exception as e:
+                    current_app.logger.error(e)
+                    yield format_sse_event(
+                        "error", {"Error": "Internal Server Error"}
+                    )
+
+            # Stream the events (errors after this point are sent as events)
+            return Response(
+                stream_with_context(generate()),
+                mimetype="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    # Disable the buffering of the reverse proxies
+                    "X-Accel-Buffering": "no",
+                },
+            )
         except ValueError as e:
             return {"Error": str(e)}, 400
         except Exception as e:
@@ -110,13 +256,24 @@ class ChildStories(Resource):
 
     @jwt_required()
     @stories.response(200, "Success")
+    @stories.response(400, "Validation Error")
     @stories.response(401, "Unauthorized, please log in")
     @stories.response(404, "Child Not Found")
     @stories.response(500, "Internal Server Error")
-    @stories.doc(params={"child_id": "The ID of the child, required"})
+    @stories.doc(
+        params={
+            "child_id": "The ID of the child, required",
+            "limit": "The maximum number of stories, optional",
+            "cursor": "The cursor of the page (next_cursor), optional",
+            "fields": "The comma-separated fields to return, optional",
+            "covers": "Whether to include the URLs of the image (and its "
+            "thumbnails) of the first chapter ('true' or 'false', defaults "
+            "to 'false')",
+        }
+    )
     def get(self):
         """
-        Get all stories for a child.
+        Get a page of the stories of a child, newest first.
         """
         try:
             # Get the parent
@@ -136,20 +293,67 @@ class ChildStories(Resource):
             # Validate the child_id
             validate_id_format(child_id, "child_id")
 
-            # Get the child
-            child = get_child_from_parent(parent.user_id, child_id)
+            # Get the page size, the cursor and the fields to return
+            limit, cursor, fields = parse_page_arguments(
+                request.args,
+                Story,
+                default_limit=current_app.config["PAGE_SIZE"],
+                max_limit=current_app.config["MAX_PAGE_SIZE"],
+            )
+
+            # Check whether the covers of the stories should be included
+            covers = request.args.get("covers", "false").lower()
+            if covers not in ("true", "false"):
+                return {
+                    "Error": "Parameter 'covers' must be 'true' or 'false'"
+                }, 400
 
             # Return an error if the child does not exist
-            if not child:
+            if not child_belongs_to_parent(parent.user_id, child_id):
                 return {"Error": f"Child with ID '{child_id}' not found."}, 404
 
+            # Get the page of stories (with their first chapter)
+            page = get_child_stories(
+                child_id,
+                limit=limit,
+                cursor=cursor,
+                fields=fields,
+                options=stories_with_covers() if covers == "true" else (),
+            )
+
             # Define the payload
+            stories_attributes = []
+            for story in page.items:
+                # Get the attributes of the story
+                story_attributes = get_entry_attributes(story, include=fields)
+
+                # Add the URLs of the image of the first chapter and of its
+                # thumbnails (the library cards only need a thumbnail)
+                if covers == "true":
+                    cover = (
+                        with_thumbnail_urls(
+                            with_image_url(
+                                get_entry_attributes(
+                                    story.chapters[0],
+                                    include=["image", "thumbnails"],
+                                )
+                            )
+                        )
+                        if story.chapters
+                        else {}
+                    )
+                    story_attributes["cover_image_url"] = cover.get(
+                        "image_url"
+                    )
+                    story_attributes["cover_thumbnail_urls"] = cover.get(
+                        "thumbnail_urls", {}
+                    )
+
+                stories_attributes.append(story_attributes)
+
             payload = {
-                "stories": [
-                    # Get the attributes of the story
-                    get_entry_attributes(story)
-                    for story in child.stories
-                ]
+                "stories": stories_attributes,
+                "next_cursor": page.next_cursor,
             }
 
             # Return the story data and a 200 status code
@@ -171,7 +375,13 @@ class StoryChapters(Resource):
     @stories.response(200, "Success")
     @stories.response(404, "Story Not Found")
     @stories.response(500, "Internal Server Error")
-    @stories.doc(params={"story_id": "The ID of the story, required"})
+    @stories.doc(
+        params={
+            "story_id": "The ID of the story, required",
+            "images": "Whether to include the image references "
+            "('true' or 'false', defaults to 'true')",
+        }
+    )
     def get(self):
         """
         Get all chapters for a story.
@@ -193,22 +403,44 @@ class StoryChapters(Resource):
             # Validate the story_id
             validate_id_format(story_id, "story_id")
 
-            # Get the story
-            story = get_story(story_id)
+            # Check whether the image references should be included
+            images = request.args.get("images", "true").lower()
+            if images not in ("true", "false"):
+                return {
+                    "Error": "Parameter 'images' must be 'true' or 'false'"
+                }, 400
+
+            # Get the story with its chapters (with or without their images)
+            story = get_story(
+                story_id, options=story_with_chapters(images=images == "true")
+            )
 
             # Return an error if the story does not exist
             if not story:
                 return {"Error": f"Story with ID '{story_id}' not found."}, 404
 
             # Define the payload
-            payload = {
-                "story_title": story.title,
-                "chapters": [
+            if images == "true":
+                chapters = [
                     # Get the attributes of the chapter
-                    get_entry_attributes(chapter)
+                    # (with the image and thumbnail URLs)
+                    with_thumbnail_urls(
+                        with_image_url(get_entry_attributes(chapter))
+                    )
                     for chapter in story.chapters
-                ],
-            }
+                ]
+            else:
+                chapters = [
+                    # Get the attributes of the chapter without the image (and
+                    # its thumbnails), which can be lazy-loaded from the
+                    # chapter image endpoint
+                    get_entry_attributes(
+                        chapter, exclude=["image", "thumbnails"]
+                    )
+                    for chapter in story.chapters
+                ]
+
+            payload = {"story_title": story.title, "chapters": chapters}
 
             # Return the story data and a 200 status code
             return payload, 200
@@ -217,3 +449,49 @@ class StoryChapters(Resource):
         except Exception as e:
             current_app.logger.error(f"Error: {e}")
             return {"Error": "Internal Server Error"}, 500
+
+
+@stories.route("/chapters/<string:chapter_id>/image", strict_slashes=False)
+class ChapterImage(Resource):
+    """
+    Represents the image of a chapter.
+    """
+
+    # Note: no JWT is required because <img> tags cannot send the
+    # Authorization header, the random chapter IDs are unguessable
+    @stories.response(200, "Success")
+    @stories.response(206, "Partial Content")
+    @stories.response(304, "Not Modified")
+    @stories.response(400, "Validation Error")
+    @stories.response(404, "Chapter Not Found")
+    @stories.response(416, "Range Not Satisfiable")
+    @stories.response(500, "Internal Server Error")
+    def get(self, chapter_id: str):
+        """
+        Get the image of a chapter as raw bytes.
+        """
+        try:
+            # Validate the chapter_id
+            validate_id_format(chapter_id, "chapter_id")
+
+            # Get the chapter
+            chapter = get_chapter(chapter_id, options=chapter_with_image())
+
+            # Return an error if the chapter does not exist
+            if not chapter:
+                return {
+                    "Error": f"Chapter with ID '{chapter_id}' not found."
+                }, 404
+
+            # Stream the image (handles ETag and Range requests)
+            return make_blob_response(chapter.image)
+        except KeyError:
+            current_app.logger.error(
+                f"Image of chapter '{chapter_id}' missing in the blob store"
+            )
+            return {"Error": "Internal Server Error"}, 500
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(f"Error: {e}")
+            return {"Error": "Internal Server Error"}, 500
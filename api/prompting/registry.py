@@ -0,0 +1,102 @@
+"""
+This module contains the registry of the prompt templates, whose
+placeholders are extracted once at import.
+"""
+
+import re
+from collections.abc import Mapping
+from string import Template
+from typing import Any
+
+from .prompt_templates import (
+    story_prompt_template,
+    chapter_image_prompt_template,
+    child_image_prompt_template,
+)
+
+# Pattern to find the ${placeholder} or $placeholder in a template
+PLACEHOLDER_PATTERN = re.compile(
+    r"""
+    \$              # Start with a dollar sign
+    \{?             # Optionally followed by an opening brace
+    (\w+)           # Capture one or more word characters (the placeholder name)
+    \}?             # Optionally followed by a closing brace
+    """,
+    re.VERBOSE,
+)
+
+
+class PromptTemplate:
+    """
+    Represents a prompt template and the set of its placeholders.
+    """
+
+    def __init__(self, name: str, template: Template) -> None:
+        self.name = name
+        self.template = template
+        self.placeholders = frozenset(
+            PLACEHOLDER_PATTERN.findall(template.template)
+        )
+
+    def validate(self, parameters: Mapping[str, Any]) -> None:
+        """
+        Validate that the parameters fill in all the placeholders.
+
+        Args:
+            parameters (Mapping[str, Any]): The parameters of the prompt.
+
+        Raises:
+            ValueError: If there are missing required placeholders.
+        """
+        missing_placeholders = sorted(self.placeholders - parameters.keys())
+
+        if missing_placeholders:
+            raise ValueError(
+                f"Missing required placeholders: {', '.join(missing_placeholders)}"
+            )
+
+    def render(self, parameters: Mapping[str, Any]) -> str:
+        """
+        Validate the parameters and substitute them into the template.
+
+        Args:
+            parameters (Mapping[str, Any]): The parameters of the prompt.
+
+        Raises:
+            ValueError: If there are missing required placeholders.
+
+        Returns:
+            str: The prompt.
+        """
+        self.validate(parameters)
+        return self.template.substitute(parameters)
+
+
+# Registry of the prompt templates by name
+PROMPT_TEMPLATES = {
+    prompt_template.name: prompt_template
+    for prompt_template in (
+        PromptTemplate("story", story_prompt_template),
+        PromptTemplate("chapter_image", chapter_image_prompt_template),
+        PromptTemplate("child_image", child_image_prompt_template),
+    )
+}
+
+
+def get_prompt_template(name: str) -> PromptTemplate:
+    """
+    Get a registered prompt template.
+
+    Args:
+        name (str): The name of the template.
+
+    Raises:
+        ValueError: If no template is registered with this name.
+
+    Returns:
+        PromptTemplate: The prompt template.
+    """
+    try:
+        return PROMPT_TEMPLATES[name]
+    except KeyError:
+        raise ValueError(f"Unknown prompt template: '{name}'.") from None
@@ -0,0 +1,510 @@
+"""
+This module contains the content-addressed blob store used to keep
+images out of the database.
+"""
+
+import os
+import re
+import hmac
+import hashlib
+import tempfile
+import requests
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import BinaryIO
+from datetime import datetime, timezone
+from urllib.parse import quote, urlparse
+from flask import Flask, current_app, has_request_context, url_for
+
+# Regex pattern of a blob key (hex encoded SHA-256 digest of the raw bytes)
+BLOB_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Magic numbers used to detect the content type of the stored images
+_CONTENT_TYPE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def compute_blob_key(data: bytes) -> str:
+    """
+    Compute the content address (key) of the given bytes.
+
+    Args:
+        data (bytes): The raw bytes.
+
+    Returns:
+        str: The hex encoded SHA-256 digest of the bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def validate_blob_key(key: str) -> None:
+    """
+    Validate that a string is a valid blob key.
+
+    Args:
+        key (str): The key to check.
+
+    Raises:
+        ValueError: If the key is not a hex encoded SHA-256 digest.
+    """
+    if not isinstance(key, str) or not BLOB_KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid blob key: '{key}'.")
+
+
+def detect_content_type(data: bytes) -> str:
+    """
+    Detect the content type of an image from its magic number.
+
+    Args:
+        data (bytes): The raw bytes (only the first bytes are needed).
+
+    Returns:
+        str: The detected content type, "application/octet-stream" if unknown.
+    """
+    # WebP and AVIF have their signature after a size/offset prefix
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+
+    for signature, content_type in _CONTENT_TYPE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+
+    return "application/octet-stream"
+
+
+class BlobStore(ABC):
+    """
+    Base class of the content-addressed blob stores.
+
+    Blobs are immutable and keyed by the SHA-256 digest of their bytes,
+    so storing the same bytes twice only stores them once.
+    """
+
+    def __init__(self, public_url: str | None = None) -> None:
+        # Base URL the blobs are publicly served from (e.g. a CDN), if any
+        self.public_url = public_url.rstrip("/") if public_url else None
+
+    def put(self, data: bytes) -> str:
+        """
+        Store the given bytes.
+
+        Args:
+            data (bytes): The raw bytes to store.
+
+        Raises:
+            ValueError: If the data is empty.
+
+        Returns:
+            str: The key of the stored blob.
+        """
+        if not isinstance(data, (bytes, bytearray)) or not data:
+            raise ValueError("Blob data must be non-empty bytes.")
+
+        key = compute_blob_key(data)
+
+        # Content addressing makes writing an existing blob a no-op
+        if not self.exists(key):
+            self._write(key, bytes(data))
+
+        return key
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """
+        Get the bytes of a blob.
+
+        Args:
+            key (str): The key of the blob.
+
+        Raises:
+            KeyError: If the blob does not exist.
+
+        Returns:
+            bytes: The raw bytes of the blob.
+        """
+
+    def open(self, key: str) -> tuple[BinaryIO, int]:
+        """
+        Open a blob for streaming.
+
+        Args:
+            key (str): The key of the blob.
+
+        Raises:
+            KeyError: If the blob does not exist.
+
+        Returns:
+            tuple[BinaryIO, int]: A seekable binary file object
+                (to be closed by the caller) and the size of the blob.
+        """
+        data = self.get(key)
+        return BytesIO(data), len(data)
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """
+        Check if a blob exists.
+
+        Args:
+            key (str): The key of the blob.
+
+        Returns:
+            bool: True if the blob exists, False otherwise.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Delete a blob (deleting a missing blob is a no-op).
+
+        Args:
+            key (str): The key of the blob.
+        """
+
+    def url(self, key: str) -> str:
+        """
+        Get the URL a blob can be downloaded from.
+
+        Args:
+            key (str): The key of the blob.
+
+        Returns:
+            str: The URL of the blob.
+        """
+        validate_blob_key(key)
+
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+
+        # Absolute URLs are needed because the frontend can run on another origin
+        return url_for(
+            "api.media_blob", key=key, _external=has_request_context()
+        )
+
+    def close(self) -> None:
+        """
+        Release the resources held by the store.
+        """
+
+    @abstractmethod
+    def _write(self, key: str, data: bytes) -> None:
+        """
+        Write the bytes of a new blob.
+
+        Args:
+            key (str): The key of the blob.
+            data (bytes): The raw bytes of the blob.
+        """
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store keeping the blobs in a directory of the local filesystem.
+    """
+
+    def __init__(self, root: str, public_url: str | None = None) -> None:
+        super().__init__(public_url)
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """
+        Get the filesystem path of a blob.
+
+        Args:
+            key (str): The key of the blob.
+
+        Returns:
+            str: The path of the blob (sharded by the first 4 hex digits).
+        """
+        validate_blob_key(key)
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self.path(key), "rb") as file:
+                return file.read()
+        except FileNotFoundError as e:
+            raise KeyError(key) from e
+
+    def open(self, key: str) -> tuple[BinaryIO, int]:
+        # Stream from the disk instead of loading the whole blob in memory
+        try:
+            file = open(self.path(key), "rb")
+        except FileNotFoundError as e:
+            raise KeyError(key) from e
+        return file, os.fstat(file.fileno()).st_size
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial blobs
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class S3BlobStore(BlobStore):
+    """
+    Blob store keeping the blobs in an S3 compatible object storage
+    (AWS S3, MinIO, Cloudflare R2...), using path-style requests
+    signed with AWS Signature Version 4.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        *,
+        region: str = "us-east-1",
+        prefix: str = "",
+        timeout: float = 30.0,
+        public_url: str | None = None,
+    ) -> None:
+        super().__init__(public_url)
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.timeout = timeout
+
+        # Reuse the connections between the requests
+        self.session = requests.Session()
+
+    def get(self, key: str) -> bytes:
+        response = self._request("GET", key)
+
+        if response.status_code == 404:
+            raise KeyError(key)
+
+        response.raise_for_status()
+        return response.content
+
+    def exists(self, key: str) -> bool:
+        response = self._request("HEAD", key)
+
+        if response.status_code == 404:
+            return False
+
+        response.raise_for_status()
+        return True
+
+    def delete(self, key: str) -> None:
+        response = self._request("DELETE", key)
+
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _write(self, key: str, data: bytes) -> None:
+        response = self._request(
+            "PUT",
+            key,
+            data,
+            headers={"Content-Type": detect_content_type(data)},
+        )
+        response.raise_for_status()
+
+    def _request(
+        self,
+        method: str,
+        key: str,
+        data: bytes = b"",
+        headers: dict[str, str] | None = None,
+    ) -> requests.Response:
+        """
+        Send a signed request for the object of the given blob.
+        """
+        validate_blob_key(key)
+
+        # Build the path-style object URL
+        path = "/" + quote(f"{self.bucket}/{self.prefix}{key}")
+        url = self.endpoint_url + path
+
+        # Sign the request
+        headers = self._sign(method, urlparse(url).netloc, path, data, headers)
+
+        return self.session.request(
+            method,
+            url,
+            data=data or None,
+            headers=headers,
+            timeout=self.timeout,
+        )
+
+    def _sign(
+        self,
+        method: str,
+        host: str,
+        path: str,
+        data: bytes,
+        headers: dict[str, str] | None,
+    ) -> dict[str, str]:
+        """
+        Add the AWS Signature Version 4 authorization headers to a request.
+        """
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = now.strftime("%Y%m%d")
+        payload_hash = hashlib.sha256(data).hexdigest()
+
+        # Collect the headers to sign (lowercase names, sorted)
+        signed = {
+            **{name.lower(): value for name, value in (headers or {}).items()},
+            "host": host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        signed_header_names = ";".join(sorted(signed))
+        canonical_headers = "".join(
+            f"{name}:{signed[name].strip()}\n" for name in sorted(signed)
+        )
+
+        # Build the canonical request and the string to sign
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                "",
+                canonical_headers,
+                signed_header_names,
+                payload_hash,
+            ]
+        )
+        scope = f"{date_stamp}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+            ]
+        )
+
+        # Derive the signing key and sign
+        signing_key = ("AWS4" + self.secret_key).encode("utf-8")
+        for part in (date_stamp, self.region, "s3", "aws4_request"):
+            signing_key = hmac.new(
+                signing_key, part.encode("utf-8"), hashlib.sha256
+            ).digest()
+        signature = hmac.new(
+            signing_key, string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+        return {
+            **(headers or {}),
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+            "Authorization": (
+                f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                f"SignedHeaders={signed_header_names}, Signature={signature}"
+            ),
+        }
+
+
+def init_blob_store(app: Flask) -> BlobStore:
+    """
+    Create the blob store configured for the given app and register it.
+
+    Args:
+        app (Flask): The Flask app.
+
+    Raises:
+        ValueError: If the configured backend is unknown or incomplete.
+
+    Returns:
+        BlobStore: The created blob store.
+    """
+    backend = app.config.get("BLOB_STORE_BACKEND", "local")
+    public_url = app.config.get("BLOB_STORE_PUBLIC_URL")
+
+    if backend == "local":
+        # Resolve relative paths against the instance folder (like SQLite URIs)
+        path = app.config.get("BLOB_STORE_PATH", "blob_store")
+        if not os.path.isabs(path):
+            path = os.path.join(app.instance_path, path)
+
+        store = LocalBlobStore(path, public_url=public_url)
+    elif backend == "s3":
+        required = [
+            "BLOB_STORE_S3_ENDPOINT",
+            "BLOB_STORE_S3_BUCKET",
+            "BLOB_STORE_S3_ACCESS_KEY",
+            "BLOB_STORE_S3_SECRET_KEY",
+        ]
+        missing = [name for name in required if not app.config.get(name)]
+        if missing:
+            raise ValueError(
+                f"Missing blob store settings: {', '.join(missing)}"
+            )
+
+        store = S3BlobStore(
+            app.config["BLOB_STORE_S3_ENDPOINT"],
+            app.config["BLOB_STORE_S3_BUCKET"],
+            app.config["BLOB_STORE_S3_ACCESS_KEY"],
+            app.config["BLOB_STORE_S3_SECRET_KEY"],
+            region=app.config.get("BLOB_STORE_S3_REGION") or "us-east-1",
+            prefix=app.config.get("BLOB_STORE_S3_PREFIX") or "",
+            public_url=public_url,
+        )
+    else:
+        raise ValueError(f"Unknown blob store backend: '{backend}'")
+
+    app.extensions["blob_store"] = store
+    return store
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Get the blob store of the current app.
+
+    Returns:
+        BlobStore: The blob store.
+    """
+    return current_app.extensions["blob_store"]
+
+
+def with_image_url(attributes: dict[str, str]) -> dict[str, str]:
+    """
+    Add the URL of the referenced image to the attributes of an entry.
+
+    Args:
+        attributes (dict[str, str]): The attributes of a child or chapter.
+
+    Returns:
+        dict[str, str]: The same attributes with the "image_url" added
+            (unless the image was not selected).
+    """
+    if "image" not in attributes:
+        return attributes
+
+    attributes["image_url"] = get_blob_store().url(attributes["image"])
+    return attributes
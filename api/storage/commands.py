@@ -0,0 +1,54 @@
+"""
+This module contains the CLI commands to manage the blob store.
+"""
+
+import click
+from base64 import b64decode
+from binascii import Error as Base64Error
+from flask.cli import AppGroup
+from sqlalchemy.orm import undefer
+
+from ..database.models import db, Child, Chapter
+from .blob_store import get_blob_store
+
+# Create a "flask blobs ..." command group
+blobs_cli = AppGroup("blobs", help="Manage the image blob store.")
+
+
+@blobs_cli.command("migrate")
+@click.option(
+    "--batch-size", default=50, show_default=True, help="Rows per commit."
+)
+def migrate_inline_images(batch_size: int) -> None:
+    """
+    Move the base64 images stored inline in the database into the blob store.
+    """
+    store = get_blob_store()
+
+    for model in (Child, Chapter):
+        primary_key = model.__mapper__.primary_key[0]
+        migrated = 0
+
+        # Only the rows that do not hold a blob key yet need to be migrated
+        legacy_ids = [
+            row_id
+            for (row_id,) in db.session.query(primary_key).filter(
+                db.func.length(model.image) != 64
+            )
+        ]
+
+        for row_id in legacy_ids:
+            row = db.session.get(model, row_id, options=[undefer(model.image)])
+
+            try:
+                row.image = store.put(b64decode(row.image, validate=True))
+            except (Base64Error, ValueError) as e:
+                click.echo(f"Skipping {model.__tablename__} row {row_id}: {e}")
+                continue
+
+            migrated += 1
+            if migrated % batch_size == 0:
+                db.session.commit()
+
+        db.session.commit()
+        click.echo(f"Migrated {migrated} {model.__tablename__} images.")
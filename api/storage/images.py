@@ -0,0 +1,294 @@
+"""
+This module contains the image processing stage transcoding the generated
+images into compact masters and thumbnails on a pool of processes.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import weakref
+from io import BytesIO
+from typing import NamedTuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from flask import Flask, current_app
+
+from .blob_store import get_blob_store, validate_blob_key
+from ..functions.input_validation import validate_non_empty_bytes
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Default sizes (in pixels, of the longest side) of the thumbnails
+THUMBNAIL_SIZES = (128, 256, 512)
+
+
+class ProcessedImage(NamedTuple):
+    """
+    The transcoded master of an image and its thumbnails (by size).
+    """
+
+    master: bytes
+    thumbnails: dict[int, bytes]
+
+
+class StoredImage(NamedTuple):
+    """
+    The blob store keys of an image already stored and of its thumbnails (by
+    size), e.g. a portrait of the library reused by a child without
+    downloading and storing it again.
+    """
+
+    key: str
+    thumbnails: dict[str, str]
+
+
+def transcode_image(
+    data: bytes,
+    sizes: tuple[int, ...] = THUMBNAIL_SIZES,
+    image_format: str = "WEBP",
+    quality: int = 80,
+) -> ProcessedImage:
+    """
+    Transcode an image into a compact master and its thumbnails.
+
+    The images are kept as they are when Pillow is not installed.
+
+    Args:
+        data (bytes): The raw bytes of the image (e.g. a generated PNG).
+        sizes (tuple[int, ...], optional): The sizes of the thumbnails
+            (only those smaller than the image are created).
+        image_format (str, optional): The format of the master and the
+            thumbnails ("WEBP" or "AVIF"). Defaults to "WEBP".
+        quality (int, optional): The encoding quality (0-100).
+
+    Returns:
+        ProcessedImage: The master and the thumbnails.
+    """
+    if Image is None:
+        return ProcessedImage(data, {})
+
+    def encode(image: "Image.Image") -> bytes:
+        output = BytesIO()
+        image.save(output, format=image_format, quality=quality, method=4)
+        return output.getvalue()
+
+    with Image.open(BytesIO(data)) as image:
+        # Keep the transparency only when the image has some
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        master = encode(image)
+        thumbnails = {}
+        for size in sizes:
+            if size >= max(image.size):
+                continue
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+            thumbnails[size] = encode(thumbnail)
+
+    # Keep the original when it is already smaller (e.g. a compact JPEG)
+    if len(master) >= len(data):
+        master = data
+
+    return ProcessedImage(master, thumbnails)
+
+
+class ImageProcessor:
+    """
+    Transcodes the images on a bounded pool of processes.
+
+    Encoding a 1024x1024 image takes a few hundred milliseconds of CPU time
+    holding the GIL, so it runs in other processes to keep the requests
+    (and the event loops of the streamed stories) responsive.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        sizes: tuple[int, ...] = THUMBNAIL_SIZES,
+        image_format: str = "WEBP",
+        quality: int = 80,
+    ) -> None:
+        self.max_workers = max_workers
+        self.sizes = sizes
+        self.image_format = image_format
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def process(self, data: bytes) -> ProcessedImage:
+        """
+        Transcode an image (kept as it is if it cannot be transcoded).
+
+        Args:
+            data (bytes): The raw bytes of the image.
+
+        Returns:
+            ProcessedImage: The master and the thumbnails.
+        """
+        try:
+            if self.max_workers == 0:
+                return self._transcode(data)
+
+            return self._submit(data).result()
+        except Exception as e:
+            return self._keep_original(data, e)
+
+    async def process_async(self, data: bytes) -> ProcessedImage:
+        """
+        Asynchronously transcode an image (kept as it is if it cannot be
+        transcoded).
+
+        Args:
+            data (bytes): The raw bytes of the image.
+
+        Returns:
+            ProcessedImage: The master and the thumbnails.
+        """
+        try:
+            if self.max_workers == 0:
+                return self._transcode(data)
+
+            return await asyncio.wrap_future(self._submit(data))
+        except Exception as e:
+            return self._keep_original(data, e)
+
+    def close(self) -> None:
+        """
+        Shut down the pool of processes.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _transcode(self, data: bytes) -> ProcessedImage:
+        return transcode_image(
+            data, self.sizes, self.image_format, self.quality
+        )
+
+    @staticmethod
+    def _keep_original(data: bytes, error: Exception) -> ProcessedImage:
+        # An image that cannot be transcoded is still stored as it is
+        current_app.logger.warning(f"Failed to transcode image: {error}")
+        return ProcessedImage(data, {})
+
+    def _submit(self, data: bytes) -> Future:
+        with self._lock:
+            # Start the processes lazily, spawned (instead of forked) because
+            # the app runs threads (e.g. the event loop of the OpenAI clients)
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+            return self._executor.submit(
+                transcode_image,
+                data,
+                self.sizes,
+                self.image_format,
+                self.quality,
+            )
+
+
+def store_processed_image(
+    image: ProcessedImage | StoredImage,
+) -> tuple[str, dict[str, str]]:
+    """
+    Store the master and the thumbnails of a processed image (an image
+    already stored keeps its keys, without being stored again).
+
+    Args:
+        image (ProcessedImage | StoredImage): The processed image.
+
+    Returns:
+        tuple[str, dict[str, str]]: The key of the master and the keys of
+            the thumbnails (by size).
+    """
+    if isinstance(image, StoredImage):
+        return image.key, image.thumbnails
+
+    blob_store = get_blob_store()
+
+    return blob_store.put(image.master), {
+        str(size): blob_store.put(thumbnail)
+        for size, thumbnail in image.thumbnails.items()
+    }
+
+
+def validate_image(image: bytes | StoredImage, field_name: str) -> None:
+    """
+    Validate an image given as raw bytes or as the keys of a stored image.
+
+    Args:
+        image (bytes | StoredImage): The image to check.
+        field_name (str): The name of the field (for the error message).
+
+    Raises:
+        ValueError: If the bytes are empty or the key is not a blob key.
+        TypeError: If the image is neither bytes nor a stored image.
+    """
+    if isinstance(image, StoredImage):
+        validate_blob_key(image.key)
+    else:
+        validate_non_empty_bytes(image, field_name)
+
+
+def with_thumbnail_urls(attributes: dict) -> dict:
+    """
+    Add the URLs of the referenced thumbnails to the attributes of an entry.
+
+    Args:
+        attributes (dict): The attributes of a child or chapter.
+
+    Returns:
+        dict: The same attributes with the "thumbnail_urls" (by size) added
+            (unless the thumbnails were not selected).
+    """
+    if "thumbnails" not in attributes:
+        return attributes
+
+    blob_store = get_blob_store()
+    attributes["thumbnail_urls"] = {
+        size: blob_store.url(key)
+        for size, key in (attributes["thumbnails"] or {}).items()
+    }
+    return attributes
+
+
+def init_image_processor(app: Flask) -> ImageProcessor:
+    """
+    Create the image processor of the given app and register it.
+
+    Args:
+        app (Flask): The Flask app.
+
+    Returns:
+        ImageProcessor: The created image processor.
+    """
+    processor = ImageProcessor(
+        max_workers=app.config["IMAGE_PROCESS_WORKERS"],
+        sizes=tuple(app.config["IMAGE_THUMBNAIL_SIZES"]),
+        image_format=app.config["IMAGE_FORMAT"],
+        quality=app.config["IMAGE_QUALITY"],
+    )
+    app.extensions["image_processor"] = processor
+
+    # Shut down the pool when the app is torn down (or at exit)
+    weakref.finalize(app, processor.close)
+
+    return processor
+
+
+def get_image_processor() -> ImageProcessor:
+    """
+    Get the image processor of the current app.
+
+    Returns:
+        ImageProcessor: The image processor.
+    """
+    return current_app.extensions["image_processor"]
@@ -0,0 +1,60 @@
+"""
+This module contains helpers to serve blobs over HTTP.
+"""
+
+from flask import Response, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.wsgi import wrap_file
+
+from .blob_store import get_blob_store, detect_content_type
+
+# Blobs never change (their key is the digest of their bytes), so they can
+# be cached by the browsers and proxies for a year without revalidation
+BLOB_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def make_blob_response(key: str) -> Response:
+    """
+    Create a streamed response of a blob supporting conditional
+    (If-None-Match) and byte range (Range) requests.
+
+    Args:
+        key (str): The key of the blob.
+
+    Raises:
+        KeyError: If the blob does not exist.
+        ValueError: If the key is invalid.
+
+    Returns:
+        Response: The response (200, 206, 304 or 416).
+    """
+    file, size = get_blob_store().open(key)
+
+    # Detect the content type from the magic number of the blob
+    content_type = detect_content_type(file.read(16))
+    file.seek(0)
+
+    response = Response(
+        wrap_file(request.environ, file),
+        mimetype=content_type,
+        direct_passthrough=True,
+    )
+    response.content_length = size
+    response.accept_ranges = "bytes"
+
+    # The key is the SHA-256 digest of the bytes, i.e. a perfect strong ETag
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = BLOB_MAX_AGE
+    response.cache_control.immutable = True
+
+    try:
+        # Answer with 304 Not Modified or 206 Partial Content when applicable
+        return response.make_conditional(
+            request.environ, accept_ranges=True, complete_length=size
+        )
+    except RequestedRangeNotSatisfiable:
+        response.close()
+        return Response(
+            status=416, headers={"Content-Range": f"bytes */{size}"}
+        )
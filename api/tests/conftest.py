@@ -2,12 +2,23 @@
 This module contains test fixtures for the API tests.
 """
 
+import os
+import shutil
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
 
 from api import create_app, db
 from api.config import TestingConfig
-from api.database.models import Parent, Child, Story, Chapter
+from api.database.models import Parent, Child, Story, Chapter, GenerationJob
 from api.extensions import bcrypt
+from api.functions.openai_clients import OpenAIClientRegistry
+from api.jobs.queue import enqueue_story_job
+from api.storage.blob_store import get_blob_store
+from api.tests.stand_ins import OpenAIStandIn
+
+# Path to the dummy data directory
+DUMMY_PATH = os.path.join(os.path.dirname(__file__), "..", "dummy_data")
 
 
 @pytest.fixture(scope="session")
@@ -25,10 +36,11 @@ def app():
     # Yield the app to the tests
     yield app
 
-    # Drop the database tables when the tests are done
+    # Drop the database tables and the blob store when the tests are done
     with app.app_context():
         db.session.remove()
         db.drop_all()
+        shutil.rmtree(get_blob_store().root, ignore_errors=True)
 
 
 @pytest.fixture(scope="session")
@@ -39,6 +51,75 @@ def client(app):
     yield app.test_client()
 
 
+@pytest.fixture(scope="session")
+def image_bytes():
+    """
+    The bytes of a test image.
+    """
+    with open(os.path.join(DUMMY_PATH, "image_1.webp"), "rb") as file:
+        yield file.read()
+
+
+@pytest.fixture(scope="session")
+def image_key(app, image_bytes):
+    """
+    The blob store key of a stored test image.
+    """
+    with app.app_context():
+        key = get_blob_store().put(image_bytes)
+
+    yield key
+
+
+@pytest.fixture(scope="session")
+def child_params():
+    """
+    The parameters of a test child used in the prompts.
+    """
+    yield {
+        "name": "Test",
+        "age_range": "5-7",
+        "sex": "Male",
+        "ethnicity": "Asian",
+        "hair_color": "Black",
+        "hair_type": "Straight",
+        "eye_color": "Brown",
+        "fav_animals": None,
+        "fav_activities": None,
+        "fav_shows": None,
+    }
+
+
+@pytest.fixture(scope="session")
+def openai_stand_in():
+    """
+    A local stand-in of the OpenAI API.
+    """
+    stand_in = OpenAIStandIn().start()
+
+    yield stand_in
+
+    stand_in.stop()
+
+
+@pytest.fixture
+def openai_clients(app, openai_stand_in):
+    """
+    An OpenAI client registry of the app pointing to the stand-in API.
+    """
+    registry = OpenAIClientRegistry(
+        api_key="test", base_url=f"{openai_stand_in.url}/v1"
+    )
+    original = app.extensions["openai_clients"]
+    app.extensions["openai_clients"] = registry
+    openai_stand_in.reset()
+
+    yield registry
+
+    app.extensions["openai_clients"] = original
+    registry.close()
+
+
 @pytest.fixture(scope="session")
 def parent(app):
     """
@@ -67,7 +148,7 @@ def parent(app):
 
 
 @pytest.fixture(scope="session")
-def child(app, parent):
+def child(app, parent, image_key):
     """
     A test child.
     """
@@ -75,7 +156,7 @@ def child(app, parent):
     test_child = Child(
         parent_id=parent.user_id,
         name="TestChild",
-        image="base64image==",
+        image=image_key,
         age_range="4-6",
         sex="Female",
         eye_color="Brown",
@@ -96,7 +177,7 @@ def child(app, parent):
 
 # Function scope because the child is modified in the tests
 @pytest.fixture(scope="function")
-def child_to_update(app, parent):
+def child_to_update(app, parent, image_key):
     """
     A test child.
     """
@@ -104,7 +185,7 @@ def child_to_update(app, parent):
     test_update_child = Child(
         parent_id=parent.user_id,
         name="TestChild",
-        image="base64image==",
+        image=image_key,
         age_range="4-6",
         sex="Female",
         eye_color="Brown",
@@ -164,7 +245,7 @@ def story(app, child):
 
 
 @pytest.fixture(scope="session")
-def chapter(app, story):
+def chapter(app, story, image_key):
     """
     A test chapter.
     """
@@ -172,7 +253,7 @@ def chapter(app, story):
         story_id=story.story_id,
         title="Chapter Title",
         content="Chapter Content",
-        image="base64image==",
+        image=image_key,
         order=1,
     )
 
@@ -184,3 +265,98 @@ def chapter(app, story):
 
         db.session.delete(test_chapter)
         db.session.commit()
+
+
+@pytest.fixture(scope="function")
+def make_story(app, child, image_key):
+    """
+    A factory of test stories with the given number of chapters (deleted
+    after the test).
+    """
+    story_ids = []
+
+    def make(chapters: int = 1) -> str:
+        with app.app_context():
+            test_story = Story(
+                child_id=child.child_id,
+                title="Generated Story",
+                topic="Travelling to the Moon",
+                image_style="Cartoon",
+                story_genre="Adventure",
+            )
+            db.session.add(test_story)
+            db.session.flush()
+            db.session.add_all(
+                Chapter(
+                    story_id=test_story.story_id,
+                    title=f"Chapter {order}",
+                    content=f"Chapter {order} Content",
+                    image=image_key,
+                    order=order,
+                    thumbnails={"256": image_key},
+                )
+                for order in range(1, chapters + 1)
+            )
+            db.session.commit()
+            story_ids.append(test_story.story_id)
+            return test_story.story_id
+
+    yield make
+
+    with app.app_context():
+        Chapter.query.filter(Chapter.story_id.in_(story_ids)).delete()
+        Story.query.filter(Story.story_id.in_(story_ids)).delete()
+        db.session.commit()
+
+
+@pytest.fixture(scope="function")
+def count_queries(app):
+    """
+    A context manager collecting the SQL statements run in its block.
+    """
+
+    @contextmanager
+    def count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args) -> None:
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(
+                engine, "before_cursor_execute", before_cursor_execute
+            )
+
+    return count
+
+
+@pytest.fixture(scope="function")
+def generation_jobs(app, parent, child):
+    """
+    A factory queuing test story generation jobs (deleted after the test).
+    """
+
+    def enqueue(count: int = 1) -> list[str]:
+        with app.app_context():
+            return [
+                enqueue_story_job(
+                    parent_id=parent.user_id,
+                    child_id=child.child_id,
+                    topic="topic",
+                    image_style="Cartoon",
+                    story_genre="Fantasy",
+                ).job_id
+                for _ in range(count)
+            ]
+
+    yield enqueue
+
+    with app.app_context():
+        GenerationJob.query.delete()
+        db.session.commit()
@@ -0,0 +1,195 @@
+"""
+This module contains local stand-ins of the external services used in the tests.
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A tiny valid PNG image (1x1 pixel) returned as generated image
+STAND_IN_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d4944415478da636460f85f0f0002870180eb47ba92"
+    "0000000049454e44ae426082"
+)
+
+
+class OpenAIStandIn:
+    """
+    Local HTTP/1.1 stand-in of the OpenAI API which counts the TCP
+    connections opened by its clients.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.005,
+        story: str = "",
+        stream_chunk_size: int = 16,
+        stream_interval: float = 0.0,
+    ) -> None:
+        # Simulated processing time of every API call (in seconds)
+        self.latency = latency
+
+        # Text returned by the chat completions, and the size of (and the
+        # time between) its chunks when streamed
+        self.story = story
+        self.stream_chunk_size = stream_chunk_size
+        self.stream_interval = stream_interval
+
+        # Number of TCP connections and API calls received, the time of each
+        # call (by path) and the time the last stream ended
+        self.connections = 0
+        self.calls = 0
+        self.call_times: list[tuple[str, float]] = []
+        self.stream_ended_at: float | None = None
+        self._lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), self._make_handler()
+        )
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OpenAIStandIn":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.calls = 0
+            self.call_times = []
+            self.stream_ended_at = None
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep the connections alive between the requests
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                with stand_in._lock:
+                    stand_in.calls += 1
+                    stand_in.call_times.append(
+                        (self.path, time.perf_counter())
+                    )
+                time.sleep(stand_in.latency)
+
+                if self.path.endswith("/images/generations"):
+                    self._send_json(
+                        {
+                            "created": int(time.time()),
+                            "data": [
+                                {"url": f"{stand_in.url}/files/image.png"}
+                            ],
+                        }
+                    )
+                elif self.path.endswith("/chat/completions") and body.get(
+                    "stream"
+                ):
+                    self._stream_completion(body.get("model", "stand-in"))
+                elif self.path.endswith("/chat/completions"):
+                    self._send_json(
+                        {
+                            "id": "chatcmpl-stand-in",
+                            "object": "chat.completion",
+                            "created": int(time.time()),
+                            "model": body.get("model", "stand-in"),
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": stand_in.story,
+                                    },
+                                    "finish_reason": "stop",
+                                }
+                            ],
+                        }
+                    )
+                else:
+                    self._send(404, b"", "text/plain")
+
+            def do_GET(self) -> None:
+                if self.path == "/files/image.png":
+                    self._send(200, STAND_IN_PNG, "image/png")
+                else:
+                    self._send(404, b"", "text/plain")
+
+            def _stream_completion(self, model: str) -> None:
+                # Send the story as server-sent events in chunked encoding
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                story = stand_in.story
+                size = stand_in.stream_chunk_size
+                for i in range(0, len(story), size):
+                    self._send_event(
+                        {
+                            "id": "chatcmpl-stand-in",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "delta": {"content": story[i : i + size]},
+                                    "finish_reason": None,
+                                }
+                            ],
+                        }
+                    )
+                    time.sleep(stand_in.stream_interval)
+
+                with stand_in._lock:
+                    stand_in.stream_ended_at = time.perf_counter()
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _send_event(self, payload: dict) -> None:
+                self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode())
+                self.wfile.write(data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_json(self, payload: dict) -> None:
+                self._send(
+                    200, json.dumps(payload).encode(), "application/json"
+                )
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
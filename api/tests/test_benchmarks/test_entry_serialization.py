@@ -0,0 +1,91 @@
+"""
+This module contains benchmarks of the serialization of the database entries,
+run on every response.
+"""
+
+import timeit
+import pytest
+from datetime import datetime
+from sqlalchemy.inspection import inspect
+
+from api.database import serialization
+from api.database.models import Story
+from api.database.serialization import get_serializer
+
+
+def get_entry_attributes_per_row(entry) -> dict:
+    """
+    The previous get_entry_attributes, inspecting every entry.
+    """
+    attributes = {
+        attr.key: getattr(entry, attr.key)
+        for attr in inspect(entry, raiseerr=True).mapper.column_attrs
+    }
+    for key, value in attributes.items():
+        if value is not None and not isinstance(value, int):
+            attributes[key] = str(value)
+    return attributes
+
+
+def make_stories(count: int) -> list[Story]:
+    """
+    Make (transient) stories.
+    """
+    stories = []
+    for i in range(count):
+        story = Story(f"{i:032x}", f"Story {i}", "Topic", "Cartoon", "Fantasy")
+        story.story_id = f"{i + count:032x}"
+        story.created_at = datetime(2024, 1, 1, 0, 0, i % 60)
+        stories.append(story)
+    return stories
+
+
+@pytest.mark.benchmark
+class TestSerializationBenchmark:
+    """
+    Compare the per-row inspection with the compiled serializer.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("count", [1_000, 10_000])
+    def test_compiled_serializer(
+        count: int, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the compiled serializer gives the same attributes on 1k and
+        10k rows, without inspecting them, and report the time of both paths
+        (not asserted, it depends on the machine).
+        """
+        stories = make_stories(count)
+        serializer = get_serializer(Story)
+
+        # Best of 3 runs of each path
+        reflective = min(
+            timeit.repeat(
+                lambda: [get_entry_attributes_per_row(s) for s in stories],
+                number=1,
+                repeat=3,
+            )
+        )
+        compiled = min(
+            timeit.repeat(
+                lambda: serializer.serialize_many(stories), number=1, repeat=3
+            )
+        )
+
+        print(
+            f"\nSerialization of {count} rows:"
+            f"\n  per-row inspection: {reflective * 1000:.1f} ms"
+            f"\n  compiled:           {compiled * 1000:.1f} ms"
+        )
+
+        def fail(*args, **kwargs):
+            raise AssertionError("An entry was inspected")
+
+        # The columns and their converters are resolved once, by
+        # get_serializer
+        monkeypatch.setattr(serialization, "inspect", fail)
+
+        assert serializer.serialize_many(stories) == [
+            get_entry_attributes_per_row(story) for story in stories
+        ]
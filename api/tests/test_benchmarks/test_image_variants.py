@@ -0,0 +1,68 @@
+"""
+This module contains benchmarks of the bytes stored and transferred per
+story with the transcoded images and their thumbnails.
+"""
+
+import os
+import pytest
+from io import BytesIO
+
+from api.storage.images import transcode_image
+
+Image = pytest.importorskip("PIL.Image")
+
+# Path to the dummy data directory (images of a generated story)
+DUMMY_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "dummy_data")
+
+# Size of the thumbnails shown on the library cards
+CARD_SIZE = 512
+
+
+def load_generated_images() -> list[bytes]:
+    """
+    Load the images of the dummy story as PNGs (the format of the images
+    returned by the OpenAI API).
+    """
+    images = []
+    for number in range(1, 6):
+        output = BytesIO()
+        with Image.open(
+            os.path.join(DUMMY_PATH, f"image_{number}.webp")
+        ) as im:
+            im.save(output, format="PNG")
+        images.append(output.getvalue())
+    return images
+
+
+@pytest.mark.benchmark
+class TestImageVariantsBenchmark:
+    """
+    Compare storing and serving the generated PNGs with the transcoded
+    WebP masters and thumbnails.
+    """
+
+    @staticmethod
+    def test_bytes_per_story() -> None:
+        """
+        Test that a story stores and transfers fewer bytes.
+        """
+        originals = load_generated_images()
+        processed = [transcode_image(image) for image in originals]
+
+        # Bytes stored per story (the masters and all their thumbnails)
+        stored_before = sum(len(image) for image in originals)
+        stored_after = sum(
+            len(image.master) + sum(map(len, image.thumbnails.values()))
+            for image in processed
+        )
+
+        # Bytes transferred to show the story card (its cover) in the
+        # library and to read the story (all its chapter images)
+        card_before = len(originals[0])
+        card_after = len(processed[0].thumbnails[CARD_SIZE])
+        read_before = stored_before
+        read_after = sum(len(image.master) for image in processed)
+
+        assert stored_after < stored_before
+        assert card_after * 10 < card_before
+        assert read_after < read_before
@@ -0,0 +1,117 @@
+"""
+This module contains benchmarks of the JSON encoding of large responses.
+"""
+
+import json
+import os
+import timeit
+import tracemalloc
+from base64 import b64encode
+import pytest
+
+from api.functions import representations
+
+# Size of a generated image (a 1024x1024 PNG is about 1.5 MB)
+IMAGE_SIZE = 1_500_000
+
+# Number of chapters (and images) of a story
+CHAPTERS = 5
+
+# Number of encodings timed per run
+NUMBER = 20
+
+
+def make_story_payload(images: bool) -> dict:
+    """
+    Make a representative story payload, with the images inline as base64
+    (the previous generation payload) or as URLs (the chapters payload).
+    """
+    image = b64encode(os.urandom(IMAGE_SIZE)).decode("ascii")
+    return {
+        "story_id": "a" * 32,
+        "title": "The Dragon Who Loved the Stars",
+        "created_at": "2024-04-01 12:30:00.123456",
+        "chapters": [
+            {
+                "chapter_id": f"{order:032x}",
+                "title": f"Chapter {order}",
+                "content": "Once upon a time, under a sky full of stars. "
+                * 60,
+                "order": order,
+                **(
+                    {"image": image}
+                    if images
+                    else {"image_url": f"/api/media/{'b' * 64}"}
+                ),
+            }
+            for order in range(1, CHAPTERS + 1)
+        ],
+    }
+
+
+def peak_memory(encode, payload: dict) -> int:
+    """
+    Get the peak memory allocated by the encoding (in bytes).
+    """
+    tracemalloc.start()
+    try:
+        encode(payload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def encode_with_stdlib(payload: dict) -> bytes:
+    """
+    Encode the payload like Flask-RESTX does by default.
+    """
+    return (json.dumps(payload) + "\n").encode("utf-8")
+
+
+@pytest.mark.benchmark
+class TestJsonEncodingBenchmark:
+    """
+    Compare the standard library encoder with the API's representation.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("images", [True, False])
+    def test_representation(images: bool) -> None:
+        """
+        Test that the representation encodes the story payloads the same,
+        with less memory (without the intermediate string), and report the
+        time of both encodings (not asserted, it depends on the machine).
+        """
+        pytest.importorskip("orjson")
+
+        payload = make_story_payload(images)
+        assert json.loads(representations.dumps(payload)) == payload
+
+        stdlib_peak = peak_memory(encode_with_stdlib, payload)
+        representation_peak = peak_memory(representations.dumps, payload)
+
+        # Best of 3 runs of each encoding
+        stdlib_time = min(
+            timeit.repeat(
+                lambda: encode_with_stdlib(payload), number=NUMBER, repeat=3
+            )
+        )
+        representation_time = min(
+            timeit.repeat(
+                lambda: representations.dumps(payload),
+                number=NUMBER,
+                repeat=3,
+            )
+        )
+
+        print(
+            f"\nEncoding of a story {'with' if images else 'without'} "
+            "inline images:"
+            f"\n  stdlib:         {stdlib_time / NUMBER * 1000:.2f} ms, "
+            f"peak {stdlib_peak / 1000:.0f} kB"
+            f"\n  representation: {representation_time / NUMBER * 1000:.2f} "
+            f"ms, peak {representation_peak / 1000:.0f} kB"
+        )
+
+        assert representation_peak < stdlib_peak
@@ -0,0 +1,108 @@
+"""
+This module contains benchmarks of the OpenAI image generation fan-out.
+"""
+
+import asyncio
+import statistics
+import time
+import pytest
+from openai import AsyncOpenAI
+
+from api.functions.openai_clients import OpenAIClientRegistry
+from api.tests.stand_ins import OpenAIStandIn
+
+# Number of images generated concurrently per story (one per chapter)
+FAN_OUT = 5
+
+# Number of simulated story generations (each one on a new event loop)
+ROUNDS = 30
+
+
+def percentile(samples: list[float], percent: int) -> float:
+    """
+    Get the given percentile of the samples (in milliseconds).
+    """
+    return statistics.quantiles(samples, n=100)[percent - 1] * 1000
+
+
+def run_rounds(fan_out) -> list[float]:
+    """
+    Run the fan-out on a new event loop per round, like Flask does for
+    every request to an async view, and time each round.
+    """
+    durations = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        asyncio.run(fan_out())
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+@pytest.mark.benchmark
+class TestImageFanOutBenchmark:
+    """
+    Compare a new client per image (the previous behaviour) with the
+    pooled clients of the registry.
+    """
+
+    @staticmethod
+    def test_pooled_clients(openai_stand_in: OpenAIStandIn) -> None:
+        """
+        Test that the pooled clients reuse their connections across the
+        rounds, and report the latencies of both (not asserted, they depend
+        on the machine).
+        """
+        base_url = f"{openai_stand_in.url}/v1"
+
+        async def generate_with_new_client() -> None:
+            client = AsyncOpenAI(api_key="test", base_url=base_url)
+            try:
+                await client.images.generate(prompt="A dragon")
+            finally:
+                await client.close()
+
+        async def fresh_fan_out() -> None:
+            await asyncio.gather(
+                *(generate_with_new_client() for _ in range(FAN_OUT))
+            )
+
+        registry = OpenAIClientRegistry(api_key="test", base_url=base_url)
+
+        async def pooled_fan_out() -> None:
+            await asyncio.gather(
+                *(
+                    registry.run_async(
+                        lambda client: client.images.generate(
+                            prompt="A dragon"
+                        )
+                    )
+                    for _ in range(FAN_OUT)
+                )
+            )
+
+        try:
+            openai_stand_in.reset()
+            fresh = run_rounds(fresh_fan_out)
+            fresh_connections = openai_stand_in.connections
+
+            # The connections opened by the warm-up round are counted too
+            openai_stand_in.reset()
+            asyncio.run(pooled_fan_out())
+            pooled = run_rounds(pooled_fan_out)
+            pooled_connections = openai_stand_in.connections
+        finally:
+            registry.close()
+
+        print(
+            f"\n{FAN_OUT}-image fan-out over {ROUNDS} rounds:"
+            f"\n  new clients: {fresh_connections} connections, "
+            f"p50 {percentile(fresh, 50):.1f} ms, "
+            f"p99 {percentile(fresh, 99):.1f} ms"
+            f"\n  pooled:      {pooled_connections} connections, "
+            f"p50 {percentile(pooled, 50):.1f} ms, "
+            f"p99 {percentile(pooled, 99):.1f} ms"
+        )
+
+        # Every new client opens its own connection, the pool reuses them
+        assert fresh_connections == FAN_OUT * ROUNDS
+        assert pooled_connections <= FAN_OUT
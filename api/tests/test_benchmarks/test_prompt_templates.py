@@ -0,0 +1,136 @@
+"""
+This module contains micro-benchmarks of the prompt assembly and the story
+parsing, run on every story generation.
+"""
+
+import re
+import timeit
+import pytest
+from flask import Flask
+
+from api.dummy_data.dummy_story import dummy_story
+from api.functions import prompt_assembly
+from api.functions.prompt_assembly import (
+    STORY_CHAPTER_PATTERN,
+    STORY_TITLE_PATTERN,
+    create_story_prompt,
+    extract_story_components,
+)
+from api.prompting import registry
+from api.prompting.prompt_templates import story_prompt_template
+
+# Number of prompts assembled per timed run
+NUMBER = 10_000
+
+
+def create_story_prompt_per_call(child_params, topic, story_genre) -> str:
+    """
+    The previous create_story_prompt, extracting the placeholders of the
+    template on every call.
+    """
+    parameters = {**child_params, "topic": topic, "story_genre": story_genre}
+    placeholder_pattern = re.compile(
+        r"""
+        \$              # Start with a dollar sign
+        \{?             # Optionally followed by an opening brace
+        (\w+)           # Capture one or more word characters (the placeholder name)
+        \}?             # Optionally followed by a closing brace
+    """,
+        re.VERBOSE,
+    )
+    required = set(placeholder_pattern.findall(story_prompt_template.template))
+    missing = [param for param in required if param not in parameters]
+    if missing:
+        raise ValueError(f"Missing required placeholders: {missing}")
+    for key in ["fav_animals", "fav_activities", "fav_shows"]:
+        if parameters.get(key, "") is None:
+            parameters[key] = "unspecified"
+    return story_prompt_template.substitute(parameters)
+
+
+def extract_story_components_per_call(story: str) -> tuple:
+    """
+    The previous extract_story_components, compiling its patterns on every
+    call (which only hits the cache of the re module).
+    """
+    title_pattern = re.compile(
+        STORY_TITLE_PATTERN.pattern, STORY_TITLE_PATTERN.flags
+    )
+    chapter_pattern = re.compile(
+        STORY_CHAPTER_PATTERN.pattern, STORY_CHAPTER_PATTERN.flags
+    )
+    title = title_pattern.search(story).group(1).strip()
+    chapters = [
+        (match.group(1).strip(), match.group(2).strip())
+        for match in chapter_pattern.finditer(story)
+    ]
+    return title, [c[0] for c in chapters], [c[1] for c in chapters]
+
+
+@pytest.mark.benchmark
+class TestPromptAssemblyBenchmark:
+    """
+    Compare the per-call template scans and regex compilations with the
+    precompiled registry and patterns.
+    """
+
+    @staticmethod
+    def test_story_prompt(
+        app: Flask, child_params: dict, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the story prompt is the same with the registry, without
+        scanning the template for its placeholders, and report the time of
+        both (not asserted, it depends on the machine).
+        """
+        arguments = (child_params, "Travelling to the Moon", "Adventure")
+
+        # The placeholders are extracted once, when the template is
+        # registered
+        monkeypatch.setattr(registry, "PLACEHOLDER_PATTERN", None)
+        monkeypatch.setattr(prompt_assembly, "PLACEHOLDER_PATTERN", None)
+
+        with app.app_context():
+            assert create_story_prompt(
+                *arguments
+            ) == create_story_prompt_per_call(*arguments)
+
+            # Best of 3 runs of each assembly
+            per_call = min(
+                timeit.repeat(
+                    lambda: create_story_prompt_per_call(*arguments),
+                    number=NUMBER,
+                    repeat=3,
+                )
+            )
+            precompiled = min(
+                timeit.repeat(
+                    lambda: create_story_prompt(*arguments),
+                    number=NUMBER,
+                    repeat=3,
+                )
+            )
+
+        print(
+            f"\nAssembly of the story prompt ({NUMBER} prompts):"
+            f"\n  per call:    {per_call / NUMBER * 1e6:.2f} µs per prompt"
+            f"\n  precompiled: {precompiled / NUMBER * 1e6:.2f} µs per prompt"
+        )
+
+    @staticmethod
+    def test_story_parsing(
+        app: Flask, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the story is parsed the same with the precompiled
+        patterns, without compiling them.
+        """
+
+        def fail(*args, **kwargs):
+            raise AssertionError("A pattern was compiled")
+
+        with app.app_context():
+            expected = extract_story_components_per_call(dummy_story)
+
+            monkeypatch.setattr(re, "compile", fail)
+            assert extract_story_components(dummy_story) == expected
@@ -0,0 +1,117 @@
+"""
+This module contains benchmarks of the persistence of a generated story and
+its chapters.
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import exists
+
+from api.database.inserts import insert_story
+from api.database.models import db, Child, Story, Chapter
+from api.storage.images import ProcessedImage, store_processed_image
+
+
+def insert_story_per_row(
+    child_id: str, chapter_titles: list[str], images: list[bytes]
+) -> Story:
+    """
+    The previous insert_story: a SELECT checking the child, a flush of the
+    story to get its ID, then the chapters added one at a time.
+    """
+    if not db.session.query(
+        exists().where(Child.child_id == child_id)
+    ).scalar():
+        raise ValueError(f"Child with ID '{child_id}' does not exist")
+
+    stored_images = [
+        store_processed_image(ProcessedImage(image, {})) for image in images
+    ]
+
+    story = Story(child_id, "Title", "Topic", "Cartoon", "Fantasy")
+    db.session.add(story)
+    db.session.flush()
+
+    for i, (title, (image_key, _)) in enumerate(
+        zip(chapter_titles, stored_images), 1
+    ):
+        db.session.add(
+            Chapter(story.story_id, title, "Content " * 50, image_key, i)
+        )
+
+    db.session.commit()
+    return story
+
+
+def insert_story_bulk(
+    child_id: str, chapter_titles: list[str], images: list[bytes]
+) -> Story:
+    """
+    The bulk insert_story.
+    """
+    return insert_story(
+        child_id=child_id,
+        title="Title",
+        topic="Topic",
+        image_style="Cartoon",
+        story_genre="Fantasy",
+        chapter_titles=chapter_titles,
+        chapter_contents=["Content " * 50] * len(chapter_titles),
+        images=images,
+    )
+
+
+@pytest.mark.benchmark
+class TestStoryPersistenceBenchmark:
+    """
+    Compare the per-row persistence of a story with the bulk persistence.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("chapters", [5, 20, 100])
+    def test_bulk_insert(
+        app: Flask,
+        child: Child,
+        image_bytes: bytes,
+        count_queries,
+        chapters: int,
+    ) -> None:
+        """
+        Test that the bulk persistence runs fewer statements, a constant
+        number of them whatever the number of chapters (5, 20 and 100).
+        """
+        chapter_titles = [f"Chapter {i}" for i in range(1, chapters + 1)]
+        images = [image_bytes] * chapters
+
+        with app.app_context():
+            try:
+                with count_queries() as per_row_statements:
+                    insert_story_per_row(
+                        child.child_id, chapter_titles, images
+                    )
+                with count_queries() as bulk_statements:
+                    insert_story_bulk(child.child_id, chapter_titles, images)
+
+                # The child is checked by the INSERT of the story
+                assert len(bulk_statements) < len(per_row_statements)
+                assert not any(
+                    statement.lstrip().upper().startswith("SELECT")
+                    for statement in bulk_statements
+                )
+
+                # The story and its chapters are inserted in one statement
+                # each, whatever the number of chapters
+                inserts = [
+                    statement
+                    for statement in bulk_statements
+                    if statement.lstrip().upper().startswith("INSERT")
+                ]
+                assert len(inserts) == 2
+            finally:
+                story_ids = [
+                    story.story_id
+                    for story in Story.query.filter_by(child_id=child.child_id)
+                ]
+                Chapter.query.filter(Chapter.story_id.in_(story_ids)).delete()
+                Story.query.filter(Story.story_id.in_(story_ids)).delete()
+                db.session.commit()
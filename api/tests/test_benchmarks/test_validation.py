@@ -0,0 +1,124 @@
+"""
+This module contains benchmarks of the validation of the child payloads, run
+on every request adding or modifying a child.
+"""
+
+import timeit
+import pytest
+
+from api.database.schemas import CHILD_SCHEMA
+from api.functions.input_validation import (
+    validate_allowed_value,
+    validate_non_empty_string,
+    validate_type,
+)
+
+# Payload of a child
+CHILD = {
+    "name": "Benchmark",
+    "age_range": "7-9",
+    "sex": "Female",
+    "eye_color": "Amber",
+    "hair_type": "Kinky",
+    "hair_color": "Bald",
+    "ethnicity": "White",
+    "fav_animals": "Cats",
+    "fav_activities": None,
+    "fav_shows": "Cartoons",
+}
+
+# Number of validations timed per run
+NUMBER = 10_000
+
+
+def validate_per_call(payload: dict) -> None:
+    """
+    The previous validation of insert_child, with the lists of allowed values
+    rebuilt on every call and scanned linearly.
+    """
+    valid_age_ranges = ["0-3", "4-6", "7-9", "10-13"]
+    valid_sexes = ["Male", "Female"]
+    valid_eye_colors = ["Blue", "Brown", "Green", "Hazel", "Amber", "Gray"]
+    valid_hair_types = ["Straight", "Wavy", "Curly", "Kinky", "Bald"]
+    valid_hair_colors = [
+        "Blonde",
+        "Brown",
+        "Black",
+        "Red",
+        "Auburn",
+        "Gray",
+        "White",
+        "Bald",
+    ]
+
+    validate_non_empty_string(payload["name"], "name")
+    validate_non_empty_string(payload["age_range"], "age_range")
+    validate_non_empty_string(payload["sex"], "sex")
+    validate_non_empty_string(payload["eye_color"], "eye_color")
+    validate_non_empty_string(payload["hair_type"], "hair_type")
+    validate_non_empty_string(payload["hair_color"], "hair_color")
+    validate_non_empty_string(payload["ethnicity"], "ethnicity")
+
+    validate_type(payload["fav_animals"], [str], "fav_animals", True)
+    validate_type(payload["fav_activities"], [str], "fav_activities", True)
+    validate_type(payload["fav_shows"], [str], "fav_shows", True)
+
+    validate_allowed_value(payload["age_range"], valid_age_ranges, "age_range")
+    validate_allowed_value(payload["sex"], valid_sexes, "sex")
+    validate_allowed_value(payload["eye_color"], valid_eye_colors, "eye_color")
+    validate_allowed_value(payload["hair_type"], valid_hair_types, "hair_type")
+    validate_allowed_value(
+        payload["hair_color"], valid_hair_colors, "hair_color"
+    )
+
+
+@pytest.mark.benchmark
+class TestValidationBenchmark:
+    """
+    Compare the per-call validation with the compiled validators of the
+    schema registry.
+    """
+
+    @staticmethod
+    def test_valid_payload() -> None:
+        """
+        Test that a valid payload is accepted by both validations, and
+        report the time of both (not asserted, it depends on the machine).
+        """
+        validate_per_call(CHILD)
+
+        assert CHILD_SCHEMA.get_errors(CHILD) == {}
+        CHILD_SCHEMA.validate(CHILD)
+
+        # Best of 3 runs of each validation
+        per_call = min(
+            timeit.repeat(
+                lambda: validate_per_call(CHILD), number=NUMBER, repeat=3
+            )
+        )
+        compiled = min(
+            timeit.repeat(
+                lambda: CHILD_SCHEMA.validate(CHILD), number=NUMBER, repeat=3
+            )
+        )
+
+        print(
+            f"\nValidation of a child payload ({NUMBER} calls):"
+            f"\n  per call: {per_call / NUMBER * 1e6:.2f} µs per payload"
+            f"\n  compiled: {compiled / NUMBER * 1e6:.2f} µs per payload"
+        )
+
+    @staticmethod
+    def test_invalid_payload() -> None:
+        """
+        Test that all the errors of an invalid payload are collected (the
+        per-call validation stops at the first one).
+        """
+        payload = {**CHILD, "sex": "Other", "hair_color": "Green"}
+
+        with pytest.raises(ValueError) as exc_info:
+            validate_per_call(payload)
+
+        errors = CHILD_SCHEMA.get_errors(payload)
+        assert set(errors) == {"sex", "hair_color"}
+        assert str(exc_info.value) == errors["sex"]
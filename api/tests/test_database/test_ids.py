@@ -0,0 +1,156 @@
+"""
+This module contains tests for the IDs of the entries.
+"""
+
+import time
+import uuid
+import pytest
+from flask import Flask
+from sqlalchemy import inspect
+
+from api.database.ids import UUIDHex, uuid7
+from api.database.models import db, Child
+from api.database.utilities import generate_id
+from api.database.inserts import insert_child
+from api.functions.input_validation import is_valid_id
+
+
+class TestUUID7:
+    """
+    Test the uuid7 function.
+    """
+
+    @staticmethod
+    def test_version_and_variant() -> None:
+        """
+        Test that the UUIDs have the version 7 and the RFC variant.
+        """
+        value = uuid7()
+
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+    @staticmethod
+    def test_timestamp() -> None:
+        """
+        Test that the UUIDs start with the current Unix time in milliseconds.
+        """
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+
+        assert before <= value.int >> 80 <= after
+
+    @staticmethod
+    def test_ordered() -> None:
+        """
+        Test that the UUIDs generated in later milliseconds sort after the
+        earlier ones.
+        """
+        first = uuid7()
+        time.sleep(0.002)
+        second = uuid7()
+
+        assert first.hex < second.hex
+
+    @staticmethod
+    def test_unique() -> None:
+        """
+        Test that the UUIDs generated in the same millisecond are unique.
+        """
+        assert len({uuid7() for _ in range(1000)}) == 1000
+
+
+class TestGenerateId:
+    """
+    Test the generate_id function.
+    """
+
+    @staticmethod
+    def test_format() -> None:
+        """
+        Test that the IDs are valid 32 character hex strings.
+        """
+        new_id = generate_id()
+
+        assert len(new_id) == 32
+        assert is_valid_id(new_id)
+        assert uuid.UUID(new_id).version == 7
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "nonexistent",
+            "0" * 31,
+            "0" * 33,
+            "G" * 32,
+            "A" * 32,
+            str(uuid.uuid4()),
+            None,
+            1,
+        ],
+    )
+    def test_invalid(value) -> None:
+        """
+        Test that the malformed IDs are not valid.
+        """
+        assert not is_valid_id(value)
+
+
+class TestUUIDHex:
+    """
+    Test the UUIDHex column type.
+    """
+
+    @staticmethod
+    def test_columns(app: Flask) -> None:
+        """
+        Test that the ID columns are UUIDs (32 characters on SQLite).
+        """
+        with app.app_context():
+            assert isinstance(Child.__table__.c.child_id.type, UUIDHex)
+            assert isinstance(Child.__table__.c.parent_id.type, UUIDHex)
+
+            columns = {
+                column["name"]: column["type"]
+                for column in inspect(db.engine).get_columns("children")
+            }
+            assert "32" in str(columns["child_id"])
+
+    @staticmethod
+    def test_round_trip(app: Flask, child: Child) -> None:
+        """
+        Test that the IDs are read back as 32 character hex strings.
+        """
+        with app.app_context():
+            child_id, parent_id = (
+                db.session.query(Child.child_id, Child.parent_id)
+                .filter_by(child_id=child.child_id)
+                .one()
+            )
+
+            assert child_id == child.child_id
+            assert parent_id == child.parent_id
+            assert is_valid_id(child_id)
+            assert is_valid_id(parent_id)
+
+    @staticmethod
+    def test_malformed_id(app: Flask) -> None:
+        """
+        Test that a malformed parent ID is reported as nonexistent (instead
+        of failing to be bound to the UUID column).
+        """
+        with app.app_context():
+            with pytest.raises(ValueError, match="does not exist"):
+                insert_child(
+                    parent_id="nonexistent",
+                    name="Child",
+                    image=b"imagebytes",
+                    age_range="4-6",
+                    sex="Female",
+                    eye_color="Blue",
+                    hair_type="Curly",
+                    hair_color="Blonde",
+                    ethnicity="Asian",
+                )
@@ -4,11 +4,21 @@ This module contains tests for the database inserts.
 
 import pytest
 from flask import Flask
+from sqlalchemy.exc import SQLAlchemyError
 from typing import Any
 
-from api.database.inserts import insert_parent, insert_child, insert_story
-from api.database.models import Parent, Child, Story
+from api.database import inserts
+from api.database.inserts import (
+    insert_parent,
+    insert_child,
+    insert_children,
+    insert_story,
+    validate_children,
+)
+from api.database.models import db, Parent, Child, GenerationJob, Story
 from api.extensions import bcrypt
+from api.storage.blob_store import compute_blob_key, get_blob_store
+from api.storage.images import StoredImage
 
 
 class TestInsertParent:
@@ -189,7 +199,7 @@ class TestInsertChild:
         """
         with app.app_context():
             name = "ChildSuccess"
-            image = "base64imagestring=="
+            image = b"imagebytes"
             age_range = "0-3"
             sex = "Male"
             eye_color = "Amber"
@@ -222,7 +232,8 @@ class TestInsertChild:
             assert child is not None
             assert child.parent_id == parent.user_id
             assert child.name == name
-            assert child.image == image
+            assert child.image == compute_blob_key(image)
+            assert get_blob_store().get(child.image) == image
             assert child.age_range == age_range
             assert child.sex == sex
             assert child.eye_color == eye_color
@@ -245,7 +256,7 @@ class TestInsertChild:
                 insert_child(
                     parent_id="non_existing_id",
                     name="Child",
-                    image="base64imagestring==",
+                    image=b"imagebytes",
                     age_range="4-6",
                     sex="Male",
                     eye_color="Blue",
@@ -258,6 +269,120 @@ class TestInsertChild:
                 exc_info.value
             )
 
+    @staticmethod
+    def test_stored_image(
+        app: Flask, parent: Parent, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a child inserted with a stored image keeps its keys,
+        without storing the image again.
+        """
+        with app.app_context():
+            blob_store = get_blob_store()
+            image = StoredImage(
+                blob_store.put(b"stored image"),
+                {"128": blob_store.put(b"stored thumbnail")},
+            )
+            monkeypatch.setattr(blob_store, "put", None)
+
+            child = insert_child(
+                parent_id=parent.user_id,
+                name="StoredChild",
+                image=image,
+                age_range="4-6",
+                sex="Male",
+                eye_color="Green",
+                hair_type="Wavy",
+                hair_color="Brown",
+                ethnicity="Asian",
+            )
+
+            assert child.image == image.key
+            assert child.thumbnails == image.thumbnails
+
+    @staticmethod
+    def test_pending(app: Flask, parent: Parent) -> None:
+        """
+        Test that a child with a placeholder image is inserted with the job
+        generating its portrait.
+        """
+        with app.app_context():
+            child = insert_child(
+                parent_id=parent.user_id,
+                name="PendingChild",
+                image=b"placeholder",
+                age_range="4-6",
+                sex="Male",
+                eye_color="Green",
+                hair_type="Wavy",
+                hair_color="Brown",
+                ethnicity="Asian",
+                image_status="pending",
+            )
+
+            try:
+                job = GenerationJob.query.filter_by(
+                    child_id=child.child_id
+                ).one()
+                assert job.kind == "portrait"
+                assert job.parent_id == parent.user_id
+                assert job.status == "queued"
+            finally:
+                GenerationJob.query.filter_by(child_id=child.child_id).delete()
+                db.session.delete(child)
+                db.session.commit()
+
+    @staticmethod
+    def test_pending_failure(
+        app: Flask, parent: Parent, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the child is not inserted when its job cannot be queued.
+        """
+
+        def fail(parent_id, child_ids):
+            raise SQLAlchemyError("The job insert failed")
+
+        monkeypatch.setattr(inserts, "add_portrait_jobs", fail)
+
+        with app.app_context():
+            with pytest.raises(SQLAlchemyError):
+                insert_child(
+                    parent_id=parent.user_id,
+                    name="FailedPendingChild",
+                    image=b"placeholder",
+                    age_range="4-6",
+                    sex="Male",
+                    eye_color="Green",
+                    hair_type="Wavy",
+                    hair_color="Brown",
+                    ethnicity="Asian",
+                    image_status="pending",
+                )
+
+            assert (
+                Child.query.filter_by(name="FailedPendingChild").count() == 0
+            )
+
+    @staticmethod
+    def test_invalid_stored_image(app: Flask, parent: Parent) -> None:
+        """
+        Test that a stored image with a malformed key is rejected.
+        """
+        with app.app_context():
+            with pytest.raises(ValueError, match="Invalid blob key"):
+                insert_child(
+                    parent_id=parent.user_id,
+                    name="StoredChild",
+                    image=StoredImage("../portrait", {}),
+                    age_range="4-6",
+                    sex="Male",
+                    eye_color="Green",
+                    hair_type="Wavy",
+                    hair_color="Brown",
+                    ethnicity="Asian",
+                )
+
     @staticmethod
     def test_optional_values(app: Flask, parent: Parent) -> None:
         """
@@ -270,7 +395,7 @@ class TestInsertChild:
             insert_child(
                 parent_id=parent.user_id,
                 name=name,
-                image="base64imagestring==",
+                image=b"imagebytes",
                 age_range="4-6",
                 sex="Male",
                 eye_color="Green",
@@ -292,7 +417,7 @@ class TestInsertChild:
         [
             (
                 123,
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -318,7 +443,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 123,
                 "Female",
                 "Brown",
@@ -331,7 +456,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 123,
                 "Brown",
@@ -344,7 +469,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 123,
@@ -357,7 +482,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -370,7 +495,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -383,7 +508,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -396,7 +521,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -409,7 +534,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -422,7 +547,7 @@ class TestInsertChild:
             ),
             (
                 "Name",
-                "valid_image",
+                b"valid_image",
                 "4-6",
                 "Female",
                 "Brown",
@@ -531,7 +656,7 @@ class TestInsertChild:
                 insert_child(
                     parent.user_id,
                     "InvalidChild",
-                    "base64imagestring==",
+                    b"imagebytes",
                     age_range,
                     sex,
                     eye_color,
@@ -549,7 +674,7 @@ class TestInsertChild:
                 "name",
                 {
                     "name": "",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "4-6",
                     "sex": "Male",
                     "eye_color": "Brown",
@@ -562,7 +687,7 @@ class TestInsertChild:
                 "image",
                 {
                     "name": "Bob",
-                    "image": "",
+                    "image": b"",
                     "age_range": "4-6",
                     "sex": "Male",
                     "eye_color": "Brown",
@@ -575,7 +700,7 @@ class TestInsertChild:
                 "age_range",
                 {
                     "name": "Bob",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "",
                     "sex": "Male",
                     "eye_color": "Brown",
@@ -588,7 +713,7 @@ class TestInsertChild:
                 "sex",
                 {
                     "name": "Bob",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "4-6",
                     "sex": "",
                     "eye_color": "Brown",
@@ -601,7 +726,7 @@ class TestInsertChild:
                 "eye_color",
                 {
                     "name": "Bob",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "4-6",
                     "sex": "Male",
                     "eye_color": "",
@@ -614,7 +739,7 @@ class TestInsertChild:
                 "hair_type",
                 {
                     "name": "Bob",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "4-6",
                     "sex": "Male",
                     "eye_color": "Brown",
@@ -627,7 +752,7 @@ class TestInsertChild:
                 "hair_color",
                 {
                     "name": "Bob",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "4-6",
                     "sex": "Male",
                     "eye_color": "Brown",
@@ -640,7 +765,7 @@ class TestInsertChild:
                 "ethnicity",
                 {
                     "name": "Bob",
-                    "image": "base64imagestring==",
+                    "image": b"imagebytes",
                     "age_range": "4-6",
                     "sex": "Male",
                     "eye_color": "Brown",
@@ -672,6 +797,198 @@ class TestInsertChild:
             assert empty_field in str(exc_info.value)
 
 
+class TestValidateChildren:
+    """
+    This class contains tests for the validate_children function.
+    """
+
+    # Attributes of a valid child
+    CHILD = {
+        "name": "Batch",
+        "age_range": "4-6",
+        "sex": "Female",
+        "eye_color": "Green",
+        "hair_type": "Wavy",
+        "hair_color": "Red",
+        "ethnicity": "White",
+        "fav_animals": None,
+        "fav_activities": "Drawing",
+        "fav_shows": None,
+    }
+
+    @staticmethod
+    def test_valid() -> None:
+        """
+        Test that valid children have no errors.
+        """
+        assert validate_children([TestValidateChildren.CHILD] * 3) == {}
+
+    @staticmethod
+    def test_invalid(app: Flask) -> None:
+        """
+        Test that the errors of every invalid child are returned.
+        """
+        child = TestValidateChildren.CHILD
+        children = [
+            child,
+            {**child, "name": " "},
+            {**child, "sex": "Other", "eye_color": "Purple"},
+            {**child, "fav_shows": 3},
+            {key: value for key, value in child.items() if key != "ethnicity"},
+        ]
+
+        with app.app_context():
+            errors = validate_children(children)
+
+        assert set(errors) == {1, 2, 3, 4}
+        assert errors[1] == "name must be a non-empty string."
+        assert errors[2].startswith("Invalid value for sex: Other.")
+        assert "Invalid value for eye_color: Purple." in errors[2]
+        assert errors[3].startswith("fav_shows must be of type str")
+        assert errors[4] == "ethnicity must not be None."
+
+
+class TestInsertChildren:
+    """
+    This class contains tests for the insert_children function.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, parent: Parent, count_queries) -> None:
+        """
+        Test that the children are inserted in one statement, with their
+        shared image stored once, and the jobs of their portraits in
+        another.
+        """
+        children = [
+            {
+                **TestValidateChildren.CHILD,
+                "name": f"Batch {i}",
+                "image": b"shared image",
+                "image_status": "pending",
+            }
+            for i in range(3)
+        ] + [
+            {
+                **TestValidateChildren.CHILD,
+                "name": "Batch portrait",
+                "image": b"portrait image",
+                "thumbnails": {128: b"portrait thumbnail"},
+            }
+        ]
+
+        with app.app_context():
+            try:
+                with count_queries() as statements:
+                    inserted = insert_children(parent.user_id, children)
+
+                inserts = [
+                    statement
+                    for statement in statements
+                    if statement.lstrip().upper().startswith("INSERT")
+                ]
+                assert len(inserts) == 2
+
+                # A portrait job is queued per pending child
+                assert {
+                    job.child_id
+                    for job in GenerationJob.query.filter_by(kind="portrait")
+                } == {child.child_id for child in inserted[:3]}
+
+                # The children are returned without being reloaded
+                with count_queries() as statements:
+                    names = [child.name for child in inserted]
+                    images = {child.image for child in inserted}
+                assert not statements
+                assert names == [child["name"] for child in children]
+                assert images == {
+                    compute_blob_key(b"shared image"),
+                    compute_blob_key(b"portrait image"),
+                }
+
+                stored = Child.query.filter(
+                    Child.child_id.in_([child.child_id for child in inserted])
+                ).all()
+                assert len(stored) == 4
+                assert {child.image_status for child in stored} == {
+                    "pending",
+                    "ready",
+                }
+                assert inserted[3].thumbnails == {
+                    "128": compute_blob_key(b"portrait thumbnail")
+                }
+            finally:
+                GenerationJob.query.filter_by(kind="portrait").delete()
+                Child.query.filter(
+                    Child.name.in_([child["name"] for child in children])
+                ).delete()
+                db.session.commit()
+
+    @staticmethod
+    def test_stored_image(app: Flask, parent: Parent) -> None:
+        """
+        Test that the children inserted with a stored image keep its keys.
+        """
+        with app.app_context():
+            image = StoredImage(get_blob_store().put(b"stored image"), {})
+            children = [
+                {
+                    **TestValidateChildren.CHILD,
+                    "name": f"Stored {i}",
+                    "image": image,
+                }
+                for i in range(2)
+            ]
+
+            try:
+                inserted = insert_children(parent.user_id, children)
+
+                assert [child.image for child in inserted] == [image.key] * 2
+                assert [child.thumbnails for child in inserted] == [None] * 2
+            finally:
+                Child.query.filter(
+                    Child.name.in_([child["name"] for child in children])
+                ).delete()
+                db.session.commit()
+
+    @staticmethod
+    def test_invalid_child(app: Flask, parent: Parent) -> None:
+        """
+        Test that no child is inserted when one of them is invalid.
+        """
+        children = [
+            {**TestValidateChildren.CHILD, "image": b"image"},
+            {**TestValidateChildren.CHILD, "image": b"image", "sex": "Other"},
+        ]
+
+        with app.app_context():
+            count = Child.query.count()
+
+            with pytest.raises(ValueError) as e:
+                insert_children(parent.user_id, children)
+
+            assert str(e.value).startswith(
+                "Invalid child at index 1: Invalid value for sex: Other."
+            )
+            assert Child.query.count() == count
+
+    @staticmethod
+    def test_parent_does_not_exist(app: Flask) -> None:
+        """
+        Test insertion of children with a non-existing parent ID.
+        """
+        with app.app_context():
+            with pytest.raises(ValueError) as e:
+                insert_children(
+                    "nonexistent",
+                    [{**TestValidateChildren.CHILD, "image": b"image"}],
+                )
+
+            assert (
+                str(e.value) == "Parent with ID 'nonexistent' does not exist."
+            )
+
+
 class TestInsertStory:
     """
     This class contains tests for the insert_story function.
@@ -694,7 +1011,7 @@ class TestInsertStory:
                 story_genre="Adventure",
                 chapter_titles=["Chapter Title"] * 5,
                 chapter_contents=["Chapter Content"] * 5,
-                images=["base64imagestring=="] * 5,
+                images=[b"imagebytes"] * 5,
             )
 
             assert Story.query.filter_by(title=title).first() is not None
@@ -702,6 +1019,54 @@ class TestInsertStory:
                 len(Story.query.filter_by(title=title).first().chapters) == 5
             )
 
+    @staticmethod
+    def test_thumbnails(app: Flask, child: Child) -> None:
+        """
+        Test that the thumbnails of the chapter images are stored.
+        """
+        with app.app_context():
+            story = insert_story(
+                child_id=child.child_id,
+                title="A Story With Thumbnails",
+                topic="Travelling",
+                image_style="Cartoon",
+                story_genre="Adventure",
+                chapter_titles=["Chapter 1", "Chapter 2"],
+                chapter_contents=["Content 1", "Content 2"],
+                images=[b"image 1", b"image 2"],
+                thumbnails=[{128: b"thumbnail 1"}, {}],
+            )
+
+            first, second = story.chapters
+            assert first.thumbnails == {
+                "128": compute_blob_key(b"thumbnail 1")
+            }
+            assert get_blob_store().get(first.thumbnails["128"]) == (
+                b"thumbnail 1"
+            )
+            assert second.thumbnails is None
+
+    @staticmethod
+    def test_mismatched_thumbnails(app: Flask, child: Child) -> None:
+        """
+        Test insertion of a story with thumbnails missing for an image.
+        """
+        with app.app_context():
+            with pytest.raises(ValueError) as exc_info:
+                insert_story(
+                    child_id=child.child_id,
+                    title="Mismatched Thumbnails",
+                    topic="Adventure",
+                    image_style="Cartoon",
+                    story_genre="Adventure",
+                    chapter_titles=["Chapter 1", "Chapter 2"],
+                    chapter_contents=["Content 1", "Content 2"],
+                    images=[b"imagebytes"] * 2,
+                    thumbnails=[{}],
+                )
+
+            assert "Lists of images and thumbnails" in str(exc_info.value)
+
     @pytest.mark.parametrize(
         "image_style,story_genre",
         [
@@ -733,7 +1098,7 @@ class TestInsertStory:
                     story_genre=story_genre,
                     chapter_titles=["Chapter Title"],
                     chapter_contents=["Chapter Content"],
-                    images=["base64imagestring=="],
+                    images=[b"imagebytes"],
                 )
 
             assert "invalid value" in str(exc_info.value).lower()
@@ -757,7 +1122,7 @@ class TestInsertStory:
                 [None, "Valid Content"],
             ),
             # Second image is None
-            ("images", ["base64imagestring==", None]),
+            ("images", [b"imagebytes", None]),
         ],
     )
     def test_none_values(
@@ -775,7 +1140,7 @@ class TestInsertStory:
                 "story_genre": "Adventure",
                 "chapter_titles": ["Chapter 1", "Chapter 2"],
                 "chapter_contents": ["Content 1", "Content 2"],
-                "images": ["base64imagestring=="] * 2,
+                "images": [b"imagebytes"] * 2,
             }
 
             # Dynamically set the field to the value for the test case
@@ -798,7 +1163,7 @@ class TestInsertStory:
                 ["", "Valid Content"],
             ),
             # Empty image
-            ("images", ["base64imagestring==", ""]),
+            ("images", [b"imagebytes", b""]),
         ],
     )
     def test_empty_chapter_strings(
@@ -817,7 +1182,7 @@ class TestInsertStory:
                     "story_genre": "Adventure",
                     "chapter_titles": ["Chapter 1", "Chapter 2"],
                     "chapter_contents": ["Content 1", "Content 2"],
-                    "images": ["base64imagestring=="] * 2,
+                    "images": [b"imagebytes"] * 2,
                 }
 
                 # Dynamically set the field to the value for the test case
@@ -847,7 +1212,7 @@ class TestInsertStory:
                         "Content 1",
                         "Content 2",
                     ],
-                    images=["base64imagestring=="] * 2,
+                    images=[b"imagebytes"] * 2,
                 )
 
             assert "must have the same length" in str(exc_info.value)
@@ -867,7 +1232,7 @@ class TestInsertStory:
                     story_genre="Fantasy",
                     chapter_titles=["Chapter 1"],
                     chapter_contents=["Content 1"],
-                    images=["base64imagestring=="],
+                    images=[b"imagebytes"],
                 )
 
             assert (
@@ -885,7 +1250,7 @@ class TestInsertStory:
                 "Adventure",
                 ["Chapter 1"],
                 ["Content 1"],
-                ["base64imagestring=="],
+                [b"imagebytes"],
             ),
             (
                 "Story",
@@ -894,7 +1259,7 @@ class TestInsertStory:
                 "Adventure",
                 ["Chapter 1"],
                 ["Content 1"],
-                ["base64imagestring=="],
+                [b"imagebytes"],
             ),
             (
                 "Story",
@@ -903,7 +1268,7 @@ class TestInsertStory:
                 "Adventure",
                 ["Chapter 1"],
                 ["Content 1"],
-                ["base64imagestring=="],
+                [b"imagebytes"],
             ),
             (
                 "Story",
@@ -912,7 +1277,7 @@ class TestInsertStory:
                 123,
                 ["Chapter 1"],
                 ["Content 1"],
-                ["base64imagestring=="],
+                [b"imagebytes"],
             ),
             (
                 "Story",
@@ -921,7 +1286,7 @@ class TestInsertStory:
                 "Adventure",
                 [123],
                 ["Content 1"],
-                ["base64imagestring=="],
+                [b"imagebytes"],
             ),
             (
                 "Story",
@@ -930,7 +1295,7 @@ class TestInsertStory:
                 "Adventure",
                 ["Chapter 1"],
                 [123],
-                ["base64imagestring=="],
+                [b"imagebytes"],
             ),
             (
                 "Story",
@@ -1001,7 +1366,7 @@ class TestInsertStory:
                 "story_genre": "Adventure",
                 "chapter_titles": ["Chapter 1"],
                 "chapter_contents": ["Content 1"],
-                "images": ["base64imagestring=="],
+                "images": [b"imagebytes"],
             }
 
             # Dynamically set the field to the empty value for the test case
@@ -1039,7 +1404,7 @@ class TestInsertStory:
                     "story_genre": "Adventure",
                     "chapter_titles": ["Chapter 1", "Chapter 2"],
                     "chapter_contents": ["Content 1", "Content 2"],
-                    "images": ["base64imagestring=="] * 2,
+                    "images": [b"imagebytes"] * 2,
                 }
 
                 # Dynamically set the field to the value for the test case
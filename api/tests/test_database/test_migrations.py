@@ -0,0 +1,350 @@
+"""
+This module contains tests for the database migrations.
+"""
+
+import io
+import pytest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, call
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+
+from api import create_app
+from api.config import TestingConfig
+from api.database.migrations import (
+    BASELINE_REVISION,
+    connect_for_migrations,
+    create_index_concurrently,
+    drop_index_concurrently,
+    get_alembic_config,
+    upgrade_database,
+)
+from api.database.models import db
+
+# Baseline IDs (text, generated with uuid4().hex before the migrations)
+PARENT_ID = "0f8fad5bd9cb469fa16570867728950e"
+CHILD_ID = "7c9e6679742540de944be07fc1f90ae7"
+STORY_ID = "16fd2706a88e4e3fbd2d7b7b2c6e1bc5"
+CHAPTER_ID = "c9bf9e57a1a84d0ab5e4ef9b4c7d2d2b"
+
+
+@pytest.fixture
+def engine(tmp_path) -> Engine:
+    """
+    An engine of an empty SQLite database.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.sqlite'}")
+    yield engine
+    engine.dispose()
+
+
+def get_revision(engine: Engine) -> str | None:
+    """
+    Get the revision of the schema of a database.
+    """
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def get_head() -> str:
+    """
+    Get the latest revision of the migrations.
+    """
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+
+def get_differences(engine: Engine) -> list:
+    """
+    Get the differences between the schema of a database and the models.
+    """
+    with engine.connect() as connection:
+        return compare_metadata(
+            MigrationContext.configure(connection), db.metadata
+        )
+
+
+def create_baseline_schema(engine: Engine) -> None:
+    """
+    Create the schema of the baseline (created by db.create_all before the
+    migrations, so without its revision), with a parent, a child, a story
+    and a chapter.
+    """
+    with engine.connect() as connection:
+        command.upgrade(get_alembic_config(connection), BASELINE_REVISION)
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE alembic_version")
+        connection.exec_driver_sql(
+            "INSERT INTO parents VALUES "
+            f"('{PARENT_ID}', 'First', 'Last', 'hash', 'parent@example.com')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO children (child_id, parent_id, name, image, "
+            "age_range, sex, eye_color, hair_type, hair_color, ethnicity) "
+            f"VALUES ('{CHILD_ID}', '{PARENT_ID}', 'Child', 'image', '4-6', "
+            "'Male', 'Blue', 'Wavy', 'Red', 'Asian')"
+        )
+        connection.exec_driver_sql(
+            f"INSERT INTO stories VALUES ('{STORY_ID}', '{CHILD_ID}', "
+            "'Title', 'Topic', 'Cartoon', 'Fantasy', '2024-01-01 00:00:00')"
+        )
+        connection.exec_driver_sql(
+            f"INSERT INTO chapters VALUES ('{CHAPTER_ID}', '{STORY_ID}', "
+            "'Title', 'Content', 'image', 1)"
+        )
+
+
+class TestUpgradeDatabase:
+    """
+    Test the upgrade_database function.
+    """
+
+    @staticmethod
+    def test_empty_database(engine: Engine) -> None:
+        """
+        Test that upgrading an empty database creates the schema of the
+        models.
+        """
+        with engine.connect() as connection:
+            upgrade_database(connection)
+
+        assert get_differences(engine) == []
+        assert get_revision(engine) == get_head()
+
+    @staticmethod
+    def test_unversioned_database(engine: Engine) -> None:
+        """
+        Test that a schema created by db.create_all before the migrations is
+        adopted (stamped with the baseline revision) and upgraded to the
+        schema of the models, with its entries kept.
+        """
+        create_baseline_schema(engine)
+
+        with engine.connect() as connection:
+            upgrade_database(connection)
+
+        assert get_differences(engine) == []
+        assert get_revision(engine) == get_head()
+
+        with engine.connect() as connection:
+            children = connection.exec_driver_sql(
+                "SELECT child_id, parent_id, image_status, created_at "
+                "FROM children"
+            ).all()
+            chapters = connection.exec_driver_sql(
+                "SELECT chapter_id, story_id, thumbnails FROM chapters"
+            ).all()
+
+        assert len(children) == 1
+        assert children[0][:3] == (CHILD_ID, PARENT_ID, "ready")
+        assert children[0][3] is not None
+        assert chapters == [(CHAPTER_ID, STORY_ID, None)]
+
+    @staticmethod
+    def test_downgrade_to_baseline(engine: Engine) -> None:
+        """
+        Test that downgrading an adopted schema to the baseline revision
+        restores the baseline schema, with its entries kept.
+        """
+        create_baseline_schema(engine)
+
+        with engine.connect() as connection:
+            upgrade_database(connection)
+            command.downgrade(
+                get_alembic_config(connection), BASELINE_REVISION
+            )
+
+        assert get_revision(engine) == BASELINE_REVISION
+        assert "generation_jobs" not in inspect(engine).get_table_names()
+        assert "image_status" not in {
+            column["name"]
+            for column in inspect(engine).get_columns("children")
+        }
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql(
+                "SELECT child_id, parent_id FROM children"
+            ).all() == [(CHILD_ID, PARENT_ID)]
+
+    @staticmethod
+    def test_idempotent(engine: Engine) -> None:
+        """
+        Test that upgrading an up-to-date database does nothing.
+        """
+        for _ in range(2):
+            with engine.connect() as connection:
+                upgrade_database(connection)
+
+        assert get_revision(engine) == get_head()
+
+    @staticmethod
+    def test_downgrade(engine: Engine) -> None:
+        """
+        Test that downgrading to the base revision drops the schema.
+        """
+        with engine.connect() as connection:
+            upgrade_database(connection)
+            command.downgrade(get_alembic_config(connection), "base")
+
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+        assert get_revision(engine) is None
+
+
+class TestConnectForMigrations:
+    """
+    Test the connect_for_migrations function.
+    """
+
+    @staticmethod
+    def test_postgresql() -> None:
+        """
+        Test that the statement timeout is disabled while the migrations
+        run on PostgreSQL, and restored after.
+        """
+        engine = MagicMock()
+        connection = engine.connect.return_value.__enter__.return_value
+        connection.dialect.name = "postgresql"
+
+        with connect_for_migrations(engine) as migration_connection:
+            assert migration_connection is connection
+            assert connection.exec_driver_sql.call_args_list == [
+                call("SET statement_timeout = 0")
+            ]
+
+        assert connection.exec_driver_sql.call_args_list[-1] == call(
+            "RESET statement_timeout"
+        )
+
+    @staticmethod
+    def test_other_databases(engine: Engine) -> None:
+        """
+        Test that the connection is used as it is on the other databases.
+        """
+        with connect_for_migrations(engine) as connection:
+            upgrade_database(connection)
+
+        assert get_revision(engine) == get_head()
+
+
+class TestIndexesConcurrently:
+    """
+    Test the create_index_concurrently and drop_index_concurrently
+    functions.
+    """
+
+    @staticmethod
+    def test_postgresql() -> None:
+        """
+        Test that the indexes are built concurrently outside of the
+        transaction of the migration on PostgreSQL.
+        """
+        output = io.StringIO()
+        context = MigrationContext.configure(
+            dialect_name="postgresql",
+            opts={"as_sql": True, "output_buffer": output},
+        )
+
+        with Operations.context(context):
+            context.impl.emit_begin()
+            create_index_concurrently("idx_test", "children", ["name"])
+            drop_index_concurrently("idx_test", "children")
+
+        statements = [
+            statement.strip()
+            for statement in output.getvalue().split(";")
+            if statement.strip()
+        ]
+        assert statements == [
+            "BEGIN",
+            "COMMIT",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_test",
+            "CREATE INDEX CONCURRENTLY idx_test ON children (name)",
+            "BEGIN",
+            "COMMIT",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_test",
+            "BEGIN",
+        ]
+
+    @staticmethod
+    def test_other_databases(engine: Engine) -> None:
+        """
+        Test that the indexes are built by a plain CREATE INDEX on the other
+        databases.
+        """
+        create_baseline_schema(engine)
+
+        with engine.begin() as connection:
+            with Operations.context(MigrationContext.configure(connection)):
+                create_index_concurrently("idx_test", "children", ["name"])
+
+        indexes = inspect(engine).get_indexes("children")
+        assert {"name": "idx_test", "column_names": ["name"]}.items() <= (
+            next(index for index in indexes if index["name"] == "idx_test")
+        ).items()
+
+        with engine.begin() as connection:
+            with Operations.context(MigrationContext.configure(connection)):
+                drop_index_concurrently("idx_test", "children")
+
+        assert "idx_test" not in {
+            index["name"] for index in inspect(engine).get_indexes("children")
+        }
+
+
+class TestCreateApp:
+    """
+    Test that the schema is not created by create_app.
+    """
+
+    @staticmethod
+    def test_no_tables(tmp_path) -> None:
+        """
+        Test that creating the app does not create the tables (the schema is
+        created by "flask db upgrade").
+        """
+
+        class Config(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.sqlite'}"
+
+        app = create_app(Config)
+
+        with app.app_context():
+            assert inspect(db.engine).get_table_names() == []
+            db.engine.dispose()
+
+
+class TestUpgradeCommand:
+    """
+    Test the "flask db upgrade" command.
+    """
+
+    @staticmethod
+    def test_sql() -> None:
+        """
+        Test printing the SQL of the migrations (of PostgreSQL, the batch
+        operations of SQLite need a live database).
+        """
+
+        class Config(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = "postgresql://user:password@db/stories"
+
+        app = create_app(Config)
+
+        output = io.StringIO()
+        with app.app_context(), redirect_stdout(output):
+            result = app.test_cli_runner().invoke(
+                args=["db", "upgrade", "--sql"]
+            )
+        sql = output.getvalue() + result.output
+
+        assert result.exit_code == 0, result.output
+        assert "CREATE TABLE parents" in sql
+        assert 'ALTER COLUMN user_id TYPE UUID USING "user_id"::uuid' in sql
+        assert (
+            "CREATE INDEX CONCURRENTLY idx_children_parent_id_created_at"
+            in sql
+        )
@@ -0,0 +1,95 @@
+"""
+This module contains tests for the pagination helpers.
+"""
+
+import pytest
+from datetime import datetime
+
+from api.database.models import Story
+from api.database.pagination import (
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+    parse_page_arguments,
+)
+
+
+class TestCursor:
+    """
+    Test encoding and decoding the cursors.
+    """
+
+    @staticmethod
+    def test_round_trip() -> None:
+        """
+        Test that a decoded cursor gives back the position of the entry.
+        """
+        created_at = datetime(2024, 4, 1, 12, 30, 15, 123456)
+        entry_id = "a" * 32
+
+        assert decode_cursor(encode_cursor(created_at, entry_id)) == (
+            created_at,
+            entry_id,
+        )
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "cursor", ["", "invalid", "bm90IGpzb24=", "WzFd", "WyJ4IiwgImEiXQ=="]
+    )
+    def test_invalid(cursor: str) -> None:
+        """
+        Test decoding invalid cursors.
+        """
+        with pytest.raises(ValueError) as e:
+            decode_cursor(cursor)
+
+        assert str(e.value) == "Invalid cursor."
+
+
+class TestParsePageArguments:
+    """
+    Test parsing the page arguments.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "args, expected",
+        [
+            ({}, (20, None, None)),
+            ({"limit": "5"}, (5, None, None)),
+            ({"limit": "500"}, (100, None, None)),
+            ({"cursor": "abc"}, (20, "abc", None)),
+            ({"fields": "title, story_id"}, (20, None, ["title", "story_id"])),
+        ],
+    )
+    def test_success(args: dict, expected: tuple) -> None:
+        """
+        Test parsing valid page arguments.
+        """
+        assert (
+            parse_page_arguments(args, Story, default_limit=20, max_limit=100)
+            == expected
+        )
+
+    @staticmethod
+    @pytest.mark.parametrize("limit", ["0", "-1", "ten"])
+    def test_invalid_limit(limit: str) -> None:
+        """
+        Test parsing invalid limits.
+        """
+        with pytest.raises(ValueError) as e:
+            parse_page_arguments(
+                {"limit": limit}, Story, default_limit=20, max_limit=100
+            )
+
+        assert str(e.value) == "limit must be a positive integer."
+
+    @staticmethod
+    def test_invalid_fields() -> None:
+        """
+        Test parsing unknown fields.
+        """
+        with pytest.raises(ValueError) as e:
+            parse_fields("title,chapters", Story)
+
+        assert "Invalid fields: chapters." in str(e.value)
@@ -0,0 +1,212 @@
+"""
+This module contains tests for the database pool settings and metrics.
+"""
+
+import logging
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from api.database.pool import (
+    PoolMetrics,
+    TimedQueuePool,
+    get_pool_metrics,
+    make_engine_options,
+)
+
+# Pool settings of the tests
+CONFIG = {
+    "DATABASE_POOL_SIZE": 4,
+    "DATABASE_MAX_OVERFLOW": 2,
+    "DATABASE_POOL_TIMEOUT": 5.0,
+    "DATABASE_POOL_RECYCLE": 600,
+    "DATABASE_POOL_PRE_PING": True,
+    "DATABASE_STATEMENT_TIMEOUT": 15000,
+}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    A SQLite engine with a timed pool of a single connection.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.sqlite'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+    yield engine
+
+    engine.dispose()
+
+
+class TestMakeEngineOptions:
+    """
+    Test the make_engine_options function.
+    """
+
+    @staticmethod
+    def test_postgresql() -> None:
+        """
+        Test that PostgreSQL gets the sized pool and the statement timeout.
+        """
+        options = make_engine_options(
+            {**CONFIG, "SQLALCHEMY_DATABASE_URI": "postgresql://u:p@db/app"}
+        )
+
+        assert options == {
+            "pool_pre_ping": True,
+            "poolclass": TimedQueuePool,
+            "pool_size": 4,
+            "max_overflow": 2,
+            "pool_timeout": 5.0,
+            "pool_recycle": 600,
+            "connect_args": {"options": "-c statement_timeout=15000"},
+        }
+
+    @staticmethod
+    def test_without_statement_timeout() -> None:
+        """
+        Test that a statement timeout of 0 is not set.
+        """
+        options = make_engine_options(
+            {
+                **CONFIG,
+                "SQLALCHEMY_DATABASE_URI": "postgresql://u:p@db/app",
+                "DATABASE_STATEMENT_TIMEOUT": 0,
+            }
+        )
+
+        assert "connect_args" not in options
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "uri", ["sqlite:///:memory:", "sqlite:///db.sqlite"]
+    )
+    def test_sqlite(uri: str) -> None:
+        """
+        Test that SQLite keeps the pool of its dialect.
+        """
+        options = make_engine_options(
+            {**CONFIG, "SQLALCHEMY_DATABASE_URI": uri}
+        )
+
+        assert options == {"pool_pre_ping": True}
+
+
+class TestPoolMetrics:
+    """
+    Test the PoolMetrics class.
+    """
+
+    @staticmethod
+    def test_checkouts(engine) -> None:
+        """
+        Test that the checkouts, the saturation and the churn are counted.
+        """
+        metrics = PoolMetrics()
+        metrics.attach(engine)
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            assert metrics.snapshot(engine.pool)["checked_out"] == 1
+
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot["checkouts"] == 1
+        assert snapshot["checked_out"] == 0
+        assert snapshot["peak_checked_out"] == 1
+        assert snapshot["capacity"] == 1
+        assert snapshot["saturation"] == 1.0
+        assert snapshot["connects"] == 1
+        assert snapshot["timeouts"] == 0
+
+        # Closing the connections is churn
+        engine.dispose()
+        assert metrics.snapshot(engine.pool)["closes"] == 1
+
+    @staticmethod
+    def test_timeout(engine) -> None:
+        """
+        Test that the time waiting for a connection and the timeouts are
+        recorded.
+        """
+        metrics = PoolMetrics()
+        metrics.attach(engine)
+
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot["timeouts"] == 1
+        assert snapshot["wait_max_ms"] >= 50
+
+    @staticmethod
+    def test_recreated_pool(engine) -> None:
+        """
+        Test that the metrics are kept when the pool is recreated.
+        """
+        metrics = PoolMetrics()
+        metrics.attach(engine)
+
+        engine.dispose()
+        with engine.connect():
+            pass
+
+        assert engine.pool.metrics is metrics
+        assert metrics.waits == 1
+
+    @staticmethod
+    def test_reset(engine) -> None:
+        """
+        Test that a new window keeps the checked out connections only.
+        """
+        metrics = PoolMetrics()
+        metrics.attach(engine)
+
+        with engine.connect():
+            metrics.reset()
+            snapshot = metrics.snapshot(engine.pool)
+
+        assert snapshot["checkouts"] == 0
+        assert snapshot["checked_out"] == 1
+        assert snapshot["peak_checked_out"] == 1
+
+
+class TestReportPoolMetrics:
+    """
+    Test the periodic report of the pool metrics.
+    """
+
+    @staticmethod
+    def test_report(
+        app: Flask,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """
+        Test that the metrics are logged once the interval has elapsed.
+        """
+        monkeypatch.setitem(app.config, "DATABASE_POOL_METRICS_INTERVAL", 60)
+
+        with app.app_context():
+            metrics = get_pool_metrics()
+            metrics.reset()
+
+        with caplog.at_level(logging.INFO, logger=app.logger.name):
+            # Not logged before the interval
+            with app.app_context():
+                pass
+            assert "Database pool:" not in caplog.text
+
+            metrics.started_at -= 60
+            with app.app_context():
+                pass
+
+        assert "Database pool:" in caplog.text
+        assert "checkouts=" in caplog.text
+        assert "wait_max_ms=" in caplog.text
@@ -4,16 +4,21 @@ This module contains tests for the database queries.
 
 import pytest
 from typing import Any
+from sqlalchemy import inspect
 
-from api.database.models import Parent, Child, Story
+from api.database.models import db, Parent, Child, Story, Chapter
 from api.database.queries import (
     get_parent,
     get_child_from_parent,
     child_belongs_to_parent,
+    authenticate_parent,
     check_password,
     get_story,
+    get_chapter,
 )
+from api.database.query_shapes import child_with_image
 from api.database.utilities import generate_id
+from api.extensions import bcrypt
 
 
 class TestGetParent:
@@ -171,6 +176,24 @@ class TestGetChildFromParent:
 
         assert "must be of type str" in str(exc_info.value)
 
+    @staticmethod
+    def test_image_deferred(parent: Parent, child: Child) -> None:
+        """
+        Test that the image is only loaded when requested.
+        """
+        db.session.expire_all()
+
+        retrieved_child = get_child_from_parent(parent.user_id, child.child_id)
+        assert "image" in inspect(retrieved_child).unloaded
+
+        db.session.expire_all()
+
+        retrieved_child = get_child_from_parent(
+            parent.user_id, child.child_id, options=child_with_image()
+        )
+        assert "image" not in inspect(retrieved_child).unloaded
+        assert retrieved_child.image == child.image
+
 
 class TestChildBelongsToParent:
     """
@@ -256,6 +279,90 @@ class TestChildBelongsToParent:
 
         assert "must be of type str" in str(exc_info.value)
 
+    @staticmethod
+    def test_exists_query(parent: Parent, child: Child, count_queries) -> None:
+        """
+        Test that the check is a single EXISTS query.
+        """
+        with count_queries() as statements:
+            assert child_belongs_to_parent(parent.user_id, child.child_id)
+
+        assert len(statements) == 1
+        assert "EXISTS" in statements[0].upper()
+
+
+class TestAuthenticateParent:
+    """
+    Test the authenticate_parent query.
+    """
+
+    @staticmethod
+    def test_success(parent: Parent) -> None:
+        """
+        Test the authenticate_parent query when the password is correct.
+        """
+        authenticated_parent, authenticated = authenticate_parent(
+            parent.email, "password"
+        )
+
+        assert authenticated_parent.user_id == parent.user_id
+        assert authenticated
+
+    @staticmethod
+    def test_no_parent() -> None:
+        """
+        Test the authenticate_parent query when the parent does not exist.
+        """
+        assert authenticate_parent("unused.email@gmail.com", "password") == (
+            None,
+            False,
+        )
+
+    @staticmethod
+    def test_invalid_password(parent: Parent) -> None:
+        """
+        Test the authenticate_parent query when the password is incorrect.
+        """
+        authenticated_parent, authenticated = authenticate_parent(
+            parent.email, "incorrect_password"
+        )
+
+        assert authenticated_parent.user_id == parent.user_id
+        assert not authenticated
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "password, expected_rehash", [("password", True), ("wrong", False)]
+    )
+    def test_rehash(parent: Parent, password: str, expected_rehash: bool):
+        """
+        Test that a password hashed with another cost is hashed again on a
+        successful login only.
+        """
+        old_hash = bcrypt.generate_password_hash("password", 5).decode()
+        legacy_parent = Parent(
+            first_name="Legacy",
+            last_name="Parent",
+            email="legacy.parent@gmail.com",
+            password=old_hash,
+        )
+        db.session.add(legacy_parent)
+        db.session.commit()
+
+        try:
+            authenticate_parent(legacy_parent.email, password)
+
+            db.session.refresh(legacy_parent)
+            assert (legacy_parent.password != old_hash) == expected_rehash
+            assert bcrypt.check_password_hash(
+                legacy_parent.password, "password"
+            )
+            if expected_rehash:
+                assert legacy_parent.password.startswith("$2b$04$")
+        finally:
+            db.session.delete(legacy_parent)
+            db.session.commit()
+
 
 class TestCheckPassword:
     """
@@ -401,3 +508,39 @@ class TestGetStory:
             get_story(input_value)
 
         assert "must be of type str" in str(exc_info.value)
+
+
+class TestGetChapter:
+    """
+    Test the get_chapter query.
+    """
+
+    @staticmethod
+    def test_success(chapter: Chapter) -> None:
+        """
+        Test the get_chapter query when the chapter exists.
+        """
+        retrieved_chapter = get_chapter(chapter.chapter_id)
+
+        assert retrieved_chapter.chapter_id == chapter.chapter_id
+        assert retrieved_chapter.image == chapter.image
+
+    @staticmethod
+    def test_no_chapter() -> None:
+        """
+        Test the get_chapter query when the chapter does not exist.
+        """
+        assert get_chapter(generate_id()) is None
+
+    @staticmethod
+    def test_invalid_input() -> None:
+        """
+        Test the get_chapter query with invalid input.
+        """
+        with pytest.raises(ValueError) as exc_info:
+            get_chapter("invalid_chapter_id")
+
+        assert (
+            "must be a valid UUID hex string but found 'invalid_chapter_id'"
+            in str(exc_info.value)
+        )
@@ -0,0 +1,123 @@
+"""
+This module contains tests for the schema registry.
+"""
+
+import pytest
+from flask_restx import fields
+
+from api.database.models import Child, Story
+from api.database.schemas import (
+    CHILD_SCHEMA,
+    STORY_SCHEMA,
+    NullableString,
+    SchemaValidationError,
+)
+
+# Attributes of a valid child
+CHILD = {
+    "name": "Schema",
+    "age_range": "10-13",
+    "sex": "Male",
+    "eye_color": "Gray",
+    "hair_type": "Kinky",
+    "hair_color": "White",
+    "ethnicity": "Asian",
+    "fav_animals": None,
+    "fav_activities": "Chess",
+}
+
+
+class TestGetErrors:
+    """
+    Test the get_errors and validate methods of the schemas.
+    """
+
+    @staticmethod
+    def test_valid() -> None:
+        """
+        Test that a valid payload has no errors (the optional fields can be
+        missing).
+        """
+        assert CHILD_SCHEMA.get_errors(CHILD) == {}
+        CHILD_SCHEMA.validate(CHILD)
+
+    @staticmethod
+    def test_all_errors() -> None:
+        """
+        Test that the errors of all the invalid fields are collected, with
+        the messages of the input validation functions.
+        """
+        payload = {
+            **CHILD,
+            "name": "  ",
+            "age_range": "14-18",
+            "eye_color": None,
+            "hair_type": 3,
+            "fav_shows": ["Cartoons"],
+        }
+
+        assert CHILD_SCHEMA.get_errors(payload) == {
+            "name": "name must be a non-empty string.",
+            "age_range": "Invalid value for age_range: 14-18. Must be one "
+            "of 0-3, 4-6, 7-9, 10-13.",
+            "eye_color": "eye_color must not be None.",
+            "hair_type": "hair_type must be of type str, found int.",
+            "fav_shows": "fav_shows must be of type str, found list. None "
+            "is allowed.",
+        }
+
+    @staticmethod
+    @pytest.mark.parametrize("error_type", [ValueError, TypeError])
+    def test_validate(error_type: type) -> None:
+        """
+        Test that the errors are raised at once (as a ValueError, and a
+        TypeError like the type errors of the input validation functions).
+        """
+        with pytest.raises(error_type) as e:
+            STORY_SCHEMA.validate(
+                {"title": "", "topic": "Space", "image_style": "Sketch"}
+            )
+
+        assert isinstance(e.value, SchemaValidationError)
+        assert set(e.value.errors) == {"title", "image_style", "story_genre"}
+        assert str(e.value).startswith("title must be a non-empty string. ")
+
+
+class TestGeneratedDefinitions:
+    """
+    Test the definitions generated from the schemas.
+    """
+
+    @staticmethod
+    def test_check_constraints() -> None:
+        """
+        Test that the CHECK constraints of the columns list the allowed
+        values of the schemas.
+        """
+        for model, schema in ((Child, CHILD_SCHEMA), (Story, STORY_SCHEMA)):
+            for name, allowed in schema.allowed_values.items():
+                (constraint,) = model.__table__.c[name].constraints
+                quoted = ", ".join(
+                    f"'{value}'" for value in schema[name].values
+                )
+                assert str(constraint.sqltext) == f"{name} IN ({quoted})"
+                assert allowed == frozenset(schema[name].values)
+
+    @staticmethod
+    def test_restx_fields() -> None:
+        """
+        Test the RESTX fields of the schemas.
+        """
+        restx_fields = CHILD_SCHEMA.restx_fields()
+
+        assert list(restx_fields) == list(CHILD_SCHEMA.names)
+        assert restx_fields["sex"].enum == ["Male", "Female"]
+        assert restx_fields["sex"].required
+        assert type(restx_fields["ethnicity"]) is fields.String
+        assert isinstance(restx_fields["fav_shows"], NullableString)
+        assert not restx_fields["fav_shows"].required
+
+        assert list(STORY_SCHEMA.restx_fields(["topic", "story_genre"])) == [
+            "topic",
+            "story_genre",
+        ]
@@ -0,0 +1,106 @@
+"""
+This module contains tests for the compiled serializers.
+"""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import NoInspectionAvailable
+
+from api.database.models import db, Child, Story, Chapter
+from api.database.serialization import get_serializer
+
+
+class TestModelSerializer:
+    """
+    Test the ModelSerializer class.
+    """
+
+    @staticmethod
+    def test_serialize() -> None:
+        """
+        Test serializing an entry (the datetimes become strings).
+        """
+        created_at = datetime(2024, 4, 1, 12, 30)
+        story = Story(
+            child_id="a" * 32,
+            title="Title",
+            topic="Topic",
+            image_style="Cartoon",
+            story_genre="Adventure",
+        )
+        story.story_id = "b" * 32
+        story.created_at = created_at
+
+        assert get_serializer(Story).serialize(story) == {
+            "story_id": "b" * 32,
+            "child_id": "a" * 32,
+            "title": "Title",
+            "topic": "Topic",
+            "image_style": "Cartoon",
+            "story_genre": "Adventure",
+            "created_at": str(created_at),
+        }
+
+    @staticmethod
+    def test_include_exclude_and_raw_values() -> None:
+        """
+        Test selecting the columns and keeping the raw values.
+        """
+        chapter = Chapter(
+            story_id="a" * 32,
+            title="Title",
+            content="Content",
+            image="c" * 64,
+            order=2,
+        )
+
+        assert get_serializer(Chapter, include=["title", "order"]).serialize(
+            chapter
+        ) == {"title": "Title", "order": 2}
+        assert "image" not in get_serializer(
+            Chapter, exclude=["image"]
+        ).serialize(chapter)
+
+        story = Story("a" * 32, "Title", "Topic", "Cartoon", "Adventure")
+        story.created_at = datetime(2024, 4, 1)
+        assert get_serializer(
+            Story, include=["created_at"], transform_to_str=False
+        ).serialize(story) == {"created_at": datetime(2024, 4, 1)}
+
+    @staticmethod
+    def test_cached() -> None:
+        """
+        Test that the serializers are compiled once per model and columns.
+        """
+        assert get_serializer(Child, exclude=["image"]) is get_serializer(
+            Child, exclude=("image",)
+        )
+        assert get_serializer(Child) is not get_serializer(
+            Child, exclude=["image"]
+        )
+
+    @staticmethod
+    def test_serialize_row(child: Child) -> None:
+        """
+        Test serializing the rows of a column-projected query.
+        """
+        row = db.session.execute(
+            select(Child.child_id, Child.name, Child.created_at).where(
+                Child.child_id == child.child_id
+            )
+        ).one()
+
+        assert get_serializer(Child).serialize_row(row) == {
+            "child_id": child.child_id,
+            "name": child.name,
+            "created_at": str(row.created_at),
+        }
+
+    @staticmethod
+    def test_not_a_model() -> None:
+        """
+        Test getting the serializer of a class which is not a model.
+        """
+        with pytest.raises(NoInspectionAvailable):
+            get_serializer(dict)
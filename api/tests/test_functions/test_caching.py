@@ -0,0 +1,96 @@
+"""
+This module contains tests for the in-process cache.
+"""
+
+import time
+import pytest
+
+from api.functions.caching import TTLCache, MISSING
+
+
+class TestTTLCache:
+    """
+    Test the TTLCache class.
+    """
+
+    @staticmethod
+    def test_get_and_set() -> None:
+        """
+        Test getting cached and missing keys.
+        """
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", None)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") is MISSING
+        assert cache.get("c", 0) == 0
+
+    @staticmethod
+    def test_expiry() -> None:
+        """
+        Test that the entries expire after the time-to-live.
+        """
+        cache = TTLCache(maxsize=2, ttl=0.01)
+        cache.set("a", 1)
+
+        time.sleep(0.02)
+
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
+
+    @staticmethod
+    def test_lru_eviction() -> None:
+        """
+        Test that the least recently used entries are evicted.
+        """
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        # Use "a" so that "b" is the least recently used entry
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+
+    @staticmethod
+    def test_invalidate_and_clear() -> None:
+        """
+        Test removing one and all the entries.
+        """
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.invalidate("a")
+        cache.invalidate("missing")
+
+        assert cache.get("a") is MISSING
+        assert cache.get("b") == 2
+
+        cache.clear()
+
+        assert len(cache) == 0
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "maxsize, ttl, expected_error",
+        [
+            (0, 60, "maxsize must be a positive integer."),
+            (1, 0, "ttl must be a positive number of seconds."),
+        ],
+    )
+    def test_invalid_arguments(
+        maxsize: int, ttl: float, expected_error: str
+    ) -> None:
+        """
+        Test creating a cache with invalid arguments.
+        """
+        with pytest.raises(ValueError) as e:
+            TTLCache(maxsize=maxsize, ttl=ttl)
+
+        assert str(e.value) == expected_error
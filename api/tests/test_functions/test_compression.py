@@ -0,0 +1,230 @@
+"""
+This module contains tests for the compression of the responses.
+"""
+
+import gzip
+import json
+import pytest
+from pathlib import Path
+from flask import Flask, Response
+from flask.testing import FlaskClient
+
+from api.functions import compression
+from api.functions.compression import compress_response, is_hashed_filename
+
+# A JSON payload larger than the minimum size of the compressed responses
+LARGE_PAYLOAD = json.dumps({"content": "Once upon a time. " * 100})
+
+
+@pytest.fixture
+def static_folder(app: Flask, tmp_path: Path):
+    """
+    A static folder holding a hashed script with its gzip sibling.
+    """
+    script = b"console.log('Dreamify');" * 100
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "static" / "js" / "main.1a2b3c4d.js").write_bytes(script)
+    (tmp_path / "static" / "js" / "main.1a2b3c4d.js.gz").write_bytes(
+        gzip.compress(script)
+    )
+    (tmp_path / "index.html").write_text("<html></html>")
+
+    original = app.static_folder
+    app.static_folder = str(tmp_path)
+    yield tmp_path
+    app.static_folder = original
+
+
+class TestCompressResponse:
+    """
+    Test the compress_response function.
+    """
+
+    @staticmethod
+    def test_success(app: Flask) -> None:
+        """
+        Test compressing a large JSON response with gzip.
+        """
+        with app.test_request_context(
+            headers={"Accept-Encoding": "gzip, deflate"}
+        ):
+            response = compress_response(
+                Response(LARGE_PAYLOAD, mimetype="application/json")
+            )
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert response.content_length < len(LARGE_PAYLOAD)
+        assert gzip.decompress(response.get_data()).decode() == LARGE_PAYLOAD
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "accept_encoding, body, mimetype",
+        [
+            # The client does not accept a compressed response
+            ("identity", LARGE_PAYLOAD, "application/json"),
+            ("gzip;q=0", LARGE_PAYLOAD, "application/json"),
+            # The response is smaller than the minimum size
+            ("gzip", json.dumps({"Error": "Not Found"}), "application/json"),
+            # The content type is already compressed
+            ("gzip", b"\x89PNG\r\n\x1a\n" * 100, "image/png"),
+        ],
+    )
+    def test_uncompressed(
+        app: Flask, accept_encoding: str, body: str | bytes, mimetype: str
+    ) -> None:
+        """
+        Test that the responses not worth compressing are left untouched.
+        """
+        with app.test_request_context(
+            headers={"Accept-Encoding": accept_encoding}
+        ):
+            response = compress_response(Response(body, mimetype=mimetype))
+
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == (
+            body.encode() if isinstance(body, str) else body
+        )
+
+    @staticmethod
+    def test_streamed(app: Flask) -> None:
+        """
+        Test that the streamed responses (server-sent events) are untouched.
+        """
+        with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            response = compress_response(
+                Response(iter([LARGE_PAYLOAD]), mimetype="text/plain")
+            )
+
+        assert "Content-Encoding" not in response.headers
+        assert response.is_streamed
+
+    @staticmethod
+    def test_brotli(app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that Brotli is preferred when it is installed.
+        """
+        brotli = pytest.importorskip("brotli")
+        monkeypatch.setattr(compression, "brotli", brotli)
+
+        with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+            response = compress_response(
+                Response(LARGE_PAYLOAD, mimetype="application/json")
+            )
+
+        assert response.headers["Content-Encoding"] == "br"
+        assert brotli.decompress(response.get_data()).decode() == (
+            LARGE_PAYLOAD
+        )
+
+
+class TestIsHashedFilename:
+    """
+    Test the is_hashed_filename function.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "filename, expected",
+        [
+            ("static/js/main.1a2b3c4d.js", True),
+            ("static/css/453.d3b0a9e1.chunk.css", True),
+            ("static/media/logo.6ce24c58023cc2f8fd88fe9d219db6c6.svg", True),
+            ("index.html", False),
+            ("manifest.json", False),
+            ("static/js/main.js", False),
+        ],
+    )
+    def test_success(filename: str, expected: bool) -> None:
+        """
+        Test detecting the file names holding a content hash.
+        """
+        assert is_hashed_filename(filename) is expected
+
+
+class TestSendStaticFile:
+    """
+    Test serving the static files.
+    """
+
+    @staticmethod
+    def test_precompressed(client: FlaskClient, static_folder: Path) -> None:
+        """
+        Test serving the precompressed sibling of a hashed file.
+        """
+        response = client.get(
+            "/static/js/main.1a2b3c4d.js",
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.mimetype in (
+            "text/javascript",
+            "application/javascript",
+        )
+        assert "Accept-Encoding" in response.vary
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == compression.HASHED_MAX_AGE
+        assert (
+            gzip.decompress(response.data)
+            == (
+                static_folder / "static" / "js" / "main.1a2b3c4d.js"
+            ).read_bytes()
+        )
+        response.close()
+
+    @staticmethod
+    def test_uncompressed(client: FlaskClient, static_folder: Path) -> None:
+        """
+        Test serving the original file to a client without gzip support.
+        """
+        response = client.get(
+            "/static/js/main.1a2b3c4d.js",
+            headers={"Accept-Encoding": "identity"},
+        )
+
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+        assert (
+            response.data
+            == (
+                static_folder / "static" / "js" / "main.1a2b3c4d.js"
+            ).read_bytes()
+        )
+        response.close()
+
+    @staticmethod
+    def test_not_hashed(client: FlaskClient, static_folder: Path) -> None:
+        """
+        Test that the files without a content hash are revalidated.
+        """
+        response = client.get("/index.html")
+
+        assert response.status_code == 200
+        assert response.cache_control.no_cache
+        assert not response.cache_control.immutable
+        response.close()
+
+
+class TestCompressStaticFiles:
+    """
+    Test the "flask static compress" command.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, static_folder: Path) -> None:
+        """
+        Test precompressing the static files larger than the minimum size.
+        """
+        (static_folder / "static" / "js" / "main.1a2b3c4d.js.gz").unlink()
+
+        result = app.test_cli_runner().invoke(args=["static", "compress"])
+
+        assert result.exit_code == 0
+        assert "Compressed 1 static files." in result.output
+        assert (
+            static_folder / "static" / "js" / "main.1a2b3c4d.js.gz"
+        ).exists()
+        # The index page is smaller than the minimum size
+        assert not (static_folder / "index.html.gz").exists()
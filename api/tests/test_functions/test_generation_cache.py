@@ -0,0 +1,293 @@
+"""
+This module contains tests for the cache of the OpenAI generations.
+"""
+
+import asyncio
+import time
+import pytest
+from flask import Flask
+
+from api.database.models import db, GenerationCacheEntry, Portrait
+from api.functions.generation_cache import (
+    GenerationCache,
+    make_cache_key,
+)
+from api.functions.openai_clients import OpenAIClientRegistry
+from api.functions.openai_functions import (
+    text_gen,
+    text_gen_stream_async,
+    generate_image,
+    generate_image_async,
+)
+from api.storage.blob_store import compute_blob_key, get_blob_store
+from api.tests.stand_ins import OpenAIStandIn, STAND_IN_PNG
+
+
+@pytest.fixture
+def generation_cache(app: Flask):
+    """
+    The generation cache of the app, enabled for the test (emptied after).
+    """
+    cache = app.extensions["generation_cache"]
+    cache.enabled = True
+
+    with app.app_context():
+        yield cache
+
+        cache.enabled = False
+        cache.eviction_grace = app.config["GENERATION_CACHE_EVICTION_GRACE"]
+        GenerationCacheEntry.query.delete()
+        db.session.commit()
+
+
+class TestMakeCacheKey:
+    """
+    Test the make_cache_key function.
+    """
+
+    @staticmethod
+    def test_success() -> None:
+        """
+        Test that the key depends on the model, the parameters and the prompt
+        (and not on the order of the parameters).
+        """
+        key = make_cache_key("text", "gpt-4", {"a": 1, "b": 2}, "Prompt")
+
+        assert key == make_cache_key(
+            "text", "gpt-4", {"b": 2, "a": 1}, "Prompt"
+        )
+        assert (
+            len(
+                {
+                    key,
+                    make_cache_key(
+                        "image", "gpt-4", {"a": 1, "b": 2}, "Prompt"
+                    ),
+                    make_cache_key(
+                        "text", "gpt-3.5", {"a": 1, "b": 2}, "Prompt"
+                    ),
+                    make_cache_key(
+                        "text", "gpt-4", {"a": 1, "b": 3}, "Prompt"
+                    ),
+                    make_cache_key(
+                        "text", "gpt-4", {"a": 1, "b": 2}, "Prompt!"
+                    ),
+                }
+            )
+            == 5
+        )
+
+
+class TestGenerationCache:
+    """
+    Test the GenerationCache class.
+    """
+
+    @staticmethod
+    def test_text(generation_cache: GenerationCache) -> None:
+        """
+        Test caching a text.
+        """
+        key = make_cache_key("text", "gpt-4", {}, "Prompt")
+        assert generation_cache.get_text(key) is None
+
+        generation_cache.set_text(key, "gpt-4", "Once upon a time")
+
+        assert generation_cache.get_text(key) == "Once upon a time"
+        assert generation_cache.get_text(key) == "Once upon a time"
+        assert db.session.get(GenerationCacheEntry, key).hits == 2
+
+    @staticmethod
+    def test_image(generation_cache: GenerationCache) -> None:
+        """
+        Test caching an image (and generating it again once deleted).
+        """
+        key = make_cache_key("image", "dall-e-3", {}, "Prompt")
+        generation_cache.set_image(key, "dall-e-3", b"cached image")
+
+        assert generation_cache.get_image(key) == b"cached image"
+
+        get_blob_store().delete(get_blob_store().put(b"cached image"))
+
+        assert generation_cache.get_image(key) is None
+        assert db.session.get(GenerationCacheEntry, key) is None
+
+    @staticmethod
+    def test_expired(generation_cache: GenerationCache) -> None:
+        """
+        Test that the expired entries are not served and are replaced.
+        """
+        key = make_cache_key("text", "gpt-4", {}, "Prompt")
+        generation_cache.ttl = -1
+        try:
+            generation_cache.set_text(key, "gpt-4", "Expired")
+        finally:
+            generation_cache.ttl = 60
+
+        assert generation_cache.get_text(key) is None
+
+        generation_cache.set_text(key, "gpt-4", "Fresh")
+
+        assert generation_cache.get_text(key) == "Fresh"
+
+    @staticmethod
+    def test_eviction(generation_cache: GenerationCache) -> None:
+        """
+        Test that the least recently used entries are evicted beyond the
+        maximum number of entries, with their unused images.
+        """
+        keys = [
+            make_cache_key("image", "dall-e-3", {}, f"{i}") for i in range(3)
+        ]
+        generation_cache.max_entries = 2
+        generation_cache.eviction_grace = 0
+        try:
+            generation_cache.set_image(keys[0], "dall-e-3", b"cached image 0")
+            generation_cache.set_image(keys[1], "dall-e-3", b"cached image 1")
+
+            # Use the first entry, so that the second one is the oldest
+            time.sleep(0.001)
+            assert generation_cache.get_image(keys[0]) == b"cached image 0"
+
+            generation_cache.set_image(keys[2], "dall-e-3", b"cached image 2")
+        finally:
+            generation_cache.max_entries = 10000
+
+        assert GenerationCacheEntry.query.count() == 2
+        assert generation_cache.get_image(keys[1]) is None
+        assert not get_blob_store().exists(compute_blob_key(b"cached image 1"))
+        assert generation_cache.get_image(keys[0]) == b"cached image 0"
+        assert generation_cache.get_image(keys[2]) == b"cached image 2"
+
+    @staticmethod
+    def test_eviction_grace(generation_cache: GenerationCache) -> None:
+        """
+        Test that the entries used within the grace period are not evicted.
+        """
+        keys = [
+            make_cache_key("image", "dall-e-3", {}, f"{i}") for i in range(2)
+        ]
+        generation_cache.max_entries = 1
+        generation_cache.eviction_grace = 60
+        try:
+            generation_cache.set_image(keys[0], "dall-e-3", b"cached image 0")
+            generation_cache.set_image(keys[1], "dall-e-3", b"cached image 1")
+        finally:
+            generation_cache.max_entries = 10000
+
+        assert GenerationCacheEntry.query.count() == 2
+        assert generation_cache.get_image(keys[0]) == b"cached image 0"
+
+    @staticmethod
+    def test_eviction_of_portrait_image(
+        generation_cache: GenerationCache,
+    ) -> None:
+        """
+        Test that the image of an evicted entry is kept while a portrait of
+        the library references it.
+        """
+        key = make_cache_key("image", "dall-e-3", {}, "Portrait")
+        generation_cache.eviction_grace = 0
+        generation_cache.set_image(key, "dall-e-3", b"portrait image")
+
+        portrait = Portrait(
+            "7-9",
+            "Female",
+            "Amber",
+            "Curly",
+            "Brown",
+            "white",
+            compute_blob_key(b"portrait image"),
+        )
+        db.session.add(portrait)
+        db.session.commit()
+        try:
+            generation_cache.max_entries = 0
+            try:
+                assert generation_cache.evict() == 1
+            finally:
+                generation_cache.max_entries = 10000
+
+            assert get_blob_store().exists(compute_blob_key(b"portrait image"))
+        finally:
+            db.session.delete(portrait)
+            db.session.commit()
+
+    @staticmethod
+    def test_disabled(app: Flask) -> None:
+        """
+        Test that a disabled cache neither stores nor serves generations.
+        """
+        cache = GenerationCache(enabled=False, ttl=60, max_entries=10)
+        key = make_cache_key("text", "gpt-4", {}, "Prompt")
+
+        with app.app_context():
+            cache.set_text(key, "gpt-4", "Once upon a time")
+
+            assert cache.get_text(key) is None
+            assert db.session.get(GenerationCacheEntry, key) is None
+
+
+class TestCachedGenerations:
+    """
+    Test the OpenAI generations served from the cache.
+    """
+
+    @staticmethod
+    def test_text_gen(
+        generation_cache: GenerationCache,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that a repeated prompt is only sent once (unless opted out).
+        """
+        monkeypatch.setattr(openai_stand_in, "story", "Once upon a time")
+
+        assert text_gen("Tell a story") == "Once upon a time"
+        assert text_gen("Tell a story") == "Once upon a time"
+        assert openai_stand_in.calls == 1
+
+        # The streamed generations share the cache
+        async def stream() -> str:
+            return "".join(
+                [
+                    chunk
+                    async for chunk in text_gen_stream_async("Tell a story")
+                ]
+            )
+
+        assert asyncio.run(stream()) == "Once upon a time"
+        assert openai_stand_in.calls == 1
+
+        assert text_gen("Tell a story", cache=False) == "Once upon a time"
+        assert openai_stand_in.calls == 2
+
+    @staticmethod
+    def test_generate_image(
+        generation_cache: GenerationCache,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+    ) -> None:
+        """
+        Test that a repeated portrait is served from the cache in
+        milliseconds, without calling the API.
+        """
+        prompt = "A portrait of a child with brown eyes and curly hair"
+
+        assert generate_image(prompt) == STAND_IN_PNG
+        assert openai_stand_in.calls == 1
+
+        start = time.perf_counter()
+        assert generate_image(prompt) == STAND_IN_PNG
+        assert asyncio.run(generate_image_async(prompt)) == STAND_IN_PNG
+        assert time.perf_counter() - start < 0.1
+        assert openai_stand_in.calls == 1
+
+        # Another size is another generation
+        assert generate_image(prompt, size="1792x1024") == STAND_IN_PNG
+        assert openai_stand_in.calls == 2
+
+        assert generate_image(prompt, cache=False) == STAND_IN_PNG
+        assert openai_stand_in.calls == 3
@@ -0,0 +1,123 @@
+"""
+This module contains tests for the JWT helper functions.
+"""
+
+from flask import Flask
+from flask_jwt_extended import (
+    create_access_token,
+    decode_token,
+    verify_jwt_in_request,
+)
+from sqlalchemy import event
+
+from api.database.models import db, Parent
+from api.functions.jwt_functions import (
+    ParentIdentity,
+    get_current_parent,
+    invalidate_parent,
+)
+
+
+def count_statements(app: Flask, token: str) -> tuple:
+    """
+    Get the current parent for a token, with the number of SQL statements run.
+    """
+    statements = []
+
+    def count(*args) -> None:
+        statements.append(args[2])
+
+    with app.test_request_context(
+        headers={"Authorization": f"Bearer {token}"}
+    ):
+        verify_jwt_in_request()
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            parent = get_current_parent()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+    return parent, len(statements)
+
+
+class TestGetCurrentParent:
+    """
+    Test the get_current_parent function.
+    """
+
+    @staticmethod
+    def test_claims(app: Flask, parent: Parent, access_token: str) -> None:
+        """
+        Test that the access token holds the identity claims of the parent.
+        """
+        with app.app_context():
+            claims = decode_token(access_token)
+
+        assert claims["sub"] == parent.user_id
+        assert claims["first_name"] == parent.first_name
+        assert claims["last_name"] == parent.last_name
+        assert claims["email"] == parent.email
+
+    @staticmethod
+    def test_cached(app: Flask, parent: Parent, access_token: str) -> None:
+        """
+        Test that the parent is only looked up in the database once.
+        """
+        with app.app_context():
+            invalidate_parent(parent.user_id)
+
+        first, first_statements = count_statements(app, access_token)
+        second, second_statements = count_statements(app, access_token)
+
+        assert first == second == ParentIdentity.from_parent(parent)
+        assert first_statements == 1
+        assert second_statements == 0
+
+    @staticmethod
+    def test_invalidate(app: Flask, parent: Parent, access_token: str) -> None:
+        """
+        Test that an invalidated parent is looked up again.
+        """
+        count_statements(app, access_token)
+
+        with app.app_context():
+            invalidate_parent(parent.user_id)
+
+        _, statements = count_statements(app, access_token)
+
+        assert statements == 1
+
+    @staticmethod
+    def test_without_claims(app: Flask, parent: Parent) -> None:
+        """
+        Test a token without the identity claims (issued before them).
+        """
+        with app.app_context():
+            token = create_access_token(identity=parent.user_id)
+            invalidate_parent(parent.user_id)
+
+        current_parent, _ = count_statements(app, token)
+
+        assert current_parent == ParentIdentity.from_parent(parent)
+
+    @staticmethod
+    def test_missing_parent(app: Flask) -> None:
+        """
+        Test a token of a parent which does not exist, which is not cached.
+        """
+        missing_id = "0" * 32
+        with app.app_context():
+            token = create_access_token(
+                identity=missing_id,
+                additional_claims={
+                    "first_name": "Missing",
+                    "last_name": "Parent",
+                    "email": "missing.parent@gmail.com",
+                },
+            )
+
+        first, _ = count_statements(app, token)
+        second, statements = count_statements(app, token)
+
+        assert first is None and second is None
+        assert statements == 1
@@ -0,0 +1,222 @@
+"""
+This module contains tests for the pooled OpenAI clients.
+"""
+
+import asyncio
+import pytest
+from flask import Flask
+
+from api.dummy_data.dummy_story import dummy_story
+from api.functions import prepare_data
+from api.functions.openai_clients import (
+    OpenAIClientRegistry,
+    get_openai_clients,
+)
+from api.functions.openai_functions import (
+    image_gen,
+    image_gen_async,
+    text_gen_stream_async,
+)
+from api.functions.prompt_assembly import extract_story_components
+from api.tests.stand_ins import OpenAIStandIn, STAND_IN_PNG
+
+
+class TestOpenAIClientRegistry:
+    """
+    Test the OpenAI client registry.
+    """
+
+    @staticmethod
+    def test_registered(app: Flask) -> None:
+        """
+        Test that the app registers a registry configured from its config.
+        """
+        with app.app_context():
+            registry = get_openai_clients()
+
+            assert isinstance(registry, OpenAIClientRegistry)
+            assert registry.max_retries == app.config["OPENAI_MAX_RETRIES"]
+            assert (
+                registry.limits.max_connections
+                == app.config["OPENAI_MAX_CONNECTIONS"]
+            )
+
+    @staticmethod
+    def test_clients_are_reused(openai_clients: OpenAIClientRegistry) -> None:
+        """
+        Test that the same clients are returned on every call.
+        """
+        assert openai_clients.get_client() is openai_clients.get_client()
+        assert (
+            openai_clients.get_client()._client
+            is openai_clients.get_http_client()
+        )
+
+    @staticmethod
+    def test_connections_reused_across_event_loops(
+        openai_clients: OpenAIClientRegistry, openai_stand_in: OpenAIStandIn
+    ) -> None:
+        """
+        Test that the async calls of successive event loops (one per Flask
+        request) share the same keep-alive connection.
+        """
+
+        async def generate() -> str:
+            response = await openai_clients.run_async(
+                lambda client: client.images.generate(prompt="A dragon")
+            )
+            return response.data[0].url
+
+        for _ in range(3):
+            assert asyncio.run(generate()).endswith("/files/image.png")
+
+        assert openai_stand_in.calls == 3
+        assert openai_stand_in.connections == 1
+
+    @staticmethod
+    def test_download(
+        openai_clients: OpenAIClientRegistry, openai_stand_in: OpenAIStandIn
+    ) -> None:
+        """
+        Test downloading a file synchronously and asynchronously.
+        """
+        url = f"{openai_stand_in.url}/files/image.png"
+
+        assert openai_clients.download(url) == STAND_IN_PNG
+        assert asyncio.run(openai_clients.download_async(url)) == STAND_IN_PNG
+
+    @staticmethod
+    def test_close(openai_stand_in: OpenAIStandIn) -> None:
+        """
+        Test that closing the registry stops its event loop thread.
+        """
+        registry = OpenAIClientRegistry(
+            api_key="test", base_url=f"{openai_stand_in.url}/v1"
+        )
+        url = f"{openai_stand_in.url}/files/image.png"
+        asyncio.run(registry.download_async(url))
+        thread = registry._thread
+
+        registry.close()
+
+        assert not thread.is_alive()
+        assert registry._loop is None
+
+        # The registry can still be used after being closed
+        assert registry.download(url) == STAND_IN_PNG
+        registry.close()
+
+
+class TestTextGenStreamAsync:
+    """
+    Test streaming a generated text with the pooled clients.
+    """
+
+    @staticmethod
+    def test_success(
+        app: Flask,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that the chunks of the generated text are streamed in order.
+        """
+        monkeypatch.setattr(openai_stand_in, "story", "Once upon a time " * 8)
+
+        async def collect() -> list[str]:
+            return [chunk async for chunk in text_gen_stream_async("A story")]
+
+        with app.app_context():
+            chunks = asyncio.run(collect())
+
+        assert len(chunks) > 1
+        assert "".join(chunks) == openai_stand_in.story
+
+    @staticmethod
+    def test_stop_early(
+        app: Flask,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that the stream can be left before its end.
+        """
+        monkeypatch.setattr(openai_stand_in, "story", "Once upon a time " * 8)
+
+        async def first() -> str:
+            chunks = text_gen_stream_async("A story")
+            try:
+                return await anext(chunks)
+            finally:
+                await chunks.aclose()
+
+        with app.app_context():
+            assert openai_stand_in.story.startswith(asyncio.run(first()))
+
+            # The registry is still usable afterwards
+            assert asyncio.run(image_gen_async("A dragon"))
+
+
+class TestImageGen:
+    """
+    Test the image generation functions with the pooled clients.
+    """
+
+    @staticmethod
+    def test_image_gen(
+        app: Flask, openai_clients: OpenAIClientRegistry
+    ) -> None:
+        """
+        Test generating an image synchronously.
+        """
+        with app.app_context():
+            assert image_gen("A dragon").endswith("/files/image.png")
+
+    @staticmethod
+    def test_image_gen_async(
+        app: Flask, openai_clients: OpenAIClientRegistry
+    ) -> None:
+        """
+        Test generating an image asynchronously.
+        """
+        with app.app_context():
+            url = asyncio.run(image_gen_async("A dragon"))
+
+        assert url.endswith("/files/image.png")
+
+    @staticmethod
+    def test_chapter_images_fan_out(
+        app: Flask,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+        child_params: dict[str, str],
+    ) -> None:
+        """
+        Test generating and downloading the chapter images of a streamed
+        story concurrently.
+        """
+        monkeypatch.setattr(prepare_data, "get_generate_flag", lambda: True)
+        monkeypatch.setattr(openai_stand_in, "story", dummy_story)
+        chapters = len(extract_story_components(dummy_story)[1])
+
+        async def collect_images() -> list[bytes]:
+            return [
+                event["image"]
+                async for event in prepare_data.generate_story_events_async(
+                    child_params, "Magic", "Fantasy", "Cartoon"
+                )
+                if event["type"] == "image"
+            ]
+
+        with app.app_context():
+            images = asyncio.run(collect_images())
+
+        assert images == [STAND_IN_PNG] * chapters
+
+        # One generation call per chapter (and one for the story), on at most
+        # one connection each
+        assert openai_stand_in.calls == chapters + 1
+        assert openai_stand_in.connections <= chapters + 1
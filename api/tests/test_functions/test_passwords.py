@@ -0,0 +1,51 @@
+"""
+This module contains tests for the password hasher.
+"""
+
+import pytest
+from flask import Flask
+
+from api.extensions import bcrypt
+from api.functions.passwords import PasswordHasher, get_password_hasher
+
+
+class TestPasswordHasher:
+    """
+    Test the password hasher.
+    """
+
+    @staticmethod
+    def test_registered(app: Flask) -> None:
+        """
+        Test that the app registers a hasher configured from its config.
+        """
+        with app.app_context():
+            hasher = get_password_hasher()
+
+        assert hasher.log_rounds == app.config["BCRYPT_LOG_ROUNDS"]
+
+    @staticmethod
+    def test_hash_and_check() -> None:
+        """
+        Test hashing a password with the configured cost and checking it.
+        """
+        hasher = PasswordHasher(log_rounds=5)
+        password_hash = hasher.hash("password")
+
+        assert password_hash.startswith("$2b$05$")
+        assert hasher.check(password_hash, "password")
+        assert not hasher.check(password_hash, "incorrect_password")
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "rounds, expected", [(4, True), (5, False), (6, True)]
+    )
+    def test_needs_rehash(rounds: int, expected: bool) -> None:
+        """
+        Test detecting the hashes created with another cost.
+        """
+        hasher = PasswordHasher(log_rounds=5)
+        password_hash = bcrypt.generate_password_hash("pw", rounds).decode()
+
+        assert hasher.needs_rehash(password_hash) == expected
+        assert hasher.needs_rehash("not a bcrypt hash")
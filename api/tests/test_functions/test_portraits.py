@@ -0,0 +1,308 @@
+"""
+This module contains tests for the portrait library.
+"""
+
+import asyncio
+import pytest
+from flask import Flask
+
+from api.database.models import db, Child, Portrait
+from api.functions import prepare_data
+from api.functions.openai_clients import OpenAIClientRegistry
+from api.functions.portraits import (
+    ATTRIBUTE_VALUES,
+    PORTRAIT_ATTRIBUTES,
+    add_portrait,
+    get_missing_attribute_combinations,
+    get_portrait,
+    get_portrait_attributes,
+)
+from api.storage.blob_store import get_blob_store
+from api.storage.images import ProcessedImage, StoredImage
+from api.tests.stand_ins import OpenAIStandIn
+
+# Attributes of a child (with an oddly written ethnicity)
+CHILD_PARAMS = {
+    "name": "Alice",
+    "age_range": "7-9",
+    "sex": "Female",
+    "eye_color": "Green",
+    "hair_type": "Wavy",
+    "hair_color": "Red",
+    "ethnicity": "  Pacific   Islander ",
+    "fav_animals": "Cats",
+}
+
+
+@pytest.fixture
+def portraits(app: Flask):
+    """
+    An app context with an empty portrait library (emptied after).
+    """
+    with app.app_context():
+        yield
+
+        Portrait.query.delete()
+        db.session.commit()
+
+
+class TestGetPortraitAttributes:
+    """
+    Test the get_portrait_attributes function.
+    """
+
+    @staticmethod
+    def test_success() -> None:
+        """
+        Test that only the portrait attributes are kept, with the ethnicity
+        normalized.
+        """
+        assert get_portrait_attributes(CHILD_PARAMS) == {
+            "age_range": "7-9",
+            "sex": "Female",
+            "eye_color": "Green",
+            "hair_type": "Wavy",
+            "hair_color": "Red",
+            "ethnicity": "pacific islander",
+        }
+
+
+class TestGetPortrait:
+    """
+    Test the get_portrait and add_portrait functions.
+    """
+
+    @staticmethod
+    def test_hit(portraits: None, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that a portrait is found for the same (normalized) attributes,
+        as the keys of its stored image and thumbnails (without downloading
+        them).
+        """
+        portrait = add_portrait(
+            CHILD_PARAMS,
+            ProcessedImage(b"portrait master", {256: b"portrait 256"}),
+        )
+        blob_store = get_blob_store()
+        monkeypatch.setattr(blob_store, "get", None)
+
+        assert get_portrait(
+            {**CHILD_PARAMS, "ethnicity": "pacific islander"}
+        ) == StoredImage(portrait.image, {"256": portrait.thumbnails["256"]})
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "name, value", [("age_range", "4-6"), ("ethnicity", "Asian")]
+    )
+    def test_miss(portraits: None, name: str, value: str) -> None:
+        """
+        Test that no portrait is found for other attributes.
+        """
+        add_portrait(CHILD_PARAMS, ProcessedImage(b"portrait master", {}))
+
+        assert get_portrait({**CHILD_PARAMS, name: value}) is None
+
+    @staticmethod
+    def test_replace(portraits: None) -> None:
+        """
+        Test that adding a portrait again replaces it.
+        """
+        add_portrait(CHILD_PARAMS, ProcessedImage(b"portrait old", {}))
+        add_portrait(CHILD_PARAMS, ProcessedImage(b"portrait new", {}))
+
+        assert Portrait.query.count() == 1
+        assert (
+            get_blob_store().get(get_portrait(CHILD_PARAMS).key)
+            == b"portrait new"
+        )
+
+    @staticmethod
+    def test_missing_blob(portraits: None) -> None:
+        """
+        Test that a portrait whose image was deleted is not found.
+        """
+        portrait = add_portrait(
+            CHILD_PARAMS, ProcessedImage(b"portrait deleted", {})
+        )
+        get_blob_store().delete(portrait.image)
+
+        assert get_portrait(CHILD_PARAMS) is None
+
+
+class TestGetMissingAttributeCombinations:
+    """
+    Test the get_missing_attribute_combinations function.
+    """
+
+    @staticmethod
+    def test_success(
+        portraits: None, parent, image_key: str, child: Child
+    ) -> None:
+        """
+        Test that the combinations are ordered by their number of children
+        and skip those already in the library.
+        """
+        attributes = get_portrait_attributes(CHILD_PARAMS)
+        children = [
+            Child(
+                parent_id=parent.user_id,
+                name=f"Child {i}",
+                image=image_key,
+                **{**attributes, "ethnicity": ethnicity},
+            )
+            for i, ethnicity in enumerate(
+                ["Pacific islander", "pacific  ISLANDER", "Asian"]
+            )
+        ]
+        db.session.add_all(children)
+        db.session.commit()
+
+        try:
+            # The two children of the same (normalized) combination come
+            # before the other children
+            combinations = get_missing_attribute_combinations(10)
+            assert combinations.index(attributes) < combinations.index(
+                {**attributes, "ethnicity": "asian"}
+            )
+            assert combinations.index(attributes) < combinations.index(
+                get_portrait_attributes(
+                    {name: getattr(child, name) for name in attributes}
+                )
+            )
+
+            add_portrait(attributes, ProcessedImage(b"portrait master", {}))
+            assert attributes not in get_missing_attribute_combinations(10)
+            assert len(get_missing_attribute_combinations(1)) == 1
+        finally:
+            for added in children:
+                db.session.delete(added)
+            db.session.commit()
+
+    @staticmethod
+    def test_include_all(portraits: None) -> None:
+        """
+        Test that all the combinations offered by the frontend are added.
+        """
+        combinations = get_missing_attribute_combinations(
+            100000, include_all=True
+        )
+
+        total = 1
+        for values in ATTRIBUTE_VALUES.values():
+            total *= len(values)
+        assert len(combinations) >= total
+        assert len({tuple(c.values()) for c in combinations}) == len(
+            combinations
+        )
+
+
+class TestGeneratePortraitsCommand:
+    """
+    Test the "flask portraits generate" command.
+    """
+
+    @staticmethod
+    def test_success(
+        app: Flask,
+        portraits: None,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        child: Child,
+    ) -> None:
+        """
+        Test that the portraits of the children are generated, once.
+        """
+        runner = app.test_cli_runner()
+        missing = len(get_missing_attribute_combinations(1000))
+
+        result = runner.invoke(
+            args=["portraits", "generate", "--limit", "1000"]
+        )
+        assert result.exit_code == 0, result.output
+        assert f"Generated {missing} portraits." in result.output
+        assert openai_stand_in.calls == missing
+
+        child_params = {
+            name: getattr(child, name) for name in PORTRAIT_ATTRIBUTES
+        }
+        assert get_portrait(child_params) is not None
+
+        # Nothing is left to generate
+        result = runner.invoke(
+            args=["portraits", "generate", "--limit", "1000"]
+        )
+        assert "Generated 0 portraits." in result.output
+        assert openai_stand_in.calls == missing
+
+    @staticmethod
+    def test_dry_run(
+        app: Flask,
+        portraits: None,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        child: Child,
+    ) -> None:
+        """
+        Test that a dry run only lists the combinations.
+        """
+        result = app.test_cli_runner().invoke(
+            args=[
+                "portraits",
+                "generate",
+                "--all",
+                "--limit",
+                "3",
+                "--dry-run",
+            ]
+        )
+
+        assert result.exit_code == 0, result.output
+        assert len(result.output.splitlines()) == 3
+        assert openai_stand_in.calls == 0
+        assert Portrait.query.count() == 0
+
+
+class TestGenerateChildImage:
+    """
+    Test that generate_child_image_async uses the portrait library.
+    """
+
+    @staticmethod
+    def test_library_hit(
+        portraits: None,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that the portrait of the library is used without generating.
+        """
+        monkeypatch.setattr(prepare_data, "get_generate_flag", lambda: True)
+        portrait = add_portrait(
+            CHILD_PARAMS,
+            ProcessedImage(b"portrait master", {128: b"portrait 128"}),
+        )
+
+        assert asyncio.run(
+            prepare_data.generate_child_image_async(CHILD_PARAMS)
+        ) == StoredImage(portrait.image, portrait.thumbnails)
+        assert openai_stand_in.calls == 0
+
+    @staticmethod
+    def test_library_miss(
+        portraits: None,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that the portrait is generated when the library has none.
+        """
+        monkeypatch.setattr(prepare_data, "get_generate_flag", lambda: True)
+
+        image = asyncio.run(
+            prepare_data.generate_child_image_async(CHILD_PARAMS)
+        )
+
+        assert image.master
+        assert openai_stand_in.calls == 1
@@ -0,0 +1,164 @@
+"""
+This module contains tests for the data preparation functions.
+"""
+
+import asyncio
+import pytest
+from flask import Flask
+
+from api.database.models import db, GenerationCacheEntry
+from api.dummy_data.dummy_story import dummy_story
+from api.functions import prepare_data
+from api.functions.openai_clients import OpenAIClientRegistry
+from api.functions.prompt_assembly import extract_story_components
+from api.tests.stand_ins import OpenAIStandIn, STAND_IN_PNG
+
+
+def collect_story(
+    child_params: dict[str, str],
+) -> tuple[str, list[str], list[str], list[bytes]]:
+    """
+    Collect the story components and images from the story events.
+    """
+
+    async def collect() -> list[dict]:
+        return [
+            event
+            async for event in prepare_data.generate_story_events_async(
+                child_params, "Magic", "Fantasy", "Cartoon"
+            )
+        ]
+
+    events = asyncio.run(collect())
+
+    title = [event["title"] for event in events if event["type"] == "title"]
+    chapters = [event for event in events if event["type"] == "chapter"]
+    images = sorted(
+        (event["number"], event["image"])
+        for event in events
+        if event["type"] == "image"
+    )
+
+    # The image of a chapter always comes after the chapter
+    for number, _ in images:
+        assert events.index(chapters[number - 1]) < next(
+            i
+            for i, event in enumerate(events)
+            if event["type"] == "image" and event["number"] == number
+        )
+
+    return (
+        title[0],
+        [chapter["title"] for chapter in chapters],
+        [chapter["content"] for chapter in chapters],
+        [image for _, image in images],
+    )
+
+
+class TestGenerateStoryEventsAsync:
+    """
+    Test generating a story and its chapter images.
+    """
+
+    @staticmethod
+    def test_dummy_story(app: Flask, child_params: dict[str, str]) -> None:
+        """
+        Test that the dummy story is streamed when generation is disabled.
+        """
+        with app.app_context():
+            title, chapter_titles, chapter_contents, images = collect_story(
+                child_params
+            )
+
+        assert (title, chapter_titles, chapter_contents) == (
+            extract_story_components(dummy_story)
+        )
+        assert len(images) == len(chapter_titles)
+
+    @staticmethod
+    def test_images_overlap_text_generation(
+        app: Flask,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+        child_params: dict[str, str],
+    ) -> None:
+        """
+        Test that the chapter images are generated while the story is still
+        being streamed.
+        """
+        monkeypatch.setattr(prepare_data, "get_generate_flag", lambda: True)
+        monkeypatch.setattr(openai_stand_in, "story", dummy_story)
+        monkeypatch.setattr(openai_stand_in, "stream_interval", 0.002)
+
+        with app.app_context():
+            title, chapter_titles, chapter_contents, images = collect_story(
+                child_params
+            )
+
+        assert (title, chapter_titles, chapter_contents) == (
+            extract_story_components(dummy_story)
+        )
+        assert images == [STAND_IN_PNG] * len(chapter_titles)
+
+        # The first chapter image was requested before the story was complete
+        image_calls = [
+            call_time
+            for path, call_time in openai_stand_in.call_times
+            if path.endswith("/images/generations")
+        ]
+        assert len(image_calls) == len(chapter_titles)
+        assert min(image_calls) < openai_stand_in.stream_ended_at
+
+    @staticmethod
+    def test_invalid_story(
+        app: Flask,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+        child_params: dict[str, str],
+    ) -> None:
+        """
+        Test that a story which cannot be parsed raises an error.
+        """
+        monkeypatch.setattr(prepare_data, "get_generate_flag", lambda: True)
+        monkeypatch.setattr(openai_stand_in, "story", "Once upon a time")
+
+        with app.app_context():
+            with pytest.raises(ValueError):
+                collect_story(child_params)
+
+    @staticmethod
+    def test_story_not_cached(
+        app: Flask,
+        openai_clients: OpenAIClientRegistry,
+        openai_stand_in: OpenAIStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+        child_params: dict[str, str],
+    ) -> None:
+        """
+        Test that the story is generated again for the same prompt (so that
+        a malformed story is not replayed by the retries).
+        """
+        monkeypatch.setattr(prepare_data, "get_generate_flag", lambda: True)
+        monkeypatch.setattr(
+            app.extensions["generation_cache"], "enabled", True
+        )
+        monkeypatch.setattr(openai_stand_in, "story", "Once upon a time")
+
+        with app.app_context():
+            try:
+                with pytest.raises(ValueError):
+                    collect_story(child_params)
+
+                monkeypatch.setattr(openai_stand_in, "story", dummy_story)
+                title, chapter_titles, chapter_contents, _ = collect_story(
+                    child_params
+                )
+            finally:
+                GenerationCacheEntry.query.delete()
+                db.session.commit()
+
+        assert (title, chapter_titles, chapter_contents) == (
+            extract_story_components(dummy_story)
+        )
@@ -0,0 +1,88 @@
+"""
+This module contains tests for the prompt assembly functions.
+"""
+
+import pytest
+from flask import Flask
+
+from api.dummy_data.dummy_story import dummy_story
+from api.functions.prompt_assembly import (
+    StoryStreamParser,
+    extract_story_components,
+)
+
+
+class TestStoryStreamParser:
+    """
+    Test the incremental extraction of the streamed story components.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("chunk_size", [1, 4, 64, len(dummy_story)])
+    def test_same_as_whole_story(app: Flask, chunk_size: int) -> None:
+        """
+        Test that the streamed components match the ones of the whole story.
+        """
+        with app.app_context():
+            parser = StoryStreamParser()
+            events = []
+            for i in range(0, len(dummy_story), chunk_size):
+                events += parser.feed(dummy_story[i : i + chunk_size])
+            events += parser.close()
+
+            title, chapter_titles, chapter_contents = extract_story_components(
+                dummy_story
+            )
+
+        assert events[0] == {"type": "title", "title": title}
+        assert events[1:] == [
+            {
+                "type": "chapter",
+                "number": i + 1,
+                "title": chapter_titles[i],
+                "content": chapter_contents[i],
+            }
+            for i in range(len(chapter_titles))
+        ]
+
+    @staticmethod
+    def test_chapter_emitted_when_complete() -> None:
+        """
+        Test that a chapter is emitted as soon as the next one starts.
+        """
+        parser = StoryStreamParser()
+
+        assert parser.feed("Title of the story: The Test\n\n") == [
+            {"type": "title", "title": "The Test"}
+        ]
+        assert parser.feed("Chapter 1 title: One\n\n") == []
+        assert parser.feed("Chapter 1 description:\nFirst.\n\n") == []
+        assert parser.feed("Chapter 2 tit") == []
+        assert parser.feed("le: Two") == [
+            {
+                "type": "chapter",
+                "number": 1,
+                "title": "One",
+                "content": "First.",
+            }
+        ]
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "story",
+        [
+            "",
+            "Title of the story: The Test\n\n",
+            "Chapter 1 title: One\n\nChapter 1 description:\nFirst.",
+        ],
+    )
+    def test_invalid_story(app: Flask, story: str) -> None:
+        """
+        Test that an invalid story raises an error once it is complete.
+        """
+        with app.app_context():
+            parser = StoryStreamParser()
+            parser.feed(story)
+
+            with pytest.raises(ValueError):
+                parser.close()
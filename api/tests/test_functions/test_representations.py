@@ -0,0 +1,91 @@
+"""
+This module contains tests for the JSON representation of the responses.
+"""
+
+import json
+import pytest
+from datetime import datetime
+from flask import Flask
+from flask.testing import FlaskClient
+
+from api.functions import representations
+from api.functions.representations import dumps
+
+
+class TestDumps:
+    """
+    Test the dumps function.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("fast", [True, False])
+    def test_success(monkeypatch: pytest.MonkeyPatch, fast: bool) -> None:
+        """
+        Test encoding data (with and without orjson).
+        """
+        if fast:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(representations, "orjson", None)
+
+        data = {
+            "title": "Story",
+            "order": 1,
+            "created_at": datetime(2024, 4, 1, 12, 30),
+            "chapters": [{"image_url": None}],
+        }
+        encoded = dumps(data)
+
+        assert encoded.endswith(b"\n")
+        assert json.loads(encoded) == {
+            "title": "Story",
+            "order": 1,
+            "created_at": "2024-04-01T12:30:00",
+            "chapters": [{"image_url": None}],
+        }
+
+    @staticmethod
+    @pytest.mark.parametrize("fast", [True, False])
+    def test_unsupported(monkeypatch: pytest.MonkeyPatch, fast: bool) -> None:
+        """
+        Test encoding an unsupported value.
+        """
+        if fast:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(representations, "orjson", None)
+
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+
+class TestOutputJson:
+    """
+    Test the JSON representation registered on the API.
+    """
+
+    @staticmethod
+    def test_registered(client: FlaskClient) -> None:
+        """
+        Test that the API responses are encoded by the representation.
+        """
+        response = client.get("/api/auth/current_parent")
+
+        assert response.status_code == 401
+        assert response.mimetype == "application/json"
+        assert response.data.endswith(b"\n")
+        assert "msg" in response.json
+
+    @staticmethod
+    def test_headers(app: Flask) -> None:
+        """
+        Test that the status code and the headers are kept.
+        """
+        with app.test_request_context():
+            response = representations.output_json(
+                {"Error": "Not Found"}, 404, {"X-Test": "value"}
+            )
+
+        assert response.status_code == 404
+        assert response.headers["X-Test"] == "value"
+        assert json.loads(response.data) == {"Error": "Not Found"}
@@ -0,0 +1,205 @@
+"""
+This module contains tests for the generation job queue.
+"""
+
+import pytest
+from datetime import timedelta
+from flask import Flask
+
+from api.database.models import db, Child, GenerationJob
+from api.jobs.queue import (
+    add_portrait_jobs,
+    claim_generation_jobs,
+    complete_generation_job,
+    fail_generation_job,
+    utc_now,
+)
+
+
+class TestClaimGenerationJobs:
+    """
+    Test claiming the queued jobs.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, generation_jobs) -> None:
+        """
+        Test that every job is claimed once, oldest first.
+        """
+        first_id, second_id = generation_jobs(2)
+
+        with app.app_context():
+            assert claim_generation_jobs(1) == [first_id]
+            assert claim_generation_jobs(5) == [second_id]
+            assert claim_generation_jobs(5) == []
+
+            job = db.session.get(GenerationJob, first_id)
+            assert job.status == "running"
+            assert job.attempts == 1
+            assert job.locked_until > utc_now()
+
+    @staticmethod
+    def test_expired_lease(app: Flask, generation_jobs) -> None:
+        """
+        Test that a job whose worker stopped renewing is claimed again.
+        """
+        (job_id,) = generation_jobs()
+
+        with app.app_context():
+            assert claim_generation_jobs(1) == [job_id]
+
+            # Simulate a crashed worker
+            job = db.session.get(GenerationJob, job_id)
+            job.locked_until = utc_now() - timedelta(seconds=1)
+            db.session.commit()
+
+            assert claim_generation_jobs(1) == [job_id]
+
+            db.session.refresh(job)
+            assert job.attempts == 2
+
+    @staticmethod
+    def test_expired_lease_without_attempts(
+        app: Flask, generation_jobs
+    ) -> None:
+        """
+        Test that an abandoned job without attempts left is failed.
+        """
+        (job_id,) = generation_jobs()
+
+        with app.app_context():
+            job = db.session.get(GenerationJob, job_id)
+            job.status = "running"
+            job.attempts = job.max_attempts
+            job.locked_until = utc_now() - timedelta(seconds=1)
+            db.session.commit()
+
+            assert claim_generation_jobs(1) == []
+
+            db.session.refresh(job)
+            assert job.status == "failed"
+            assert job.error == "The story generation timed out."
+
+    @staticmethod
+    def test_expired_portrait_lease_without_attempts(
+        app: Flask, generation_jobs, child: Child
+    ) -> None:
+        """
+        Test that the portrait of an abandoned portrait job without attempts
+        left is failed.
+        """
+        with app.app_context():
+            add_portrait_jobs(child.parent_id, [child.child_id])
+            job = GenerationJob.query.filter_by(
+                child_id=child.child_id, kind="portrait"
+            ).one()
+            job.status = "running"
+            job.attempts = job.max_attempts
+            job.locked_until = utc_now() - timedelta(seconds=1)
+            db.session.commit()
+
+            try:
+                assert claim_generation_jobs(1) == []
+
+                db.session.refresh(job)
+                assert job.status == "failed"
+                assert job.error == "The portrait generation timed out."
+                assert (
+                    db.session.get(Child, child.child_id).image_status
+                    == "failed"
+                )
+            finally:
+                db.session.get(Child, child.child_id).image_status = "ready"
+                db.session.commit()
+
+
+class TestFailGenerationJob:
+    """
+    Test recording the failed attempts of a job.
+    """
+
+    @staticmethod
+    def test_retried_until_failed(app: Flask, generation_jobs) -> None:
+        """
+        Test that a job is retried until it runs out of attempts.
+        """
+        (job_id,) = generation_jobs()
+
+        with app.app_context():
+            max_attempts = app.config["GENERATION_JOB_MAX_ATTEMPTS"]
+
+            for attempt in range(1, max_attempts + 1):
+                assert claim_generation_jobs(1) == [job_id]
+
+                status = fail_generation_job(job_id, "Error")
+                expected = "queued" if attempt < max_attempts else "failed"
+                assert status == expected
+
+            assert claim_generation_jobs(1) == []
+
+            job = db.session.get(GenerationJob, job_id)
+            assert job.attempts == max_attempts
+            assert job.error == "Error"
+
+    @staticmethod
+    def test_not_retried(app: Flask, generation_jobs) -> None:
+        """
+        Test that a job that cannot be retried fails at once.
+        """
+        (job_id,) = generation_jobs()
+
+        with app.app_context():
+            assert claim_generation_jobs(1) == [job_id]
+            assert (
+                fail_generation_job(job_id, "Error", retry=False) == "failed"
+            )
+            assert claim_generation_jobs(1) == []
+
+    @staticmethod
+    def test_backoff(
+        app: Flask, generation_jobs, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the retries wait twice as long after every failure.
+        """
+        monkeypatch.setitem(app.config, "GENERATION_JOB_RETRY_DELAY", 60)
+        (job_id,) = generation_jobs()
+
+        with app.app_context():
+            for attempt in range(1, 3):
+                claim_generation_jobs(1)
+                fail_generation_job(job_id, "Error")
+
+                job = db.session.get(GenerationJob, job_id)
+                delay = (job.available_at - utc_now()).total_seconds()
+                assert 60 * 2 ** (attempt - 1) - 5 < delay
+                assert delay <= 60 * 2 ** (attempt - 1)
+
+                # The job is not claimed before the delay
+                assert claim_generation_jobs(1) == []
+
+                job.available_at = utc_now()
+                db.session.commit()
+
+
+class TestCompleteGenerationJob:
+    """
+    Test marking a job as succeeded.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, generation_jobs, story) -> None:
+        """
+        Test that a completed job references its story.
+        """
+        (job_id,) = generation_jobs()
+
+        with app.app_context():
+            claim_generation_jobs(1)
+            complete_generation_job(job_id, story.story_id)
+
+            job = db.session.get(GenerationJob, job_id)
+            assert job.status == "succeeded"
+            assert job.story_id == story.story_id
+            assert job.locked_until is None
+            assert claim_generation_jobs(1) == []
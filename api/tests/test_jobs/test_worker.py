@@ -0,0 +1,236 @@
+"""
+This module contains tests for the story generation job worker.
+"""
+
+import asyncio
+import pytest
+from flask import Flask
+
+from api.database.models import db, GenerationJob, Story
+from api.functions.prompt_assembly import StoryFormatError
+from api.jobs import worker
+from api.jobs.worker import run_worker
+
+
+class TestRunWorker:
+    """
+    Test processing the queued jobs.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, generation_jobs) -> None:
+        """
+        Test that the worker generates the story of every queued job.
+        """
+        job_ids = generation_jobs(3)
+
+        assert asyncio.run(run_worker(app, concurrency=2, burst=True)) == 3
+
+        with app.app_context():
+            for job_id in job_ids:
+                job = db.session.get(GenerationJob, job_id)
+                assert job.status == "succeeded"
+                assert job.attempts == 1
+                assert db.session.get(Story, job.story_id) is not None
+
+    @staticmethod
+    def test_concurrency_limit(
+        app: Flask, generation_jobs, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the worker never runs more jobs than its concurrency.
+        """
+        running = 0
+        max_running = 0
+
+        async def generate(**kwargs):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            yield {"type": "story", "story_id": None}
+
+        monkeypatch.setattr(worker, "assemble_story_events_async", generate)
+        generation_jobs(5)
+
+        assert asyncio.run(run_worker(app, concurrency=2, burst=True)) == 5
+        assert max_running == 2
+
+    @staticmethod
+    def test_claims_into_free_slots(
+        app: Flask, generation_jobs, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a job queued while another one is running starts in a free
+        slot without waiting for the running job to finish.
+        """
+        first_started = asyncio.Event()
+        second_started = asyncio.Event()
+
+        async def generate(**kwargs):
+            if not first_started.is_set():
+                # The first job only finishes once the second one started
+                first_started.set()
+                await asyncio.wait_for(second_started.wait(), 1)
+            else:
+                second_started.set()
+            yield {"type": "story", "story_id": None}
+
+        monkeypatch.setattr(worker, "assemble_story_events_async", generate)
+        job_ids = generation_jobs()
+
+        async def run_and_enqueue() -> int:
+            stop = asyncio.Event()
+            task = asyncio.create_task(
+                run_worker(app, concurrency=2, poll_interval=0.01, stop=stop)
+            )
+            await first_started.wait()
+            job_ids.extend(generation_jobs())
+            await second_started.wait()
+            stop.set()
+            return await task
+
+        assert asyncio.run(run_and_enqueue()) == 2
+
+        with app.app_context():
+            for job_id in job_ids:
+                job = db.session.get(GenerationJob, job_id)
+                assert job.status == "succeeded"
+                assert job.attempts == 1
+
+    @staticmethod
+    def test_retry(
+        app: Flask, generation_jobs, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a failed job is retried.
+        """
+        generate_story = worker.assemble_story_events_async
+        calls = 0
+
+        async def flaky_generate(**kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("OpenAI API unavailable")
+            async for event in generate_story(**kwargs):
+                yield event
+
+        monkeypatch.setattr(
+            worker, "assemble_story_events_async", flaky_generate
+        )
+        (job_id,) = generation_jobs()
+
+        assert asyncio.run(run_worker(app, burst=True)) == 2
+
+        with app.app_context():
+            job = db.session.get(GenerationJob, job_id)
+            assert job.status == "succeeded"
+            assert job.attempts == 2
+            assert job.error is None
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "error, message",
+        [
+            (
+                StoryFormatError("Invalid story format."),
+                "Invalid story format.",
+            ),
+            (RuntimeError("Secret details"), "Internal Server Error"),
+        ],
+    )
+    def test_failed(
+        app: Flask,
+        generation_jobs,
+        monkeypatch: pytest.MonkeyPatch,
+        error: Exception,
+        message: str,
+    ) -> None:
+        """
+        Test that a job failing every attempt is marked as failed.
+        """
+
+        async def failing_generate(**kwargs):
+            raise error
+            yield
+
+        monkeypatch.setattr(
+            worker, "assemble_story_events_async", failing_generate
+        )
+        (job_id,) = generation_jobs()
+        max_attempts = app.config["GENERATION_JOB_MAX_ATTEMPTS"]
+
+        assert asyncio.run(run_worker(app, burst=True)) == max_attempts
+
+        with app.app_context():
+            job = db.session.get(GenerationJob, job_id)
+            assert job.status == "failed"
+            assert job.attempts == max_attempts
+            assert job.error == message
+
+    @staticmethod
+    def test_not_retried(
+        app: Flask, generation_jobs, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a job failing with a validation error (e.g. a deleted
+        child) is marked as failed without being retried.
+        """
+
+        async def failing_generate(**kwargs):
+            raise ValueError("Child with ID 'abc' does not exist")
+            yield
+
+        monkeypatch.setattr(
+            worker, "assemble_story_events_async", failing_generate
+        )
+        (job_id,) = generation_jobs()
+
+        assert asyncio.run(run_worker(app, burst=True)) == 1
+
+        with app.app_context():
+            job = db.session.get(GenerationJob, job_id)
+            assert job.status == "failed"
+            assert job.attempts == 1
+            assert job.error == "Child with ID 'abc' does not exist"
+
+    @staticmethod
+    def test_stop(app: Flask, generation_jobs) -> None:
+        """
+        Test that a stopped worker finishes its running jobs.
+        """
+        (job_id,) = generation_jobs()
+
+        async def run_and_stop() -> int:
+            stop = asyncio.Event()
+            task = asyncio.create_task(run_worker(app, stop=stop))
+            await asyncio.sleep(0.05)
+            stop.set()
+            return await task
+
+        assert asyncio.run(run_and_stop()) == 1
+
+        with app.app_context():
+            assert db.session.get(GenerationJob, job_id).status == "succeeded"
+
+
+class TestWorkCommand:
+    """
+    Test the "flask jobs work" command.
+    """
+
+    @staticmethod
+    def test_burst(app: Flask, generation_jobs) -> None:
+        """
+        Test processing the queued jobs from the command line.
+        """
+        (job_id,) = generation_jobs()
+
+        result = app.test_cli_runner().invoke(args=["jobs", "work", "--burst"])
+
+        assert result.exit_code == 0
+
+        with app.app_context():
+            assert db.session.get(GenerationJob, job_id).status == "succeeded"
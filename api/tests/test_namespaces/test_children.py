@@ -2,11 +2,56 @@
 This module contains tests for the children namespace.
 """
 
+import asyncio
+import json
 import pytest
+from flask import Flask
 from flask.testing import FlaskClient
+from sqlalchemy import inspect
 from uuid import uuid4
 
-from api.database.models import Child
+from api.database.models import db, Child, GenerationJob, Portrait
+from api.functions import prepare_data
+from api.functions.portraits import add_portrait
+from api.jobs.worker import run_worker
+from api.storage.images import ProcessedImage
+
+
+@pytest.fixture
+def portrait_jobs(app: Flask):
+    """
+    Delete the portrait jobs queued by the test.
+    """
+    yield
+
+    with app.app_context():
+        GenerationJob.query.filter_by(kind="portrait").delete()
+        db.session.commit()
+
+
+@pytest.fixture
+def batch_children(app: Flask, portrait_jobs):
+    """
+    Delete the children added by the batch tests (named "Batch ...").
+    """
+    yield
+
+    with app.app_context():
+        Child.query.filter(Child.name.startswith("Batch")).delete()
+        db.session.commit()
+
+
+# Attributes of the children of the batch tests
+BATCH_CHILD = {
+    "name": "Batch",
+    "age_range": "7-9",
+    "sex": "Female",
+    "eye_color": "Hazel",
+    "hair_type": "Curly",
+    "hair_color": "Brown",
+    "ethnicity": "Latino",
+    "fav_animals": "Dogs",
+}
 
 
 class TestChildGet:
@@ -30,9 +75,14 @@ class TestChildGet:
         assert response.status_code == 200
 
         # Check if the response keys are a subset of the child's keys
+        # (plus the URL of the child's image)
         response_keys = set(response.json.keys())
-        child_keys = set(child.__dict__.keys())
+        # (the columns of the model, since the deferred image is not loaded)
+        child_keys = {
+            attr.key for attr in inspect(child).mapper.column_attrs
+        } | {"image_url", "thumbnail_urls"}
         assert response_keys.issubset(child_keys)
+        assert response.json["image_url"].endswith(f"/api/media/{child.image}")
 
         # Check if the response values match the child's values
         assert response.json["child_id"] == child.child_id
@@ -139,9 +189,12 @@ class TestChildPost:
     """
 
     @staticmethod
-    def test_success(client: FlaskClient, access_token: str) -> None:
+    def test_success(
+        app: Flask, client: FlaskClient, access_token: str, portrait_jobs
+    ) -> None:
         """
-        Test the POST method of the children endpoint.
+        Test the POST method of the children endpoint (the child is added
+        with a placeholder until the worker generates its portrait).
         """
         response = client.post(
             "/api/children",
@@ -157,7 +210,7 @@ class TestChildPost:
             },
         )
 
-        assert response.status_code == 200
+        assert response.status_code == 202
 
         assert "child_id" in response.json
         assert "name" in response.json
@@ -171,6 +224,115 @@ class TestChildPost:
         assert "fav_activities" in response.json
         assert "fav_shows" in response.json
 
+        # The placeholder is served until the portrait is generated
+        child_id = response.json["child_id"]
+        assert response.json["image_status"] == "pending"
+        assert response.json["thumbnail_urls"] == {}
+        placeholder_url = response.json["image_url"]
+        assert response.headers["Location"].endswith(
+            f"/api/children/{child_id}/image"
+        )
+
+        # The worker generates the portrait
+        assert asyncio.run(run_worker(app, burst=True)) == 1
+
+        response = client.get(
+            f"/api/children/{child_id}/image",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 200
+        assert response.json["child_id"] == child_id
+        assert response.json["image_status"] == "ready"
+        assert response.json["image_url"] != placeholder_url
+
+    @staticmethod
+    def test_portrait_library(
+        client: FlaskClient, access_token: str, portrait_jobs
+    ) -> None:
+        """
+        Test that a child whose portrait is in the portrait library is added
+        with it (without queuing a job).
+        """
+        attributes = {
+            "age_range": "10-13",
+            "sex": "Female",
+            "eye_color": "Amber",
+            "hair_type": "Kinky",
+            "hair_color": "Auburn",
+            "ethnicity": "Black",
+        }
+        with client.application.app_context():
+            portrait = add_portrait(
+                attributes, ProcessedImage(b"library portrait", {})
+            )
+            image_key = portrait.image
+
+        try:
+            response = client.post(
+                "/api/children",
+                headers={"Authorization": f"Bearer {access_token}"},
+                json={"name": "Library", **attributes},
+            )
+
+            assert response.status_code == 200
+            assert response.json["image_status"] == "ready"
+            assert response.json["image_url"].endswith(
+                f"/api/media/{image_key}"
+            )
+            with client.application.app_context():
+                assert GenerationJob.query.count() == 0
+        finally:
+            with client.application.app_context():
+                Portrait.query.delete()
+                db.session.commit()
+
+    @staticmethod
+    def test_portrait_failed(
+        app: Flask,
+        client: FlaskClient,
+        access_token: str,
+        portrait_jobs,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that the child keeps its placeholder when the portrait cannot
+        be generated.
+        """
+
+        async def fail(child_params):
+            raise RuntimeError("The image generation failed")
+
+        monkeypatch.setattr(prepare_data, "generate_child_image_async", fail)
+        monkeypatch.setitem(app.config, "GENERATION_JOB_MAX_ATTEMPTS", 1)
+
+        response = client.post(
+            "/api/children",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "name": "Failed",
+                "age_range": "4-6",
+                "sex": "Male",
+                "eye_color": "Gray",
+                "hair_type": "Wavy",
+                "hair_color": "Gray",
+                "ethnicity": "White",
+            },
+        )
+        child_id = response.json["child_id"]
+        placeholder_url = response.json["image_url"]
+
+        assert asyncio.run(run_worker(app, burst=True)) == 1
+
+        response = client.get(
+            f"/api/children/{child_id}/image",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 200
+        assert response.json["image_status"] == "failed"
+        assert response.json["image_url"] == placeholder_url
+
     @staticmethod
     def test_unauthorized(client: FlaskClient) -> None:
         """
@@ -425,6 +587,64 @@ class TestChildPost:
         assert "Input payload validation failed" in response.json["message"]
 
 
+class TestChildImageGet:
+    """
+    Test the GET method of the child image endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        client: FlaskClient, child: Child, access_token: str
+    ) -> None:
+        """
+        Test that only the image status and URLs of the child are returned.
+        """
+        response = client.get(
+            f"/api/children/{child.child_id}/image",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 200
+        assert set(response.json) == {
+            "child_id",
+            "image",
+            "thumbnails",
+            "image_status",
+            "image_url",
+            "thumbnail_urls",
+        }
+        assert response.json["image_status"] == "ready"
+        assert response.json["image_url"].endswith(f"/api/media/{child.image}")
+
+    @staticmethod
+    def test_unauthorized(client: FlaskClient, child: Child) -> None:
+        """
+        Test the GET method of the child image endpoint without a token.
+        """
+        response = client.get(f"/api/children/{child.child_id}/image")
+
+        assert response.status_code == 401
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "child_id, status_code", [("invalid", 400), (uuid4().hex, 404)]
+    )
+    def test_invalid_child(
+        client: FlaskClient, access_token: str, child_id: str, status_code: int
+    ) -> None:
+        """
+        Test the GET method of the child image endpoint with an invalid or
+        unknown child ID.
+        """
+        response = client.get(
+            f"/api/children/{child_id}/image",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == status_code
+        assert "Error" in response.json
+
+
 class TestChildPatch:
     """
     Test the PATCH method of the children endpoint.
@@ -907,3 +1127,339 @@ class TestAllChildrenGet:
 
         assert response.status_code == 422
         assert "Not enough segments" in response.json["msg"]
+
+    @staticmethod
+    def test_fields(
+        client: FlaskClient, child: Child, access_token: str
+    ) -> None:
+        """
+        Test returning only the selected fields (e.g. without the image).
+        """
+        response = client.get(
+            "/api/children/all",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={"fields": "child_id,name"},
+        )
+
+        assert response.status_code == 200
+        assert response.json["next_cursor"] is None
+        assert {"child_id": child.child_id, "name": child.name} in (
+            response.json["children"]
+        )
+        for retrieved_child in response.json["children"]:
+            assert set(retrieved_child) == {"child_id", "name"}
+
+    @staticmethod
+    def test_invalid_fields(client: FlaskClient, access_token: str) -> None:
+        """
+        Test the GET method of the all_children endpoint with unknown fields.
+        """
+        response = client.get(
+            "/api/children/all",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={"fields": "password"},
+        )
+
+        assert response.status_code == 400
+        assert "Invalid fields: password." in response.json["Error"]
+
+    @staticmethod
+    def test_bounded_queries(
+        client: FlaskClient, child: Child, access_token: str, count_queries
+    ) -> None:
+        """
+        Test that the children are listed with a single query.
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        client.get("/api/children/all", headers=headers)
+
+        with count_queries() as statements:
+            response = client.get("/api/children/all", headers=headers)
+
+        assert response.status_code == 200
+        assert len(statements) == 1
+
+
+class TestChildrenBatchPost:
+    """
+    Test the POST method of the children batch endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        app: Flask,
+        client: FlaskClient,
+        access_token: str,
+        batch_children,
+        count_queries,
+    ) -> None:
+        """
+        Test that the children are added at once, with a portrait job per
+        child without a portrait in the portrait library.
+        """
+        library_attributes = {
+            "age_range": "0-3",
+            "sex": "Male",
+            "eye_color": "Blue",
+            "hair_type": "Bald",
+            "hair_color": "Bald",
+            "ethnicity": "Asian",
+        }
+        with app.app_context():
+            add_portrait(
+                library_attributes, ProcessedImage(b"batch portrait", {})
+            )
+
+        try:
+            batch = [
+                {**BATCH_CHILD, "name": f"Batch {i}"} for i in range(5)
+            ] + [{"name": "Batch library", **library_attributes}]
+
+            with count_queries() as statements:
+                response = client.post(
+                    "/api/children/batch",
+                    headers={"Authorization": f"Bearer {access_token}"},
+                    json=batch,
+                )
+
+            assert response.status_code == 202
+            children = response.json["children"]
+            assert [child["name"] for child in children] == [
+                child["name"] for child in batch
+            ]
+            assert [child["image_status"] for child in children] == [
+                "pending"
+            ] * 5 + ["ready"]
+
+            # The children and their jobs are inserted in one statement
+            # each, whatever the size of the batch
+            inserts = [
+                statement
+                for statement in statements
+                if statement.lstrip().upper().startswith("INSERT")
+            ]
+            assert len(inserts) == 2
+
+            # The worker generates the 5 portraits
+            assert asyncio.run(run_worker(app, burst=True)) == 5
+
+            response = client.get(
+                f"/api/children/{children[0]['child_id']}/image",
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            assert response.json["image_status"] == "ready"
+        finally:
+            with app.app_context():
+                Portrait.query.delete()
+                db.session.commit()
+
+    @staticmethod
+    def test_ndjson(
+        app: Flask, client: FlaskClient, access_token: str, batch_children
+    ) -> None:
+        """
+        Test adding children from NDJSON (the other fields are ignored).
+        """
+        lines = [
+            json.dumps({**BATCH_CHILD, "name": "Batch A", "child_id": "x"}),
+            "",
+            json.dumps({**BATCH_CHILD, "name": "Batch B"}),
+        ]
+
+        response = client.post(
+            "/api/children/batch",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/x-ndjson",
+            },
+            data="\n".join(lines),
+        )
+
+        assert response.status_code == 202
+        assert [child["name"] for child in response.json["children"]] == [
+            "Batch A",
+            "Batch B",
+        ]
+        assert response.json["children"][0]["child_id"] != "x"
+
+    @staticmethod
+    def test_invalid_children(
+        app: Flask, client: FlaskClient, access_token: str, batch_children
+    ) -> None:
+        """
+        Test that the errors of all the invalid children are returned, and
+        that no child is added.
+        """
+        with app.app_context():
+            count = Child.query.count()
+
+        response = client.post(
+            "/api/children/batch",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json=[
+                BATCH_CHILD,
+                {**BATCH_CHILD, "age_range": "20-30"},
+                BATCH_CHILD,
+                {**BATCH_CHILD, "name": ""},
+            ],
+        )
+
+        assert response.status_code == 400
+        assert response.json["Error"] == "Found 2 invalid children"
+        assert [row["row"] for row in response.json["Rows"]] == [2, 4]
+        assert "Invalid value for age_range: 20-30." in (
+            response.json["Rows"][0]["Error"]
+        )
+        with app.app_context():
+            assert Child.query.count() == count
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "headers, data, error",
+        [
+            ({}, json.dumps({"name": "Batch"}), "Expected a JSON array"),
+            ({}, json.dumps([]), "No children provided"),
+            ({}, json.dumps(["Batch"]), "Every child must be a JSON object"),
+            (
+                {"Content-Type": "application/x-ndjson"},
+                '{"name": "Batch"}\n{"name": ',
+                "Invalid JSON on line 2",
+            ),
+        ],
+    )
+    def test_invalid_body(
+        client: FlaskClient,
+        access_token: str,
+        headers: dict[str, str],
+        data: str,
+        error: str,
+    ) -> None:
+        """
+        Test the POST method of the children batch endpoint with an invalid
+        body.
+        """
+        response = client.post(
+            "/api/children/batch",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json",
+                **headers,
+            },
+            data=data,
+        )
+
+        assert response.status_code == 400
+        assert response.json["Error"].startswith(error)
+
+    @staticmethod
+    def test_too_many_children(
+        app: Flask,
+        client: FlaskClient,
+        access_token: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that the size of a batch is limited.
+        """
+        monkeypatch.setitem(app.config, "CHILDREN_BATCH_MAX_SIZE", 2)
+
+        response = client.post(
+            "/api/children/batch",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json=[BATCH_CHILD] * 3,
+        )
+
+        assert response.status_code == 400
+        assert response.json["Error"] == (
+            "At most 2 children can be added at once but found 3"
+        )
+
+    @staticmethod
+    def test_unauthorized(client: FlaskClient) -> None:
+        """
+        Test the POST method of the children batch endpoint without a token.
+        """
+        response = client.post("/api/children/batch", json=[BATCH_CHILD])
+
+        assert response.status_code == 401
+
+
+class TestChildrenExportGet:
+    """
+    Test the GET method of the children export endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        app: Flask,
+        client: FlaskClient,
+        child: Child,
+        access_token: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that all the children are streamed as NDJSON, page by page.
+        """
+        monkeypatch.setitem(app.config, "MAX_PAGE_SIZE", 1)
+        child_id, parent_id, name, image = (
+            child.child_id,
+            child.parent_id,
+            child.name,
+            child.image,
+        )
+
+        response = client.get(
+            "/api/children/export",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.is_streamed
+
+        exported = [json.loads(line) for line in response.text.splitlines()]
+        with app.app_context():
+            assert (
+                len(exported)
+                == Child.query.filter_by(parent_id=child.parent_id).count()
+            )
+
+        exported_child = next(
+            line for line in exported if line["child_id"] == child.child_id
+        )
+        assert exported_child["name"] == child.name
+        assert exported_child["image_url"].endswith(
+            f"/api/media/{child.image}"
+        )
+
+    @staticmethod
+    def test_import_export(
+        client: FlaskClient, child: Child, access_token: str, batch_children
+    ) -> None:
+        """
+        Test that an export can be imported back.
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        exported = client.get("/api/children/export", headers=headers).text
+        lines = [
+            json.dumps({**json.loads(line), "name": f"Batch {i}"})
+            for i, line in enumerate(exported.splitlines())
+        ]
+
+        response = client.post(
+            "/api/children/batch",
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+            data="\n".join(lines),
+        )
+
+        assert response.status_code == 202
+        assert len(response.json["children"]) == len(lines)
+
+    @staticmethod
+    def test_unauthorized(client: FlaskClient) -> None:
+        """
+        Test the GET method of the children export endpoint without a token.
+        """
+        response = client.get("/api/children/export")
+
+        assert response.status_code == 401
@@ -0,0 +1,48 @@
+"""
+This module contains tests for the media namespace.
+"""
+
+from flask.testing import FlaskClient
+
+from api.storage.blob_store import compute_blob_key
+
+
+class TestBlobGet:
+    """
+    Test the GET method of the media endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        client: FlaskClient, image_key: str, image_bytes: bytes
+    ) -> None:
+        """
+        Test the GET method of the media endpoint.
+        """
+        response = client.get(f"/api/media/{image_key}")
+
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        assert response.data == image_bytes
+
+    @staticmethod
+    def test_not_found(client: FlaskClient) -> None:
+        """
+        Test the GET method of the media endpoint with a missing blob.
+        """
+        key = compute_blob_key(b"never stored")
+
+        response = client.get(f"/api/media/{key}")
+
+        assert response.status_code == 404
+        assert f"Blob with key '{key}' not found" in response.json["Error"]
+
+    @staticmethod
+    def test_invalid_key(client: FlaskClient) -> None:
+        """
+        Test the GET method of the media endpoint with an invalid key.
+        """
+        response = client.get("/api/media/invalid_key")
+
+        assert response.status_code == 400
+        assert "Invalid blob key" in response.json["Error"]
@@ -2,11 +2,28 @@
 This module contains tests for the stories namespace.
 """
 
+import asyncio
+import json
 import pytest
+from flask import Flask
 from flask.testing import FlaskClient
 from uuid import uuid4
+from datetime import datetime
 
-from api.database.models import Child, Story, Chapter
+from api.database.models import db, Child, Story, Chapter
+from api.functions import prepare_data
+from api.jobs.worker import run_worker
+
+
+def parse_sse_events(body: str) -> list[tuple[str, dict]]:
+    """
+    Parse the server-sent events of a response body.
+    """
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
 
 
 class TestGenerateStoryPost:
@@ -16,7 +33,7 @@ class TestGenerateStoryPost:
 
     @staticmethod
     def test_success(
-        client: FlaskClient, child: Child, access_token: str
+        app: Flask, client: FlaskClient, child: Child, access_token: str
     ) -> None:
         """
         Test the POST method of the generate_story endpoint.
@@ -32,27 +49,40 @@ class TestGenerateStoryPost:
             },
         )
 
-        assert response.status_code == 200
-        assert (
-            "story_id" in response.json
-            and response.json["story_id"] is not None
+        # The generation is queued
+        assert response.status_code == 202
+        assert response.json["status"] == "queued"
+        assert response.json["story_id"] is None
+        job_id = response.json["job_id"]
+        assert response.headers["Location"].endswith(
+            f"/api/stories/jobs/{job_id}"
         )
-        assert "title" in response.json and response.json["title"] is not None
-        assert (
-            "chapter_titles" in response.json
-            and response.json["chapter_titles"] is not None
-        )
-        assert (
-            "chapter_contents" in response.json
-            and response.json["chapter_contents"] is not None
+
+        # The worker generates the story
+        assert asyncio.run(run_worker(app, burst=True)) == 1
+
+        response = client.get(
+            f"/api/stories/jobs/{job_id}",
+            headers={"Authorization": f"Bearer {access_token}"},
         )
-        assert (
-            "chapter_images" in response.json
-            and response.json["chapter_images"] is not None
+
+        assert response.status_code == 200
+        assert response.json["status"] == "succeeded"
+        assert response.json["attempts"] == 1
+        assert response.json["error"] is None
+
+        # The generated story can be read
+        response = client.get(
+            f"/api/stories/chapters?story_id={response.json['story_id']}",
+            headers={"Authorization": f"Bearer {access_token}"},
         )
-        assert (
-            "created_at" in response.json
-            and response.json["created_at"] is not None
+
+        assert response.status_code == 200
+        assert response.json["story_title"] is not None
+        assert len(response.json["chapters"]) == 5
+        assert all(
+            "/api/media/" in chapter["image_url"]
+            for chapter in response.json["chapters"]
         )
 
     @staticmethod
@@ -352,6 +382,222 @@ class TestGenerateStoryPost:
         )
 
 
+class TestGenerationJobStatusGet:
+    """
+    Test the GET method of the generation job status endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        client: FlaskClient, generation_jobs, access_token: str
+    ) -> None:
+        """
+        Test getting the status of a queued job.
+        """
+        (job_id,) = generation_jobs()
+
+        response = client.get(
+            f"/api/stories/jobs/{job_id}",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 200
+        assert response.json["job_id"] == job_id
+        assert response.json["status"] == "queued"
+        assert response.json["attempts"] == 0
+        assert response.json["story_id"] is None
+        assert "parent_id" not in response.json
+
+    @staticmethod
+    def test_no_token(client: FlaskClient) -> None:
+        """
+        Test getting the status of a job without a token.
+        """
+        response = client.get(f"/api/stories/jobs/{uuid4().hex}")
+
+        assert response.status_code == 401
+
+    @staticmethod
+    def test_not_found(client: FlaskClient, access_token: str) -> None:
+        """
+        Test getting the status of a job that does not exist.
+        """
+        job_id = uuid4().hex
+
+        response = client.get(
+            f"/api/stories/jobs/{job_id}",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 404
+        assert response.json["Error"] == f"Job with ID '{job_id}' not found."
+
+    @staticmethod
+    def test_invalid_id(client: FlaskClient, access_token: str) -> None:
+        """
+        Test getting the status of a job with an invalid ID.
+        """
+        response = client.get(
+            "/api/stories/jobs/invalid_id",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 400
+        assert (
+            "job_id must be a valid UUID hex string" in response.json["Error"]
+        )
+
+
+class TestGenerateStoryStreamPost:
+    """
+    Test the POST method of the generate_story stream endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        app: Flask, client: FlaskClient, child: Child, access_token: str
+    ) -> None:
+        """
+        Test streaming the events of a generated story.
+        """
+        response = client.post(
+            "/api/stories/generate/stream",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "child_id": child.child_id,
+                "topic": "topic",
+                "image_style": "Cartoon",
+                "story_genre": "Fantasy",
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        events = parse_sse_events(response.get_data(as_text=True))
+        names = [name for name, _ in events]
+
+        # The title comes first and the ID of the stored story last
+        assert names[0] == "title" and events[0][1]["title"]
+        assert names[-1] == "story"
+        assert names.count("chapter") == names.count("image") == 5
+
+        # The image of a chapter comes after the chapter
+        chapter_positions = {
+            data["number"]: i
+            for i, (name, data) in enumerate(events)
+            if name == "chapter"
+        }
+        for i, (name, data) in enumerate(events):
+            if name == "image":
+                assert "/api/media/" in data["image_url"]
+                assert chapter_positions[data["number"]] < i
+
+        with app.app_context():
+            story = Story.query.filter_by(
+                story_id=events[-1][1]["story_id"]
+            ).first()
+            assert story is not None
+            assert len(story.chapters) == 5
+
+    @staticmethod
+    def test_no_token(client: FlaskClient, child: Child) -> None:
+        """
+        Test the POST method of the generate_story stream endpoint without a token.
+        """
+        response = client.post(
+            "/api/stories/generate/stream",
+            json={
+                "child_id": child.child_id,
+                "topic": "topic",
+                "image_style": "Cartoon",
+                "story_genre": "Fantasy",
+            },
+        )
+
+        assert response.status_code == 401
+
+    @staticmethod
+    def test_invalid_child_id(client: FlaskClient, access_token: str) -> None:
+        """
+        Test the POST method of the generate_story stream endpoint with an invalid child_id.
+        """
+        response = client.post(
+            "/api/stories/generate/stream",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "child_id": "invalid_id",
+                "topic": "topic",
+                "image_style": "Cartoon",
+                "story_genre": "Fantasy",
+            },
+        )
+
+        assert response.status_code == 400
+        assert (
+            "child_id must be a valid UUID hex string"
+            in response.json["Error"]
+        )
+
+    @staticmethod
+    def test_child_not_found(client: FlaskClient, access_token: str) -> None:
+        """
+        Test the POST method of the generate_story stream endpoint with a child that does not exist.
+        """
+        child_id = uuid4().hex
+
+        response = client.post(
+            "/api/stories/generate/stream",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "child_id": child_id,
+                "topic": "topic",
+                "image_style": "Cartoon",
+                "story_genre": "Fantasy",
+            },
+        )
+
+        assert response.status_code == 404
+        assert (
+            f"Child with ID '{child_id}' not found" in response.json["Error"]
+        )
+
+    @staticmethod
+    def test_generation_error(
+        client: FlaskClient,
+        child: Child,
+        access_token: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that an error during the generation is sent as an event.
+        """
+        monkeypatch.setattr(prepare_data, "dummy_story", "Not a story")
+
+        response = client.post(
+            "/api/stories/generate/stream",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "child_id": child.child_id,
+                "topic": "topic",
+                "image_style": "Cartoon",
+                "story_genre": "Fantasy",
+            },
+        )
+
+        assert response.status_code == 200
+        assert parse_sse_events(response.get_data(as_text=True)) == [
+            (
+                "error",
+                {
+                    "Error": "Invalid story format, "
+                    "could not extract story components."
+                },
+            )
+        ]
+
+
 class TestChildStoriesGet:
     """
     Test the GET method of the child_stories endpoint.
@@ -493,6 +739,189 @@ class TestChildStoriesGet:
         assert response.status_code == 400
         assert "Parameter 'child_id' is required" in response.json["Error"]
 
+    @staticmethod
+    def test_pages(
+        app: Flask, client: FlaskClient, child: Child, access_token: str
+    ) -> None:
+        """
+        Test following the cursors of the pages of the stories, including
+        stories created at the same time.
+        """
+        with app.app_context():
+            created_at = datetime(2024, 1, 1)
+            extra_stories = [
+                Story(
+                    child_id=child.child_id,
+                    title=f"Story {i}",
+                    topic="Travelling to the Moon",
+                    image_style="Cartoon",
+                    story_genre="Adventure",
+                )
+                for i in range(4)
+            ]
+            for extra_story in extra_stories:
+                extra_story.created_at = created_at
+            db.session.add_all(extra_stories)
+            db.session.commit()
+            all_ids = {
+                story.story_id
+                for story in Story.query.filter_by(child_id=child.child_id)
+            }
+
+        try:
+            retrieved = []
+            cursor = None
+            while True:
+                response = client.get(
+                    "/api/stories/child_stories",
+                    headers={"Authorization": f"Bearer {access_token}"},
+                    query_string={
+                        "child_id": child.child_id,
+                        "limit": 2,
+                        **({"cursor": cursor} if cursor else {}),
+                    },
+                )
+
+                assert response.status_code == 200
+                assert len(response.json["stories"]) <= 2
+                retrieved.extend(response.json["stories"])
+
+                cursor = response.json["next_cursor"]
+                if cursor is None:
+                    break
+
+            # Every story is returned once, newest first
+            ids = [story["story_id"] for story in retrieved]
+            assert len(ids) == len(set(ids))
+            assert set(ids) == all_ids
+            keys = [
+                (story["created_at"], story["story_id"]) for story in retrieved
+            ]
+            assert keys == sorted(keys, reverse=True)
+        finally:
+            with app.app_context():
+                for extra_story in extra_stories:
+                    db.session.delete(db.session.merge(extra_story))
+                db.session.commit()
+
+    @staticmethod
+    def test_fields(
+        client: FlaskClient, child: Child, story: Story, access_token: str
+    ) -> None:
+        """
+        Test returning only the selected fields of the stories.
+        """
+        response = client.get(
+            "/api/stories/child_stories",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={
+                "child_id": child.child_id,
+                "fields": "story_id,title",
+            },
+        )
+
+        assert response.status_code == 200
+        for retrieved_story in response.json["stories"]:
+            assert set(retrieved_story) == {"story_id", "title"}
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query_string, expected_error",
+        [
+            ({"limit": 0}, "limit must be a positive integer."),
+            ({"limit": "ten"}, "limit must be a positive integer."),
+            ({"cursor": "invalid"}, "Invalid cursor."),
+            ({"fields": "title,unknown"}, "Invalid fields: unknown."),
+        ],
+    )
+    def test_invalid_page_arguments(
+        client: FlaskClient,
+        child: Child,
+        access_token: str,
+        query_string: dict,
+        expected_error: str,
+    ) -> None:
+        """
+        Test the GET method of the child_stories endpoint with invalid page
+        arguments.
+        """
+        response = client.get(
+            "/api/stories/child_stories",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={"child_id": child.child_id, **query_string},
+        )
+
+        assert response.status_code == 400
+        assert expected_error in response.json["Error"]
+
+    @staticmethod
+    def test_covers(
+        client: FlaskClient,
+        child: Child,
+        access_token: str,
+        make_story,
+        image_key: str,
+    ) -> None:
+        """
+        Test including the URLs of the image of the first chapter and of
+        its thumbnails.
+        """
+        story_id = make_story(chapters=3)
+
+        response = client.get(
+            "/api/stories/child_stories",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={"child_id": child.child_id, "covers": "true"},
+        )
+
+        assert response.status_code == 200
+        covers = {
+            story["story_id"]: story for story in response.json["stories"]
+        }
+        assert covers[story_id]["cover_image_url"].endswith(
+            f"/api/media/{image_key}"
+        )
+        assert covers[story_id]["cover_thumbnail_urls"]["256"].endswith(
+            f"/api/media/{image_key}"
+        )
+
+    @staticmethod
+    def test_bounded_queries(
+        client: FlaskClient,
+        child: Child,
+        access_token: str,
+        make_story,
+        count_queries,
+    ) -> None:
+        """
+        Test that the number of queries does not grow with the number of
+        stories and chapters.
+        """
+
+        def get_stories() -> int:
+            with count_queries() as statements:
+                response = client.get(
+                    "/api/stories/child_stories",
+                    headers={"Authorization": f"Bearer {access_token}"},
+                    query_string={
+                        "child_id": child.child_id,
+                        "covers": "true",
+                    },
+                )
+            assert response.status_code == 200
+            return len(statements)
+
+        make_story(chapters=1)
+        get_stories()
+        few_stories = get_stories()
+
+        for _ in range(5):
+            make_story(chapters=5)
+        many_stories = get_stories()
+
+        # Child check, page of stories and their covers
+        assert few_stories == many_stories == 3
+
 
 class TestStoryChaptersGet:
     """
@@ -534,6 +963,44 @@ class TestStoryChaptersGet:
 
         assert found_chapter_fixture
 
+    @staticmethod
+    def test_without_images(
+        client: FlaskClient, story: Story, chapter: Chapter, access_token: str
+    ) -> None:
+        """
+        Test the GET method of the chapters endpoint without the images.
+        """
+        response = client.get(
+            "/api/stories/chapters",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={"story_id": story.story_id, "images": "false"},
+        )
+
+        assert response.status_code == 200
+        assert response.json["chapters"]
+
+        for retrieved_chapter in response.json["chapters"]:
+            assert "chapter_id" in retrieved_chapter
+            assert "content" in retrieved_chapter
+            assert "image" not in retrieved_chapter
+            assert "image_url" not in retrieved_chapter
+
+    @staticmethod
+    def test_invalid_images_parameter(
+        client: FlaskClient, story: Story, access_token: str
+    ) -> None:
+        """
+        Test the GET method of the chapters endpoint with an invalid images parameter.
+        """
+        response = client.get(
+            "/api/stories/chapters",
+            headers={"Authorization": f"Bearer {access_token}"},
+            query_string={"story_id": story.story_id, "images": "maybe"},
+        )
+
+        assert response.status_code == 400
+        assert "Parameter 'images' must be" in response.json["Error"]
+
     @staticmethod
     def test_unauthorized(client: FlaskClient) -> None:
         """
@@ -631,3 +1098,137 @@ class TestStoryChaptersGet:
 
         assert response.status_code == 400
         assert "Parameter 'story_id' is required" in response.json["Error"]
+
+    @staticmethod
+    @pytest.mark.parametrize("images", ["true", "false"])
+    def test_bounded_queries(
+        client: FlaskClient,
+        access_token: str,
+        make_story,
+        count_queries,
+        images: str,
+    ) -> None:
+        """
+        Test that the number of queries does not grow with the number of
+        chapters, which are returned in their order.
+        """
+
+        def get_chapters(story_id: str) -> int:
+            with count_queries() as statements:
+                response = client.get(
+                    "/api/stories/chapters",
+                    headers={"Authorization": f"Bearer {access_token}"},
+                    query_string={"story_id": story_id, "images": images},
+                )
+            assert response.status_code == 200
+            assert [
+                chapter["order"] for chapter in response.json["chapters"]
+            ] == list(range(1, len(response.json["chapters"]) + 1))
+            return len(statements)
+
+        short_story_id = make_story(chapters=1)
+        long_story_id = make_story(chapters=10)
+        get_chapters(short_story_id)
+
+        # Story and its chapters
+        assert get_chapters(short_story_id) == get_chapters(long_story_id) == 2
+
+
+class TestChapterImageGet:
+    """
+    Test the GET method of the chapter image endpoint.
+    """
+
+    @staticmethod
+    def test_success(
+        client: FlaskClient, chapter: Chapter, image_bytes: bytes
+    ) -> None:
+        """
+        Test the GET method of the chapter image endpoint.
+        """
+        response = client.get(
+            f"/api/stories/chapters/{chapter.chapter_id}/image"
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        assert response.data == image_bytes
+        assert response.headers["ETag"] == f'"{chapter.image}"'
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert "immutable" in response.headers["Cache-Control"]
+
+    @staticmethod
+    def test_not_modified(client: FlaskClient, chapter: Chapter) -> None:
+        """
+        Test the GET method of the chapter image endpoint with a matching ETag.
+        """
+        response = client.get(
+            f"/api/stories/chapters/{chapter.chapter_id}/image",
+            headers={"If-None-Match": f'"{chapter.image}"'},
+        )
+
+        assert response.status_code == 304
+        assert response.data == b""
+
+    @staticmethod
+    def test_range(
+        client: FlaskClient, chapter: Chapter, image_bytes: bytes
+    ) -> None:
+        """
+        Test the GET method of the chapter image endpoint with a byte range.
+        """
+        response = client.get(
+            f"/api/stories/chapters/{chapter.chapter_id}/image",
+            headers={"Range": "bytes=10-99"},
+        )
+
+        assert response.status_code == 206
+        assert response.data == image_bytes[10:100]
+        assert response.headers["Content-Range"] == (
+            f"bytes 10-99/{len(image_bytes)}"
+        )
+
+    @staticmethod
+    def test_range_not_satisfiable(
+        client: FlaskClient, chapter: Chapter, image_bytes: bytes
+    ) -> None:
+        """
+        Test the GET method of the chapter image endpoint with an out of bounds range.
+        """
+        response = client.get(
+            f"/api/stories/chapters/{chapter.chapter_id}/image",
+            headers={"Range": f"bytes={len(image_bytes) + 10}-"},
+        )
+
+        assert response.status_code == 416
+        assert response.headers["Content-Range"] == (
+            f"bytes */{len(image_bytes)}"
+        )
+
+    @staticmethod
+    def test_chapter_not_found(client: FlaskClient) -> None:
+        """
+        Test the GET method of the chapter image endpoint with a chapter that does not exist.
+        """
+        chapter_id = uuid4().hex
+
+        response = client.get(f"/api/stories/chapters/{chapter_id}/image")
+
+        assert response.status_code == 404
+        assert (
+            f"Chapter with ID '{chapter_id}' not found"
+            in response.json["Error"]
+        )
+
+    @staticmethod
+    def test_invalid_chapter_id(client: FlaskClient) -> None:
+        """
+        Test the GET method of the chapter image endpoint with an invalid chapter_id.
+        """
+        response = client.get("/api/stories/chapters/invalid_id/image")
+
+        assert response.status_code == 400
+        assert (
+            "chapter_id must be a valid UUID hex string"
+            in response.json["Error"]
+        )
@@ -0,0 +1,82 @@
+"""
+This module contains tests for the prompt template registry.
+"""
+
+import pytest
+from string import Template
+
+from api.prompting.registry import (
+    PROMPT_TEMPLATES,
+    PromptTemplate,
+    get_prompt_template,
+)
+
+
+class TestPromptTemplate:
+    """
+    Test the PromptTemplate class.
+    """
+
+    @staticmethod
+    def test_placeholders() -> None:
+        """
+        Test that the placeholders are extracted once, without duplicates.
+        """
+        prompt_template = PromptTemplate(
+            "test", Template("${name} is $age, ${name} likes ${topic}.")
+        )
+
+        assert prompt_template.placeholders == {"name", "age", "topic"}
+
+    @staticmethod
+    def test_render() -> None:
+        """
+        Test rendering a template (extra parameters are ignored).
+        """
+        prompt_template = PromptTemplate("test", Template("Hello ${name}!"))
+
+        assert (
+            prompt_template.render({"name": "Pablo", "unused": "value"})
+            == "Hello Pablo!"
+        )
+
+    @staticmethod
+    def test_missing_placeholders() -> None:
+        """
+        Test rendering a template with missing parameters.
+        """
+        prompt_template = PromptTemplate(
+            "test", Template("${name} likes ${topic} and ${animal}.")
+        )
+
+        with pytest.raises(ValueError) as e:
+            prompt_template.render({"name": "Pablo"})
+
+        assert str(e.value) == "Missing required placeholders: animal, topic"
+
+
+class TestGetPromptTemplate:
+    """
+    Test the get_prompt_template function.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("name", ["story", "chapter_image", "child_image"])
+    def test_success(name: str) -> None:
+        """
+        Test getting the registered templates.
+        """
+        prompt_template = get_prompt_template(name)
+
+        assert prompt_template is PROMPT_TEMPLATES[name]
+        assert "age_range" in prompt_template.placeholders
+
+    @staticmethod
+    def test_unknown() -> None:
+        """
+        Test getting a template which is not registered.
+        """
+        with pytest.raises(ValueError) as e:
+            get_prompt_template("unknown")
+
+        assert str(e.value) == "Unknown prompt template: 'unknown'."
@@ -0,0 +1,230 @@
+"""
+This module contains tests for the blob store.
+"""
+
+import pytest
+import threading
+from flask import Flask
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api.storage.blob_store import (
+    BlobStore,
+    LocalBlobStore,
+    S3BlobStore,
+    compute_blob_key,
+    detect_content_type,
+    validate_blob_key,
+)
+
+
+class S3StandInHandler(BaseHTTPRequestHandler):
+    """
+    Minimal in-memory stand-in of an S3 compatible object storage.
+    """
+
+    # Objects stored by path, shared by all the requests of a server
+    objects: dict[str, tuple[bytes, str]] = {}
+
+    def _authorized(self) -> bool:
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("AWS4-HMAC-SHA256 Credential=key/"):
+            self.send_response(403)
+            self.end_headers()
+            return False
+        return True
+
+    def do_PUT(self) -> None:
+        if not self._authorized():
+            return
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.objects[self.path] = (body, self.headers["Content-Type"])
+        self.send_response(200)
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path not in self.objects:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body, content_type = self.objects[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        if not self._authorized():
+            return
+        self.send_response(200 if self.path in self.objects else 404)
+        self.end_headers()
+
+    def do_DELETE(self) -> None:
+        if not self._authorized():
+            return
+        self.objects.pop(self.path, None)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def s3_stand_in():
+    """
+    A running S3 stand-in server.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), S3StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path, s3_stand_in) -> BlobStore:
+    """
+    A blob store of each backend.
+    """
+    if request.param == "local":
+        store = LocalBlobStore(str(tmp_path))
+    else:
+        host, port = s3_stand_in.server_address
+        store = S3BlobStore(
+            f"http://{host}:{port}",
+            "dreamify",
+            "key",
+            "secret",
+            prefix=f"{tmp_path.name}/",
+        )
+
+    yield store
+
+    store.close()
+
+
+class TestBlobStore:
+    """
+    Test the blob store backends.
+    """
+
+    @staticmethod
+    def test_put_get(store: BlobStore, image_bytes: bytes) -> None:
+        """
+        Test storing and retrieving a blob.
+        """
+        key = store.put(image_bytes)
+
+        assert key == compute_blob_key(image_bytes)
+        assert store.exists(key)
+        assert store.get(key) == image_bytes
+
+    @staticmethod
+    def test_put_is_idempotent(store: BlobStore) -> None:
+        """
+        Test that storing the same bytes twice returns the same key.
+        """
+        assert store.put(b"same bytes") == store.put(b"same bytes")
+
+    @staticmethod
+    def test_missing_blob(store: BlobStore) -> None:
+        """
+        Test retrieving a blob that does not exist.
+        """
+        key = compute_blob_key(b"never stored")
+
+        assert not store.exists(key)
+        with pytest.raises(KeyError):
+            store.get(key)
+
+    @staticmethod
+    def test_delete(store: BlobStore) -> None:
+        """
+        Test deleting a blob (twice, the second time being a no-op).
+        """
+        key = store.put(b"to delete")
+
+        store.delete(key)
+        store.delete(key)
+
+        assert not store.exists(key)
+
+    @pytest.mark.parametrize("data", [b"", None, "string"])
+    def test_put_invalid_data(self, store: BlobStore, data) -> None:
+        """
+        Test storing invalid data.
+        """
+        with pytest.raises(ValueError):
+            store.put(data)
+
+    @pytest.mark.parametrize(
+        "key", ["", "abc", "G" * 64, "../" + "a" * 61, None]
+    )
+    def test_invalid_keys(self, store: BlobStore, key) -> None:
+        """
+        Test that invalid keys (e.g. path traversals) are rejected.
+        """
+        with pytest.raises(ValueError):
+            store.get(key)
+
+    @staticmethod
+    def test_url(app: Flask, tmp_path) -> None:
+        """
+        Test the URL of a blob with and without a public base URL.
+        """
+        key = compute_blob_key(b"url")
+
+        with app.test_request_context():
+            assert LocalBlobStore(str(tmp_path)).url(key) == (
+                f"http://localhost/api/media/{key}"
+            )
+            assert LocalBlobStore(
+                str(tmp_path), public_url="https://cdn.example.com/"
+            ).url(key) == (f"https://cdn.example.com/{key}")
+
+    @staticmethod
+    def test_abstract() -> None:
+        """
+        Test that the base class cannot be instantiated.
+        """
+        with pytest.raises(TypeError):
+            BlobStore()
+
+
+class TestHelpers:
+    """
+    Test the blob store helper functions.
+    """
+
+    @pytest.mark.parametrize(
+        "data,content_type",
+        [
+            (b"\x89PNG\r\n\x1a\n...", "image/png"),
+            (b"\xff\xd8\xff\xe0...", "image/jpeg"),
+            (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+            (b"\x00\x00\x00\x1cftypavif", "image/avif"),
+            (b"GIF89a...", "image/gif"),
+            (b"plain text", "application/octet-stream"),
+        ],
+    )
+    def test_detect_content_type(self, data: bytes, content_type: str) -> None:
+        """
+        Test the detection of the content type of images.
+        """
+        assert detect_content_type(data) == content_type
+
+    @staticmethod
+    def test_validate_blob_key() -> None:
+        """
+        Test the validation of blob keys.
+        """
+        validate_blob_key(compute_blob_key(b"valid"))
+
+        with pytest.raises(ValueError):
+            validate_blob_key(compute_blob_key(b"valid").upper())
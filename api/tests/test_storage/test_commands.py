@@ -0,0 +1,45 @@
+"""
+This module contains tests for the blob store CLI commands.
+"""
+
+from base64 import b64encode
+from flask import Flask
+
+from api.database.models import db, Chapter, Story
+from api.storage.blob_store import compute_blob_key, get_blob_store
+
+
+class TestMigrateInlineImages:
+    """
+    Test the "flask blobs migrate" command.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, story: Story, image_bytes: bytes) -> None:
+        """
+        Test migrating a chapter image stored inline as base64.
+        """
+        with app.app_context():
+            # Insert a chapter the way it was stored before the blob store
+            legacy_chapter = Chapter(
+                story_id=story.story_id,
+                title="Legacy Chapter",
+                content="Legacy Content",
+                image=b64encode(image_bytes).decode("utf-8"),
+                order=2,
+            )
+            db.session.add(legacy_chapter)
+            db.session.commit()
+
+            result = app.test_cli_runner().invoke(args=["blobs", "migrate"])
+
+            assert result.exit_code == 0
+            assert "Migrated 1 chapters images." in result.output
+
+            # The row now only holds the key of the stored image
+            db.session.refresh(legacy_chapter)
+            assert legacy_chapter.image == compute_blob_key(image_bytes)
+            assert get_blob_store().get(legacy_chapter.image) == image_bytes
+
+            db.session.delete(legacy_chapter)
+            db.session.commit()
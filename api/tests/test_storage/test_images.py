@@ -0,0 +1,160 @@
+"""
+This module contains tests for the image processing stage.
+"""
+
+import asyncio
+import pytest
+from io import BytesIO
+from flask import Flask
+
+from api.storage import images
+from api.storage.blob_store import get_blob_store
+from api.storage.images import (
+    ImageProcessor,
+    ProcessedImage,
+    store_processed_image,
+    transcode_image,
+    with_thumbnail_urls,
+)
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(scope="module")
+def png_bytes(image_bytes: bytes) -> bytes:
+    """
+    The test image as a PNG (the format of the generated images).
+    """
+    output = BytesIO()
+    Image.open(BytesIO(image_bytes)).save(output, format="PNG")
+    return output.getvalue()
+
+
+class TestTranscodeImage:
+    """
+    Test the transcode_image function.
+    """
+
+    @staticmethod
+    def test_success(png_bytes: bytes) -> None:
+        """
+        Test transcoding a PNG into a WebP master and its thumbnails.
+        """
+        master, thumbnails = transcode_image(png_bytes)
+
+        assert len(master) < len(png_bytes)
+        assert Image.open(BytesIO(master)).format == "WEBP"
+        assert Image.open(BytesIO(master)).size == (1024, 1024)
+
+        assert sorted(thumbnails) == [128, 256, 512]
+        for size, thumbnail in thumbnails.items():
+            image = Image.open(BytesIO(thumbnail))
+            assert image.format == "WEBP"
+            assert image.size == (size, size)
+
+    @staticmethod
+    def test_small_image() -> None:
+        """
+        Test that no thumbnail is larger than the image.
+        """
+        output = BytesIO()
+        Image.new("RGB", (200, 100), "blue").save(output, format="PNG")
+
+        _, thumbnails = transcode_image(output.getvalue())
+
+        assert list(thumbnails) == [128]
+        assert Image.open(BytesIO(thumbnails[128])).size == (128, 64)
+
+    @staticmethod
+    def test_without_pillow(
+        monkeypatch: pytest.MonkeyPatch, png_bytes: bytes
+    ) -> None:
+        """
+        Test that the image is kept as it is when Pillow is not installed.
+        """
+        monkeypatch.setattr(images, "Image", None)
+
+        assert transcode_image(png_bytes) == ProcessedImage(png_bytes, {})
+
+
+class TestImageProcessor:
+    """
+    Test the ImageProcessor class.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("max_workers", [0, 1])
+    def test_success(app: Flask, png_bytes: bytes, max_workers: int) -> None:
+        """
+        Test transcoding an image inline and on the pool of processes.
+        """
+        processor = ImageProcessor(max_workers=max_workers, sizes=(256,))
+        try:
+            with app.app_context():
+                processed = processor.process(png_bytes)
+                processed_async = asyncio.run(
+                    processor.process_async(png_bytes)
+                )
+        finally:
+            processor.close()
+
+        assert processed == processed_async
+        assert list(processed.thumbnails) == [256]
+        assert len(processed.master) < len(png_bytes)
+
+    @staticmethod
+    def test_invalid_image(app: Flask) -> None:
+        """
+        Test that an image which cannot be decoded is kept as it is.
+        """
+        processor = ImageProcessor(max_workers=0)
+
+        with app.app_context():
+            assert processor.process(b"not an image") == ProcessedImage(
+                b"not an image", {}
+            )
+
+
+class TestStoreProcessedImage:
+    """
+    Test storing processed images and referencing their thumbnails.
+    """
+
+    @staticmethod
+    def test_success(app: Flask, png_bytes: bytes) -> None:
+        """
+        Test storing an image with its thumbnails and getting their URLs.
+        """
+        processed = transcode_image(png_bytes, sizes=(128, 256))
+
+        with app.test_request_context():
+            image_key, thumbnail_keys = store_processed_image(processed)
+
+            assert get_blob_store().get(image_key) == processed.master
+            assert list(thumbnail_keys) == ["128", "256"]
+            assert get_blob_store().get(thumbnail_keys["128"]) == (
+                processed.thumbnails[128]
+            )
+
+            attributes = with_thumbnail_urls({"thumbnails": thumbnail_keys})
+
+        assert attributes["thumbnail_urls"]["256"].endswith(
+            f"/api/media/{thumbnail_keys['256']}"
+        )
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "attributes, expected",
+        [
+            ({"thumbnails": None}, {"thumbnails": None, "thumbnail_urls": {}}),
+            ({"title": "Chapter"}, {"title": "Chapter"}),
+        ],
+    )
+    def test_without_thumbnails(
+        app: Flask, attributes: dict, expected: dict
+    ) -> None:
+        """
+        Test the entries without (or without selected) thumbnails.
+        """
+        with app.test_request_context():
+            assert with_thumbnail_urls(attributes) == expected
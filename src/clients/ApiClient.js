@@ -6,6 +6,16 @@ https://blog.miguelgrinberg.com/post/the-react-mega-tutorial-chapter-6-building-
 import { concatErrors } from "../utils/clientUtils";
 import BaseApiClient from "./BaseApiClient";
 
+// Keep the given page parameters (limit, cursor, fields and covers) of a listing
+const pageQuery = (page) =>
+  Object.fromEntries(
+    Object.entries(page).filter(
+      ([key, value]) =>
+        ["limit", "cursor", "fields", "covers"].includes(key) &&
+        value != null
+    )
+  );
+
 // API client for the application
 export default class ApiClient extends BaseApiClient {
   /**
@@ -93,15 +103,53 @@ export default class ApiClient extends BaseApiClient {
   }
 
   /**
-   * Get all children of the current user
-   * @returns {Promise<Object>} The response body
+   * Get the status of a child's image (polled while the portrait of a new
+   * child is generated)
+   * @param {string} childId - The ID of the child
+   * @returns {Promise<Object>} The response body (image_status: "pending",
+   * "ready" or "failed", image_url and thumbnail_urls)
+   * @throws {Error} If childId is not provided
    * @throws {Error} If the response is not ok
    * @example
-   * const response = await apiClient.getAllChildren();
+   * const childId = "4e1bb09b712c40749329c978e5061717";
+   * const response = await apiClient.getChildImage(childId);
    */
-  async getAllChildren() {
+  async getChildImage(childId) {
+    // Check if childId is provided and throw an error if not
+    if (!childId) {
+      throw new Error("Child ID is required to fetch the child's image");
+    }
+
     // Send the request
-    const response = await this.get("children/all");
+    const response = await this.get(`children/${childId}/image`);
+
+    // Parse the response
+    if (response.ok) {
+      return response.body;
+      // If the response is not ok, throw an error
+    } else {
+      const errorMessage =
+        response?.body?.Error ||
+        response?.body?.error ||
+        concatErrors(response?.body?.errors);
+      throw new Error(`Error while fetching child image: ${errorMessage}`);
+    }
+  }
+
+  /**
+   * Get a page of the children of the current user (newest first)
+   * @param {Object} [page] - The page to get
+   * @param {number} [page.limit] - The maximum number of children
+   * @param {string} [page.cursor] - The next_cursor of the previous page
+   * @param {string} [page.fields] - The comma-separated fields to return
+   * @returns {Promise<Object>} The response body (children and next_cursor)
+   * @throws {Error} If the response is not ok
+   * @example
+   * const response = await apiClient.getAllChildren({ fields: "child_id,name" });
+   */
+  async getAllChildren(page = {}) {
+    // Send the request
+    const response = await this.get("children/all", pageQuery(page));
 
     // Parse the response
     if (response.ok) {
@@ -172,13 +220,13 @@ export default class ApiClient extends BaseApiClient {
   }
 
   /**
-   * Generate a story
+   * Queue the generation of a story (poll it with getGenerationJob)
    * @param {Object} payload - The payload to generate a story
    * @param {string} payload.child_id - The ID of the child
    * @param {string} payload.topic - The topic of the story
    * @param {string} payload.story_genre - The genre of the story
    * @param {string} payload.image_style - The image style of the story
-   * @returns {Promise<Object>} The response body
+   * @returns {Promise<Object>} The queued job (job_id, status, ...)
    * @throws {Error} If payload is not provided
    * @throws {Error} If the response is not ok
    * @example
@@ -188,7 +236,7 @@ export default class ApiClient extends BaseApiClient {
    *  story_genre: "Fantasy",
    *  image_style: "Cartoon"
    * }
-   * const response = await apiClient.postGenerateStory(payload);
+   * const job = await apiClient.postGenerateStory(payload);
    */
   async postGenerateStory(payload) {
     // Check if payload is provided and throw an error if not
@@ -213,25 +261,145 @@ export default class ApiClient extends BaseApiClient {
   }
 
   /**
-   * Get all stories of a child
+   * Get the status of a story generation job
+   * @param {string} jobId - The ID of the job
+   * @returns {Promise<Object>} The job (status is "queued", "running",
+   * "succeeded" with the story_id or "failed" with the error)
+   * @throws {Error} If jobId is not provided
+   * @throws {Error} If the response is not ok
+   * @example
+   * const jobId = "2b1d8c5e0a4f4d3c9e7b6a5f4e3d2c1b";
+   * const job = await apiClient.getGenerationJob(jobId);
+   */
+  async getGenerationJob(jobId) {
+    // Check if jobId is provided and throw an error if not
+    if (!jobId) {
+      throw new Error("Job ID is required to fetch the generation status");
+    }
+
+    // Send the request
+    const response = await this.get(`stories/jobs/${jobId}`);
+
+    // Parse the response
+    if (response.ok) {
+      return response.body;
+      // If the response is not ok, throw an error
+    } else {
+      const errorMessage =
+        response?.body?.Error ||
+        response?.body?.error ||
+        concatErrors(response?.body?.errors);
+      throw new Error(`Error while fetching generation status: ${errorMessage}`);
+    }
+  }
+
+  /**
+   * Generate a story progressively (server-sent events)
+   * @param {Object} payload - The payload to generate a story
+   * @param {string} payload.child_id - The ID of the child
+   * @param {string} payload.topic - The topic of the story
+   * @param {string} payload.story_genre - The genre of the story
+   * @param {string} payload.image_style - The image style of the story
+   * @param {Function} onEvent - Called with each event as soon as it arrives
+   * ({type: "title", title}, {type: "chapter", number, title, content},
+   * {type: "image", number, image_url} or {type: "story", story_id, created_at})
+   * @returns {Promise<Object>} The final "story" event
+   * @throws {Error} If payload is not provided
+   * @throws {Error} If the response is not ok or an error event is received
+   * @example
+   * const payload = {
+   *  child_id: "83adfb09110747bc93575bd208a52d8b",
+   *  topic: "Travelling to Hogwarts",
+   *  story_genre: "Fantasy",
+   *  image_style: "Cartoon"
+   * }
+   * const story = await apiClient.postGenerateStoryStream(payload, console.log);
+   */
+  async postGenerateStoryStream(payload, onEvent) {
+    // Check if payload is provided and throw an error if not
+    if (!payload) {
+      throw new Error("Payload is required to generate a story");
+    }
+
+    // Send the request
+    const response = await this.stream("stories/generate/stream", payload);
+
+    // Parse the error response
+    if (!response.ok) {
+      const body = await response.json();
+      const errorMessage =
+        body?.Error || body?.error || concatErrors(body?.errors);
+      throw new Error(`Error while generating story: ${errorMessage}`);
+    }
+
+    // Read the events as they arrive
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let story = null;
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      const blocks = buffer.split("\n\n");
+      buffer = blocks.pop();
+      for (const block of blocks) {
+        const dataLine = block
+          .split("\n")
+          .find((line) => line.startsWith("data: "));
+        if (!dataLine) {
+          continue;
+        }
+        const event = JSON.parse(dataLine.slice("data: ".length));
+
+        // Throw an error if the generation failed
+        if (event.Error) {
+          throw new Error(`Error while generating story: ${event.Error}`);
+        }
+        if (event.type === "story") {
+          story = event;
+        }
+        onEvent(event);
+      }
+    }
+
+    if (!story) {
+      throw new Error("Error while generating story: incomplete stream");
+    }
+    return story;
+  }
+
+  /**
+   * Get a page of the stories of a child (newest first)
    * @param {string} childId - The ID of the child
-   * @returns {Promise<Object>} The response body
+   * @param {Object} [page] - The page to get
+   * @param {number} [page.limit] - The maximum number of stories
+   * @param {string} [page.cursor] - The next_cursor of the previous page
+   * @param {string} [page.fields] - The comma-separated fields to return
+   * @param {boolean} [page.covers] - Whether to include the cover_image_url
+   * and the cover_thumbnail_urls (by size)
+   * @returns {Promise<Object>} The response body (stories and next_cursor)
    * @throws {Error} If childId is not provided
    * @throws {Error} If the response is not ok
    * @example
    * const childId = "83adfb09110747bc93575bd208a52d8b"
-   * const response = await apiClient.getAllChildStories(childId);
+   * const response = await apiClient.getAllChildStories(childId, { limit: 10 });
    */
-  async getAllChildStories(childId) {
+  async getAllChildStories(childId, page = {}) {
     // Check if childId is provided and throw an error if not
     if (!childId) {
       throw new Error("Child ID is required to fetch child stories");
     }
 
     // Send the request
-    const response = await this.get(
-      `stories/child_stories?child_id=${childId}`
-    );
+    const response = await this.get("stories/child_stories", {
+      child_id: childId,
+      ...pageQuery(page),
+    });
 
     // Parse the response
     if (response.ok) {
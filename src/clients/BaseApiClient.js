@@ -62,6 +62,24 @@ export default class BaseApiClient {
     };
   }
 
+  // Send a POST request and return the raw (streamed) response
+  async stream(url, body) {
+    // Retrieve the access token from storage
+    const token = localStorage.getItem("access_token");
+
+    return fetch(this.base_url + url, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "text/event-stream",
+
+        // Include the authorization token if it's available
+        ...(token ? { Authorization: `Bearer ${token}` } : null),
+      },
+      body: JSON.stringify(body),
+    });
+  }
+
   // Convenience methods for different request types
   async get(url, query, options) {
     return this.request({ method: "GET", url, query, ...options });
@@ -6,6 +6,9 @@ import { useApi } from "../contexts/ApiProvider";
 import Spinner from "./Spinner";
 import "./styles/ChildProfileCard.css";
 
+// Time between two polls of a portrait being generated (in milliseconds)
+const IMAGE_POLL_INTERVAL = 3000;
+
 // Component that displays a card for a child's profile
 const ChildProfileCard = ({ childId, disableEdit }) => {
   const [childProfile, setChildProfile] = useState(null); // State for storing child profile data
@@ -30,6 +33,27 @@ const ChildProfileCard = ({ childId, disableEdit }) => {
     fetchChildProfile();
   }, [childId, api]);
 
+  // Poll the image while the portrait is generated (a placeholder is shown)
+  const imageStatus = childProfile?.image_status;
+  useEffect(() => {
+    if (imageStatus !== "pending") {
+      return;
+    }
+
+    const interval = setInterval(async () => {
+      try {
+        const image = await api.getChildImage(childId);
+        if (image.image_status !== "pending") {
+          setChildProfile((profile) => ({ ...profile, ...image }));
+        }
+      } catch (err) {
+        // Keep the placeholder and try again on the next poll
+      }
+    }, IMAGE_POLL_INTERVAL);
+
+    return () => clearInterval(interval);
+  }, [imageStatus, childId, api]);
+
   // Render a spinner while data is loading
   if (isLoading) {
     return <Spinner />;
@@ -42,7 +66,8 @@ const ChildProfileCard = ({ childId, disableEdit }) => {
   return (
     <div className="child-profile-card">
       <img
-        src={"data:image/png;base64," + childProfile.image} // Display child's image
+        // Display the child's image (a thumbnail if there is one)
+        src={childProfile.thumbnail_urls?.["512"] || childProfile.image_url}
         alt={childProfile.name} // Alternative text for the image
       />
       <div className="child-profile-content">
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import { useNavigate } from "react-router-dom";
 import { useApi } from "../contexts/ApiProvider";
 import Spinner from "../components/Spinner";
@@ -45,54 +45,63 @@ export default function LibraryPage() {
     document.title = "Dreamify | Library";
   }, []);
 
+  // Fetch a page of stories of a child and process them for the UI
+  const fetchStoriesPage = useCallback(
+    async (childId, cursor) => {
+      // Get the stories with the image of their first chapter (cover)
+      const storiesResponse = await api.getAllChildStories(childId, {
+        cursor,
+        fields: "story_id,title,created_at",
+        covers: true,
+      });
+
+      // Process the stories for the UI
+      const stories = storiesResponse.stories.map((story) => {
+        // Format the date to be displayed in the UI
+        const dateCreated = new Date(story.created_at)
+          .toISOString()
+          .slice(0, 10)
+          .replace(/-/g, "/");
+
+        // Return the processed story data
+        return {
+          title: story.title,
+          // Show a thumbnail on the card instead of the full-size image
+          image:
+            story.cover_thumbnail_urls?.["512"] || story.cover_image_url || "",
+          dateGenerated: dateCreated,
+          storyId: story.story_id,
+        };
+      });
+
+      return { stories, nextCursor: storiesResponse.next_cursor };
+    },
+    [api]
+  );
+
   // Fetch the data when the component mounts
   useEffect(() => {
     const fetchData = async () => {
       setIsLoading(true);
       try {
-        // Fetch all children concurrently
-        const childrenResponse = await api.getAllChildren();
+        // Fetch the children (without their images)
+        const childrenResponse = await api.getAllChildren({
+          fields: "child_id,name",
+        });
 
-        // Process each child concurrently
+        // Fetch the first page of stories of each child concurrently
         const childrenPromises = childrenResponse.children.map(
           async (child) => {
-            const storiesResponse = await api.getAllChildStories(
+            const { stories, nextCursor } = await fetchStoriesPage(
               child.child_id
             );
 
-            // Fetch all stories' chapters concurrently for the current child
-            const storiesPromises = storiesResponse.stories.map((story) =>
-              api.getAllStoryChapters(story.story_id).then((response) => {
-                const firstImage =
-                  response.chapters && response.chapters.length > 0
-                    ? `data:image/png;base64,${response.chapters[0].image}`
-                    : "";
-
-                // Format the date to be displayed in the UI
-                const dateCreated = new Date(story.created_at)
-                  .toISOString()
-                  .slice(0, 10)
-                  .replace(/-/g, "/");
-
-                // Return the processed story data
-                return {
-                  title: story.title,
-                  image: firstImage,
-                  dateGenerated: dateCreated,
-                  storyId: story.story_id,
-                };
-              })
-            );
-
-            // Await for all stories' data to be fetched and processed
-            const stories = await Promise.all(storiesPromises);
-
             // Return the processed child data
             return {
               childId: child.child_id,
               childName: child.name,
-              numberOfStories: stories.length,
               stories: stories,
+              nextCursor: nextCursor,
             };
           }
         );
@@ -111,7 +120,29 @@ export default function LibraryPage() {
 
     // Fetch data when the component mounts
     fetchData();
-  }, [api]);
+  }, [api, fetchStoriesPage]);
+
+  // Fetch the next page of stories of a child
+  const handleLoadMore = async (childId, cursor) => {
+    try {
+      const { stories, nextCursor } = await fetchStoriesPage(childId, cursor);
+
+      setStoryData((previous) =>
+        previous.map((childData) =>
+          childData.childId === childId
+            ? {
+                ...childData,
+                stories: [...childData.stories, ...stories],
+                nextCursor: nextCursor,
+              }
+            : childData
+        )
+      );
+    } catch (error) {
+      console.error("Error fetching story data:", error);
+      showAlert();
+    }
+  };
 
   // Render the loading spinner while fetching data
   if (isLoading) {
@@ -149,7 +180,10 @@ export default function LibraryPage() {
                 <h1>{childData.childName}'s Bedtime Stories</h1>
               </div>
               <div className="storyh3">
-                <h3>{childData.numberOfStories} items</h3>
+                <h3>
+                  {childData.stories.length}
+                  {childData.nextCursor ? "+" : ""} items
+                </h3>
               </div>
             </div>
             <div className="hr-style"></div>
@@ -174,6 +208,19 @@ export default function LibraryPage() {
                 </div>
               </div>
             ))}
+            {/* Render the button loading the next page of stories */}
+            {childData.nextCursor && (
+              <div className="story-load-more">
+                <button
+                  type="button"
+                  onClick={() =>
+                    handleLoadMore(childData.childId, childData.nextCursor)
+                  }
+                >
+                  Load more stories
+                </button>
+              </div>
+            )}
           </div>
         ))}
       </div>
@@ -19,6 +19,8 @@ export default function NewStoryPage() {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState("");
   const [alertVisible, setAlertVisible] = useState(false);
+  // Set the initial state of the story preview (filled in while generating)
+  const [preview, setPreview] = useState({ title: null, chapters: [] });
 
   const showAlert = () => {
     setAlertVisible(true);
@@ -51,9 +53,36 @@ export default function NewStoryPage() {
     setter(value === "" ? null : value);
   };
 
+  // Function to add a streamed event to the story preview
+  const handleStoryEvent = (event) => {
+    setPreview((preview) => {
+      if (event.type === "title") {
+        return { ...preview, title: event.title };
+      }
+      if (event.type === "chapter") {
+        return {
+          ...preview,
+          chapters: [...preview.chapters, { ...event, image_url: null }],
+        };
+      }
+      if (event.type === "image") {
+        return {
+          ...preview,
+          chapters: preview.chapters.map((chapter) =>
+            chapter.number === event.number
+              ? { ...chapter, image_url: event.image_url }
+              : chapter
+          ),
+        };
+      }
+      return preview;
+    });
+  };
+
   // Function to handle the generation of the story
   const handleGenerate = async (storyTopic, imageStyle, storyGenre) => {
     setIsLoading(true); // Start loading
+    setPreview({ title: null, chapters: [] });
     try {
       const payload = {
         child_id: childId,
@@ -61,7 +90,11 @@ export default function NewStoryPage() {
         image_style: imageStyle,
         story_genre: storyGenre,
       };
-      const response = await api.postGenerateStory(payload);
+      // Stream the story to show each part as soon as it is ready
+      const response = await api.postGenerateStoryStream(
+        payload,
+        handleStoryEvent
+      );
       // Check if the story was generated successfully
       if (response?.story_id) {
         setIsLoading(false);
@@ -81,6 +114,28 @@ export default function NewStoryPage() {
     }
   };
 
+  // Display the story as it is being generated
+  if (isLoading && preview.title) {
+    return (
+      <div className="new-story-page story-preview">
+        <h1>{preview.title}</h1>
+        <div className="hr-style"></div>
+        {preview.chapters.map((chapter) => (
+          <div key={chapter.number} className="story-preview-chapter">
+            <h2>{chapter.title}</h2>
+            {chapter.image_url ? (
+              <img src={chapter.image_url} alt={chapter.title} />
+            ) : (
+              <p className="story-preview-pending">Drawing the picture...</p>
+            )}
+            <p>{chapter.content}</p>
+          </div>
+        ))}
+        <p className="story-preview-pending">Writing the story...</p>
+      </div>
+    );
+  }
+
   // Display a loading spinner while the data is being fetched
   if (isLoading) {
     return (
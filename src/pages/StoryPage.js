@@ -102,7 +102,7 @@ export default function StoryPage() {
               response?.chapters?.map((chapter) => ({
                 title: chapter.title || "No chapter title available",
                 text: chapter.content || "No text available",
-                imageBase64: "data:image/png;base64," + chapter.image,
+                imageBase64: chapter.image_url,
               })) || [],
           });
         } catch (error) {